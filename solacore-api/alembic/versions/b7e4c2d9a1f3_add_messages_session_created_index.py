@@ -0,0 +1,32 @@
+"""add composite index for recent messages per session
+
+Revision ID: b7e4c2d9a1f3
+Revises: a903714778fe
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e4c2d9a1f3"
+down_revision: Union[str, Sequence[str], None] = "a903714778fe"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (session_id, created_at) index for the conversation window query."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_messages_session_created_at "
+            "ON messages (session_id, created_at)"
+        )
+
+
+def downgrade() -> None:
+    """Drop (session_id, created_at) index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY ix_messages_session_created_at")
@@ -0,0 +1,40 @@
+"""add learn session conversation memory
+
+Revision ID: c3f8a6e2b5d4
+Revises: b7e4c2d9a1f3
+Create Date: 2026-10-18 00:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c3f8a6e2b5d4"
+down_revision: Union[str, Sequence[str], None] = "b7e4c2d9a1f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add learn_sessions.memory and a recent-messages index."""
+    # 旧会话 memory 为空，首次发送消息时从最近几条消息初始化
+    op.add_column(
+        "learn_sessions",
+        sa.Column("memory", postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_learn_messages_session_created_at "
+            "ON learn_messages (session_id, created_at)"
+        )
+
+
+def downgrade() -> None:
+    """Drop learn_sessions.memory and the recent-messages index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY ix_learn_messages_session_created_at")
+    op.drop_column("learn_sessions", "memory")
@@ -0,0 +1,53 @@
+"""trim oversized solve profiles
+
+Revision ID: d9b2e7f4a6c1
+Revises: c3f8a6e2b5d4
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d9b2e7f4a6c1"
+down_revision: Union[str, Sequence[str], None] = "c3f8a6e2b5d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 app.schemas.orchestration.PROFILE_LIST_LIMITS 保持一致（迁移不依赖应用代码）
+LIST_LIMITS = {
+    "agent_runs": 32,
+    "last_questions": 8,
+    "constraints": 16,
+}
+
+
+def upgrade() -> None:
+    """Keep only the most recent entries of unbounded solve profile lists."""
+    for field, limit in LIST_LIMITS.items():
+        op.execute(
+            f"""
+            UPDATE solve_profiles
+            SET profile = jsonb_set(
+                profile,
+                '{{{field}}}',
+                (
+                    SELECT jsonb_agg(item ORDER BY position)
+                    FROM jsonb_array_elements(profile -> '{field}')
+                        WITH ORDINALITY AS items(item, position)
+                    WHERE position > jsonb_array_length(profile -> '{field}') - {limit}
+                )
+            )
+            WHERE CASE
+                WHEN jsonb_typeof(profile -> '{field}') = 'array'
+                THEN jsonb_array_length(profile -> '{field}') > {limit}
+                ELSE false
+            END
+            """
+        )
+
+
+def downgrade() -> None:
+    """Trimmed entries cannot be restored; nothing to undo."""
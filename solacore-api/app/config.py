@@ -69,17 +69,97 @@ class Settings(BaseSettings):
     payments_enabled: bool = True
 
     # LLM 配置
-    llm_provider: str = "openai"
+    llm_provider: str = "openai"  # openai / anthropic / openrouter / fake
     openai_api_key: str = ""
     anthropic_api_key: str = ""
     openrouter_api_key: str = ""
+    openai_base_url: str = "https://api.openai.com/v1"
+    anthropic_base_url: str = "https://api.anthropic.com/v1"
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    # llm_provider=fake 时指向本地替身服务（scripts/fake_llm_server.py），不需要 API Key
+    fake_llm_base_url: str = "http://127.0.0.1:8765"
+    fake_llm_format: str = (
+        "openai"  # 替身服务使用的协议：openai / anthropic / openrouter
+    )
     openrouter_app_name: str = ""
     openrouter_referer: str = ""
     openrouter_reasoning_fallback: bool = False
     llm_model: str = "gpt-4o-mini"
     llm_timeout: int = 30
     llm_max_tokens: int = 1024
+    # LLM HTTP 连接池（按提供商共享，应用生命周期内复用）
+    llm_http2: bool = False  # 需要安装 h2
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_warmup_on_startup: bool = True
+
+    # 多提供商路由：失败立即切换到备用提供商，首字过慢时发起对冲请求
+    llm_fallback_providers: str = ""  # 逗号分隔，如 "anthropic,openrouter"
+    llm_fallback_models: str = ""  # 如 "anthropic=claude-3-5-haiku-latest"
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 0.95  # 主提供商 TTFT 超过该分位即对冲
+    llm_hedge_initial_delay_ms: int = 2000  # 样本不足时的对冲阈值
+    llm_hedge_min_delay_ms: int = 500
+
+    # 按 Solve 步骤 / Learn 步骤 / Learn 工具选择模型与生成参数（见 generation_routes）
+    llm_fast_model: str = ""  # 短回复步骤使用的模型，留空则与 llm_model 相同
+    llm_routing_table_path: str = (
+        ""  # JSON 路由表，按键覆盖内置预算，修改后自动重新加载
+    )
+    llm_routing_reload_seconds: float = 5.0
+
+    # 提供商熔断与自适应并发（按 provider + model 统计）
+    llm_breaker_failure_threshold: int = 5  # 连续失败次数达到后熔断
+    llm_breaker_recovery_seconds: float = 30.0  # 熔断后多久放行探测请求
+    llm_concurrency_initial: int = 20
+    llm_concurrency_min: int = 2
+    llm_concurrency_max: int = 100
+    llm_concurrency_backoff: float = 0.5  # 提供商故障时并发上限乘以该系数
+
+    # 提供商端提示词缓存（Anthropic cache_control、OpenAI prompt_cache_key 与 usage 统计）
+    llm_prompt_cache_enabled: bool = True
+
+    # Solve 多轮对话窗口（Redis 列表缓存最近 N 轮，按条截断）
+    solve_context_turns: int = 6  # 0 表示不带历史
+    solve_context_message_chars: int = 2000
+    solve_context_ttl_seconds: int = 86400
+
+    # Solve 会话状态写穿缓存（会话 / 当前步骤历史 / profile 行，命中时消息路径不读数据库）
+    solve_state_cache_enabled: bool = True
+    solve_state_cache_ttl_seconds: int = 3600
+
+    # CacheService（用户 / 订阅 / 会话列表 / 设备）的进程内 L1 缓存，写入与删除经 pub/sub 广播失效
+    cache_local_enabled: bool = True
+    cache_local_ttl_seconds: float = 30.0
+    cache_local_max_entries: int = 10000
+    cache_local_max_bytes: int = 16 * 1024 * 1024  # 按 JSON 长度估算
+
+    # RedisCache 值格式：序列化器（json 在安装 orjson 时自动使用 orjson；msgpack 需安装 msgpack），
+    # 超过阈值的值用 zlib 压缩（0 表示不压缩）；get_or_load 的概率提前刷新系数（0 表示关闭）
+    cache_serializer: str = "json"
+    cache_compress_min_bytes: int = 1024
+    cache_early_refresh_beta: float = 1.0
+
+    # 访问令牌会话缓存（Redis 有效 / 撤销标记 + 进程内 TTL LRU，撤销经 pub/sub 广播）
+    auth_session_cache_enabled: bool = True
+    auth_session_local_ttl_seconds: float = 30.0  # 0 表示不使用进程内缓存
+    auth_session_local_max_entries: int = 10000
+
+    # 多代理编排使用 LLM 代理（主代理流式输出，次代理并发执行；超时 / 失败时回退到规则草稿）
+    orchestration_llm_agents: bool = False
+    orchestration_agent_timeout_seconds: float = 8.0  # 主代理首字 / 次代理整体超时
+    # 结构化流式：澄清问题、问题重构与可选方向以 question / reframe / option 事件逐个发送
+    orchestration_structured_stream: bool = False
+
+    # SSE 输出合并（按时间或字节数刷新 token，空闲时发送心跳注释）
+    sse_flush_interval_ms: int = 50  # 0 表示逐 token 发送
+    sse_flush_max_bytes: int = 512
+    sse_heartbeat_seconds: float = 15.0  # 0 表示不发送心跳
+
+    # 输出安全过滤（流式 token 的邮箱 / 电话打码与危机关键词检测）
+    outbound_filter_enabled: bool = True
+    outbound_filter_window_chars: int = 64  # 跨 token 匹配最多保留的尾部字符数
 
     # Stripe 配置
     stripe_secret_key: str = ""
@@ -0,0 +1,184 @@
+"""学习会话对话记忆 - 滚动摘要 + 最近窗口
+
+记忆保存在 learn_sessions.memory（JSON）中，每次 AI 回复后增量更新：
+- recent：最近若干条 user / assistant 消息，原样作为角色消息发给 LLM；
+- summary：被挤出窗口的较早轮次压缩成的要点行，作为当前消息前的摘要。
+
+两者合计受当前步骤 / 工具的 token 预算约束。发送消息时只读取会话行本身；
+旧会话（尚无记忆）用一次有上限的索引查询取最近几条消息初始化。
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+from uuid import UUID
+
+from app.models.learn_message import LearnMessage
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MEMORY_VERSION = 1
+MAX_RECENT_MESSAGES = 8
+SUMMARY_SHARE = 0.3  # 预算中留给摘要的比例
+SUMMARY_CLIP_CHARS = 80  # 每条摘要行中单条消息保留的字符数
+MESSAGE_CLIP_TOKENS = 600  # 窗口内单条消息的上限
+
+DEFAULT_TOKEN_BUDGET = 1000
+# 按步骤 / 工具设置的上下文 token 预算（摘要 + 最近窗口）
+TOKEN_BUDGETS: dict[str, int] = {
+    "start": 600,
+    "explore": 1200,
+    "practice": 1200,
+    "plan": 900,
+    "pareto": 800,
+    "feynman": 1500,
+    "chunking": 1200,
+    "dual_coding": 1000,
+    "interleaving": 1200,
+    "retrieval": 800,
+    "spaced": 600,
+    "grow": 1000,
+    "socratic": 1500,
+    "error_driven": 1200,
+}
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?.])\s*")
+
+
+def token_budget(key: str | None) -> int:
+    return TOKEN_BUDGETS.get(key or "", DEFAULT_TOKEN_BUDGET)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符按 1 个计，其余按每 4 个字符 1 个计"""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + (len(text) - wide + 3) // 4
+
+
+def _clip_tokens(text: str, limit: int) -> str:
+    if estimate_tokens(text) <= limit:
+        return text
+    # 预留省略号占用的 1 个 token
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= limit - 1:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…"
+
+
+def _gist(text: str) -> str:
+    """取首句并截断，作为摘要中的一条要点"""
+    first = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    if len(first) > SUMMARY_CLIP_CHARS:
+        first = first[:SUMMARY_CLIP_CHARS] + "…"
+    return first
+
+
+def empty_memory() -> dict[str, Any]:
+    return {"v": MEMORY_VERSION, "summary": [], "recent": []}
+
+
+def _normalize(memory: dict[str, Any] | None) -> dict[str, Any]:
+    if not memory or memory.get("v") != MEMORY_VERSION:
+        return empty_memory()
+    return {
+        "v": MEMORY_VERSION,
+        "summary": list(memory.get("summary") or []),
+        "recent": list(memory.get("recent") or []),
+    }
+
+
+def _fold(summary: list[str], evicted: list[dict[str, str]]) -> None:
+    """把挤出窗口的消息按轮次并入摘要"""
+    parts = [
+        f"{'用户' if msg['role'] == 'user' else '助手'}：{_gist(msg['content'])}"
+        for msg in evicted
+    ]
+    if parts:
+        summary.append("；".join(parts))
+
+
+def _trim(memory: dict[str, Any], budget: int) -> dict[str, Any]:
+    """按预算裁剪：窗口超出时最早的消息并入摘要，摘要超出时丢弃最早的要点"""
+    summary: list[str] = memory["summary"]
+    recent: list[dict[str, str]] = memory["recent"]
+    recent_budget = max(int(budget * (1 - SUMMARY_SHARE)), 1)
+    summary_budget = max(budget - recent_budget, 0)
+
+    recent_tokens = sum(estimate_tokens(msg["content"]) for msg in recent)
+    evicted: list[dict[str, str]] = []
+    while len(recent) > 1 and (
+        len(recent) > MAX_RECENT_MESSAGES or recent_tokens > recent_budget
+    ):
+        msg = recent.pop(0)
+        recent_tokens -= estimate_tokens(msg["content"])
+        evicted.append(msg)
+    # 保证窗口以 user 开头，落单的 assistant 回复一并进入摘要
+    while len(recent) > 1 and recent[0]["role"] != "user":
+        msg = recent.pop(0)
+        recent_tokens -= estimate_tokens(msg["content"])
+        evicted.append(msg)
+    _fold(summary, evicted)
+    if len(recent) == 1 and recent_tokens > recent_budget:
+        msg = recent[0]
+        recent[0] = {**msg, "content": _clip_tokens(msg["content"], recent_budget)}
+
+    summary_tokens = sum(estimate_tokens(line) for line in summary)
+    while summary and summary_tokens > summary_budget:
+        summary_tokens -= estimate_tokens(summary.pop(0))
+    return memory
+
+
+def update_memory(
+    memory: dict[str, Any] | None,
+    user_content: str,
+    assistant_content: str,
+    budget_key: str | None,
+) -> dict[str, Any]:
+    """AI 回复完成后追加本轮对话并按预算滚动（返回新对象，便于 JSON 列检测变更）"""
+    updated = _normalize(memory)
+    for role, content in (("user", user_content), ("assistant", assistant_content)):
+        if content:
+            updated["recent"].append(
+                {"role": role, "content": _clip_tokens(content, MESSAGE_CLIP_TOKENS)}
+            )
+    return _trim(updated, token_budget(budget_key))
+
+
+def build_context(
+    memory: dict[str, Any] | None, content: str, budget_key: str | None
+) -> tuple[list[dict[str, str]], str]:
+    """返回 (历史角色消息, 带摘要的当前消息)，按当前步骤 / 工具的预算裁剪"""
+    trimmed = _trim(_normalize(memory), token_budget(budget_key))
+    if not trimmed["summary"]:
+        return trimmed["recent"], content
+    summary_text = "\n".join(f"- {line}" for line in trimmed["summary"])
+    return (
+        trimmed["recent"],
+        f"Conversation summary:\n{summary_text}\n\nCurrent message: {content}",
+    )
+
+
+async def load_memory(
+    db: AsyncSession, session_id: UUID, memory: dict[str, Any] | None
+) -> dict[str, Any]:
+    """返回会话记忆；旧会话只查询最近 MAX_RECENT_MESSAGES 条消息初始化"""
+    if memory and memory.get("v") == MEMORY_VERSION:
+        return memory
+    result: Any = await db.execute(
+        select(LearnMessage.role, LearnMessage.content)
+        .where(LearnMessage.session_id == session_id)
+        .order_by(LearnMessage.created_at.desc())
+        .limit(MAX_RECENT_MESSAGES)
+    )
+    seeded = empty_memory()
+    seeded["recent"] = [
+        {"role": role, "content": _clip_tokens(content, MESSAGE_CLIP_TOKENS)}
+        for role, content in reversed(result.all())
+        if role in ("user", "assistant")
+    ]
+    return seeded
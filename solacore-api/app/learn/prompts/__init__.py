@@ -1,6 +1,7 @@
 """学习提示词模块"""
 
 from app.models.learn_session import LearnStep
+from app.services.prompt_registry import prompt_registry
 
 from .base import BASE_ROLE
 from .tools import (
@@ -72,4 +73,7 @@ LEARN_STEP_PROMPTS = {
     ),
 }
 
-__all__ = ["LEARN_STEP_PROMPTS"]
+# 预注册为带版本的静态前缀，供提供商端提示词缓存复用
+LEARN_STEP_PREFIXES = prompt_registry.register_many("learn", LEARN_STEP_PROMPTS)
+
+__all__ = ["LEARN_STEP_PREFIXES", "LEARN_STEP_PROMPTS"]
@@ -0,0 +1,102 @@
+"""请求级认证上下文
+
+AuthContextMiddleware（纯 ASGI）在请求入口从 Authorization header（优先）或
+access_token cookie 提取访问令牌，只做一次签名校验与 payload 解析，结果以
+AuthContext 存入 scope["state"]（即 request.state.auth_context）。
+限流 key、CSRF 检查、Sentry 用户标记与 get_current_user 都通过
+get_auth_context() 读取，不再各自调用 decode_token。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Literal
+from uuid import UUID
+
+from app.utils.security import decode_token
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+AUTH_CONTEXT_KEY = "auth_context"
+
+# bearer：Authorization: Bearer <token>；header：不带前缀的 Authorization；cookie：access_token
+TokenSource = Literal["bearer", "header", "cookie"]
+
+
+@dataclass(frozen=True, slots=True)
+class AuthContext:
+    """token_source 为 None 表示未携带访问令牌；令牌无效时 user_id 为 None"""
+
+    token_source: TokenSource | None = None
+    user_id: UUID | None = None
+    # sid 缺失或格式错误时为 None（get_current_user 返回 SESSION_NOT_FOUND）
+    session_id: UUID | None = None
+    # 令牌过期时间（naive UTC，与 utc_now() 一致）
+    expires_at: datetime | None = None
+
+    @property
+    def authenticated(self) -> bool:
+        return self.user_id is not None
+
+
+ANONYMOUS = AuthContext()
+
+
+def _extract_token(connection: HTTPConnection) -> tuple[str, TokenSource] | None:
+    auth_header = connection.headers.get("authorization")
+    if auth_header:
+        if auth_header.startswith("Bearer "):
+            return auth_header.split(" ", 1)[1], "bearer"
+        return auth_header, "header"
+    token = connection.cookies.get("access_token")
+    return (token, "cookie") if token else None
+
+
+def build_auth_context(connection: HTTPConnection) -> AuthContext:
+    """解码并校验访问令牌（每个请求只应调用一次，见 get_auth_context）"""
+    extracted = _extract_token(connection)
+    if extracted is None:
+        return ANONYMOUS
+    token, source = extracted
+    payload = decode_token(token) if token else None
+    if not payload or payload.get("type") != "access":
+        return AuthContext(token_source=source)
+
+    try:
+        user_id = UUID(str(payload.get("sub")))
+    except (TypeError, ValueError):
+        return AuthContext(token_source=source)
+    try:
+        session_id: UUID | None = UUID(str(payload.get("sid")))
+    except (TypeError, ValueError):
+        session_id = None
+
+    exp = payload.get("exp")
+    expires_at = (
+        datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+        if isinstance(exp, (int, float))
+        else None
+    )
+    return AuthContext(source, user_id, session_id, expires_at)
+
+
+def get_auth_context(connection: HTTPConnection) -> AuthContext:
+    """读取本请求的认证上下文；未经过 AuthContextMiddleware 时在此计算并缓存"""
+    state = connection.scope.setdefault("state", {})
+    context = state.get(AUTH_CONTEXT_KEY)
+    if context is None:
+        context = state[AUTH_CONTEXT_KEY] = build_auth_context(connection)
+    return context
+
+
+class AuthContextMiddleware:
+    """在请求入口计算 AuthContext（不拒绝请求，鉴权仍由 get_current_user 负责）"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            get_auth_context(HTTPConnection(scope))
+        await self.app(scope, receive, send)
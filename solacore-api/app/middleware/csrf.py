@@ -3,6 +3,7 @@ import secrets
 from typing import Iterable
 
 from app.config import get_settings
+from app.middleware.auth_context import get_auth_context
 from fastapi import HTTPException, Request, Response, status
 
 CSRF_COOKIE_NAME = "csrf_token"
@@ -91,8 +92,8 @@ def validate_csrf(
     if request.method not in CSRF_PROTECTED_METHODS:
         return
 
-    auth_header = request.headers.get("Authorization", "")
-    if auth_header.startswith("Bearer "):
+    # Bearer 令牌由客户端显式附加，不受 CSRF 影响
+    if get_auth_context(request).token_source == "bearer":
         return
 
     path = request.url.path
@@ -6,7 +6,7 @@ from contextvars import ContextVar
 from typing import Optional
 
 from app.config import get_settings
-from app.utils.security import decode_token
+from app.middleware.auth_context import get_auth_context
 from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -50,30 +50,7 @@ class RateLimitContextMiddleware:
 
 
 def _extract_user_id(request: Request) -> Optional[str]:
-    cached_user = getattr(request.state, "current_user", None)
-    if cached_user is not None:
-        user_id = getattr(cached_user, "id", None)
-        if user_id:
-            return str(user_id)
-
-    token = request.cookies.get("access_token")
-    if not token:
-        auth_header = request.headers.get("Authorization")
-        if auth_header:
-            token = (
-                auth_header.split(" ", 1)[1]
-                if auth_header.startswith("Bearer ")
-                else auth_header
-            )
-
-    if not token:
-        return None
-
-    payload = decode_token(token)
-    if not payload or payload.get("type") != "access":
-        return None
-
-    user_id = payload.get("sub")
+    user_id = get_auth_context(request).user_id
     return str(user_id) if user_id else None
 
 
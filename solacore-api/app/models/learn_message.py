@@ -5,7 +5,7 @@ from enum import Enum
 
 from app.database import Base
 from app.utils.datetime_utils import utc_now
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -21,6 +21,10 @@ class LearnMessage(Base):
     """学习消息模型 - 保存学习会话中的每条消息"""
 
     __tablename__ = "learn_messages"
+    __table_args__ = (
+        # 旧会话初始化对话记忆：按会话取最近几条消息
+        Index("ix_learn_messages_session_created_at", "session_id", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(
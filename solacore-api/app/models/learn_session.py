@@ -67,6 +67,8 @@ class LearnSession(Base):
     key_concepts = Column(JSON, nullable=True)  # 关键概念列表
     review_schedule = Column(JSON, nullable=True)  # 艾宾浩斯复习计划
     learning_summary = Column(Text, nullable=True)  # 学习总结
+    # 对话记忆：滚动摘要 + 最近窗口（见 app.learn.memory）
+    memory = Column(JSON, nullable=True)
 
     created_at = Column(DateTime, default=lambda: utc_now())
     completed_at = Column(DateTime, nullable=True)
@@ -5,7 +5,7 @@ from enum import Enum
 
 from app.database import Base
 from app.utils.datetime_utils import utc_now
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -22,6 +22,10 @@ class Message(Base):
     """消息模型 - 保存会话中的每条消息"""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # 对话窗口：按会话取最近 N 条消息
+        Index("ix_messages_session_created_at", "session_id", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(
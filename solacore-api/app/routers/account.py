@@ -12,6 +12,7 @@ from app.models.solve_session import SolveSession
 from app.models.step_history import StepHistory
 from app.models.user import User
 from app.services.cache_service import CacheService
+from app.services.session_registry import session_registry
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
@@ -234,6 +235,11 @@ async def delete_account(
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """删除当前用户账户并清理相关缓存。"""
+    session_ids: list[UUID] = list(
+        await db.scalars(
+            select(ActiveSession.id).where(ActiveSession.user_id == current_user.id)
+        )
+    )
     result = await db.execute(
         delete(User).where(User.id == current_user.id).returning(User.id)
     )
@@ -241,7 +247,6 @@ async def delete_account(
     if not deleted_id:
         raise HTTPException(status_code=404, detail={"error": "USER_NOT_FOUND"})
     await db.commit()
-    await cache_service.invalidate_user(cast(UUID, current_user.id))
-    await cache_service.invalidate_subscription(cast(UUID, current_user.id))
-    await cache_service.invalidate_sessions(cast(UUID, current_user.id))
+    await session_registry.revoke(session_ids)
+    await cache_service.invalidate_account(cast(UUID, current_user.id))
     return None
@@ -6,6 +6,7 @@
 import hashlib
 import secrets
 from datetime import timedelta
+from uuid import UUID
 
 from app.config import get_settings
 from app.database import get_db
@@ -26,6 +27,7 @@ from app.schemas.auth import (
 )
 from app.services.cache_service import CacheService
 from app.services.email_service import send_password_reset_email
+from app.services.session_registry import session_registry
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from app.utils.security import hash_password_async
@@ -158,10 +160,15 @@ async def reset_password(
     reset_token.user.password_hash = await hash_password_async(data.new_password)  # type: ignore[assignment]
     reset_token.used_at = utc_now()  # type: ignore[assignment]
 
-    await db.execute(
-        delete(ActiveSession).where(ActiveSession.user_id == reset_token.user_id)
+    removed_session_ids: list[UUID] = list(
+        await db.scalars(
+            delete(ActiveSession)
+            .where(ActiveSession.user_id == reset_token.user_id)
+            .returning(ActiveSession.id)
+        )
     )
 
     await db.commit()
+    await session_registry.revoke(removed_session_ids)
     await cache_service.invalidate_sessions(reset_token.user_id)
     return {"message": "Password reset successful"}
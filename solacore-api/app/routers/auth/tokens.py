@@ -4,11 +4,11 @@
 """
 
 from typing import Optional
-from uuid import UUID
 
 from app.config import get_settings
 from app.database import get_db
 from app.middleware.auth import get_current_user
+from app.middleware.auth_context import get_auth_context
 from app.middleware.csrf import clear_csrf_cookies
 from app.middleware.rate_limit import API_RATE_LIMIT, limiter, user_rate_limit_key
 from app.models.session import ActiveSession
@@ -16,6 +16,7 @@ from app.models.user import User
 from app.schemas.auth import AuthSuccessResponse, RefreshRequest
 from app.services.auth_service import AuthService
 from app.services.cache_service import CacheService
+from app.services.session_registry import session_registry
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from app.utils.exceptions import raise_auth_error
 from app.utils.security import decode_token
@@ -88,27 +89,9 @@ async def logout(
     db: AsyncSession = Depends(get_db),
 ):
     """使当前 access token 对应 session 失效并清除认证 Cookie。"""
-    # 优先从 cookie 读取 token
-    token = request.cookies.get("access_token")
-
-    # 如果 cookie 没有，从 Authorization 头读取（向后兼容）
-    if not token:
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(status_code=401, detail={"error": "INVALID_TOKEN"})
-        if auth_header.startswith("Bearer "):
-            token = auth_header.split(" ", 1)[1]
-        else:
-            token = auth_header
-
-    payload = decode_token(token)
-    if not payload or payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail={"error": "INVALID_TOKEN"})
-
-    session_id = payload.get("sid")
-    try:
-        session_uuid = UUID(str(session_id))
-    except (TypeError, ValueError):
+    # get_current_user 已校验令牌与会话，sid 直接取自请求级认证上下文
+    session_uuid = get_auth_context(request).session_id
+    if session_uuid is None:
         raise HTTPException(status_code=401, detail={"error": "SESSION_NOT_FOUND"})
 
     # 删除数据库中的 session
@@ -119,6 +102,7 @@ async def logout(
         )
     )
     await db.commit()
+    await session_registry.revoke([session_uuid])
     await cache_service.invalidate_sessions(current_user.id)
 
     # 清除 cookies (httpOnly cookies 模式)
@@ -3,6 +3,7 @@
 提供用户信息查询、设备管理、会话管理功能
 """
 
+from typing import Any
 from uuid import UUID
 
 from app.database import get_db
@@ -13,6 +14,7 @@ from app.models.session import ActiveSession
 from app.models.user import User
 from app.schemas.auth import ActiveSessionResponse, DeviceResponse, UserResponse
 from app.services.cache_service import CacheService
+from app.services.session_registry import session_registry
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request, Response
@@ -68,9 +70,10 @@ async def list_devices(
         .order_by(Device.created_at.asc())
     )
     devices = result.scalars().all()
+    cached = await cache_service.get_devices([device.id for device in devices])
     devices_list: list[dict[str, object]] = []
-    for device in devices:
-        cached_device = await cache_service.get_device(device.id)
+    missing: dict[UUID | str, dict[str, Any]] = {}
+    for device, cached_device in zip(devices, cached):
         if isinstance(cached_device, dict):
             devices_list.append(cached_device)
             continue
@@ -84,7 +87,9 @@ async def list_devices(
             "is_active": device.is_active,
         }
         devices_list.append(payload)
-        await cache_service.set_device(device.id, payload)
+        missing[device.id] = payload  # type: ignore[index]
+    if missing:
+        await cache_service.set_devices(missing)
     return devices_list
 
 
@@ -146,9 +151,16 @@ async def revoke_device(
     device.last_removal_at = utc_now()  # type: ignore[assignment]
 
     # 批量删除会话，避免 N+1 问题
-    await db.execute(delete(ActiveSession).where(ActiveSession.device_id == device_id))
+    removed_session_ids: list[UUID] = list(
+        await db.scalars(
+            delete(ActiveSession)
+            .where(ActiveSession.device_id == device_id)
+            .returning(ActiveSession.id)
+        )
+    )
 
     await db.commit()
+    await session_registry.revoke(removed_session_ids)
     await cache_service.invalidate_device(device_id)
     await cache_service.invalidate_sessions(current_user.id)
     return None
@@ -169,34 +181,32 @@ async def list_sessions(
     db: AsyncSession = Depends(get_db),
 ):
     """获取当前用户的活跃会话列表。"""
-    cached_sessions = await cache_service.get_sessions(current_user.id)
-    if isinstance(cached_sessions, list):
-        return cached_sessions
-    # 只查询需要的字段，不加载 device 关联
-    result = await db.execute(
-        select(ActiveSession)
-        .where(
-            ActiveSession.user_id == current_user.id,
-            ActiveSession.expires_at > utc_now(),
+
+    async def load() -> list[dict[str, Any]]:
+        # 只查询需要的字段，不加载 device 关联
+        result = await db.execute(
+            select(ActiveSession)
+            .where(
+                ActiveSession.user_id == current_user.id,
+                ActiveSession.expires_at > utc_now(),
+            )
+            .order_by(ActiveSession.created_at.asc())
         )
-        .order_by(ActiveSession.created_at.asc())
-    )
-    sessions = result.scalars().all()
-    response = [
-        {
-            "id": str(session.id),
-            "device_id": str(session.device_id) if session.device_id else None,
-            "created_at": session.created_at.isoformat()
-            if session.created_at
-            else None,
-            "expires_at": session.expires_at.isoformat()
-            if session.expires_at
-            else None,
-        }
-        for session in sessions
-    ]
-    await cache_service.set_sessions(current_user.id, response)
-    return response
+        return [
+            {
+                "id": str(session.id),
+                "device_id": str(session.device_id) if session.device_id else None,
+                "created_at": session.created_at.isoformat()
+                if session.created_at
+                else None,
+                "expires_at": session.expires_at.isoformat()
+                if session.expires_at
+                else None,
+            }
+            for session in result.scalars().all()
+        ]
+
+    return await cache_service.load_sessions(current_user.id, load)
 
 
 @router.delete(
@@ -233,5 +243,6 @@ async def revoke_session(
 
     await db.delete(session)
     await db.commit()
+    await session_registry.revoke([session_id])
     await cache_service.invalidate_sessions(current_user.id)
     return None
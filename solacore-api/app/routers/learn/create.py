@@ -3,6 +3,7 @@
 import logging
 
 from app.database import get_db
+from app.learn.memory import empty_memory
 from app.learn.prompts.registry import TOOL_REGISTRY
 from app.middleware.auth import get_current_user
 from app.middleware.rate_limit import API_RATE_LIMIT, limiter, user_rate_limit_key
@@ -62,6 +63,7 @@ async def create_learn_session(
         status="active",
         current_step=LearnStep.START.value,
         locale="zh",
+        memory=empty_memory(),
     )
 
     if selected_mode == "quick":
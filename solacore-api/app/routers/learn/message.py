@@ -1,11 +1,13 @@
 """学习功能路由 - 发送消息（SSE 流式）"""
 
 import json
+from contextlib import aclosing
 from typing import AsyncGenerator
 from uuid import UUID
 
 from app.database import get_db
-from app.learn.prompts import LEARN_STEP_PROMPTS
+from app.learn.memory import build_context, load_memory, update_memory
+from app.learn.prompts import LEARN_STEP_PREFIXES
 from app.learn.prompts.base import BASE_ROLE
 from app.learn.prompts.registry import TOOL_REGISTRY
 from app.learn.prompts.tools import (
@@ -27,16 +29,20 @@ from app.models.learn_session import LearnSession, LearnStep
 from app.models.user import User
 from app.services.ai_service import AIService
 from app.services.content_filter import sanitize_user_input, strip_pii
+from app.services.outbound_filter import create_outbound_filter
+from app.services.prompt_registry import prompt_registry
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from app.utils.error_handlers import handle_sse_error
+from app.utils.sse import SSE_HEARTBEAT, DisconnectWatcher, coalesce_llm_stream
 from fastapi import Depends, Header, HTTPException, Path, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 
 from . import LearnMessageRequest, get_next_learn_step, is_final_learn_step, router
-from .utils import _build_context_prompt, _generate_review_schedule, _validate_session
+from .utils import _generate_review_schedule, _validate_session
 
 TOOL_PROMPTS = {
     "pareto": PARETO_PROMPT,
@@ -63,6 +69,11 @@ def _build_tool_prompt(tool: str) -> str:
     )
 
 
+TOOL_PROMPT_PREFIXES = prompt_registry.register_many(
+    "learn_tool", {tool: _build_tool_prompt(tool) for tool in TOOL_PROMPTS}
+)
+
+
 @router.post(
     "/{session_id}/messages",
     summary="发送学习消息",
@@ -80,9 +91,11 @@ async def send_learn_message(
     db: AsyncSession = Depends(get_db),
 ):
     """发送消息并获取流式回复"""
-    # 查询并验证会话
+    # 查询并验证会话（不加载消息集合，历史上下文来自会话行上的对话记忆）
     result = await db.execute(
-        select(LearnSession).where(
+        select(LearnSession)
+        .options(raiseload(LearnSession.messages))
+        .where(
             LearnSession.id == session_id,
             LearnSession.user_id == current_user.id,
         )
@@ -116,6 +129,10 @@ async def send_learn_message(
     sanitized_content = sanitize_user_input(message_request.content)
     sanitized_content = strip_pii(sanitized_content)
 
+    # 读取对话记忆（在保存本轮用户消息之前，旧会话据此初始化）
+    memory = await load_memory(db, session.id, session.memory)
+    budget_key = message_request.tool or current_step.value
+
     # 保存用户消息
     user_message = LearnMessage(
         session_id=session.id,
@@ -134,40 +151,56 @@ async def send_learn_message(
 
     await db.commit()
 
-    # 获取历史消息并构建上下文提示
-    history_messages = [
-        {"role": msg.role, "content": msg.content}
-        for msg in session.messages
-        if msg.id != user_message.id
-    ]
-    user_prompt_with_history = _build_context_prompt(
-        history_messages, sanitized_content
-    )
+    # 按当前步骤 / 工具的 token 预算构建上下文
+    history, user_prompt = build_context(memory, sanitized_content, budget_key)
 
     # 获取系统提示词和 AI 服务
     if message_request.tool:
-        system_prompt = _build_tool_prompt(message_request.tool)
+        prefix = TOOL_PROMPT_PREFIXES[message_request.tool]
+        route = f"learn_tool:{message_request.tool}"
     else:
-        system_prompt = LEARN_STEP_PROMPTS.get(
-            current_step.value, LEARN_STEP_PROMPTS[LearnStep.START.value]
+        route = f"learn:{current_step.value}"
+        prefix = LEARN_STEP_PREFIXES.get(
+            current_step.value, LEARN_STEP_PREFIXES[LearnStep.START.value]
         )
+    system_prompt = prompt_registry.compose((prefix,))
     ai_service = AIService()
 
     async def event_generator() -> AsyncGenerator[str, None]:
         accumulated_content = ""
+        outbound = create_outbound_filter()
 
         try:
-            async for token in ai_service.stream(
-                system_prompt, user_prompt_with_history
-            ):
-                if await request.is_disconnected():
-                    return
-                accumulated_content += token
-                yield f"event: token\ndata: {json.dumps({'content': token})}\n\n"
+            async with DisconnectWatcher(request) as watcher:
+                async with aclosing(
+                    coalesce_llm_stream(
+                        ai_service.stream(
+                            system_prompt, user_prompt, history, route=route
+                        ),
+                        watcher,
+                    )
+                ) as chunks:
+                    async for chunk in chunks:
+                        if chunk is None:
+                            yield SSE_HEARTBEAT
+                            continue
+                        if outbound is not None:
+                            chunk = outbound.feed(chunk)
+                            if not chunk:
+                                continue
+                        accumulated_content += chunk
+                        yield f"event: token\ndata: {json.dumps({'content': chunk})}\n\n"
 
-            if await request.is_disconnected():
+            # 客户端已断开：上游流已取消，不保存不完整的回复
+            if watcher.disconnected:
                 return
 
+            # 输出过滤保留的尾部窗口
+            tail = outbound.flush() if outbound is not None else ""
+            if tail:
+                accumulated_content += tail
+                yield f"event: token\ndata: {json.dumps({'content': tail})}\n\n"
+
             ai_message = LearnMessage(
                 session_id=session.id,
                 role=LearnMessageRole.ASSISTANT.value,
@@ -176,6 +209,9 @@ async def send_learn_message(
             )
             ai_message.tool = message_request.tool
             db.add(ai_message)
+            session.memory = update_memory(
+                memory, sanitized_content, accumulated_content, budget_key
+            )
 
             next_step = get_next_learn_step(current_step)
             step_completed = len(accumulated_content) > 50
@@ -194,6 +230,7 @@ async def send_learn_message(
                     "next_step": next_step.value if next_step else None,
                     "step_completed": step_completed,
                     "session_completed": session.status == "completed",
+                    **(outbound.done_fields() if outbound is not None else {}),
                 }
             )
             yield f"event: done\ndata: {done_data}\n\n"
@@ -16,20 +16,6 @@ def _validate_session(session: LearnSession | None) -> LearnSession:
     return session
 
 
-def _build_context_prompt(
-    history_messages: list[dict[str, str]], sanitized_content: str
-) -> str:
-    """构建包含历史上下文的用户提示"""
-    if not history_messages:
-        return sanitized_content
-
-    history_text = "Previous conversation:\n"
-    for msg in history_messages[-6:]:  # 只保留最近 6 条消息
-        role_label = "User" if msg["role"] == "user" else "Assistant"
-        history_text += f"{role_label}: {msg['content']}\n"
-    return f"{history_text}\nCurrent message: {sanitized_content}"
-
-
 def _generate_review_schedule() -> dict[str, str]:
     """生成艾宾浩斯复习计划"""
     now = utc_now()
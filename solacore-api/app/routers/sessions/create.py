@@ -1,18 +1,19 @@
 # 会话创建路由：处理创建 Solve 会话与使用量统计
 
+from datetime import datetime
+
 from app.config import get_settings
 from app.database import get_db
-from app.middleware.auth import get_current_user
+from app.middleware.auth import get_current_principal
 from app.middleware.rate_limit import API_RATE_LIMIT, limiter, user_rate_limit_key
-from app.models.device import Device
 from app.models.message import Message, MessageRole
 from app.models.prompt_template import PromptTemplate
 from app.models.solve_session import SessionStatus, SolveSession, SolveStep
 from app.models.step_history import StepHistory
 from app.models.subscription import Subscription, Usage
-from app.models.user import User
 from app.schemas.session import SessionCreateRequest, SessionCreateResponse
 from app.services.analytics_service import AnalyticsService
+from app.services.request_principal import RequestPrincipal
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response
@@ -24,6 +25,30 @@ from .utils import SESSION_LIMITS, _get_or_create_usage, _period_start_for_tier
 router = APIRouter()
 
 
+async def _subscription_period(
+    db: AsyncSession, principal: RequestPrincipal
+) -> tuple[str, datetime]:
+    """订阅等级与当期起点；没有订阅时创建免费订阅"""
+    dates = principal.subscription_dates()
+    if dates is not None:
+        return principal.tier, _period_start_for_tier(principal.tier, *dates)
+
+    result = await db.execute(
+        select(Subscription).where(Subscription.user_id == principal.user.id)
+    )
+    subscription = result.scalar_one_or_none()
+    if not subscription:
+        subscription = Subscription(user_id=principal.user.id, tier="free")
+        db.add(subscription)
+        await db.flush()
+    tier = str(subscription.tier)
+    return tier, _period_start_for_tier(
+        tier,
+        subscription.created_at,  # type: ignore[arg-type]
+        subscription.current_period_start,  # type: ignore[arg-type]
+    )
+
+
 @router.post(
     "/",
     response_model=SessionCreateResponse,
@@ -46,7 +71,7 @@ async def create_session(
     request: Request,
     response: Response,
     payload: SessionCreateRequest | None = Body(default=None),
-    current_user: User = Depends(get_current_user),
+    principal: RequestPrincipal = Depends(get_current_principal),
     device_fingerprint: str = Header(
         ...,
         alias="X-Device-Fingerprint",
@@ -56,6 +81,7 @@ async def create_session(
     db: AsyncSession = Depends(get_db),
 ):
     """创建新的 Solve 会话并返回会话基础信息与使用量。"""
+    current_user = principal.user
     template: PromptTemplate | None = None
     if payload and payload.template_id:
         template_result = await db.execute(
@@ -68,27 +94,15 @@ async def create_session(
         if not template:
             raise HTTPException(status_code=404, detail={"error": "TEMPLATE_NOT_FOUND"})
 
-    device_result = await db.execute(
-        select(Device).where(
-            Device.user_id == current_user.id,
-            Device.device_fingerprint == device_fingerprint,
-        )
-    )
-    # 使用 .first() 容错重复记录（数据库可能存在历史重复数据）
-    device = device_result.scalars().first()
-    if not device:
+    # 设备与订阅来自请求主体（get_current_user 已一次读取），未缓存的订阅才查询数据库
+    if (
+        principal.device_id is None
+        or principal.device_fingerprint != device_fingerprint
+    ):
         raise HTTPException(status_code=403, detail={"error": "DEVICE_NOT_FOUND"})
+    device_id = principal.device_id
 
-    subscription_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == current_user.id)
-    )
-    subscription = subscription_result.scalar_one_or_none()
-    if not subscription:
-        subscription = Subscription(user_id=current_user.id, tier="free")
-        db.add(subscription)
-        await db.flush()
-
-    tier: str = str(subscription.tier)
+    tier, period_start = await _subscription_period(db, principal)
     sessions_limit: int = SESSION_LIMITS.get(tier, SESSION_LIMITS["free"])
 
     # Beta 模式移除 session 限制
@@ -96,24 +110,22 @@ async def create_session(
     if settings.beta_mode:
         sessions_limit = 0  # 0 表示无限制
 
-    usage = await _get_or_create_usage(db, subscription)
+    usage = await _get_or_create_usage(db, current_user.id, period_start)
 
     # 原子递增 session_count，避免并发丢失更新
-    period_start = _period_start_for_tier(
-        tier, subscription.created_at, subscription.current_period_start
-    )
     stmt = (
         update(Usage)
         .where(Usage.user_id == current_user.id, Usage.period_start == period_start)
         .values(session_count=Usage.session_count + 1)
     )
     await db.execute(stmt)
-    result = await db.execute(
-        select(Usage.session_count).where(
-            Usage.user_id == current_user.id, Usage.period_start == period_start
+    new_count: int = (
+        await db.execute(
+            select(Usage.session_count).where(
+                Usage.user_id == current_user.id, Usage.period_start == period_start
+            )
         )
-    )
-    new_count = result.scalar_one()
+    ).scalar_one()
 
     # 检查是否超限（递增后再检查，避免竞态条件）
     if sessions_limit > 0 and new_count > sessions_limit:
@@ -141,7 +153,7 @@ async def create_session(
 
     session = SolveSession(
         user_id=current_user.id,
-        device_id=device.id,
+        device_id=device_id,
         status=SessionStatus.ACTIVE.value,
         current_step=SolveStep.RECEIVE.value,
     )
@@ -185,7 +197,7 @@ async def create_session(
     await analytics_service.emit(
         "session_started",
         session.id,  # type: ignore[arg-type]
-        {"user_id": str(current_user.id), "device_id": str(device.id)},
+        {"user_id": str(current_user.id), "device_id": str(device_id)},
     )
 
     await db.commit()
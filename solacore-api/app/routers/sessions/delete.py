@@ -8,6 +8,8 @@ from app.middleware.auth import get_current_user
 from app.middleware.rate_limit import API_RATE_LIMIT, limiter, user_rate_limit_key
 from app.models.solve_session import SolveSession
 from app.models.user import User
+from app.services.conversation_window import conversation_window
+from app.services.session_state_cache import session_state_cache
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
 from sqlalchemy import select
@@ -61,6 +63,8 @@ async def delete_session(
     # 删除会话（级联删除会自动删除相关的消息和历史记录）
     await db.delete(session)
     await db.commit()
+    await conversation_window.clear(session_id)
+    await session_state_cache.invalidate(session_id)
 
     logger.info(
         f"Session {session_id} deleted by user {current_user.id}",
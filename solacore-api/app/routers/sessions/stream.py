@@ -1,32 +1,47 @@
 # 会话流式路由：处理 SSE 消息流与 Solve 流程推进
 
+import asyncio
 import json
-from typing import AsyncGenerator
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterable
 from uuid import UUID
 
+import anyio
 from app.config import get_settings
 from app.database import get_db
 from app.middleware.auth import get_current_user
 from app.middleware.rate_limit import SSE_RATE_LIMIT, limiter, user_rate_limit_key
+from app.models.message import MessageRole
+from app.models.prompt_template import PromptTemplate
 from app.models.solve_session import SessionStatus, SolveSession, SolveStep
 from app.models.step_history import StepHistory
 from app.models.user import User
 from app.schemas.session import MessageRequest
 from app.services.ai_service import AIService
 from app.services.analytics_service import AnalyticsService
-from app.services.content_filter import sanitize_user_input, strip_pii
-from app.services.crisis_detector import detect_crisis, get_crisis_response
-from app.services.emotion_detector import detect_emotion
+from app.services.conversation_window import conversation_window
+from app.services.crisis_detector import get_crisis_response
+from app.services.message_analysis import MessageAnalysis, analyze_message
 from app.services.orchestrator_service import OrchestratorService
+from app.services.outbound_filter import OutboundFilter, create_outbound_filter
+from app.services.prompt_registry import SystemPrompt, prompt_registry
+from app.services.session_state_cache import SessionState, session_state_cache
+from app.services.structured_stream import (
+    StructuredStream,
+    decision_events,
+    render_text,
+)
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from app.utils.error_handlers import handle_sse_error
+from app.utils.sse import SSE_HEARTBEAT, DisconnectWatcher, coalesce_llm_stream
 from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 
 from .utils import (
-    STEP_SYSTEM_PROMPTS,
+    STEP_PROMPT_PREFIXES,
     _close_step_history,
     _handle_step_transition,
     _handle_step_transition_to,
@@ -42,10 +57,32 @@ async def _validate_session_and_get_context(
     db: AsyncSession,
     session_id: UUID,
     user_id: UUID,
-) -> tuple[SolveSession, StepHistory | None]:
-    """验证会话并获取上下文（会话 + 当前步骤历史）"""
+) -> SessionState:
+    """验证会话并获取上下文（会话 + 当前步骤历史 + profile）
+
+    优先读取会话状态缓存；未命中时一次联表查询会话与当前步骤历史，
+    profile 留给编排服务按需查询。消息、步骤历史集合与 profile 关系不随会话加载，
+    对话历史由 conversation_window 按固定窗口读取。
+    """
+    state, generation = await session_state_cache.load(db, session_id, user_id)
+    if state is None:
+        state = await _load_session_state(db, session_id, user_id)
+    state.generation = generation
+    if state.session.status == SessionStatus.COMPLETED.value:
+        raise HTTPException(status_code=400, detail={"error": "SESSION_COMPLETED"})
+    return state
+
+
+async def _load_session_state(
+    db: AsyncSession, session_id: UUID, user_id: UUID
+) -> SessionState:
     result = await db.execute(
         select(SolveSession, StepHistory)
+        .options(
+            raiseload(SolveSession.messages),
+            raiseload(SolveSession.step_history),
+            raiseload(SolveSession.profile),
+        )
         .outerjoin(
             StepHistory,
             and_(
@@ -62,18 +99,16 @@ async def _validate_session_and_get_context(
     if not row:
         raise HTTPException(status_code=404, detail={"error": "SESSION_NOT_FOUND"})
     session, step_history = row
-    if session.status == SessionStatus.COMPLETED.value:
-        raise HTTPException(status_code=400, detail={"error": "SESSION_COMPLETED"})
-    return session, step_history
+    return SessionState(session, step_history)
 
 
 async def _handle_crisis_detection(
     db: AsyncSession,
     session: SolveSession,
-    content: str,
+    analysis: MessageAnalysis,
 ) -> StreamingResponse | None:
     """处理危机检测，如果触发危机则返回 StreamingResponse，否则返回 None"""
-    crisis_result = detect_crisis(content)
+    crisis_result = analysis.crisis
     if not crisis_result.blocked:
         return None
 
@@ -111,115 +146,312 @@ async def _handle_crisis_detection(
     )
 
 
+async def _build_system_prompt(
+    db: AsyncSession, session: SolveSession, current_step: str
+) -> SystemPrompt:
+    """Solve 系统提示词：模板角色前缀（模板会话）+ 当前步骤提示词
+
+    两段都是静态内容；模板前缀在进程内缓存，未命中时才查询一次数据库。
+    """
+    step_prefix = STEP_PROMPT_PREFIXES.get(
+        current_step, STEP_PROMPT_PREFIXES[SolveStep.RECEIVE.value]
+    )
+    if session.template_id is None:
+        return prompt_registry.compose((step_prefix,))
+
+    template_id = str(session.template_id)
+    template_prefix = prompt_registry.cached_template(template_id)
+    if template_prefix is None:
+        template_prompt = await db.scalar(
+            select(PromptTemplate.system_prompt).where(
+                PromptTemplate.id == session.template_id
+            )
+        )
+        if not template_prompt:
+            return prompt_registry.compose((step_prefix,))
+        template_prefix = prompt_registry.register_template(
+            template_id, template_prompt
+        )
+    return prompt_registry.compose((template_prefix, step_prefix))
+
+
+async def _close_disconnected_stream(
+    db: AsyncSession, step_history: StepHistory
+) -> None:
+    """客户端断开后的收尾：关闭当前步骤历史并提交（屏蔽取消，确保执行）"""
+    with anyio.CancelScope(shield=True):
+        _close_step_history(db, step_history, "disconnected")
+        await db.commit()
+        await session_state_cache.invalidate(step_history.session_id)  # type: ignore[arg-type]
+
+
+def _token_event(content: str) -> str:
+    return f"event: token\ndata: {json.dumps({'content': content})}\n\n"
+
+
+async def _relay_tokens(
+    tokens: AsyncIterable[str],
+    watcher: DisconnectWatcher,
+    outbound: OutboundFilter | None,
+    parts: list[str],
+    structured: StructuredStream | None = None,
+) -> AsyncGenerator[str, None]:
+    """合并 token 流并经输出过滤后转为 SSE 事件，实际发送的文本追加到 parts
+
+    structured 不为空时 token 流是 JSON：不发送 token 事件，
+    每个对象闭合后立即发送对应的类型化事件。
+    """
+    async with aclosing(coalesce_llm_stream(tokens, watcher)) as chunks:
+        async for chunk in chunks:
+            if chunk is None:
+                yield SSE_HEARTBEAT
+                continue
+            if outbound is not None:
+                chunk = outbound.feed(chunk)
+                if not chunk:
+                    continue
+            parts.append(chunk)
+            if structured is None:
+                yield _token_event(chunk)
+                continue
+            for event in structured.feed(chunk):
+                yield event.sse()
+
+
 def _create_event_generator(
     request: Request,
     db: AsyncSession,
-    session: SolveSession,
-    step_history: StepHistory | None,
+    state: SessionState,
     current_step_enum: SolveStep,
-    system_prompt: str,
-    sanitized_input: str,
-    user_content: str,
-    emotion_result,
+    system_prompt: SystemPrompt,
+    analysis: MessageAnalysis,
     enable_orchestration: bool,
     session_id: UUID,
     user_id: UUID,
+    llm_agents: bool = False,
+    structured_stream: bool = False,
 ) -> AsyncGenerator[str, None]:
-    """创建 SSE 事件生成器（根据配置选择多代理或传统 AI 流）"""
+    """创建 SSE 事件生成器（根据配置选择多代理或传统 AI 流）
+
+    多代理模式下 llm_agents 为 True 时由 LLM 代理生成回复并流式发送；
+    structured_stream 为 True 时有结构化结果的步骤改为发送 question / reframe / option 事件。
+    """
+    session = state.session
+    user_content = analysis.raw
+    emotion_result = analysis.emotion
 
     async def event_generator() -> AsyncGenerator[str, None]:
+        active_step_history: StepHistory | None = None
         try:
-            active_step_history = _prepare_step_history(
-                db, step_history, session, current_step_enum
-            )
-            _save_user_message(db, session, current_step_enum, user_content)
-            await db.commit()
-
-            if enable_orchestration:
-                analytics_service = AnalyticsService(db)
-                orchestrator = OrchestratorService(db)
-                decision = await orchestrator.handle_solve_message(
-                    session, user_content, current_step_enum, sanitized_input
+            async with DisconnectWatcher(request) as watcher:
+                active_step_history = _prepare_step_history(
+                    db, state.step_history, session, current_step_enum
+                )
+                # 先读取窗口（不含本轮输入），再保存本轮用户消息
+                history = (
+                    []
+                    if enable_orchestration
+                    else await conversation_window.load(db, session_id)
+                )
+                _save_user_message(db, session, current_step_enum, user_content)
+                await db.commit()
+                await conversation_window.append(
+                    session_id, MessageRole.USER.value, user_content
                 )
 
-                if await request.is_disconnected():
-                    _close_step_history(db, active_step_history, "disconnected")
+                if enable_orchestration:
+                    analytics_service = AnalyticsService(db)
+                    orchestrator = OrchestratorService(db)
+                    done_fields: dict[str, Any] = {}
+                    if llm_agents:
+                        turn = await orchestrator.start_solve_turn(
+                            session,
+                            user_content,
+                            current_step_enum,
+                            analysis,
+                            profile_entity=state.profile,
+                            structured=structured_stream,
+                        )
+                        try:
+                            # 主代理输出边生成边发送，次代理在此期间继续运行
+                            outbound = create_outbound_filter()
+                            structured = StructuredStream() if turn.structured else None
+                            response_parts: list[str] = []
+                            async with aclosing(
+                                _relay_tokens(
+                                    turn.tokens(),
+                                    watcher,
+                                    outbound,
+                                    response_parts,
+                                    structured,
+                                )
+                            ) as events:
+                                async for event in events:
+                                    yield event
+                            if watcher.disconnected:
+                                await _close_disconnected_stream(
+                                    db, active_step_history
+                                )
+                                return
+                            if outbound is not None:
+                                tail = outbound.flush()
+                                if tail:
+                                    response_parts.append(tail)
+                                    if structured is None:
+                                        yield _token_event(tail)
+                                    else:
+                                        for item in structured.feed(tail):
+                                            yield item.sse()
+                                done_fields = outbound.done_fields()
+                            if structured is None:
+                                response_text = "".join(response_parts)
+                            else:
+                                # 模型输出中没有可用的对象时改发规则结果
+                                if not structured.events:
+                                    structured.events = decision_events(turn.decision)
+                                    for item in structured.events:
+                                        yield item.sse()
+                                response_text = render_text(structured.events)
+                            decision = await turn.finish(response_text)
+                        finally:
+                            turn.cancel()
+                    else:
+                        decision = await orchestrator.handle_solve_message(
+                            session,
+                            user_content,
+                            current_step_enum,
+                            analysis,
+                            profile_entity=state.profile,
+                        )
+
+                        if watcher.disconnected:
+                            await _close_disconnected_stream(db, active_step_history)
+                            return
+
+                        structured_events = (
+                            decision_events(decision) if structured_stream else []
+                        )
+                        if structured_events:
+                            for item in structured_events:
+                                yield item.sse()
+                        else:
+                            yield _token_event(decision.response_text)
+
+                    if watcher.disconnected:
+                        await _close_disconnected_stream(db, active_step_history)
+                        return
+
+                    response_text = decision.response_text
+                    next_step = current_step_enum.value
+                    actual_step_for_message = current_step_enum
+                    if decision.next_step != current_step_enum.value:
+                        (
+                            next_step,
+                            active_step_history,
+                        ) = await _handle_step_transition_to(
+                            db,
+                            analytics_service,
+                            session,
+                            active_step_history,
+                            current_step_enum,
+                            decision.next_step,
+                        )
+                        try:
+                            actual_step_for_message = SolveStep(decision.next_step)
+                        except ValueError:
+                            actual_step_for_message = current_step_enum
+
+                    _save_ai_message(
+                        db, session, actual_step_for_message, response_text
+                    )
                     await db.commit()
+                    await session_state_cache.store(
+                        session,
+                        active_step_history,
+                        orchestrator.profile_entity,
+                        generation=state.generation,
+                    )
+                    await conversation_window.append(
+                        session_id, MessageRole.ASSISTANT.value, response_text
+                    )
+                    done_payload = json.dumps(
+                        {
+                            "next_step": next_step,
+                            "primary_agent": decision.primary_agent.value,
+                            "emotion_detected": emotion_result.emotion.value,
+                            "confidence": emotion_result.confidence,
+                            **done_fields,
+                        }
+                    )
+                    yield f"event: done\ndata: {done_payload}\n\n"
                     return
 
-                response_text = decision.response_text
-                payload = json.dumps({"content": response_text})
-                yield f"event: token\ndata: {payload}\n\n"
+                analytics_service = AnalyticsService(db)
+                ai_service = AIService()
+                outbound = create_outbound_filter()
+                ai_response_parts: list[str] = []
+                async with aclosing(
+                    _relay_tokens(
+                        ai_service.stream(
+                            system_prompt,
+                            analysis.sanitized,
+                            history,
+                            route=f"solve:{current_step_enum.value}",
+                        ),
+                        watcher,
+                        outbound,
+                        ai_response_parts,
+                    )
+                ) as events:
+                    async for event in events:
+                        yield event
 
-                if await request.is_disconnected():
-                    _close_step_history(db, active_step_history, "disconnected")
-                    await db.commit()
+                # 断开时上游流已被取消，只做收尾，不保存不完整的回复
+                if watcher.disconnected:
+                    await _close_disconnected_stream(db, active_step_history)
                     return
 
-                next_step = current_step_enum.value
-                actual_step_for_message = current_step_enum
-                if decision.next_step != current_step_enum.value:
-                    next_step = await _handle_step_transition_to(
-                        db,
-                        analytics_service,
-                        session,
-                        active_step_history,
-                        current_step_enum,
-                        decision.next_step,
-                    )
-                    try:
-                        actual_step_for_message = SolveStep(decision.next_step)
-                    except ValueError:
-                        actual_step_for_message = current_step_enum
-
-                _save_ai_message(db, session, actual_step_for_message, response_text)
+                # 输出过滤保留的尾部窗口
+                tail = outbound.flush() if outbound is not None else ""
+                if tail:
+                    ai_response_parts.append(tail)
+                    yield _token_event(tail)
+
+                response_text = "".join(ai_response_parts)
+                _save_ai_message(db, session, current_step_enum, response_text)
+                next_step, active_step_history = await _handle_step_transition(
+                    db,
+                    analytics_service,
+                    session,
+                    active_step_history,
+                    current_step_enum,
+                )
                 await db.commit()
+                await session_state_cache.store(
+                    session,
+                    active_step_history,
+                    state.profile,
+                    generation=state.generation,
+                )
+                await conversation_window.append(
+                    session_id, MessageRole.ASSISTANT.value, response_text
+                )
                 done_payload = json.dumps(
                     {
                         "next_step": next_step,
-                        "primary_agent": decision.primary_agent.value,
                         "emotion_detected": emotion_result.emotion.value,
                         "confidence": emotion_result.confidence,
+                        **(outbound.done_fields() if outbound is not None else {}),
                     }
                 )
                 yield f"event: done\ndata: {done_payload}\n\n"
-                return
-
-            analytics_service = AnalyticsService(db)
-            ai_service = AIService()
-            ai_response_parts: list[str] = []
-            async for token in ai_service.stream(system_prompt, sanitized_input):
-                if await request.is_disconnected():
-                    _close_step_history(db, active_step_history, "disconnected")
-                    await db.commit()
-                    return
-                ai_response_parts.append(token)
-                payload = json.dumps({"content": token})
-                yield f"event: token\ndata: {payload}\n\n"
-
-            if await request.is_disconnected():
-                _close_step_history(db, active_step_history, "disconnected")
-                await db.commit()
-                return
-
-            _save_ai_message(db, session, current_step_enum, "".join(ai_response_parts))
-            next_step = await _handle_step_transition(
-                db,
-                analytics_service,
-                session,
-                active_step_history,
-                current_step_enum,
-            )
-            await db.commit()
-            done_payload = json.dumps(
-                {
-                    "next_step": next_step,
-                    "emotion_detected": emotion_result.emotion.value,
-                    "confidence": emotion_result.confidence,
-                }
-            )
-            yield f"event: done\ndata: {done_payload}\n\n"
+        except asyncio.CancelledError:
+            # 服务器在断开时取消了流任务（ASGI < 2.4），仍需完成步骤历史收尾
+            if active_step_history is not None:
+                await _close_disconnected_stream(db, active_step_history)
+            raise
         except Exception as e:
+            await session_state_cache.invalidate(session_id)
             async for error_event in handle_sse_error(
                 db,
                 e,
@@ -245,6 +477,7 @@ def _create_event_generator(
 
     **事件类型**:
     - `token`: AI 生成的文本片段
+    - `reframe` / `option` / `question`: 结构化流式模式下的问题重构、可选方向（逐个发送）与澄清问题
     - `done`: 生成完成，包含元数据
     - `error`: 发生错误
     """,
@@ -279,68 +512,22 @@ async def stream_messages(
     db: AsyncSession = Depends(get_db),
 ):
     """向会话发送消息并以 SSE 方式流式返回 AI 回复。"""
-    session, step_history = await _validate_session_and_get_context(
-        db,
-        session_id,
-        current_user.id,  # type: ignore[arg-type]
-    )
-
-    crisis_response = await _handle_crisis_detection(db, session, data.content)
-    if crisis_response:
-        return crisis_response
-
-    settings = get_settings()
-    current_step = str(session.current_step)
-    system_prompt = STEP_SYSTEM_PROMPTS.get(
-        current_step,
-        STEP_SYSTEM_PROMPTS[SolveStep.RECEIVE.value],
-    )
-    sanitized_input = strip_pii(sanitize_user_input(data.content))
-    emotion_result = detect_emotion(data.content)
-
-    try:
-        current_step_enum = SolveStep(current_step)
-    except ValueError:
-        current_step_enum = SolveStep.RECEIVE
-        session.current_step = current_step_enum.value  # type: ignore[assignment]
-
-    event_gen = _create_event_generator(
-        request,
+    state = await _validate_session_and_get_context(
         db,
-        session,
-        step_history,
-        current_step_enum,
-        system_prompt,
-        sanitized_input,
-        data.content,
-        emotion_result,
-        settings.enable_multi_agent_orchestration,
         session_id,
         current_user.id,  # type: ignore[arg-type]
     )
+    session = state.session
 
-    return StreamingResponse(
-        event_gen,
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
-    )
-
-    crisis_response = await _handle_crisis_detection(db, session, data.content)
+    # 消息只分析一次：危机、情绪、注入、清洗结果由后续环节共享
+    analysis = analyze_message(data.content)
+    crisis_response = await _handle_crisis_detection(db, session, analysis)
     if crisis_response:
         return crisis_response
 
     settings = get_settings()
     current_step = str(session.current_step)
-    system_prompt = STEP_SYSTEM_PROMPTS.get(
-        current_step,
-        STEP_SYSTEM_PROMPTS[SolveStep.RECEIVE.value],
-    )
-    sanitized_input = strip_pii(sanitize_user_input(data.content))
-    emotion_result = detect_emotion(data.content)
+    system_prompt = await _build_system_prompt(db, session, current_step)
 
     try:
         current_step_enum = SolveStep(current_step)
@@ -351,16 +538,15 @@ async def stream_messages(
     event_gen = _create_event_generator(
         request,
         db,
-        session,
-        step_history,
+        state,
         current_step_enum,
         system_prompt,
-        sanitized_input,
-        data.content,
-        emotion_result,
+        analysis,
         settings.enable_multi_agent_orchestration,
         session_id,
         current_user.id,  # type: ignore[arg-type]
+        llm_agents=settings.orchestration_llm_agents,
+        structured_stream=settings.orchestration_structured_stream,
     )
 
     return StreamingResponse(
@@ -8,6 +8,7 @@ from app.middleware.rate_limit import API_RATE_LIMIT, limiter, user_rate_limit_k
 from app.models.solve_session import SolveSession
 from app.models.user import User
 from app.schemas.session import SessionUpdateRequest, SessionUpdateResponse
+from app.services.session_state_cache import session_state_cache
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
@@ -66,6 +67,7 @@ async def update_session(
         session.tags = updates.tags  # type: ignore[assignment]
 
     await db.commit()
+    await session_state_cache.invalidate(session_id)
 
     session_response = SessionUpdateResponse(
         id=str(session.id),
@@ -2,12 +2,15 @@
 
 from datetime import datetime
 from typing import cast
+from uuid import UUID
 
 from app.models.message import Message, MessageRole
 from app.models.solve_session import SessionStatus, SolveSession, SolveStep
 from app.models.step_history import StepHistory
-from app.models.subscription import Subscription, Usage
+from app.models.subscription import Usage
 from app.services.analytics_service import AnalyticsService
+from app.services.prompt_registry import prompt_registry
+from app.services.session_state_cache import session_state_cache
 from app.services.state_machine import get_next_step, is_final_step, validate_transition
 from app.utils.datetime_utils import utc_now
 from fastapi import HTTPException
@@ -73,6 +76,9 @@ STEP_SYSTEM_PROMPTS = {
 回复长度：2-4 句话，明确第一步行动。""",
 }
 
+# 预注册为带版本的静态前缀，供提供商端提示词缓存复用
+STEP_PROMPT_PREFIXES = prompt_registry.register_many("solve", STEP_SYSTEM_PROMPTS)
+
 
 def _period_start_for_tier(
     tier: str,
@@ -162,7 +168,7 @@ async def _handle_step_transition(
     session: SolveSession,
     active_step_history: StepHistory,
     current_step_enum: SolveStep,
-) -> str:
+) -> tuple[str, StepHistory]:
     next_step_enum = get_next_step(current_step_enum)
 
     next_step = next_step_enum.value if next_step_enum else current_step_enum.value
@@ -183,10 +189,15 @@ async def _handle_step_transition_to(
     active_step_history: StepHistory,
     current_step_enum: SolveStep,
     target_step_value: str,
-) -> str:
+) -> tuple[str, StepHistory]:
+    """推进到目标步骤，返回实际步骤与之后的当前步骤历史
+
+    会话状态发生变化时先删除状态缓存（不递增代数），由调用方提交后写回。
+    """
     now = utc_now()
 
     if is_final_step(current_step_enum):
+        await session_state_cache.discard(session.id)  # type: ignore[arg-type]
         if active_step_history.completed_at is None:
             active_step_history.completed_at = now  # type: ignore[assignment]
             await analytics_service.emit(
@@ -203,24 +214,24 @@ async def _handle_step_transition_to(
             {"final_step": current_step_enum.value},
             flush=False,
         )
-        return current_step_enum.value
+        return current_step_enum.value, active_step_history
 
     try:
         target_step_enum = SolveStep(target_step_value)
     except ValueError:
-        return current_step_enum.value
+        return current_step_enum.value, active_step_history
 
     if not validate_transition(current_step_enum, target_step_enum):
-        return current_step_enum.value
+        return current_step_enum.value, active_step_history
 
+    await session_state_cache.discard(session.id)  # type: ignore[arg-type]
     active_step_history.completed_at = now  # type: ignore[assignment]
-    db.add(
-        StepHistory(
-            session_id=session.id,
-            step=target_step_enum.value,
-            started_at=now,
-        )
+    next_step_history = StepHistory(
+        session_id=session.id,
+        step=target_step_enum.value,
+        started_at=now,
     )
+    db.add(next_step_history)
     session.current_step = target_step_enum.value  # type: ignore[assignment]
     await analytics_service.emit(
         "step_completed",
@@ -228,25 +239,20 @@ async def _handle_step_transition_to(
         {"from_step": current_step_enum.value, "to_step": target_step_enum.value},
         flush=False,
     )
-    return target_step_enum.value
+    return target_step_enum.value, next_step_history
 
 
 async def _get_or_create_usage(
     db: AsyncSession,
-    subscription: Subscription,
+    user_id: UUID,
+    period_start: datetime,
 ) -> Usage:
-    """获取或创建当月 Usage 记录，使用 PostgreSQL upsert 保证并发安全"""
+    """获取或创建当期 Usage 记录，使用 PostgreSQL upsert 保证并发安全"""
     from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-    period_start = _period_start_for_tier(
-        cast(str, subscription.tier),
-        cast(datetime | None, subscription.created_at),
-        cast(datetime | None, subscription.current_period_start),
-    )
-
     # 使用 PostgreSQL 的 INSERT ON CONFLICT 实现并发安全的 upsert
     stmt = pg_insert(Usage).values(
-        user_id=subscription.user_id,
+        user_id=user_id,
         period_start=period_start,
         session_count=0,
     )
@@ -257,7 +263,7 @@ async def _get_or_create_usage(
     # 查询并返回记录（无论是新建还是已存在）
     result = await db.execute(
         select(Usage).where(
-            Usage.user_id == subscription.user_id, Usage.period_start == period_start
+            Usage.user_id == user_id, Usage.period_start == period_start
         )
     )
     return result.scalar_one()
@@ -16,6 +16,7 @@ from app.schemas.subscription import (
 )
 from app.services import stripe_service
 from app.services.cache_service import CacheService
+from app.services.request_principal import subscription_payload
 from app.utils.datetime_utils import utc_now
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
@@ -48,21 +49,6 @@ def _period_start_for_tier(subscription: Subscription) -> datetime:
     return utc_now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
 
-def _subscription_payload(subscription: Subscription) -> dict[str, object]:
-    return {
-        "tier": str(subscription.tier),
-        "status": str(subscription.status),
-        "period_start": subscription.current_period_start.isoformat()
-        if subscription.current_period_start
-        else None,
-        "period_end": subscription.current_period_end.isoformat()
-        if subscription.current_period_end
-        else None,
-        "cancel_at_period_end": bool(subscription.cancel_at_period_end),
-        "stripe_customer_id": subscription.stripe_customer_id,
-    }
-
-
 async def _get_or_create_usage(
     db: AsyncSession,
     subscription: Subscription,
@@ -169,7 +155,7 @@ async def get_portal(
         raise HTTPException(status_code=404, detail={"error": "NO_SUBSCRIPTION"})
 
     await cache_service.set_subscription(
-        current_user.id, _subscription_payload(subscription)
+        current_user.id, subscription_payload(subscription)
     )
     portal_url = await stripe_service.create_portal_session(
         str(subscription.stripe_customer_id)
@@ -196,38 +182,22 @@ async def get_current_subscription(
     if not settings.payments_enabled:
         raise HTTPException(status_code=501, detail={"error": "PAYMENTS_DISABLED"})
 
-    cached_subscription = await cache_service.get_subscription(current_user.id)
-    if (
-        isinstance(cached_subscription, dict)
-        and cached_subscription.get("tier")
-        and cached_subscription.get("status")
-    ):
-        return SubscriptionResponse(
-            tier=str(cached_subscription.get("tier") or ""),
-            status=str(cached_subscription.get("status") or ""),
-            period_start=cached_subscription.get("period_start"),
-            period_end=cached_subscription.get("period_end"),
-            cancel_at_period_end=bool(
-                cached_subscription.get("cancel_at_period_end", False)
-            ),
+    async def load() -> dict[str, object] | None:
+        result = await db.execute(
+            select(Subscription).where(Subscription.user_id == current_user.id)
         )
+        subscription = result.scalar_one_or_none()
+        return subscription_payload(subscription) if subscription else None
 
-    result = await db.execute(
-        select(Subscription).where(Subscription.user_id == current_user.id)
-    )
-    subscription = result.scalar_one_or_none()
-    if not subscription:
+    payload = await cache_service.load_subscription(current_user.id, load)
+    if not isinstance(payload, dict) or not payload.get("tier"):
         raise HTTPException(status_code=404, detail={"error": "NO_SUBSCRIPTION"})
-
-    await cache_service.set_subscription(
-        current_user.id, _subscription_payload(subscription)
-    )
     return SubscriptionResponse(
-        tier=str(subscription.tier),
-        status=str(subscription.status),
-        period_start=subscription.current_period_start,  # type: ignore[arg-type]
-        period_end=subscription.current_period_end,  # type: ignore[arg-type]
-        cancel_at_period_end=bool(subscription.cancel_at_period_end),
+        tier=str(payload.get("tier") or ""),
+        status=str(payload.get("status") or ""),
+        period_start=payload.get("period_start"),
+        period_end=payload.get("period_end"),
+        cancel_at_period_end=bool(payload.get("cancel_at_period_end", False)),
     )
 
 
@@ -1,13 +1,27 @@
+"""编排数据结构
+
+编排热路径每轮都会构造大量对象，内部表示统一使用 slots dataclass
+（构造开销接近普通对象，没有逐字段校验），常量假设 / 选项为不可变模板。
+Pydantic 只用在边界上：ProblemProfile 读写 JSONB 时经 PROFILE_ADAPTER 校验与序列化，
+Annotated 中的取值范围约束只在这一步生效。
+"""
+
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Literal
+from typing import Annotated, Any, Literal, Mapping
 from uuid import UUID
 
 from app.schemas.fields import Field
 from app.utils.datetime_utils import utc_now
-from pydantic import BaseModel, ConfigDict
+from pydantic import ConfigDict, TypeAdapter, with_config
+
+# 0-1 之间的分值（置信度、重要性等），仅在边界校验时生效
+Score = Annotated[float, Field(ge=0.0, le=1.0)]
+
+_FORBID_EXTRA = ConfigDict(extra="forbid")
 
 
 class AgentName(str, Enum):
@@ -36,52 +50,26 @@ class ProblemDomain(str, Enum):
     OTHER = "other"
 
 
-class ProfileMeta(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    schema_version: ProfileSchemaVersion = Field(
-        default=ProfileSchemaVersion.V1,
-        description="ProblemProfile schema 版本",
-        examples=["v1"],
-    )
-    mode: OrchestrationMode = Field(
-        default=OrchestrationMode.SOLVE,
-        description="Profile 模式（Solve/Learn）",
-        examples=["solve"],
-    )
-    last_updated_at: datetime = Field(
-        default_factory=lambda: utc_now(),
-        description="最近更新时间（UTC）",
-    )
-    clarify_state: Literal["INIT", "ALIGN", "MAP", "DIAGNOSE", "COMMIT", "DONE"] = (
-        Field(
-            default="INIT",
-            description="Clarify 内部状态（<=5 轮）",
-            examples=["MAP"],
-        )
-    )
-    clarify_turn_index: int = Field(
-        default=0,
-        description="Clarify 已提问轮次",
-        examples=[0, 1, 2],
-        ge=0,
-    )
-
-
-class EmotionSnapshot(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    label: str = Field(..., description="情绪标签", examples=["sad"])
-    confidence: float = Field(
-        ..., description="情绪置信度（0-1）", examples=[0.8], ge=0.0, le=1.0
-    )
-    intensity_1_5: int = Field(
-        default=3,
-        description="情绪强度（1-5）",
-        examples=[3, 4],
-        ge=1,
-        le=5,
-    )
+ClarifyState = Literal["INIT", "ALIGN", "MAP", "DIAGNOSE", "COMMIT", "DONE"]
+
+
+@with_config(_FORBID_EXTRA)
+@dataclass(slots=True, kw_only=True)
+class ProfileMeta:
+    schema_version: ProfileSchemaVersion = ProfileSchemaVersion.V1
+    mode: OrchestrationMode = OrchestrationMode.SOLVE
+    last_updated_at: datetime = field(default_factory=utc_now)
+    # Clarify 内部状态（<=5 轮）与已提问轮次
+    clarify_state: ClarifyState = "INIT"
+    clarify_turn_index: Annotated[int, Field(ge=0)] = 0
+
+
+@with_config(_FORBID_EXTRA)
+@dataclass(frozen=True, slots=True, kw_only=True)
+class EmotionSnapshot:
+    label: str
+    confidence: Score
+    intensity_1_5: Annotated[int, Field(ge=1, le=5)] = 3
 
 
 class HypothesisType(str, Enum):
@@ -93,177 +81,150 @@ class HypothesisType(str, Enum):
     EMOTIONAL_BLOCK = "emotional_block"
 
 
-class Hypothesis(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    id: str = Field(..., description="假设 ID", examples=["H1"])
-    statement: str = Field(..., description="可检验的假设陈述")
-    type: HypothesisType = Field(..., description="假设类型")
-    confidence: float = Field(
-        default=0.33,
-        description="置信度（0-1）",
-        examples=[0.2, 0.6],
-        ge=0.0,
-        le=1.0,
-    )
-    tests_needed: list[str] = Field(
-        default_factory=list,
-        description="验证该假设还缺哪些字段",
-        examples=[["constraints.deadlines", "current_state.when"]],
-    )
-
-
-class InfoGap(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    key: str = Field(
-        ..., description="缺口字段 key", examples=["goal.success_criteria"]
-    )
-    missing: bool = Field(..., description="是否缺失")
-    importance: float = Field(
-        default=0.5,
-        description="重要性（0-1）",
-        examples=[0.9],
-        ge=0.0,
-        le=1.0,
-    )
-    urgency: float = Field(
-        default=0.5,
-        description="紧急性（0-1）",
-        examples=[0.7],
-        ge=0.0,
-        le=1.0,
-    )
-    answerability: float = Field(
-        default=0.7,
-        description="可回答性（0-1）",
-        examples=[0.8],
-        ge=0.0,
-        le=1.0,
-    )
-    estimated_cost: float = Field(
-        default=0.2,
-        description="回答成本（0-1）",
-        examples=[0.1, 0.4],
-        ge=0.0,
-        le=1.0,
-    )
-
-
-class AgentRun(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    agent: AgentName = Field(..., description="Agent 名称")
-    started_at: datetime = Field(default_factory=lambda: utc_now())
-    latency_ms: int = Field(default=0, ge=0)
-    token_usage: dict[str, int] | None = Field(default=None)
-    notes: str | None = Field(default=None)
-
-
-class ProblemProfile(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    session_id: UUID = Field(..., description="Solve/Learn 会话 ID")
-    user_id: UUID | None = Field(default=None, description="用户 ID（可选）")
-
-    meta: ProfileMeta = Field(default_factory=ProfileMeta)
-    domain: ProblemDomain = Field(default=ProblemDomain.OTHER)
-
-    core_concern_summary: str | None = Field(default=None)
-    user_goal: str | None = Field(default=None)
-    success_criteria: list[str] = Field(default_factory=list)
-    constraints: list[str] = Field(default_factory=list)
-    attempts: list[str] = Field(default_factory=list)
-
-    emotion: EmotionSnapshot | None = Field(default=None)
-
-    hypotheses: list[Hypothesis] = Field(default_factory=list)
-    info_gaps: list[InfoGap] = Field(default_factory=list)
-    last_questions: list[str] = Field(default_factory=list)
-
-    agent_runs: list[AgentRun] = Field(default_factory=list)
+@with_config(_FORBID_EXTRA)
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Hypothesis:
+    id: str
+    statement: str
+    type: HypothesisType
+    confidence: Score = 0.33
+    # 验证该假设还缺哪些字段
+    tests_needed: tuple[str, ...] = ()
 
 
-class AuditFlag(str, Enum):
-    CRISIS = "crisis"
-    PROMPT_INJECTION = "prompt_injection"
-    PII_EMAIL = "pii_email"
-    PII_PHONE = "pii_phone"
+@with_config(_FORBID_EXTRA)
+@dataclass(frozen=True, slots=True, kw_only=True)
+class InfoGap:
+    key: str
+    missing: bool
+    importance: Score = 0.5
+    urgency: Score = 0.5
+    answerability: Score = 0.7
+    estimated_cost: Score = 0.2
 
 
-class AuditorOutput(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+@with_config(_FORBID_EXTRA)
+@dataclass(frozen=True, slots=True, kw_only=True)
+class AgentRun:
+    agent: AgentName
+    started_at: datetime = field(default_factory=utc_now)
+    latency_ms: Annotated[int, Field(ge=0)] = 0
+    token_usage: dict[str, int] | None = None
+    notes: str | None = None
 
-    allowed: bool = Field(...)
-    sanitized_user_input: str = Field(...)
-    flags: list[AuditFlag] = Field(default_factory=list)
-    reason: str | None = Field(default=None)
 
+# 逐轮追加的列表字段只保留最近 N 条（环形缓冲），避免长会话的 profile 无限膨胀
+PROFILE_LIST_LIMITS: dict[str, int] = {
+    "agent_runs": 32,
+    "last_questions": 8,
+    "constraints": 16,
+}
 
-class EmpathOutput(BaseModel):
-    model_config = ConfigDict(extra="forbid")
 
-    emotion: EmotionSnapshot | None = Field(default=None)
-    core_concern_summary: str = Field(...)
-    user_facing_message: str = Field(...)
+@with_config(_FORBID_EXTRA)
+@dataclass(slots=True, kw_only=True)
+class ProblemProfile:
+    session_id: UUID
+    user_id: UUID | None = None
 
+    meta: ProfileMeta = field(default_factory=ProfileMeta)
+    domain: ProblemDomain = ProblemDomain.OTHER
 
-class QuestionPlan(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+    core_concern_summary: str | None = None
+    user_goal: str | None = None
+    success_criteria: list[str] = field(default_factory=list)
+    constraints: list[str] = field(default_factory=list)
+    attempts: list[str] = field(default_factory=list)
 
-    prompt: str = Field(...)
-    rationale: str = Field(...)
-    expected_fields: list[str] = Field(default_factory=list)
-    allow_unknown: bool = Field(default=True)
+    emotion: EmotionSnapshot | None = None
 
+    hypotheses: list[Hypothesis] = field(default_factory=list)
+    info_gaps: list[InfoGap] = field(default_factory=list)
+    last_questions: list[str] = field(default_factory=list)
 
-class ClarifyOutput(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+    agent_runs: list[AgentRun] = field(default_factory=list)
+
+
+# 边界：profile 以 JSONB 持久化，读写都经过 pydantic-core 校验 / 序列化
+PROFILE_ADAPTER: TypeAdapter[ProblemProfile] = TypeAdapter(ProblemProfile)
+
+
+def profile_to_json(profile: ProblemProfile) -> dict[str, Any]:
+    return PROFILE_ADAPTER.dump_python(profile, mode="json")
+
+
+def profile_from_json(data: Mapping[str, Any]) -> ProblemProfile:
+    """校验 JSONB 文档；不符合当前结构时抛出 pydantic.ValidationError"""
+    return PROFILE_ADAPTER.validate_python(data)
+
+
+class AuditFlag(str, Enum):
+    CRISIS = "crisis"
+    PROMPT_INJECTION = "prompt_injection"
+    PII_EMAIL = "pii_email"
+    PII_PHONE = "pii_phone"
 
-    hypotheses: list[Hypothesis] = Field(default_factory=list)
-    info_gaps: list[InfoGap] = Field(default_factory=list)
-    next_question: QuestionPlan = Field(...)
-    user_facing_message: str = Field(...)
 
+@dataclass(slots=True, kw_only=True)
+class AuditorOutput:
+    allowed: bool
+    sanitized_user_input: str
+    flags: list[AuditFlag] = field(default_factory=list)
+    reason: str | None = None
 
-class OptionItem(BaseModel):
-    model_config = ConfigDict(extra="forbid")
 
-    title: str = Field(...)
-    description: str = Field(...)
-    pros: list[str] = Field(default_factory=list)
-    cons: list[str] = Field(default_factory=list)
+@dataclass(slots=True, kw_only=True)
+class EmpathOutput:
+    emotion: EmotionSnapshot | None = None
+    core_concern_summary: str
+    user_facing_message: str
 
 
-class VisionaryOutput(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+@dataclass(frozen=True, slots=True, kw_only=True)
+class QuestionPlan:
+    prompt: str
+    rationale: str
+    expected_fields: tuple[str, ...] = ()
+    allow_unknown: bool = True
 
-    reframed_problem: str | None = Field(default=None)
-    options: list[OptionItem] = Field(default_factory=list)
-    user_facing_message: str = Field(...)
 
+@dataclass(slots=True, kw_only=True)
+class ClarifyOutput:
+    hypotheses: list[Hypothesis] = field(default_factory=list)
+    info_gaps: list[InfoGap] = field(default_factory=list)
+    next_question: QuestionPlan
+    user_facing_message: str
 
-class OrchestratorDecision(BaseModel):
-    model_config = ConfigDict(extra="forbid")
 
-    primary_agent: AgentName = Field(...)
-    next_step: str = Field(...)
-    response_text: str = Field(...)
-    profile: ProblemProfile = Field(...)
-    audit: AuditorOutput = Field(...)
+@dataclass(frozen=True, slots=True, kw_only=True)
+class OptionItem:
+    title: str
+    description: str
+    pros: tuple[str, ...] = ()
+    cons: tuple[str, ...] = ()
 
 
-class AgentRequest(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+@dataclass(slots=True, kw_only=True)
+class VisionaryOutput:
+    reframed_problem: str | None = None
+    options: list[OptionItem] = field(default_factory=list)
+    user_facing_message: str
 
-    profile: ProblemProfile = Field(...)
-    user_input: str = Field(...)
-    now_step: str = Field(...)
 
+@dataclass(slots=True, kw_only=True)
+class OrchestratorDecision:
+    primary_agent: AgentName
+    next_step: str
+    response_text: str
+    profile: ProblemProfile
+    audit: AuditorOutput
+    # 结构化输出（按步骤填充），结构化流式模式下逐个作为类型化事件发送
+    reframed_problem: str | None = None
+    options: list[OptionItem] = field(default_factory=list)
+    question: QuestionPlan | None = None
 
-class AgentResult(BaseModel):
-    model_config = ConfigDict(extra="forbid")
 
-    agent: AgentName = Field(...)
-    output: dict[str, Any] = Field(...)
-    user_facing_text: str | None = Field(default=None)
+@dataclass(slots=True, kw_only=True)
+class AgentRequest:
+    profile: ProblemProfile
+    user_input: str
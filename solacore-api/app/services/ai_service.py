@@ -1,94 +1,389 @@
 import asyncio
-import json
-from typing import AsyncGenerator
+import contextlib
+from dataclasses import dataclass
+from typing import AsyncGenerator, Mapping, Sequence
 
 import httpx
 from app.config import get_settings
+from app.services.generation_routes import (
+    DEFAULT_PROFILE,
+    GenerationProfile,
+    generation_routes,
+)
+from app.services.llm_clients import (
+    FAKE_API_KEY,
+    LLMClientRegistry,
+    llm_clients,
+    provider_base_url,
+)
+from app.services.llm_resilience import (
+    LLMUnavailableError,
+    ProviderGuard,
+    llm_resilience,
+)
+from app.services.llm_routing import provider_chain, ttft_tracker
+from app.services.prompt_registry import SystemPrompt, as_system_prompt
+from app.services.sse_decoder import iter_sse_json, openai_delta
+from app.utils.metrics import metrics
+
+# 可重试/可切换提供商的错误（配置错误等直接抛出）
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.RequestError, httpx.HTTPStatusError)
+# 多提供商路由时可切换到下一个提供商的错误（含熔断快速失败）
+FAILOVER_ERRORS = (*RETRYABLE_ERRORS, LLMUnavailableError)
+
+# 多轮对话历史：按时间顺序的 {"role": "user" | "assistant", "content": ...}
+ChatHistory = Sequence[Mapping[str, str]]
+_CHAT_ROLES = ("user", "assistant")
+
+
+@dataclass
+class _ProviderAttempt:
+    provider: str
+    generator: AsyncGenerator[str, None]
+    started_at: float
+
+
+async def _first_token(generator: AsyncGenerator[str, None]) -> str | None:
+    """等待提供商产出首个 token；流为空时返回 None"""
+    try:
+        return await generator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _chat_messages(
+    history: ChatHistory | None, user_prompt: str
+) -> list[dict[str, str]]:
+    """拼接历史与当前输入，保证以 user 开头且 user / assistant 交替
+
+    开头的 assistant 消息被丢弃，相邻同角色消息合并（例如上一轮回复未保存时）。
+    """
+    messages: list[dict[str, str]] = []
+    for item in (*(history or ()), {"role": "user", "content": user_prompt}):
+        role = item.get("role")
+        content = item.get("content") or ""
+        if role not in _CHAT_ROLES or (not messages and role == "assistant"):
+            continue
+        if messages and messages[-1]["role"] == role:
+            merged = f"{messages[-1]['content']}\n\n{content}"
+            messages[-1] = {"role": role, "content": merged}
+        else:
+            messages.append({"role": role, "content": content})
+    return messages
+
+
+def _apply_sampling(
+    payload: dict, generation: GenerationProfile, stop_key: str
+) -> None:
+    """按路由写入 temperature 与停止序列（未设置时使用提供商默认值）"""
+    if generation.temperature is not None:
+        payload["temperature"] = generation.temperature
+    if generation.stop:
+        payload[stop_key] = list(generation.stop)
 
 
 class AIService:
-    def __init__(self):
+    def __init__(self, clients: LLMClientRegistry | None = None):
         self.settings = get_settings()
         self.provider = (self.settings.llm_provider or "openai").lower()
         self.timeout = httpx.Timeout(self.settings.llm_timeout)
         self.max_retries = 3
+        self.clients = clients or llm_clients
+        self.provider_chain = provider_chain(self.settings)
 
     def _get_stream_generator(
-        self, system_prompt: str, user_prompt: str
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        provider: str | None = None,
+        model: str | None = None,
+        history: ChatHistory | None = None,
+        generation: GenerationProfile | None = None,
     ) -> AsyncGenerator[str, None]:
-        """Return the appropriate stream generator based on provider."""
-        if self.provider == "openai":
-            return self._stream_openai(system_prompt, user_prompt)
-        elif self.provider == "anthropic":
-            return self._stream_anthropic(system_prompt, user_prompt)
-        elif self.provider == "openrouter":
-            return self._stream_openrouter(system_prompt, user_prompt)
+        """Return the appropriate stream generator based on provider.
+
+        The generator is wrapped by the provider/model circuit breaker and
+        concurrency limiter; it raises LLMUnavailableError before any request
+        is sent when the provider is tripped or saturated.
+        """
+        provider = provider or self.provider
+        model = model or self.settings.llm_model
+        # fake 提供商按 fake_llm_format 选择协议，请求发往本地替身服务
+        wire = self.settings.fake_llm_format if provider == "fake" else provider
+        if wire == "openai":
+            generator = self._stream_openai(
+                system_prompt, user_prompt, model, provider, history, generation
+            )
+        elif wire == "anthropic":
+            generator = self._stream_anthropic(
+                system_prompt, user_prompt, model, provider, history, generation
+            )
+        elif wire == "openrouter":
+            generator = self._stream_openrouter(
+                system_prompt, user_prompt, model, provider, history, generation
+            )
         else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+        guard = llm_resilience.guard(provider, model, self.settings)
+        return self._guarded_stream(guard, generator)
+
+    async def _guarded_stream(
+        self, guard: ProviderGuard, generator: AsyncGenerator[str, None]
+    ) -> AsyncGenerator[str, None]:
+        """在熔断器/并发限制内消费提供商流，并按结果反馈成功或失败"""
+        try:
+            guard.acquire()
+        except LLMUnavailableError:
+            await generator.aclose()
+            raise
+        error: BaseException | None = None
+        try:
+            async for token in generator:
+                yield token
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            guard.release(error)
+            await generator.aclose()
 
     async def stream(
-        self, system_prompt: str, user_prompt: str
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        history: ChatHistory | None = None,
+        route: str | None = None,
     ) -> AsyncGenerator[str, None]:
-        """Stream response tokens from the configured provider."""
+        """Stream response tokens from the configured provider.
+
+        Pass a registered SystemPrompt (see prompt_registry) so the static
+        prefix is laid out for provider-side prompt caching. ``history`` holds
+        earlier turns, sent as role messages between the system prompt and
+        the current user prompt. ``route`` (e.g. "solve:receive") selects the
+        model and generation budget from generation_routes.
+        """
+        generation = generation_routes.resolve(route)
+        chain = self.provider_chain
+        provider: str | None = None
+        model: str | None = None
+        if generation.overrides_model:
+            chain = provider_chain(self.settings, generation.provider, generation.model)
+            provider, model = chain[0]
+        if len(chain) > 1:
+            async for token in self._stream_routed(
+                system_prompt, user_prompt, history, chain, generation
+            ):
+                yield token
+            return
+
+        loop = asyncio.get_running_loop()
         attempt = 0
         while attempt < self.max_retries:
             attempt += 1
             yielded_any = False
+            started_at = loop.time()
             try:
                 async for token in self._get_stream_generator(
-                    system_prompt, user_prompt
+                    system_prompt,
+                    user_prompt,
+                    provider,
+                    model,
+                    history=history,
+                    generation=generation,
                 ):
+                    if not yielded_any:
+                        self._record_ttft(
+                            provider or self.provider, loop.time() - started_at
+                        )
                     yielded_any = True
                     yield token
                 return
-            except (httpx.TimeoutException, httpx.RequestError, httpx.HTTPStatusError):
+            except RETRYABLE_ERRORS:
                 if attempt >= self.max_retries or yielded_any:
                     raise
                 await asyncio.sleep(0.5 * attempt)
 
-    async def _stream_openai(
-        self, system_prompt: str, user_prompt: str
+    def _record_ttft(self, provider: str, seconds: float) -> None:
+        ttft_tracker.record(provider, seconds)
+        metrics.record_llm_ttft(seconds, provider=provider)
+
+    async def _stream_routed(
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        history: ChatHistory | None = None,
+        chain: list[tuple[str, str]] | None = None,
+        generation: GenerationProfile = DEFAULT_PROFILE,
     ) -> AsyncGenerator[str, None]:
-        api_key = self.settings.openai_api_key
+        """多提供商路由
+
+        - 提供商返回 HTTP/网络错误或熔断快速失败时立即切换到下一个提供商，
+          不在同一提供商上重试；
+        - 开启对冲时，主请求首字延迟超过历史 TTFT 分位阈值后，
+          向下一个提供商发起对冲请求，先产出 token 的一方胜出，另一方被取消；
+        - 已经输出 token 后的错误直接抛出（不能在回复中途切换）。
+        """
+        loop = asyncio.get_running_loop()
+        pending = list(chain or self.provider_chain)
+        running: dict[asyncio.Task[str | None], _ProviderAttempt] = {}
+        winner: _ProviderAttempt | None = None
+        first_token: str | None = None
+        last_error: BaseException | None = None
+        hedged = False
+
+        def launch(event: str | None = None) -> None:
+            provider, model = pending.pop(0)
+            generator = self._get_stream_generator(
+                system_prompt,
+                user_prompt,
+                provider,
+                model,
+                history,
+                generation=generation,
+            )
+            task = asyncio.create_task(_first_token(generator))
+            running[task] = _ProviderAttempt(provider, generator, loop.time())
+            if event:
+                metrics.record_llm_routing_event(event=event, provider=provider)
+
+        try:
+            launch()
+            while running:
+                timeout = None
+                if self.settings.llm_hedge_enabled and not hedged and pending:
+                    primary = next(iter(running.values()))
+                    delay = ttft_tracker.hedge_delay(primary.provider, self.settings)
+                    timeout = max(primary.started_at + delay - loop.time(), 0.0)
+
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    launch("hedge")
+                    continue
+
+                for task in done:
+                    attempt = running.pop(task)
+                    try:
+                        first_token = task.result()
+                    except FAILOVER_ERRORS as exc:
+                        last_error = exc
+                        await attempt.generator.aclose()
+                        continue
+                    winner = attempt
+                    break
+
+                if winner is not None:
+                    break
+                if not running and pending:
+                    launch("failover")
+
+            if winner is None:
+                if last_error is not None:
+                    raise last_error
+                return
+        finally:
+            for task, attempt in running.items():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+                await attempt.generator.aclose()
+
+        if first_token is None:
+            return
+        self._record_ttft(winner.provider, loop.time() - winner.started_at)
+        try:
+            yield first_token
+            async for token in winner.generator:
+                yield token
+        finally:
+            await winner.generator.aclose()
+
+    def _endpoint(self, provider: str, wire: str) -> tuple[str, str]:
+        """返回 (base_url, api_key)；fake 提供商指向本地替身服务，不需要真实 Key"""
+        if provider == "fake":
+            return provider_base_url(provider, self.settings), FAKE_API_KEY
+        api_key = getattr(self.settings, f"{wire}_api_key")
         if not api_key:
-            raise ValueError("OPENAI_API_KEY is not configured")
+            raise ValueError(f"{wire.upper()}_API_KEY is not configured")
+        return provider_base_url(provider, self.settings), api_key
+
+    def _record_openai_usage(self, provider: str, event: dict) -> None:
+        """OpenAI / OpenRouter 最后一个 chunk 的 usage（cached_tokens 为缓存命中）"""
+        usage = event.get("usage")
+        if not usage:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        metrics.record_llm_prompt_usage(
+            provider=provider,
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            cached_tokens=int(details.get("cached_tokens") or 0),
+        )
+
+    def _record_anthropic_usage(self, provider: str, event: dict) -> None:
+        """Anthropic message_start 中的 usage（input_tokens 不含缓存部分）"""
+        usage = event.get("message", {}).get("usage")
+        if not usage:
+            return
+        cached = int(usage.get("cache_read_input_tokens") or 0)
+        written = int(usage.get("cache_creation_input_tokens") or 0)
+        metrics.record_llm_prompt_usage(
+            provider=provider,
+            prompt_tokens=int(usage.get("input_tokens") or 0) + cached + written,
+            cached_tokens=cached,
+            cache_write_tokens=written,
+        )
 
-        payload = {
-            "model": self.settings.llm_model,
+    async def _stream_openai(
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        model: str | None = None,
+        provider: str = "openai",
+        history: ChatHistory | None = None,
+        generation: GenerationProfile | None = None,
+    ) -> AsyncGenerator[str, None]:
+        base_url, api_key = self._endpoint(provider, "openai")
+        prompt = as_system_prompt(system_prompt)
+        generation = generation or DEFAULT_PROFILE
+
+        # 静态 system 消息始终在最前，保证自动前缀缓存命中
+        payload: dict = {
+            "model": model or self.settings.llm_model,
             "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
+                {"role": "system", "content": prompt.text},
+                *_chat_messages(history, user_prompt),
             ],
             "stream": True,
-            "max_tokens": self.settings.llm_max_tokens,
+            "max_tokens": generation.max_tokens or self.settings.llm_max_tokens,
         }
+        _apply_sampling(payload, generation, stop_key="stop")
+        if self.settings.llm_prompt_cache_enabled:
+            payload["prompt_cache_key"] = prompt.cache_key
+            payload["stream_options"] = {"include_usage": True}
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if not line or not line.startswith("data:"):
-                        continue
-                    data = line[len("data:") :].strip()
-                    if data == "[DONE]":
-                        break
-                    try:
-                        payload = json.loads(data)
-                    except json.JSONDecodeError:
-                        continue
-                    delta = payload.get("choices", [{}])[0].get("delta", {})
-                    content = delta.get("content")
-                    if content:
-                        yield content
+        client = await self.clients.get(provider)
+        async with client.stream(
+            "POST",
+            f"{base_url}/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            async for event in iter_sse_json(response.aiter_bytes()):
+                delta = openai_delta(event)
+                if delta is None:
+                    self._record_openai_usage(provider, event)
+                    continue
+                content = delta.get("content")
+                if content:
+                    yield content
 
     def _should_collect_reasoning(self) -> bool:
         """判断是否应该收集 reasoning 内容"""
@@ -98,20 +393,14 @@ class AIService:
         )
 
     async def _process_openrouter_stream(
-        self, response: httpx.Response
+        self, response: httpx.Response, provider: str = "openrouter"
     ) -> AsyncGenerator[tuple[str | None, str | None], None]:
         """处理 OpenRouter SSE 流，返回 (content, reasoning) 元组"""
-        async for line in response.aiter_lines():
-            if not line or not line.startswith("data:"):
+        async for event in iter_sse_json(response.aiter_bytes()):
+            delta = openai_delta(event)
+            if delta is None:
+                self._record_openai_usage(provider, event)
                 continue
-            data = line[len("data:") :].strip()
-            if data == "[DONE]":
-                break
-            try:
-                payload = json.loads(data)
-            except json.JSONDecodeError:
-                continue
-            delta = payload.get("choices", [{}])[0].get("delta", {})
             yield delta.get("content"), delta.get("reasoning")
 
     def _get_openrouter_headers(self, api_key: str) -> dict[str, str]:
@@ -126,70 +415,106 @@ class AIService:
             headers["X-Title"] = self.settings.openrouter_app_name
         return headers
 
-    def _get_openrouter_payload(self, system_prompt: str, user_prompt: str) -> dict:
-        """获取 OpenRouter API 请求负载"""
-        return {
-            "model": self.settings.llm_model,
+    def _get_openrouter_payload(
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        model: str | None = None,
+        history: ChatHistory | None = None,
+        generation: GenerationProfile | None = None,
+    ) -> dict:
+        """获取 OpenRouter API 请求负载
+
+        Anthropic 模型需要显式 cache_control 才会缓存，其余模型依赖稳定的前缀顺序。
+        """
+        prompt = as_system_prompt(system_prompt)
+        generation = generation or DEFAULT_PROFILE
+        model_name = model or self.settings.llm_model
+        cache_enabled = self.settings.llm_prompt_cache_enabled
+        system_content: str | list = prompt.text
+        if cache_enabled and model_name.startswith("anthropic/"):
+            system_content = prompt.anthropic_blocks
+        payload: dict = {
+            "model": model_name,
             "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
+                {"role": "system", "content": system_content},
+                *_chat_messages(history, user_prompt),
             ],
             "stream": True,
-            "max_tokens": self.settings.llm_max_tokens,
+            "max_tokens": generation.max_tokens or self.settings.llm_max_tokens,
         }
+        _apply_sampling(payload, generation, stop_key="stop")
+        if cache_enabled:
+            payload["usage"] = {"include": True}
+        return payload
 
     async def _stream_openrouter(
-        self, system_prompt: str, user_prompt: str
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        model: str | None = None,
+        provider: str = "openrouter",
+        history: ChatHistory | None = None,
+        generation: GenerationProfile | None = None,
     ) -> AsyncGenerator[str, None]:
-        api_key = self.settings.openrouter_api_key
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY is not configured")
-
-        base_url = self.settings.openrouter_base_url.rstrip("/")
-        payload = self._get_openrouter_payload(system_prompt, user_prompt)
+        base_url, api_key = self._endpoint(provider, "openrouter")
+        payload = self._get_openrouter_payload(
+            system_prompt, user_prompt, model, history, generation
+        )
         headers = self._get_openrouter_headers(api_key)
 
         collect_reasoning = self._should_collect_reasoning()
         reasoning_buffer: list[str] = []
         yielded_content = False
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                f"{base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for content, reasoning in self._process_openrouter_stream(
-                    response
-                ):
-                    if content:
-                        yielded_content = True
-                        yield content
-                    elif collect_reasoning and reasoning:
-                        reasoning_buffer.append(reasoning)
+        client = await self.clients.get(provider)
+        async with client.stream(
+            "POST",
+            f"{base_url}/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            async for content, reasoning in self._process_openrouter_stream(
+                response, provider
+            ):
+                if content:
+                    yielded_content = True
+                    yield content
+                elif collect_reasoning and reasoning:
+                    reasoning_buffer.append(reasoning)
 
         # Reasoning 兜底：仅在启用时使用
         if collect_reasoning and not yielded_content and reasoning_buffer:
             yield "".join(reasoning_buffer)
 
     async def _stream_anthropic(
-        self, system_prompt: str, user_prompt: str
+        self,
+        system_prompt: str | SystemPrompt,
+        user_prompt: str,
+        model: str | None = None,
+        provider: str = "anthropic",
+        history: ChatHistory | None = None,
+        generation: GenerationProfile | None = None,
     ) -> AsyncGenerator[str, None]:
-        api_key = self.settings.anthropic_api_key
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY is not configured")
+        base_url, api_key = self._endpoint(provider, "anthropic")
+        prompt = as_system_prompt(system_prompt)
+        generation = generation or DEFAULT_PROFILE
 
-        payload = {
-            "model": self.settings.llm_model,
-            "max_tokens": self.settings.llm_max_tokens,
-            "system": system_prompt,
-            "messages": [
-                {"role": "user", "content": user_prompt},
-            ],
+        payload: dict = {
+            "model": model or self.settings.llm_model,
+            "max_tokens": generation.max_tokens or self.settings.llm_max_tokens,
+            # 静态前缀以 text block 发送，最后一段带 cache_control 断点
+            "system": (
+                prompt.anthropic_blocks
+                if self.settings.llm_prompt_cache_enabled
+                else prompt.text
+            ),
+            "messages": _chat_messages(history, user_prompt),
             "stream": True,
         }
+        _apply_sampling(payload, generation, stop_key="stop_sequences")
         headers = {
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01",
@@ -197,26 +522,20 @@ class AIService:
             "Accept": "text/event-stream",
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if not line or not line.startswith("data:"):
-                        continue
-                    data = line[len("data:") :].strip()
-                    if not data:
-                        continue
-                    try:
-                        payload = json.loads(data)
-                    except json.JSONDecodeError:
-                        continue
-                    if payload.get("type") == "content_block_delta":
-                        delta = payload.get("delta", {})
-                        text = delta.get("text")
-                        if text:
-                            yield text
+        client = await self.clients.get(provider)
+        async with client.stream(
+            "POST",
+            f"{base_url}/messages",
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            async for event in iter_sse_json(response.aiter_bytes()):
+                event_type = event.get("type")
+                if event_type == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event_type == "message_start":
+                    self._record_anthropic_usage(provider, event)
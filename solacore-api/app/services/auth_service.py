@@ -9,6 +9,7 @@ from app.models.session import ActiveSession
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.schemas.auth import LoginRequest, RegisterRequest, TokenResponse
+from app.services.session_registry import session_registry
 from app.utils.datetime_utils import utc_now
 from app.utils.security import (
     create_access_token,
@@ -170,6 +171,7 @@ class AuthService:
         if session:
             await self.db.delete(session)
             await self.db.commit()
+            await session_registry.revoke([session.id])  # type: ignore[list-item]
             return True
         return False
 
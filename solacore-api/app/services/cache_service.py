@@ -1,10 +1,10 @@
 from __future__ import annotations
 
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
 from typing import Any
 from uuid import UUID
 
-from app.utils.cache import RedisCache
-from app.utils.cache import cache as redis_cache
+from app.utils.cache import RedisCache, TieredCache, tiered_cache
 
 USER_TTL_SECONDS = 600
 SUBSCRIPTION_TTL_SECONDS = 300
@@ -13,8 +13,9 @@ DEVICE_TTL_SECONDS = 1800
 
 
 class CacheService:
-    def __init__(self, cache: RedisCache | None = None) -> None:
-        self._cache = cache or redis_cache
+    def __init__(self, cache: RedisCache | TieredCache | None = None) -> None:
+        # 默认经过进程内 L1（见 TieredCache），这些值每个请求都可能读取多次
+        self._cache = cache or tiered_cache
 
     @staticmethod
     def _normalize_id(value: UUID | str) -> str:
@@ -32,6 +33,61 @@ class CacheService:
     def _device_key(self, device_id: UUID | str) -> str:
         return f"device:{self._normalize_id(device_id)}"
 
+    def _device_fingerprint_key(self, user_id: UUID | str, fingerprint: str) -> str:
+        return f"device:fp:{self._normalize_id(user_id)}:{fingerprint}"
+
+    async def get_many(self, keys: Sequence[str]) -> list[Any | None]:
+        return await self._cache.get_many(keys)
+
+    async def set_many(self, items: Mapping[str, tuple[Any, int | None]]) -> None:
+        await self._cache.set_many(items)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        await self._cache.delete_many(keys)
+
+    async def get_principal(
+        self, user_id: UUID | str, device_fingerprint: str | None = None
+    ) -> tuple[Any | None, Any | None, Any | None]:
+        """一次读取用户、订阅与当前设备（按指纹），返回 (user, subscription, device)"""
+        keys = [self._user_key(user_id), self._subscription_key(user_id)]
+        if device_fingerprint:
+            keys.append(self._device_fingerprint_key(user_id, device_fingerprint))
+        values = await self.get_many(keys)
+        return values[0], values[1], values[2] if device_fingerprint else None
+
+    async def set_principal(
+        self,
+        user_id: UUID | str,
+        *,
+        user: dict[str, Any] | None = None,
+        subscription: dict[str, Any] | None = None,
+        device_fingerprint: str | None = None,
+        device: dict[str, Any] | None = None,
+    ) -> None:
+        """回填 get_principal 未命中的部分（一个 pipeline）"""
+        items: dict[str, tuple[Any, int | None]] = {}
+        if user is not None:
+            items[self._user_key(user_id)] = (user, USER_TTL_SECONDS)
+        if subscription is not None:
+            items[self._subscription_key(user_id)] = (
+                subscription,
+                SUBSCRIPTION_TTL_SECONDS,
+            )
+        if device_fingerprint and device is not None:
+            key = self._device_fingerprint_key(user_id, device_fingerprint)
+            items[key] = (device, DEVICE_TTL_SECONDS)
+        await self.set_many(items)
+
+    async def invalidate_account(self, user_id: UUID | str) -> None:
+        """删除用户、订阅与会话列表缓存（一条 DEL）"""
+        await self.delete_many(
+            [
+                self._user_key(user_id),
+                self._subscription_key(user_id),
+                self._sessions_key(user_id),
+            ]
+        )
+
     async def get_user(self, user_id: UUID | str) -> dict[str, Any] | None:
         return await self._cache.get(self._user_key(user_id))
 
@@ -53,6 +109,16 @@ class CacheService:
             ttl=SUBSCRIPTION_TTL_SECONDS,
         )
 
+    async def load_subscription(
+        self,
+        user_id: UUID | str,
+        loader: Callable[[], Awaitable[dict[str, Any] | None]],
+    ) -> dict[str, Any] | None:
+        """读取订阅缓存，未命中时以 loader 加载（并发未命中合并为一次查询）"""
+        return await self._cache.get_or_load(
+            self._subscription_key(user_id), loader, ttl=SUBSCRIPTION_TTL_SECONDS
+        )
+
     async def invalidate_subscription(self, user_id: UUID | str) -> None:
         await self._cache.delete(self._subscription_key(user_id))
 
@@ -66,6 +132,13 @@ class CacheService:
             ttl=SESSIONS_TTL_SECONDS,
         )
 
+    async def load_sessions(
+        self, user_id: UUID | str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any | None:
+        return await self._cache.get_or_load(
+            self._sessions_key(user_id), loader, ttl=SESSIONS_TTL_SECONDS
+        )
+
     async def invalidate_sessions(self, user_id: UUID | str) -> None:
         await self._cache.delete(self._sessions_key(user_id))
 
@@ -79,5 +152,18 @@ class CacheService:
             ttl=DEVICE_TTL_SECONDS,
         )
 
+    async def get_devices(
+        self, device_ids: Sequence[UUID | str]
+    ) -> list[dict[str, Any] | None]:
+        return await self.get_many([self._device_key(item) for item in device_ids])
+
+    async def set_devices(self, payloads: Mapping[UUID | str, dict[str, Any]]) -> None:
+        await self.set_many(
+            {
+                self._device_key(device_id): (payload, DEVICE_TTL_SECONDS)
+                for device_id, payload in payloads.items()
+            }
+        )
+
     async def invalidate_device(self, device_id: UUID | str) -> None:
         await self._cache.delete(self._device_key(device_id))
@@ -1,7 +1,8 @@
 import re
 import unicodedata
 
-_WORD_SEP = r"(?:[\W_]+)"
+from app.services.injection_matcher import SEP, Phrase, PhraseMatcher, render_phrase
+
 _INNER_SEP = r"(?:[\W_]*)"
 _LEET_MAP = {
     "a": "a4@",
@@ -26,68 +27,101 @@ def _split_word(word: str) -> str:
     return _INNER_SEP.join(_char_pattern(ch) for ch in word)
 
 
-def _split_phrase(*words: str) -> str:
-    return _WORD_SEP.join(_split_word(word) for word in words)
-
-
 def _prefix_boundary(pattern: str) -> str:
     return rf"(?<!\w){pattern}"
 
 
-DANGEROUS_PATTERNS = [
-    _prefix_boundary(
-        rf"{_split_word('ignore')}{_WORD_SEP}(?:{_split_word('all')}{_WORD_SEP})?{_split_word('previous')}(?:{_WORD_SEP}{_split_word('instructions')})?"
-    ),
-    _prefix_boundary(
-        rf"{_split_word('disregard')}{_WORD_SEP}(?:{_split_word('all')}{_WORD_SEP})?"
-    ),
-    _prefix_boundary(
-        rf"{_split_word('forget')}{_WORD_SEP}(?:{_split_word('all')}{_WORD_SEP})?"
-    ),
-    _prefix_boundary(
-        rf"{_split_word('please')}{_WORD_SEP}{_split_word('ignore')}(?:{_WORD_SEP}{_split_word('previous')}(?:{_WORD_SEP}{_split_word('instructions')})?)?"
-    ),
-    _prefix_boundary(
-        rf"{_split_word('override')}{_WORD_SEP}(?:{_split_word('all')}{_WORD_SEP})?(?:{_split_word('previous')}{_WORD_SEP})?{_split_word('instructions')}"
-    ),
-    _prefix_boundary(rf"{_split_phrase('now', 'act', 'as')}"),
+# 注入短语：单词间至少一个分隔符（SEP），元组为可选部分；
+# 检测与删除由线性时间的 PhraseMatcher 完成，DANGEROUS_PATTERNS 为等价的正则写法
+INJECTION_PHRASES: list[Phrase] = [
+    ("ignore", SEP, ("all", SEP), "previous", (SEP, "instructions")),
+    ("disregard", SEP, ("all", SEP)),
+    ("forget", SEP, ("all", SEP)),
+    ("please", SEP, "ignore", (SEP, "previous", (SEP, "instructions"))),
+    ("override", SEP, ("all", SEP), ("previous", SEP), "instructions"),
+    ("now", SEP, "act", SEP, "as"),
+]
+
+# 纯字面模式没有回溯风险，仍用正则
+_LITERAL_PATTERNS = [
     r"^system:",
     r"^assistant:",
     r"\[INST\]",
     r"<\|im_start\|>",
 ]
 
-_DANGEROUS_REGEXES = [
+DANGEROUS_PATTERNS = [
+    _prefix_boundary(render_phrase(phrase, _split_word)) for phrase in INJECTION_PHRASES
+] + _LITERAL_PATTERNS
+
+_PHRASE_MATCHER = PhraseMatcher(INJECTION_PHRASES, _char_pattern)
+_LITERAL_REGEXES = [
     re.compile(pattern, flags=re.IGNORECASE | re.MULTILINE)
-    for pattern in DANGEROUS_PATTERNS
+    for pattern in _LITERAL_PATTERNS
 ]
 
 _EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 _PHONE_RE = re.compile(
     r"(?:\+?\d{1,3}[\s.-]?)?(?:\(?\d{2,4}\)?[\s.-]?)?\d{3,4}[\s.-]?\d{4}"
 )
+# 审计用的宽松电话号码检测（只判断是否出现，不做删除）
+_PHONE_HINT_RE = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+# 输出流打码用的电话号码：只接受国际区号、大陆手机号、括号区号或 3-3-4 分组，
+# 前后不能紧挨数字或小数点，避免把小数、日期、年份区间当成电话
+_PHONE_STRICT_RE = re.compile(
+    r"(?<![\w.+-])"
+    r"(?:\+\d{1,3}[\s.-]?(?:\(\d{1,4}\)[\s.-]?)?\d{2,4}(?:[\s.-]?\d{2,4}){2,3}"
+    r"|1[3-9]\d[\s-]?\d{4}[\s-]?\d{4}"
+    r"|(?:\(\d{2,4}\)[\s.-]?|\d{3}[\s.-])?\d{3}[\s.-]\d{4})"
+    r"(?!\d|[.-]\d)"
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+# 输出流打码用：邮箱与电话号码合并为一个正则，命中组名即类型
+PII_RE = re.compile(
+    rf"(?P<email>{_EMAIL_RE.pattern})|(?P<phone>{_PHONE_STRICT_RE.pattern})"
+)
 
 
-def _normalize_content(content: str) -> str:
+def normalize_content(content: str) -> str:
     # Unicode 归一化，减少全角/兼容字符混淆
     return unicodedata.normalize("NFKC", content)
 
 
+def has_prompt_injection(normalized: str) -> bool:
+    """在已归一化的文本中检测注入模式"""
+    return _PHRASE_MATCHER.search(normalized) or any(
+        regex.search(normalized) for regex in _LITERAL_REGEXES
+    )
+
+
+def sanitize_normalized(normalized: str, injection: bool = True) -> str:
+    """清洗已归一化的文本；已知不含注入模式时（injection=False）跳过逐模式替换"""
+    sanitized = normalized
+    if injection:
+        sanitized = _PHRASE_MATCHER.remove(sanitized)
+        for regex in _LITERAL_REGEXES:
+            sanitized = regex.sub("", sanitized)
+    return _WHITESPACE_RE.sub(" ", sanitized).strip()
+
+
 def looks_like_prompt_injection(content: str) -> bool:
-    normalized = _normalize_content(content)
-    return any(regex.search(normalized) for regex in _DANGEROUS_REGEXES)
+    return has_prompt_injection(normalize_content(content))
 
 
 def sanitize_user_input(content: str) -> str:
-    sanitized = _normalize_content(content)
-    for regex in _DANGEROUS_REGEXES:
-        sanitized = regex.sub("", sanitized)
-    sanitized = re.sub(r"\s+", " ", sanitized).strip()
-    return sanitized
+    return sanitize_normalized(normalize_content(content))
 
 
 def strip_pii(content: str) -> str:
     sanitized = _EMAIL_RE.sub("", content)
     sanitized = _PHONE_RE.sub("", sanitized)
-    sanitized = re.sub(r"\s+", " ", sanitized).strip()
+    sanitized = _WHITESPACE_RE.sub(" ", sanitized).strip()
     return sanitized
+
+
+def contains_email(text: str) -> bool:
+    return _EMAIL_RE.search(text) is not None
+
+
+def contains_phone(text: str) -> bool:
+    return _PHONE_HINT_RE.search(text) is not None
@@ -0,0 +1,90 @@
+"""Solve 多轮对话窗口 - 每个会话最近 N 轮消息缓存在 Redis 列表中
+
+列表写入时即裁剪到固定长度；缓存未命中时用一次索引查询
+（messages.session_id, created_at）取最近 2N 条重建。
+无论会话多长，每轮对话的数据库读取都是 O(1)。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+from uuid import UUID
+
+from app.config import get_settings
+from app.models.message import Message, MessageRole
+from app.services.content_filter import sanitize_user_input, strip_pii
+from app.utils.cache import RedisCache
+from app.utils.cache import cache as redis_cache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 列表首个元素：标记窗口已加载（即使会话还没有任何消息），追加时据此判断键是否存在
+_LOADED_MARKER = "__window__"
+_ROLES = (MessageRole.USER.value, MessageRole.ASSISTANT.value)
+
+
+class ConversationWindow:
+    """按会话维护最近若干轮 user / assistant 消息"""
+
+    def __init__(self, cache: RedisCache | None = None) -> None:
+        self._cache = cache or redis_cache
+
+    @staticmethod
+    def _key(session_id: UUID | str) -> str:
+        return f"solve:window:{session_id}"
+
+    @staticmethod
+    def _max_messages() -> int:
+        return max(get_settings().solve_context_turns, 0) * 2
+
+    @staticmethod
+    def _turn(role: str, content: str) -> dict[str, str]:
+        """转换为发给 LLM 的消息：用户内容与当前输入同样脱敏，并按条截断"""
+        if role == MessageRole.USER.value:
+            content = strip_pii(sanitize_user_input(content))
+        limit = get_settings().solve_context_message_chars
+        if limit > 0 and len(content) > limit:
+            content = content[:limit]
+        return {"role": role, "content": content}
+
+    async def load(self, db: AsyncSession, session_id: UUID) -> list[dict[str, str]]:
+        """返回按时间顺序排列的最近消息（不含当前这轮输入）"""
+        max_messages = self._max_messages()
+        if max_messages == 0:
+            return []
+        key = self._key(session_id)
+        cached = await self._cache.list_range(key)
+        if cached is not None:
+            return [item for item in cached if isinstance(item, dict)][-max_messages:]
+
+        result: Any = await db.execute(
+            select(Message.role, Message.content)
+            .where(Message.session_id == session_id, Message.role.in_(_ROLES))
+            .order_by(Message.created_at.desc())
+            .limit(max_messages)
+        )
+        rows = result.all()
+        turns = [self._turn(role, content) for role, content in reversed(rows)]
+        items: list[Any] = [_LOADED_MARKER, *turns]
+        await self._cache.list_replace(
+            key, items, ttl=get_settings().solve_context_ttl_seconds
+        )
+        return turns
+
+    async def append(self, session_id: UUID, role: str, content: str) -> None:
+        """追加一条消息并裁剪；窗口未加载时不写入（下次读取从数据库重建）"""
+        max_messages = self._max_messages()
+        if max_messages == 0:
+            return
+        await self._cache.list_append(
+            self._key(session_id),
+            [self._turn(role, content)],
+            max_length=max_messages,
+            ttl=get_settings().solve_context_ttl_seconds,
+        )
+
+    async def clear(self, session_id: UUID) -> None:
+        await self._cache.delete(self._key(session_id))
+
+
+conversation_window = ConversationWindow()
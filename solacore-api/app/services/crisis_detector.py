@@ -4,6 +4,8 @@ import re
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+from app.services.keyword_engine import KeywordHit, detection_keywords
+
 # 危机关键词（多语言）
 CRISIS_KEYWORDS: Dict[str, List[str]] = {
     "en": [
@@ -50,21 +52,17 @@ class CrisisCheckResult:
     matched_keyword: Optional[str] = None
 
 
-def _build_patterns() -> List[re.Pattern]:
-    """构建所有语言的关键词正则"""
-    patterns = []
-    for lang_keywords in CRISIS_KEYWORDS.values():
-        for keyword in lang_keywords:
-            # 使用 word boundary 避免误匹配
-            pattern = re.compile(
-                rf"\b{re.escape(keyword)}\b",
-                flags=re.IGNORECASE,
-            )
-            patterns.append(pattern)
-    return patterns
-
+CRISIS_CATEGORY = "crisis"
 
-_CRISIS_PATTERNS = _build_patterns()
+# 所有语言的关键词，使用 word boundary 避免误匹配；注册顺序即优先级
+detection_keywords.register(
+    CRISIS_CATEGORY,
+    (
+        (keyword, rf"\b{re.escape(keyword)}\b", 1.0)
+        for lang_keywords in CRISIS_KEYWORDS.values()
+        for keyword in lang_keywords
+    ),
+)
 
 
 def detect_crisis(content: str) -> CrisisCheckResult:
@@ -77,19 +75,21 @@ def detect_crisis(content: str) -> CrisisCheckResult:
     Returns:
         CrisisCheckResult: 包含是否阻止、原因和资源信息
     """
-    content_lower = content.lower()
-
-    for pattern in _CRISIS_PATTERNS:
-        match = pattern.search(content_lower)
-        if match:
-            return CrisisCheckResult(
-                blocked=True,
-                reason="CRISIS",
-                resources=CRISIS_RESOURCES,
-                matched_keyword=match.group(0),
-            )
-
-    return CrisisCheckResult(blocked=False)
+    return crisis_from_hits(detection_keywords.scan(content, CRISIS_CATEGORY))
+
+
+def crisis_from_hits(hits: List[KeywordHit]) -> CrisisCheckResult:
+    """由关键词引擎的命中得出危机结果：取优先级最高的关键词的首次出现"""
+    crisis_hits = [hit for hit in hits if hit.category == CRISIS_CATEGORY]
+    if not crisis_hits:
+        return CrisisCheckResult(blocked=False)
+    first = min(crisis_hits, key=lambda hit: (hit.rank, hit.start))
+    return CrisisCheckResult(
+        blocked=True,
+        reason="CRISIS",
+        resources=CRISIS_RESOURCES,
+        matched_keyword=first.text,
+    )
 
 
 def get_crisis_response() -> Dict:
@@ -5,11 +5,12 @@ Analyzes user message content to detect emotional state.
 Returns emotion type and confidence score.
 """
 
-import re
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Tuple
 
+from app.services.keyword_engine import KeywordHit, detection_keywords
+
 
 class EmotionType(str, Enum):
     """Supported emotion types"""
@@ -100,6 +101,24 @@ EMOTION_KEYWORDS: Dict[EmotionType, List[Tuple[str, float]]] = {
 # 最低置信度阈值
 MIN_CONFIDENCE_THRESHOLD = 0.3
 
+EMOTION_CATEGORY = "emotion"
+
+# 按注册顺序展开的 (情绪, 权重)，下标即 KeywordHit.rank
+_EMOTION_ENTRIES: List[Tuple[EmotionType, float]] = [
+    (emotion, weight)
+    for emotion, patterns in EMOTION_KEYWORDS.items()
+    for _, weight in patterns
+]
+
+detection_keywords.register(
+    EMOTION_CATEGORY,
+    (
+        (emotion.value, pattern, weight)
+        for emotion, patterns in EMOTION_KEYWORDS.items()
+        for pattern, weight in patterns
+    ),
+)
+
 
 def detect_emotion(text: str) -> EmotionResult:
     """
@@ -114,18 +133,29 @@ def detect_emotion(text: str) -> EmotionResult:
     if not text or not text.strip():
         return EmotionResult(emotion=EmotionType.NEUTRAL, confidence=0.5)
 
-    text_lower = text.lower()
-    emotion_scores: Dict[EmotionType, float] = {}
+    return emotion_from_hits(detection_keywords.scan(text, EMOTION_CATEGORY))
+
 
+def emotion_from_hits(hits: List[KeywordHit]) -> EmotionResult:
+    """由关键词引擎的命中计算情绪（非情绪类别的命中会被忽略）"""
+    counts = [0] * len(_EMOTION_ENTRIES)
+    for hit in hits:
+        if hit.category == EMOTION_CATEGORY:
+            counts[hit.rank] += 1
+
+    emotion_scores: Dict[EmotionType, float] = {}
+    rank = 0
     for emotion, patterns in EMOTION_KEYWORDS.items():
         total_weight = 0.0
         match_count = 0
 
-        for pattern, weight in patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            if matches:
-                match_count += len(matches)
-                total_weight += weight * len(matches)
+        # 按模式顺序累加，保证浮点结果与逐模式匹配一致
+        for _, weight in patterns:
+            count = counts[rank]
+            rank += 1
+            if count:
+                match_count += count
+                total_weight += weight * count
 
         if match_count > 0:
             # 计算该情绪的置信度（权重平均 + 匹配次数加成）
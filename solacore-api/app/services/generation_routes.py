@@ -0,0 +1,185 @@
+"""按 Solve 步骤 / Learn 步骤 / Learn 工具选择模型与生成参数
+
+路由键：solve:<step>、learn:<step>、learn_tool:<tool>、agent:<编排代理提示词>。
+每个键对应一个 GenerationProfile（provider / model / max_tokens / temperature / stop），
+未设置的字段沿用 AIService 的全局配置（llm_provider、llm_model、llm_max_tokens）。
+
+内置表只收紧各步骤的生成预算（不超过 llm_max_tokens），配置了 llm_fast_model 时
+短回复步骤改用该模型。llm_routing_table_path 指向的 JSON 文件按键覆盖内置表
+（字段级合并，例如 {"solve:options": {"model": "gpt-4o", "temperature": 0.7}}），
+文件修改后在 llm_routing_reload_seconds 内自动重新加载，格式错误时保留上一版本。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+from typing import Annotated, Any
+
+from app.config import Settings, get_settings
+from app.schemas.fields import Field
+from pydantic import ConfigDict, TypeAdapter, ValidationError, with_config
+
+logger = logging.getLogger(__name__)
+
+
+@with_config(ConfigDict(extra="forbid"))
+@dataclass(frozen=True, slots=True, kw_only=True)
+class GenerationProfile:
+    provider: str | None = None
+    model: str | None = None
+    max_tokens: Annotated[int, Field(gt=0)] | None = None
+    temperature: Annotated[float, Field(ge=0.0, le=2.0)] | None = None
+    stop: tuple[str, ...] = ()
+
+    @property
+    def overrides_model(self) -> bool:
+        return self.provider is not None or self.model is not None
+
+
+DEFAULT_PROFILE = GenerationProfile()
+_TABLE_ADAPTER = TypeAdapter(dict[str, GenerationProfile])
+
+# 内置生成预算（max_tokens）；短回复步骤在配置了 llm_fast_model 时使用快速模型
+_BUILTIN_BUDGETS: dict[str, int] = {
+    # Solve：接收 / 澄清 / 承诺为 2-4 句话，选项需要列出 2-3 个方向
+    "solve:receive": 300,
+    "solve:clarify": 400,
+    "solve:reframe": 500,
+    "solve:options": 800,
+    "solve:commit": 400,
+    "learn:start": 600,
+    "learn:explore": 1024,
+    "learn:practice": 1024,
+    "learn:plan": 1024,
+    "learn_tool:pareto": 800,
+    "learn_tool:feynman": 1024,
+    "learn_tool:chunking": 1024,
+    "learn_tool:dual_coding": 1024,
+    "learn_tool:interleaving": 1024,
+    "learn_tool:retrieval": 600,
+    "learn_tool:spaced": 600,
+    "learn_tool:grow": 800,
+    "learn_tool:socratic": 600,
+    "learn_tool:error_driven": 1024,
+    "agent:empath": 300,
+    "agent:clarify": 300,
+    "agent:visionary": 600,
+    "agent:clarify_json": 400,
+    "agent:visionary_json": 900,
+    "agent:summary": 120,
+}
+_FAST_ROUTES = frozenset(
+    {
+        "solve:receive",
+        "solve:clarify",
+        "solve:commit",
+        "learn:start",
+        "agent:empath",
+        "agent:clarify",
+        "agent:clarify_json",
+        "agent:summary",
+    }
+)
+# 摘要需要稳定输出
+_BUILTIN_TEMPERATURES: dict[str, float] = {"agent:summary": 0.2}
+
+
+def builtin_routes(settings: Settings) -> dict[str, GenerationProfile]:
+    routes: dict[str, GenerationProfile] = {}
+    for key, budget in _BUILTIN_BUDGETS.items():
+        routes[key] = GenerationProfile(
+            model=(settings.llm_fast_model or None) if key in _FAST_ROUTES else None,
+            max_tokens=min(budget, settings.llm_max_tokens),
+            temperature=_BUILTIN_TEMPERATURES.get(key),
+        )
+    return routes
+
+
+def _merge(base: GenerationProfile, override: GenerationProfile) -> GenerationProfile:
+    """override 中显式设置的字段覆盖 base"""
+    changes = {
+        item.name: getattr(override, item.name)
+        for item in fields(override)
+        if getattr(override, item.name) not in (None, ())
+    }
+    return replace(base, **changes)
+
+
+class GenerationRoutes:
+    """路由表（进程内，线程安全）；resolve 时按间隔检查配置文件是否变化"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: dict[str, GenerationProfile] | None = None
+        self._file_routes: dict[str, GenerationProfile] = {}
+        self._file_mtime: float | None = None
+        self._checked_at = 0.0
+
+    def resolve(self, key: str | None) -> GenerationProfile:
+        if not key:
+            return DEFAULT_PROFILE
+        return self._table().get(key, DEFAULT_PROFILE)
+
+    def snapshot(self) -> dict[str, GenerationProfile]:
+        return dict(self._table())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes = None
+            self._file_routes = {}
+            self._file_mtime = None
+            self._checked_at = 0.0
+
+    def _table(self) -> dict[str, GenerationProfile]:
+        settings = get_settings()
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._routes is not None
+                and now - self._checked_at < settings.llm_routing_reload_seconds
+            ):
+                return self._routes
+            self._checked_at = now
+            changed = self._reload_file(settings.llm_routing_table_path)
+            if self._routes is None or changed:
+                routes = builtin_routes(settings)
+                for key, override in self._file_routes.items():
+                    routes[key] = _merge(routes.get(key, DEFAULT_PROFILE), override)
+                self._routes = routes
+            return self._routes
+
+    def _reload_file(self, path: str) -> bool:
+        """文件有变化时重新读取，返回路由是否需要重建"""
+        if not path:
+            changed = self._file_mtime is not None
+            self._file_routes, self._file_mtime = {}, None
+            return changed
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            logger.warning("LLM routing table %s is not readable", path)
+            return False
+        if mtime == self._file_mtime:
+            return False
+        try:
+            with open(path, encoding="utf-8") as handle:
+                raw: Any = json.load(handle)
+            self._file_routes = _TABLE_ADAPTER.validate_python(raw)
+        except (OSError, ValueError, ValidationError):
+            # 保留上一版本，下次文件变化时再试
+            logger.exception("Invalid LLM routing table %s", path)
+            self._file_mtime = mtime
+            return False
+        self._file_mtime = mtime
+        logger.info(
+            "Loaded LLM routing table %s (%d routes)", path, len(self._file_routes)
+        )
+        return True
+
+
+generation_routes = GenerationRoutes()
@@ -0,0 +1,331 @@
+"""提示注入短语匹配器 - 一次规范化 + 线性时间匹配
+
+短语模式（如 "ignore [all] previous [instructions]"）允许单词内被任意 [\\W_] 打断、
+字母被 leet 变体替换（a -> 4/@，i -> 1/! ...）。直接用回溯正则匹配时，
+"!" 这类既是分隔符又是字母变体的字符连成一长串会让每个起点都回溯到串尾，
+整体退化为 O(n²)。这里改为：
+
+1. 规范化：逐字符映射（str.translate）为小字母表——关键词字母折叠为小写，
+   兼作分隔符的变体（! @ $）记为大写，其它单词字符记为 "#"，纯分隔符记为空格 /
+   下划线；再把纯分隔符串、"#" 串各压缩为一个符号，并保留到原文的偏移表；
+2. 预筛：去掉分隔符以及可由分隔型变体充当的字母后，短语必然以固定字面串出现，
+   用普通正则在 C 层判断，绝大多数正常消息到此为止；
+3. 匹配：预筛命中的短语用 Pike 虚拟机在规范化符号上执行，线程按优先级排列，
+   语义与 re 的最左优先（贪婪）匹配一致，每个符号的处理量只取决于短语长度；
+   命中区间经偏移表映射回原文后删除。
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Iterable, Optional, Union
+
+# 短语描述：单词（字符串）、SEP（至少一个 [\W_]）、元组（可选的子序列）
+SEP = "|"
+PhraseItem = Union[str, tuple]
+Phrase = tuple[PhraseItem, ...]
+
+_LETTER, _ANY_SEP, _SPLIT, _JMP, _MATCH = range(5)
+_MAX_FOLD_CACHE = 4096
+
+_WORD_RE = re.compile(r"\w")
+_SEP_RE = re.compile(r"[\W_]")
+# 压缩：连续的其它单词字符、连续的纯分隔符各记为一个符号
+_RUN_RE = re.compile(r"#+|[ _]+|[^# _]")
+
+# Pike 程序：每条指令接受的符号集合（MATCH 为 None），以及每条指令的 ε 闭包
+_Program = tuple[list[Optional[frozenset]], list[list[int]]]
+
+
+def render_phrase(
+    phrase: Iterable[PhraseItem], split_word: Callable[[str], str]
+) -> str:
+    """把短语描述渲染为等价的正则（与匹配器共用同一份描述）"""
+    parts = []
+    for item in phrase:
+        if isinstance(item, tuple):
+            parts.append(f"(?:{render_phrase(item, split_word)})?")
+        elif item == SEP:
+            parts.append(r"(?:[\W_]+)")
+        else:
+            parts.append(split_word(item))
+    return "".join(parts)
+
+
+def _compile(phrase: Phrase, sep_symbols: frozenset) -> _Program:
+    """编译为 Pike 虚拟机程序
+
+    LETTER / ANY_SEP 消耗一个符号；SPLIT（第一个分支优先，对应贪婪量词）与 JMP
+    不消耗符号，预先展开为每条指令按优先级可达的消耗型指令列表。
+    """
+    ops: list[tuple[Any, ...]] = []
+
+    def emit(items: Iterable[PhraseItem]) -> None:
+        for item in items:
+            if isinstance(item, tuple):
+                split = len(ops)
+                ops.append(())
+                emit(item)
+                ops[split] = (_SPLIT, split + 1, len(ops))
+            elif item == SEP:
+                loop = len(ops)
+                ops.append((_ANY_SEP,))
+                ops.append((_SPLIT, loop, loop + 2))
+            else:
+                for index, letter in enumerate(item):
+                    if index:
+                        star = len(ops)
+                        ops.append((_SPLIT, star + 1, star + 3))
+                        ops.append((_ANY_SEP,))
+                        ops.append((_JMP, star))
+                    # 字母本身（单词字符）或其大写（兼作分隔符的变体）
+                    ops.append((_LETTER, frozenset((letter, letter.upper()))))
+
+    emit(phrase)
+    ops.append((_MATCH,))
+
+    def closure(pc: int) -> list[int]:
+        leaves: list[int] = []
+        seen: set[int] = set()
+        stack = [pc]
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op = ops[pc]
+            if op[0] == _JMP:
+                stack.append(op[1])
+            elif op[0] == _SPLIT:
+                stack.append(op[2])
+                stack.append(op[1])
+            else:
+                leaves.append(pc)
+        return leaves
+
+    accepts: list[Optional[frozenset]] = [
+        op[1] if op[0] == _LETTER else sep_symbols if op[0] == _ANY_SEP else None
+        for op in ops
+    ]
+    return accepts, [closure(pc) for pc in range(len(ops))]
+
+
+def _literal_core(items: Iterable[PhraseItem], droppable: set[str]) -> str:
+    """预筛正则：去掉分隔符与可由分隔型变体充当的字母后必然出现的字面串"""
+    parts = []
+    for item in items:
+        if isinstance(item, tuple):
+            inner = _literal_core(item, droppable)
+            if inner:
+                parts.append(f"(?:{inner})?")
+        elif item != SEP:
+            parts.append(re.escape("".join(ch for ch in item if ch not in droppable)))
+    return "".join(parts)
+
+
+class _FoldTable(dict[int, str]):
+    """str.translate 用的折叠表：首次遇到的字符按正则语义分类并缓存"""
+
+    def __init__(self, classify: Callable[[str], str]) -> None:
+        super().__init__()
+        self._classify = classify
+
+    def __missing__(self, codepoint: int) -> str:
+        symbol = self._classify(chr(codepoint))
+        if len(self) < _MAX_FOLD_CACHE:
+            self[codepoint] = symbol
+        return symbol
+
+
+class _Canonical:
+    """规范化符号序列及其到原文的偏移表"""
+
+    __slots__ = ("symbols", "starts", "ends")
+
+    def __init__(self, folded: str) -> None:
+        runs = [(m.group()[-1], m.start(), m.end()) for m in _RUN_RE.finditer(folded)]
+        self.symbols = "".join(run[0] for run in runs)
+        self.starts = [run[1] for run in runs]
+        self.ends = [run[2] for run in runs]
+
+
+class PhraseMatcher:
+    """按顺序对一组短语做检测 / 删除，语义等同于逐个 re.search / re.sub"""
+
+    def __init__(
+        self,
+        phrases: Iterable[Phrase],
+        letter_pattern: Callable[[str], str],
+        flags: int = re.IGNORECASE,
+    ) -> None:
+        self._phrases = [tuple(phrase) for phrase in phrases]
+        letters = sorted(
+            {
+                letter
+                for phrase in self._phrases
+                for word in _words(phrase)
+                for letter in word
+            }
+        )
+        self._letter_regexes: list[tuple[str, re.Pattern[str]]] = []
+        # 可由非单词字符（同时也是分隔符）充当的字母，如 "!" -> i
+        droppable: set[str] = set()
+        for letter in letters:
+            source = letter_pattern(letter)
+            regex = re.compile(source, flags)
+            self._letter_regexes.append((letter, regex))
+            if any(regex.fullmatch(ch) and not _WORD_RE.match(ch) for ch in source):
+                droppable.add(letter)
+        self._fold = _FoldTable(self._classify)
+        # 预筛前删除：纯分隔符、分隔型变体（大写符号）以及它们可能充当的字母
+        self._strip: dict[int, None] = {ord(ch): None for ch in " _"}
+        self._strip.update({ord(letter.upper()): None for letter in letters})
+        self._strip.update({ord(letter): None for letter in droppable})
+        self._prefilters = [
+            re.compile(_literal_core(phrase, droppable)) for phrase in self._phrases
+        ]
+        sep_symbols = frozenset({" ", "_"} | {letter.upper() for letter in letters})
+        self._programs = [_compile(phrase, sep_symbols) for phrase in self._phrases]
+        self._first_symbols = [
+            (first, first.upper())
+            for first in (_first_letter(phrase) for phrase in self._phrases)
+        ]
+
+    def _classify(self, ch: str) -> str:
+        is_word = _WORD_RE.match(ch) is not None
+        for letter, regex in self._letter_regexes:
+            if regex.fullmatch(ch):
+                return letter if is_word else letter.upper()
+        if _SEP_RE.match(ch):
+            return "_" if is_word else " "
+        return "#"
+
+    def _candidates(self, text: str) -> tuple[str, list[int]]:
+        """返回折叠后的文本与通过预筛的短语下标"""
+        folded = text.translate(self._fold)
+        core = folded.translate(self._strip)
+        hits = [
+            index
+            for index, prefilter in enumerate(self._prefilters)
+            if prefilter.search(core)
+        ]
+        return folded, hits
+
+    def search(self, text: str) -> bool:
+        """任一短语在文本中出现时返回 True（等价于逐个 re.search）"""
+        folded, hits = self._candidates(text)
+        if not hits:
+            return False
+        symbols = _Canonical(folded).symbols
+        return any(self._find(index, symbols, 0) is not None for index in hits)
+
+    def remove(self, text: str) -> str:
+        """依次删除每个短语的所有匹配（等价于按顺序逐个 re.sub）"""
+        hits: list[int] = []
+        canonical: _Canonical | None = None
+        for index in range(len(self._phrases)):
+            if canonical is None:
+                # 文本被改写后重新规范化（与逐个 re.sub 作用于上一步结果一致）
+                folded, hits = self._candidates(text)
+                if not hits:
+                    return text
+                canonical = _Canonical(folded)
+            if index not in hits:
+                continue
+            spans = self._find_all(index, canonical)
+            if spans:
+                text = _cut(text, spans)
+                canonical = None
+        return text
+
+    def _find_all(self, index: int, canonical: _Canonical) -> list[tuple[int, int]]:
+        spans = []
+        position = 0
+        while (found := self._find(index, canonical.symbols, position)) is not None:
+            start, end = found
+            spans.append((canonical.starts[start], canonical.ends[end - 1]))
+            position = end
+        return spans
+
+    def _find(self, index: int, symbols: str, position: int) -> tuple[int, int] | None:
+        """Pike 虚拟机：返回 position 起最左、按优先级选出的匹配（符号下标区间）"""
+        accepts, closures = self._programs[index]
+        first_symbols = self._first_symbols[index]
+        size = len(symbols)
+        threads: list[tuple[int, int]] = []
+        seen: set[int] = set()
+        matched: tuple[int, int] | None = None
+        step = position
+        while step <= size:
+            if matched is None and not threads:
+                # 没有存活线程时直接跳到下一个可能的起点
+                step = _next_start(symbols, first_symbols, step)
+                if step >= size:
+                    break
+            symbol = symbols[step] if step < size else ""
+            # (?<!\w)：起点前一个符号不能是单词字符（小写字母、"#"、"_"）
+            if (
+                matched is None
+                and symbol in first_symbols
+                and (step == 0 or _not_word(symbols[step - 1]))
+            ):
+                for leaf in closures[0]:
+                    if leaf not in seen:
+                        seen.add(leaf)
+                        threads.append((leaf, step))
+            next_threads: list[tuple[int, int]] = []
+            next_seen: set[int] = set()
+            for pc, start in threads:
+                accept = accepts[pc]
+                if accept is None:
+                    # 命中：更低优先级的线程全部丢弃，更高优先级的继续尝试
+                    matched = (start, step)
+                    break
+                if symbol in accept:
+                    for leaf in closures[pc + 1]:
+                        if leaf not in next_seen:
+                            next_seen.add(leaf)
+                            next_threads.append((leaf, start))
+            threads, seen = next_threads, next_seen
+            if not threads and matched is not None:
+                break
+            step += 1
+        return matched
+
+
+def _next_start(symbols: str, first_symbols: tuple[str, str], step: int) -> int:
+    found = [
+        position for ch in first_symbols if (position := symbols.find(ch, step)) != -1
+    ]
+    return min(found) if found else len(symbols)
+
+
+def _not_word(symbol: str) -> bool:
+    return symbol == " " or symbol.isupper()
+
+
+def _words(phrase: Iterable[PhraseItem]) -> list[str]:
+    words = []
+    for item in phrase:
+        if isinstance(item, tuple):
+            words.extend(_words(item))
+        elif item != SEP:
+            words.append(item)
+    return words
+
+
+def _first_letter(phrase: Phrase) -> str:
+    first = phrase[0] if phrase else SEP
+    if not isinstance(first, str) or first == SEP:
+        raise ValueError("phrase must start with a word")
+    return first[0]
+
+
+def _cut(text: str, spans: list[tuple[int, int]]) -> str:
+    pieces = []
+    last = 0
+    for start, end in spans:
+        pieces.append(text[last:start])
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
@@ -0,0 +1,175 @@
+"""增量 JSON 解析 - 在模型 token 流上逐字符扫描，值一完整就产出
+
+只跟踪容器栈、字符串 / 转义状态与各层当前的键 / 下标，不构造中间结果；
+需要产出的值闭合时才对其原文切片做一次 json.loads。
+第一个 { 或 [ 之前、根值闭合之后的文本（说明文字、```json 代码围栏等）被忽略。
+已扫描且不再需要的前缀会被丢弃，缓冲大小与尚未闭合的被产出值成正比。
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+JSONPath = tuple[str | int, ...]
+
+_SCALAR_END = frozenset(",}] \t\r\n")
+
+
+@dataclass(slots=True)
+class _Frame:
+    is_object: bool
+    path: JSONPath
+    # 容器自身的起始位置（绝对偏移），不需要产出时为 -1
+    start: int = -1
+    # 子值是否逐个产出（根容器，以及根对象中的数组成员）
+    streams: bool = False
+    key: str | int | None = None
+    expect_key: bool = False
+
+
+class IncrementalJSONParser:
+    """feed() 返回本次新闭合的 (path, value)
+
+    根对象的每个成员一完整就产出，path 为 (键,)；成员是数组时改为逐个产出其元素，
+    path 为 (键, 下标)，数组本身不产出。根为数组时逐个产出元素，path 为 (下标,)。
+    例如 {"reframe": "...", "options": [{...}, {...}]} 依次产出
+    ("reframe",)、("options", 0)、("options", 1)。格式错误时抛出 ValueError。
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        # self._text[0] 对应的绝对偏移
+        self._offset = 0
+        self._stack: list[_Frame] = []
+        self._done = False
+        # 当前字符串 / 标量的状态
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._in_scalar = False
+        self._value_start = -1
+        self._value_path: JSONPath = ()
+        self._value_tracked = False
+
+    @property
+    def done(self) -> bool:
+        """根值已闭合"""
+        return self._done
+
+    def feed(self, chunk: str) -> list[tuple[JSONPath, Any]]:
+        results: list[tuple[JSONPath, Any]] = []
+        if self._done or not chunk:
+            return results
+        base = self._offset + len(self._text)
+        self._text += chunk
+        for i, char in enumerate(chunk, base):
+            if self._done:
+                break
+            self._step(i, char, results)
+        self._compact()
+        return results
+
+    def _step(self, i: int, char: str, results: list[tuple[JSONPath, Any]]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._string_is_key:
+                    self._stack[-1].key = self._load(self._value_start, i + 1)
+                elif self._value_tracked:
+                    results.append(
+                        (self._value_path, self._load(self._value_start, i + 1))
+                    )
+            return
+
+        if self._in_scalar:
+            if char not in _SCALAR_END:
+                return
+            self._in_scalar = False
+            if self._value_tracked:
+                results.append((self._value_path, self._load(self._value_start, i)))
+
+        if not self._stack:
+            if char in "{[":
+                self._stack.append(self._open(char, (), streams=True))
+            return
+
+        frame = self._stack[-1]
+        if char.isspace() or char == ":":
+            return
+        if char == ",":
+            if frame.is_object:
+                frame.expect_key = True
+            else:
+                frame.key = int(frame.key or 0) + 1
+            return
+        if char in "}]":
+            if frame.is_object != (char == "}"):
+                raise ValueError(f"Unexpected {char!r} at offset {i}")
+            self._stack.pop()
+            if not self._stack:
+                self._done = True
+            elif frame.start >= 0:
+                results.append((frame.path, self._load(frame.start, i + 1)))
+            return
+        if frame.is_object and frame.expect_key:
+            if char != '"':
+                raise ValueError(f"Expected object key at offset {i}")
+            frame.expect_key = False
+            self._in_string = True
+            self._string_is_key = True
+            self._value_start = i
+            return
+
+        # 值的起点
+        if frame.key is None:
+            raise ValueError(f"Value without key at offset {i}")
+        path = (*frame.path, frame.key)
+        if char in "{[":
+            if not frame.streams:
+                child = self._open(char, path)
+            elif char == "[" and frame.is_object and not frame.path:
+                child = self._open(char, path, streams=True)
+            else:
+                child = self._open(char, path, start=i)
+            self._stack.append(child)
+            return
+        self._value_start = i
+        self._value_path = path
+        self._value_tracked = frame.streams
+        if char == '"':
+            self._in_string = True
+            self._string_is_key = False
+        else:
+            self._in_scalar = True
+
+    @staticmethod
+    def _open(
+        char: str, path: JSONPath, start: int = -1, streams: bool = False
+    ) -> _Frame:
+        if char == "{":
+            return _Frame(True, path, start, streams, expect_key=True)
+        return _Frame(False, path, start, streams, key=0)
+
+    def _load(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self._text[start - self._offset : end - self._offset])
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON value at offset {start}") from exc
+
+    def _compact(self) -> None:
+        """丢弃不再需要的已扫描前缀"""
+        keep = self._offset + len(self._text)
+        for frame in self._stack:
+            if frame.start >= 0:
+                keep = min(keep, frame.start)
+        if self._in_string or self._in_scalar:
+            keep = min(keep, self._value_start)
+        if keep > self._offset:
+            self._text = self._text[keep - self._offset :]
+            self._offset = keep
@@ -0,0 +1,281 @@
+"""多模式关键词匹配引擎 - 危机与情绪关键词一次编译、单次扫描
+
+各检测模块在导入时按类别注册自己的关键词表（正则片段 + 权重）。引擎为每个模式
+提取必需的字面前缀（如 r"\bworr(y|ied)\b" -> "worr"），把所有前缀编译成一个
+按字典树展开的交替正则（Aho-Corasick 式的前缀自动机），单次扫描文本找出候选位置，
+只在候选位置用预编译的模式做锚定匹配：
+- scan(text, category)：只扫描单个类别（detect_emotion / detect_crisis 使用）；
+- scan(text)：一次扫描返回所有类别的命中，供一条消息只分析一次的场景使用。
+
+每个模式记录上次命中的结束位置，结果与逐个模式独立 re.findall 完全一致
+（包括不同模式之间的重叠命中）。没有字面前缀的模式退化为单独 finditer。
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Iterable
+
+_META = set(".^$*+?{}[]\\|()")
+_OPTIONAL_QUANTIFIERS = set("?*{")
+
+
+@dataclass(frozen=True, slots=True)
+class KeywordHit:
+    """一次关键词命中
+
+    rank 为该模式在所属类别中的注册顺序，用于保持原有的优先级语义。
+    """
+
+    category: str
+    label: str
+    weight: float
+    rank: int
+    text: str
+    start: int
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    category: str
+    label: str
+    weight: float
+    rank: int
+    pattern: re.Pattern[str]
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        ch = pattern[index]
+        if ch == "\\":
+            index += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+        index += 1
+    return False
+
+
+def literal_prefix(pattern: str) -> str:
+    """返回模式所有匹配都必须以之开头的字面前缀（无法确定时返回空串）"""
+    if _has_top_level_alternation(pattern):
+        return ""
+    index = 2 if pattern.startswith(r"\b") else 0
+    chars: list[str] = []
+    while index < len(pattern):
+        ch = pattern[index]
+        if ch == "\\":
+            escaped = pattern[index + 1 : index + 2]
+            # \b \s \w 等是断言或字符类，不是字面量
+            if not escaped or escaped.isalnum():
+                break
+            literal, index = escaped, index + 2
+        elif ch in _META:
+            break
+        else:
+            literal, index = ch, index + 1
+        if index < len(pattern) and pattern[index] in _OPTIONAL_QUANTIFIERS:
+            break
+        chars.append(literal)
+    return "".join(chars).lower()
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """把字面量集合展开成字典树形式的正则，首字符不同的分支可被快速跳过"""
+    trie: dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict[str, dict]) -> str:
+        branches = [
+            re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # 该节点本身也是完整前缀时，后续分支可选（贪婪取最长前缀）
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class _CompiledSet:
+    """一组模式的前缀自动机与候选表"""
+
+    def __init__(self, entries: list[_Entry], flags: int) -> None:
+        self.entries = entries
+        by_prefix: dict[str, list[int]] = {}
+        plain: set[str] = set()
+        self.unprefixed: list[int] = []
+        for index, entry in enumerate(entries):
+            prefix = literal_prefix(entry.pattern.pattern)
+            if not prefix:
+                self.unprefixed.append(index)
+                continue
+            by_prefix.setdefault(prefix, []).append(index)
+            if not entry.pattern.pattern.startswith(r"\b"):
+                plain.add(prefix)
+        # 以 \b 开头的前缀在自动机中同样要求词边界，可跳过词中间的位置；
+        # 若某个无边界前缀以它开头则不加边界，保证最长匹配覆盖所有候选
+        bounded = {
+            prefix
+            for prefix in by_prefix
+            if prefix not in plain and not any(q.startswith(prefix) for q in plain)
+        }
+        # 自动机匹配到最长前缀 P 时，所有是 P 的前缀的模式都是候选
+        self.candidates: dict[str, tuple[int, ...]] = {
+            prefix: tuple(
+                sorted(
+                    index
+                    for other, indexes in by_prefix.items()
+                    if prefix.startswith(other)
+                    for index in indexes
+                )
+            )
+            for prefix in by_prefix
+        }
+        branches = []
+        if bounded:
+            branches.append(rf"\b(?:{_trie_pattern(bounded)})")
+        if len(bounded) < len(by_prefix):
+            branches.append(_trie_pattern(set(by_prefix) - bounded))
+        self.trigger = re.compile("|".join(branches), flags) if branches else None
+        self._flags = flags
+        # 所有字面前缀的前缀集合，供流式场景判断文本末尾是否可能还在拼出关键词
+        self.partials = {
+            prefix[:length]
+            for prefix in by_prefix
+            for length in range(1, len(prefix) + 1)
+        }
+        self.longest_prefix = max(map(len, by_prefix), default=0)
+
+    def _folded_candidates(self, matched: str) -> tuple[int, ...]:
+        """忽略大小写匹配到的非规范写法（如 "ſ" 匹配 "s"），按大小写折叠查找候选"""
+        for prefix, indexes in self.candidates.items():
+            if len(prefix) == len(matched) and re.fullmatch(
+                re.escape(prefix), matched, self._flags
+            ):
+                self.candidates[matched] = indexes
+                return indexes
+        return ()
+
+    def partial_start(self, text: str) -> int | None:
+        start = max(len(text) - self.longest_prefix, 0)
+        for index in range(start, len(text)):
+            if text[index:].lower() in self.partials:
+                return index
+        return None
+
+    def scan(self, text: str) -> list[KeywordHit]:
+        entries = self.entries
+        found: list[tuple[int, int, re.Match[str]]] = []
+        if self.trigger is not None:
+            candidates = self.candidates
+            next_allowed = [0] * len(entries)
+            search = self.trigger.search
+            position = 0
+            while (trigger := search(text, position)) is not None:
+                start = trigger.start()
+                matched = trigger.group()
+                indexes = candidates.get(matched)
+                if indexes is None:
+                    indexes = self._folded_candidates(matched)
+                for index in indexes:
+                    if start < next_allowed[index]:
+                        continue
+                    match = entries[index].pattern.match(text, start)
+                    if match is not None:
+                        found.append((start, index, match))
+                        next_allowed[index] = max(match.end(), start + 1)
+                position = start + 1
+        for index in self.unprefixed:
+            for match in entries[index].pattern.finditer(text):
+                found.append((match.start(), index, match))
+        if self.unprefixed:
+            found.sort(key=lambda item: (item[0], item[1]))
+        return [
+            KeywordHit(
+                entries[index].category,
+                entries[index].label,
+                entries[index].weight,
+                entries[index].rank,
+                match.group(),
+                start,
+            )
+            for start, index, match in found
+        ]
+
+
+class KeywordEngine:
+    """按类别注册关键词，编译为前缀自动机 + 预编译模式"""
+
+    def __init__(self, flags: int = re.IGNORECASE) -> None:
+        self._flags = flags
+        self._lock = threading.Lock()
+        self._sources: dict[str, list[tuple[str, str, float]]] = {}
+        self._by_category: dict[str, _CompiledSet] = {}
+        self._combined: _CompiledSet | None = None
+
+    def register(
+        self, category: str, patterns: Iterable[tuple[str, str, float]]
+    ) -> None:
+        """注册（或替换）一个类别的 (label, regex, weight) 列表并重新编译"""
+        with self._lock:
+            self._sources[category] = list(patterns)
+            self._compile()
+
+    def _compile(self) -> None:
+        by_category: dict[str, _CompiledSet] = {}
+        combined: list[_Entry] = []
+        for category, patterns in self._sources.items():
+            entries = [
+                _Entry(category, label, weight, rank, re.compile(pattern, self._flags))
+                for rank, (label, pattern, weight) in enumerate(patterns)
+            ]
+            by_category[category] = _CompiledSet(entries, self._flags)
+            combined.extend(entries)
+        self._by_category = by_category
+        self._combined = _CompiledSet(combined, self._flags)
+
+    @property
+    def categories(self) -> tuple[str, ...]:
+        return tuple(self._sources)
+
+    def scan(self, text: str, category: str | None = None) -> list[KeywordHit]:
+        """扫描文本（先转小写）并返回按出现位置排列的全部命中"""
+        if not text:
+            return []
+        compiled = (
+            self._combined if category is None else self._by_category.get(category)
+        )
+        if compiled is None:
+            return []
+        return compiled.scan(text.lower())
+
+    def partial_start(self, text: str, category: str | None = None) -> int | None:
+        """文本末尾仍可能拼成关键词（按字面前缀判断）的最早位置，没有时返回 None"""
+        compiled = (
+            self._combined if category is None else self._by_category.get(category)
+        )
+        if compiled is None or not text:
+            return None
+        return compiled.partial_start(text)
+
+
+detection_keywords = KeywordEngine()
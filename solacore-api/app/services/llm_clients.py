@@ -0,0 +1,135 @@
+"""LLM 提供商 HTTP 客户端池 - 按提供商复用长连接"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TIMEOUT_SECONDS = 3.0
+
+# 本地替身服务不校验 Key，发送一个固定值以保持请求头格式一致
+FAKE_API_KEY = "fake-llm-key"
+
+
+def provider_base_url(provider: str, settings: Settings) -> str:
+    """返回提供商 API 根地址（可通过 *_base_url 配置覆盖）"""
+    if provider == "openai":
+        return settings.openai_base_url.rstrip("/")
+    if provider == "anthropic":
+        return settings.anthropic_base_url.rstrip("/")
+    if provider == "openrouter":
+        return settings.openrouter_base_url.rstrip("/")
+    if provider == "fake":
+        base_url = settings.fake_llm_base_url.rstrip("/")
+        return f"{base_url}/{settings.fake_llm_format}/v1"
+    raise ValueError(f"Unsupported LLM provider: {provider}")
+
+
+def provider_configured(provider: str, settings: Settings) -> bool:
+    """提供商是否可用（配置了 API Key；fake 仅在被选为主提供商时启用）"""
+    if provider == "openai":
+        return bool(settings.openai_api_key)
+    if provider == "anthropic":
+        return bool(settings.anthropic_api_key)
+    if provider == "openrouter":
+        return bool(settings.openrouter_api_key)
+    if provider == "fake":
+        return settings.llm_provider == "fake"
+    return False
+
+
+class LLMClientRegistry:
+    """每个提供商一个共享 httpx.AsyncClient，避免每轮对话重新握手"""
+
+    PROVIDERS = ("openai", "anthropic", "openrouter", "fake")
+
+    def __init__(self) -> None:
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _http2_enabled(self, settings: Settings) -> bool:
+        if not settings.llm_http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("LLM_HTTP2 enabled but h2 is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    def _build_client(self, settings: Settings) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.llm_timeout),
+            limits=limits,
+            http2=self._http2_enabled(settings),
+        )
+
+    async def _reset_if_loop_changed(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        stale = list(self._clients.values())
+        self._clients = {}
+        self._loop = loop
+        for client in stale:
+            try:
+                await client.aclose()
+            except (httpx.HTTPError, RuntimeError):
+                logger.debug("LLM client close failed", exc_info=True)
+
+    async def get(self, provider: str) -> httpx.AsyncClient:
+        """获取提供商共享客户端，不存在时按需创建"""
+        await self._reset_if_loop_changed()
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._build_client(get_settings())
+            self._clients[provider] = client
+        return client
+
+    async def start(self, settings: Settings | None = None) -> None:
+        """为已配置的提供商创建客户端，并按需预热连接"""
+        active_settings = settings or get_settings()
+        providers = [
+            provider
+            for provider in self.PROVIDERS
+            if provider_configured(provider, active_settings)
+        ]
+        for provider in providers:
+            await self.get(provider)
+        if active_settings.llm_warmup_on_startup and providers:
+            await asyncio.gather(
+                *(self._warm(provider, active_settings) for provider in providers)
+            )
+
+    async def _warm(self, provider: str, settings: Settings) -> None:
+        client = await self.get(provider)
+        try:
+            await client.head(
+                provider_base_url(provider, settings),
+                timeout=WARMUP_TIMEOUT_SECONDS,
+            )
+        except httpx.HTTPError:
+            logger.info("LLM connection warmup failed for %s", provider)
+
+    async def close(self) -> None:
+        """关闭所有客户端（应用关闭时调用）"""
+        clients = list(self._clients.values())
+        self._clients = {}
+        self._loop = None
+        for client in clients:
+            try:
+                await client.aclose()
+            except (httpx.HTTPError, RuntimeError):
+                logger.debug("LLM client close failed", exc_info=True)
+
+
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,227 @@
+"""LLM 提供商熔断与自适应并发限制（按 provider + model）"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import httpx
+from app.config import Settings
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Prometheus 数值编码
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class LLMUnavailableError(Exception):
+    """熔断器打开或并发已满时快速失败，不向提供商发请求"""
+
+    def __init__(self, provider: str, model: str, reason: str) -> None:
+        super().__init__(f"LLM provider {provider}/{model} unavailable: {reason}")
+        self.provider = provider
+        self.model = model
+        self.reason = reason
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """提供商侧故障（超时、网络错误、429、5xx）计入熔断；其他 4xx 不计入"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TimeoutException, httpx.RequestError))
+
+
+class CircuitBreaker:
+    """三态熔断器
+
+    - closed：正常放行，连续失败达到 failure_threshold 次后打开；
+    - open：直接拒绝，recovery_seconds 后进入 half_open；
+    - half_open：只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        recovery_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == STATE_OPEN
+            and self._clock() - self._opened_at >= self.recovery_seconds
+        ):
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = STATE_OPEN
+            self._opened_at = self._clock()
+        self._probe_in_flight = False
+
+    def record_ignored(self) -> None:
+        """请求被取消（客户端断开、对冲失败方）时归还探测名额，不影响状态"""
+        self._probe_in_flight = False
+
+
+class AIMDLimiter:
+    """加性增、乘性减的并发上限
+
+    每次成功 limit += 1 / limit（约每轮满并发 +1），提供商故障时 limit *= backoff。
+    in_flight 达到 limit 时拒绝新请求，避免降级的提供商堆积大量挂起请求。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        backoff: float,
+    ) -> None:
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.backoff = min(max(backoff, 0.1), 0.99)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.in_flight = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, outcome: str | None) -> None:
+        """outcome: "success" 加性增，"failure" 乘性减，None 仅释放"""
+        self.in_flight = max(self.in_flight - 1, 0)
+        if outcome == "success":
+            self._limit = min(self._limit + 1 / self._limit, float(self.max_limit))
+        elif outcome == "failure":
+            self._limit = max(self._limit * self.backoff, float(self.min_limit))
+
+
+@dataclass
+class ProviderGuard:
+    """单个 provider + model 的熔断器与并发限制器"""
+
+    provider: str
+    model: str
+    breaker: CircuitBreaker
+    limiter: AIMDLimiter
+    rejected: int = 0
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """占用一个并发名额；熔断打开或并发已满时抛出 LLMUnavailableError"""
+        with self._lock:
+            if not self.limiter.try_acquire():
+                self.rejected += 1
+                raise LLMUnavailableError(self.provider, self.model, "overloaded")
+            if not self.breaker.allow():
+                self.limiter.release(None)
+                self.rejected += 1
+                raise LLMUnavailableError(self.provider, self.model, "circuit_open")
+
+    def release(self, error: BaseException | None = None) -> None:
+        """释放名额并按结果更新熔断器与并发上限
+
+        error 为 None 表示成功；非提供商故障的异常（取消、4xx、配置错误）只释放。
+        """
+        with self._lock:
+            if error is None:
+                self.breaker.record_success()
+                self.limiter.release("success")
+            elif is_provider_failure(error):
+                self.breaker.record_failure()
+                self.limiter.release("failure")
+            else:
+                self.breaker.record_ignored()
+                self.limiter.release(None)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            state = self.breaker.state
+            return {
+                "state": state,
+                "state_value": STATE_VALUES[state],
+                "limit": self.limiter.limit,
+                "in_flight": self.limiter.in_flight,
+                "rejected": self.rejected,
+            }
+
+
+class LLMResilienceRegistry:
+    """按 (provider, model) 懒创建 ProviderGuard"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._guards: dict[tuple[str, str], ProviderGuard] = {}
+
+    def guard(self, provider: str, model: str, settings: Settings) -> ProviderGuard:
+        key = (provider, model)
+        with self._lock:
+            guard = self._guards.get(key)
+            if guard is None:
+                guard = ProviderGuard(
+                    provider=provider,
+                    model=model,
+                    breaker=CircuitBreaker(
+                        settings.llm_breaker_failure_threshold,
+                        settings.llm_breaker_recovery_seconds,
+                    ),
+                    limiter=AIMDLimiter(
+                        settings.llm_concurrency_initial,
+                        settings.llm_concurrency_min,
+                        settings.llm_concurrency_max,
+                        settings.llm_concurrency_backoff,
+                    ),
+                )
+                self._guards[key] = guard
+            return guard
+
+    def snapshot(self) -> dict[tuple[str, str], dict[str, Any]]:
+        with self._lock:
+            guards = list(self._guards.items())
+        return {key: guard.snapshot() for key, guard in guards}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._guards.clear()
+
+
+llm_resilience = LLMResilienceRegistry()
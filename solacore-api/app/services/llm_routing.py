@@ -0,0 +1,95 @@
+"""LLM 多提供商路由 - 提供商链解析与首字延迟（TTFT）统计"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import defaultdict, deque
+
+from app.config import Settings
+from app.services.llm_clients import provider_configured
+
+TTFT_WINDOW = 200
+TTFT_MIN_SAMPLES = 20
+
+
+def _parse_provider_models(raw: str) -> dict[str, str]:
+    """解析 "anthropic=claude-3-5-haiku-latest,openrouter=openai/gpt-4o-mini" """
+    models: dict[str, str] = {}
+    for item in raw.split(","):
+        provider, sep, model = item.partition("=")
+        if sep and provider.strip() and model.strip():
+            models[provider.strip().lower()] = model.strip()
+    return models
+
+
+def provider_chain(
+    settings: Settings, provider: str | None = None, model: str | None = None
+) -> list[tuple[str, str]]:
+    """返回按优先级排列的 (provider, model) 列表
+
+    主提供商默认为 llm_provider + llm_model（provider / model 可按路由覆盖）；
+    llm_fallback_providers 中未配置 API Key 的提供商会被跳过。
+    """
+    default = (settings.llm_provider or "openai").lower()
+    primary = (provider or default).lower()
+    models = _parse_provider_models(settings.llm_fallback_models)
+    if model is None:
+        model = (
+            settings.llm_model
+            if primary == default
+            else models.get(primary, settings.llm_model)
+        )
+    chain = [(primary, model)]
+    seen = {primary}
+    if primary != default:
+        # 路由指定了其他提供商时，全局提供商作为第一个备用
+        chain.append((default, settings.llm_model))
+        seen.add(default)
+    for item in settings.llm_fallback_providers.split(","):
+        fallback = item.strip().lower()
+        if not fallback or fallback in seen:
+            continue
+        seen.add(fallback)
+        if not provider_configured(fallback, settings):
+            continue
+        chain.append((fallback, models.get(fallback, settings.llm_model)))
+    return chain
+
+
+class TTFTTracker:
+    """按提供商记录最近的首字延迟，用于计算对冲触发阈值"""
+
+    def __init__(self, window: int = TTFT_WINDOW) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[provider].append(max(seconds, 0.0))
+
+    def percentile(self, provider: str, percentile: float) -> float | None:
+        """返回指定分位的 TTFT（秒），样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < TTFT_MIN_SAMPLES:
+            return None
+        rank = min(max(percentile, 0.0), 1.0) * (len(samples) - 1)
+        return samples[math.ceil(rank)]
+
+    def hedge_delay(self, provider: str, settings: Settings) -> float:
+        """主请求超过该时长仍未产出 token 时发起对冲请求"""
+        floor = settings.llm_hedge_min_delay_ms / 1000
+        observed = self.percentile(provider, settings.llm_hedge_percentile)
+        if observed is None:
+            return max(settings.llm_hedge_initial_delay_ms / 1000, floor)
+        return max(observed, floor)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+ttft_tracker = TTFTTracker()
@@ -5,12 +5,20 @@ from typing import Any, cast
 from uuid import UUID
 
 from app.models.solve_profile import SolveProfile
-from app.schemas.orchestration import ProblemProfile
+from app.schemas.orchestration import (
+    PROFILE_LIST_LIMITS,
+    ProblemProfile,
+    profile_from_json,
+    profile_to_json,
+)
 from app.utils.datetime_utils import utc_now
 from pydantic import ValidationError
-from sqlalchemy import select
+from sqlalchemy import inspect, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.state import InstanceState
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +41,7 @@ class MemoryBankService:
         entity = SolveProfile(
             session_id=session_id,
             schema_version=profile.meta.schema_version.value,
-            profile=profile.model_dump(mode="json"),
+            profile=profile_to_json(profile),
         )
 
         async with self._db.begin_nested():
@@ -61,7 +69,7 @@ class MemoryBankService:
         """加载 profile，遇到 schema 校验失败时降级处理"""
         data = cast(dict[str, Any], getattr(entity, "profile"))
         try:
-            return ProblemProfile.model_validate(data)
+            profile = profile_from_json(data)
         except ValidationError as e:
             logger.warning(
                 "Profile schema validation failed for session %s (schema_version=%s), "
@@ -71,13 +79,70 @@ class MemoryBankService:
                 str(e),
             )
             # 降级：返回默认 profile（保留 session_id 和 user_id）
-            session_id = data.get("session_id", entity.session_id)
-            user_id = data.get("user_id")
-            return ProblemProfile(session_id=session_id, user_id=user_id)
+            return ProblemProfile(
+                session_id=_as_uuid(data.get("session_id"))
+                or cast(UUID, entity.session_id),
+                user_id=_as_uuid(data.get("user_id")),
+            )
+        trim_profile(profile)
+        return profile
 
     async def save_profile(self, entity: SolveProfile, profile: ProblemProfile) -> None:
-        setattr(entity, "profile", profile.model_dump(mode="json"))
-        setattr(entity, "schema_version", profile.meta.schema_version.value)
-        setattr(entity, "updated_at", utc_now())
-        self._db.add(entity)
-        await self._db.flush()
+        """保存 profile：只把有变化的顶层字段合并进 JSONB（profile || changes）"""
+        trim_profile(profile)
+        data = profile_to_json(profile)
+        schema_version = profile.meta.schema_version.value
+        now = utc_now()
+        stored = cast(dict[str, Any] | None, getattr(entity, "profile"))
+
+        state: InstanceState[SolveProfile] = inspect(entity)
+        if (
+            not state.persistent
+            or state.modified
+            or not stored
+            or not stored.keys() <= data.keys()
+        ):
+            # 新建 / 已有未刷新的修改 / 存量数据含多余字段：整体写入
+            setattr(entity, "profile", data)
+            setattr(entity, "schema_version", schema_version)
+            setattr(entity, "updated_at", now)
+            self._db.add(entity)
+            await self._db.flush()
+            return
+
+        changes = {
+            key: value for key, value in data.items() if stored.get(key) != value
+        }
+        if not changes and getattr(entity, "schema_version") == schema_version:
+            return
+        await self._db.execute(
+            update(SolveProfile)
+            .where(SolveProfile.id == entity.id)
+            .values(
+                profile=SolveProfile.profile.op("||")(literal(changes, JSONB)),
+                schema_version=schema_version,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        # 同步内存中的实体，但不标记为脏（避免 flush 时再整体写一遍）
+        set_committed_value(entity, "profile", data)
+        set_committed_value(entity, "schema_version", schema_version)
+        set_committed_value(entity, "updated_at", now)
+
+
+def _as_uuid(value: Any) -> UUID | None:
+    if value is None or isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def trim_profile(profile: ProblemProfile) -> None:
+    """按 PROFILE_LIST_LIMITS 截断列表字段，只保留最近的条目"""
+    for field, limit in PROFILE_LIST_LIMITS.items():
+        items = getattr(profile, field)
+        if len(items) > limit:
+            del items[:-limit]
@@ -0,0 +1,57 @@
+"""单条用户消息的一次性分析结果 - Solve 流水线各环节共享
+
+一条入站消息只做一次 NFKC 归一化、一次关键词扫描（危机 + 情绪）、一次注入检测、
+一次清洗与 PII 检测；路由、审计代理、共情代理都读取同一个 MessageAnalysis，
+不再各自重复扫描内容。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.services.content_filter import (
+    contains_email,
+    contains_phone,
+    has_prompt_injection,
+    normalize_content,
+    sanitize_normalized,
+    strip_pii,
+)
+from app.services.crisis_detector import CrisisCheckResult, crisis_from_hits
+from app.services.emotion_detector import EmotionResult, emotion_from_hits
+from app.services.keyword_engine import detection_keywords
+
+
+@dataclass(frozen=True, slots=True)
+class MessageAnalysis:
+    """消息分析上下文
+
+    raw 为用户原文（用于保存消息），normalized 为 NFKC 归一化文本，
+    sanitized 为去除注入模式与 PII 后发给模型 / 代理的文本。
+    """
+
+    raw: str
+    normalized: str
+    sanitized: str
+    has_email: bool
+    has_phone: bool
+    crisis: CrisisCheckResult
+    emotion: EmotionResult
+    prompt_injection: bool
+
+
+def analyze_message(content: str) -> MessageAnalysis:
+    """对入站消息做一次完整分析（危机 / 情绪共用一次关键词扫描）"""
+    normalized = normalize_content(content)
+    hits = detection_keywords.scan(content)
+    injection = has_prompt_injection(normalized)
+    return MessageAnalysis(
+        raw=content,
+        normalized=normalized,
+        sanitized=strip_pii(sanitize_normalized(normalized, injection)),
+        has_email=contains_email(content),
+        has_phone=contains_phone(content),
+        crisis=crisis_from_hits(hits),
+        emotion=emotion_from_hits(hits),
+        prompt_injection=injection,
+    )
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import re
+from dataclasses import replace
 from datetime import datetime
 
 from app.config import PromptInjectionPolicy
 from app.schemas.orchestration import (
+    PROFILE_LIST_LIMITS,
     AgentName,
     AgentRun,
     AuditFlag,
@@ -20,29 +22,133 @@ from app.schemas.orchestration import (
     QuestionPlan,
     VisionaryOutput,
 )
-from app.services.content_filter import (
-    looks_like_prompt_injection,
-    sanitize_user_input,
-    strip_pii,
+from app.services.message_analysis import MessageAnalysis
+
+# 以下为不可变模板：每轮直接复用同一批实例，不再重复构造
+
+_INFO_GAPS = (
+    InfoGap(
+        key="user_goal",
+        missing=True,
+        importance=0.9,
+        urgency=0.6,
+        answerability=0.8,
+        estimated_cost=0.2,
+    ),
+    InfoGap(
+        key="success_criteria",
+        missing=True,
+        importance=0.8,
+        urgency=0.6,
+        answerability=0.7,
+        estimated_cost=0.2,
+    ),
+    InfoGap(
+        key="constraints",
+        missing=True,
+        importance=0.6,
+        urgency=0.5,
+        answerability=0.8,
+        estimated_cost=0.2,
+    ),
+    InfoGap(
+        key="attempts",
+        missing=True,
+        importance=0.5,
+        urgency=0.4,
+        answerability=0.8,
+        estimated_cost=0.2,
+    ),
+)
+
+_HYPOTHESIS_GOAL = Hypothesis(
+    id="H1",
+    statement="目标/成功标准还不够清晰，导致行动难以落地",
+    type=HypothesisType.GOAL_MISMATCH,
+    confidence=0.34,
+    tests_needed=("user_goal", "success_criteria"),
+)
+_HYPOTHESIS_CONSTRAINT = Hypothesis(
+    id="H2",
+    statement="存在硬约束（时间/权限/资源）主导了局面",
+    type=HypothesisType.CONSTRAINT,
+    confidence=0.33,
+    tests_needed=("constraints",),
+)
+_HYPOTHESIS_EMOTION = Hypothesis(
+    id="H3",
+    statement="情绪负荷过高影响了专注与决策",
+    type=HypothesisType.EMOTIONAL_BLOCK,
+    confidence=0.33,
+    tests_needed=("emotion",),
+)
+# 出现时间压力 / 负面情绪时对应假设的置信度上调 0.15（上限 0.6）
+_HYPOTHESIS_CONSTRAINT_RAISED = replace(
+    _HYPOTHESIS_CONSTRAINT,
+    confidence=min(0.6, _HYPOTHESIS_CONSTRAINT.confidence + 0.15),
+)
+_HYPOTHESIS_EMOTION_RAISED = replace(
+    _HYPOTHESIS_EMOTION, confidence=min(0.6, _HYPOTHESIS_EMOTION.confidence + 0.15)
+)
+_DEADLINE_WORDS = ("deadline", "交付", "下周", "明天", "月底")
+
+_QUESTION_MIN_ACTION = QuestionPlan(
+    prompt="如果只能选一个‘今天 10 分钟内能做的最小动作’，你愿意先做哪个？",
+    rationale="在信息不完整时先推动一个最小可执行动作",
+)
+_QUESTION_GOAL = QuestionPlan(
+    prompt="你希望这件事最终变成什么样才算‘解决了’？如果有 1-2 个可量化的标准，也可以顺便说一下",
+    rationale="先对齐成功标准，避免解决错问题",
+    expected_fields=("user_goal", "success_criteria"),
+)
+_QUESTION_CONSTRAINTS = QuestionPlan(
+    prompt="这件事现在最大的硬约束是什么？比如时间点、资源、权限、必须交付的范围（选 1-2 个最关键的）",
+    rationale="把约束说清楚，才能评估可行路径",
+    expected_fields=("constraints",),
+)
+_QUESTION_ATTEMPTS = QuestionPlan(
+    prompt="你已经尝试过哪些办法？分别带来了什么结果（哪怕很小也行）",
+    rationale="避免重复无效尝试，并找到可复用的有效点",
+    expected_fields=("attempts",),
+)
+
+_OPTIONS = (
+    OptionItem(
+        title="先把问题切成可控部分",
+        description="列出你能控制的 3 件事和你无法控制的 3 件事，然后只对前者做动作。",
+        pros=("立刻降低混乱感", "可快速启动"),
+        cons=("需要接受部分不可控",),
+    ),
+    OptionItem(
+        title="用最小实验验证一个关键假设",
+        description="选一个最可能的原因，用一个 15 分钟内能完成的小实验来验证它。",
+        pros=("信息增益高", "避免无效努力"),
+        cons=("需要明确一个假设",),
+    ),
+    OptionItem(
+        title="把目标改写成可衡量的 7 天版本",
+        description="把目标拆成 7 天内可观察的指标，并设定每天 1 个最小动作。",
+        pros=("更容易坚持", "更容易复盘"),
+        cons=("需要一点规划时间",),
+    ),
+)
+_OPTIONS_SUMMARY = "\n".join(
+    [
+        "1) 先把问题切成可控部分：列出可控/不可控，各做 1 个动作",
+        "2) 用最小实验验证一个关键假设：15 分钟内完成",
+        "3) 把目标改写成 7 天可衡量版本：每天 1 个最小动作",
+    ]
 )
-from app.services.crisis_detector import detect_crisis
-from app.services.emotion_detector import detect_emotion
 
 
 def run_auditor(
-    user_input: str,
+    analysis: MessageAnalysis,
     prompt_injection_policy: PromptInjectionPolicy = PromptInjectionPolicy.WARN,
-    sanitized_input: str | None = None,
 ) -> AuditorOutput:
-    crisis = detect_crisis(user_input)
-    sanitized = (
-        sanitized_input
-        if sanitized_input is not None
-        else strip_pii(sanitize_user_input(user_input))
-    )
+    sanitized = analysis.sanitized
     flags: list[AuditFlag] = []
 
-    if crisis.blocked:
+    if analysis.crisis.blocked:
         flags.append(AuditFlag.CRISIS)
         return AuditorOutput(
             allowed=False,
@@ -51,7 +157,7 @@ def run_auditor(
             reason="CRISIS",
         )
 
-    if looks_like_prompt_injection(user_input):
+    if analysis.prompt_injection:
         flags.append(AuditFlag.PROMPT_INJECTION)
         if prompt_injection_policy == PromptInjectionPolicy.BLOCK:
             return AuditorOutput(
@@ -61,23 +167,23 @@ def run_auditor(
                 reason="PROMPT_INJECTION",
             )
 
-    if _looks_like_email(user_input):
+    if analysis.has_email:
         flags.append(AuditFlag.PII_EMAIL)
-    if _looks_like_phone(user_input):
+    if analysis.has_phone:
         flags.append(AuditFlag.PII_PHONE)
 
     return AuditorOutput(allowed=True, sanitized_user_input=sanitized, flags=flags)
 
 
-def run_empath(user_input: str) -> EmpathOutput:
-    emotion = detect_emotion(user_input)
+def run_empath(analysis: MessageAnalysis) -> EmpathOutput:
+    emotion = analysis.emotion
     snapshot = EmotionSnapshot(
         label=emotion.emotion.value,
         confidence=emotion.confidence,
         intensity_1_5=_coarse_intensity(emotion.confidence),
     )
 
-    core = _summarize_core_concern(user_input)
+    core = _summarize_core_concern(analysis.sanitized)
     message = _empath_message(core, snapshot.label)
 
     return EmpathOutput(
@@ -111,39 +217,13 @@ def run_visionary(profile: ProblemProfile, now_step: str) -> VisionaryOutput:
     if now_step == "reframe":
         reframed = f"如何在不牺牲{_first_constraint(profile)}的前提下，逐步实现：{goal}（围绕：{core}）？"
 
-    options: list[OptionItem] = []
-    if now_step in {"reframe", "options"}:
-        options = [
-            OptionItem(
-                title="先把问题切成可控部分",
-                description="列出你能控制的 3 件事和你无法控制的 3 件事，然后只对前者做动作。",
-                pros=["立刻降低混乱感", "可快速启动"],
-                cons=["需要接受部分不可控"],
-            ),
-            OptionItem(
-                title="用最小实验验证一个关键假设",
-                description="选一个最可能的原因，用一个 15 分钟内能完成的小实验来验证它。",
-                pros=["信息增益高", "避免无效努力"],
-                cons=["需要明确一个假设"],
-            ),
-            OptionItem(
-                title="把目标改写成可衡量的 7 天版本",
-                description="把目标拆成 7 天内可观察的指标，并设定每天 1 个最小动作。",
-                pros=["更容易坚持", "更容易复盘"],
-                cons=["需要一点规划时间"],
-            ),
-        ]
-
-    response = "\n".join(
-        [
-            f"我试着把你的问题重新写成一个更可解的版本：{reframed}"
-            if reframed
-            else "我给你几个可能的方向：",
-            "1) 先把问题切成可控部分：列出可控/不可控，各做 1 个动作",
-            "2) 用最小实验验证一个关键假设：15 分钟内完成",
-            "3) 把目标改写成 7 天可衡量版本：每天 1 个最小动作",
-        ]
+    options = list(_OPTIONS) if now_step in {"reframe", "options"} else []
+    intro = (
+        f"我试着把你的问题重新写成一个更可解的版本：{reframed}"
+        if reframed
+        else "我给你几个可能的方向："
     )
+    response = f"{intro}\n{_OPTIONS_SUMMARY}"
 
     return VisionaryOutput(
         reframed_problem=reframed,
@@ -153,103 +233,34 @@ def run_visionary(profile: ProblemProfile, now_step: str) -> VisionaryOutput:
 
 
 def append_run(
-    profile: ProblemProfile, agent: AgentName, started_at: datetime, latency_ms: int
+    profile: ProblemProfile,
+    agent: AgentName,
+    started_at: datetime,
+    latency_ms: int,
+    notes: str | None = None,
 ) -> None:
     profile.agent_runs.append(
-        AgentRun(agent=agent, started_at=started_at, latency_ms=latency_ms)
+        AgentRun(agent=agent, started_at=started_at, latency_ms=latency_ms, notes=notes)
     )
+    del profile.agent_runs[: -PROFILE_LIST_LIMITS["agent_runs"]]
 
 
 def _compute_info_gaps(profile: ProblemProfile) -> list[InfoGap]:
-    gaps: list[InfoGap] = []
-
-    if not profile.user_goal:
-        gaps.append(
-            InfoGap(
-                key="user_goal",
-                missing=True,
-                importance=0.9,
-                urgency=0.6,
-                answerability=0.8,
-                estimated_cost=0.2,
-            )
-        )
-
-    if not profile.success_criteria:
-        gaps.append(
-            InfoGap(
-                key="success_criteria",
-                missing=True,
-                importance=0.8,
-                urgency=0.6,
-                answerability=0.7,
-                estimated_cost=0.2,
-            )
-        )
-
-    if not profile.constraints:
-        gaps.append(
-            InfoGap(
-                key="constraints",
-                missing=True,
-                importance=0.6,
-                urgency=0.5,
-                answerability=0.8,
-                estimated_cost=0.2,
-            )
-        )
-
-    if not profile.attempts:
-        gaps.append(
-            InfoGap(
-                key="attempts",
-                missing=True,
-                importance=0.5,
-                urgency=0.4,
-                answerability=0.8,
-                estimated_cost=0.2,
-            )
-        )
-
-    return gaps
+    return [gap for gap in _INFO_GAPS if not getattr(profile, gap.key)]
 
 
 def _compute_hypotheses(profile: ProblemProfile) -> list[Hypothesis]:
     core = profile.core_concern_summary or ""
-    base = [
-        Hypothesis(
-            id="H1",
-            statement="目标/成功标准还不够清晰，导致行动难以落地",
-            type=HypothesisType.GOAL_MISMATCH,
-            confidence=0.34,
-            tests_needed=["user_goal", "success_criteria"],
-        ),
-        Hypothesis(
-            id="H2",
-            statement="存在硬约束（时间/权限/资源）主导了局面",
-            type=HypothesisType.CONSTRAINT,
-            confidence=0.33,
-            tests_needed=["constraints"],
-        ),
-        Hypothesis(
-            id="H3",
-            statement="情绪负荷过高影响了专注与决策",
-            type=HypothesisType.EMOTIONAL_BLOCK,
-            confidence=0.33,
-            tests_needed=["emotion"],
-        ),
+    emotional = bool(
+        profile.emotion and profile.emotion.label in {"anxious", "sad", "confused"}
+    )
+    time_bound = bool(core) and any(word in core for word in _DEADLINE_WORDS)
+    return [
+        _HYPOTHESIS_GOAL,
+        _HYPOTHESIS_CONSTRAINT_RAISED if time_bound else _HYPOTHESIS_CONSTRAINT,
+        _HYPOTHESIS_EMOTION_RAISED if emotional else _HYPOTHESIS_EMOTION,
     ]
 
-    if profile.emotion and profile.emotion.label in {"anxious", "sad", "confused"}:
-        base[2].confidence = min(0.6, base[2].confidence + 0.15)
-
-    if core and any(
-        word in core for word in ["deadline", "交付", "下周", "明天", "月底"]
-    ):
-        base[1].confidence = min(0.6, base[1].confidence + 0.15)
-
-    return base
-
 
 def _select_next_question(
     profile: ProblemProfile, gaps: list[InfoGap], hypotheses: list[Hypothesis]
@@ -261,39 +272,19 @@ def _select_next_question(
 
     if profile.meta.clarify_turn_index >= 5:
         profile.meta.clarify_state = "DONE"
-        return QuestionPlan(
-            prompt="如果只能选一个‘今天 10 分钟内能做的最小动作’，你愿意先做哪个？",
-            rationale="在信息不完整时先推动一个最小可执行动作",
-            expected_fields=[],
-            allow_unknown=True,
-        )
+        return _QUESTION_MIN_ACTION
 
     if "user_goal" in missing_keys or "success_criteria" in missing_keys:
         profile.meta.clarify_state = "ALIGN"
-        return QuestionPlan(
-            prompt="你希望这件事最终变成什么样才算‘解决了’？如果有 1-2 个可量化的标准，也可以顺便说一下",
-            rationale="先对齐成功标准，避免解决错问题",
-            expected_fields=["user_goal", "success_criteria"],
-            allow_unknown=True,
-        )
+        return _QUESTION_GOAL
 
     if "constraints" in missing_keys:
         profile.meta.clarify_state = "MAP"
-        return QuestionPlan(
-            prompt="这件事现在最大的硬约束是什么？比如时间点、资源、权限、必须交付的范围（选 1-2 个最关键的）",
-            rationale="把约束说清楚，才能评估可行路径",
-            expected_fields=["constraints"],
-            allow_unknown=True,
-        )
+        return _QUESTION_CONSTRAINTS
 
     if "attempts" in missing_keys:
         profile.meta.clarify_state = "MAP"
-        return QuestionPlan(
-            prompt="你已经尝试过哪些办法？分别带来了什么结果（哪怕很小也行）",
-            rationale="避免重复无效尝试，并找到可复用的有效点",
-            expected_fields=["attempts"],
-            allow_unknown=True,
-        )
+        return _QUESTION_ATTEMPTS
 
     profile.meta.clarify_state = "DIAGNOSE"
     top = sorted(hypotheses, key=lambda h: h.confidence, reverse=True)[:2]
@@ -302,8 +293,6 @@ def _select_next_question(
     return QuestionPlan(
         prompt=f"在下面两种可能里，你更像哪一种？A) {top[0].statement}  B) {top[1].statement}（也可以说都不是）",
         rationale=f"用一个低负担问题区分最可能的两条路径（当前关注：{focus}）",
-        expected_fields=[],
-        allow_unknown=True,
     )
 
 
@@ -412,14 +401,6 @@ def _first_constraint(profile: ProblemProfile) -> str:
     return "现有约束"
 
 
-def _looks_like_email(text: str) -> bool:
-    return bool(re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text))
-
-
-def _looks_like_phone(text: str) -> bool:
-    return bool(re.search(r"\+?\d[\d\s().-]{8,}\d", text))
-
-
 def _coarse_intensity(confidence: float) -> int:
     if confidence >= 0.85:
         return 4
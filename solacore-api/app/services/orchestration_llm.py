@@ -0,0 +1,166 @@
+"""LLM 编排代理 - Empath / Clarify / Visionary 作为并发的 AIService 调用
+
+规则代理（orchestration_agents）仍负责结构化部分（profile 更新、问题计划、选项），
+其回复作为本轮草稿；LLM 代理在草稿基础上生成面向用户的文本：
+- 主代理（当前步骤对应的代理）流式输出，首个 token 超时或调用失败时回退为草稿原文；
+- 次代理（Empath 的核心困扰摘要）与主代理同时发起，整体带超时，主代理输出结束后汇总。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncGenerator
+
+from app.config import get_settings
+from app.schemas.orchestration import AgentName
+from app.services.ai_service import AIService
+from app.services.prompt_registry import prompt_registry
+from app.utils.datetime_utils import utc_now
+
+logger = logging.getLogger(__name__)
+
+AGENT_SYSTEM_PROMPTS = {
+    "empath": """你是 Solacore 的共情代理（Empath）。用户刚开始描述自己的困扰。
+根据用户消息和回复草稿，用温和、具体的中文回应：先确认对方的感受，再复述你听到的核心问题。
+保持草稿的意图，不超过 120 字，不要给建议，不要提问超过一个。""",
+    "clarify": """你是 Solacore 的澄清代理（Clarify）。你的任务是帮用户把问题说清楚。
+回复草稿中包含本轮要问的问题（由规则选出），你必须保留这个问题的含义，只调整措辞使其自然。
+一次只问一个问题，不超过 120 字，不要给建议。""",
+    "visionary": """你是 Solacore 的视角代理（Visionary）。回复草稿包含重构后的问题和编号的可选方向。
+保留全部编号方向及其顺序，可以润色描述并结合用户的具体情况，不要新增方向，不超过 250 字。""",
+    # 结构化流式模式：输出 JSON，客户端按对象逐个渲染（见 structured_stream）
+    "clarify_json": """你是 Solacore 的澄清代理（Clarify）。回复草稿是一个 JSON 对象，
+其中 question 是本轮要问的问题（由规则选出）。保留问题的含义，只调整 prompt 的措辞使其自然，
+不超过 120 字。只输出与草稿结构相同的 JSON 对象，不要代码围栏或其他文字。""",
+    "visionary_json": """你是 Solacore 的视角代理（Visionary）。回复草稿是一个 JSON 对象，
+包含 reframe（重构后的问题，可能没有）和 options（可选方向，每项含 title、description、pros、cons）。
+保留全部方向及其顺序，可以结合用户的具体情况润色 reframe 与 description，不要新增方向。
+按 reframe、options 的顺序只输出与草稿结构相同的 JSON 对象，不要代码围栏或其他文字。""",
+    "summary": """你负责维护对话的问题画像。根据用户的最新消息和此前的理解，
+用一句话（不超过 60 字）概括用户当前的核心困扰。只输出这句话，不要任何前缀或解释。""",
+}
+AGENT_PROMPT_PREFIXES = prompt_registry.register_many("agent", AGENT_SYSTEM_PROMPTS)
+
+SUMMARY_MAX_CHARS = 60
+
+
+@dataclass(slots=True)
+class AgentCall:
+    """一次 LLM 代理调用的结果与耗时（用于 append_run）"""
+
+    agent: AgentName
+    started_at: datetime = field(default_factory=utc_now)
+    latency_ms: int = 0
+    text: str = ""
+    # ok / timeout / error；主代理回退为草稿时为 fallback:<原因>
+    status: str = "ok"
+
+    @property
+    def notes(self) -> str:
+        return f"llm:{self.status}"
+
+
+class LLMAgentRunner:
+    def __init__(
+        self, ai_service: AIService | None = None, timeout: float | None = None
+    ) -> None:
+        self._ai = ai_service or AIService()
+        self._timeout = (
+            timeout
+            if timeout is not None
+            else get_settings().orchestration_agent_timeout_seconds
+        )
+
+    async def complete(
+        self, agent: AgentName, prompt_key: str, user_prompt: str
+    ) -> AgentCall:
+        """非流式调用（次代理）：整体超时或失败时返回空文本，不抛出"""
+        call = AgentCall(agent)
+        t0 = time.perf_counter()
+        parts: list[str] = []
+        try:
+            async with asyncio.timeout(self._timeout):
+                async for token in self._ai.stream(
+                    prompt_registry.system(f"agent:{prompt_key}"),
+                    user_prompt,
+                    route=f"agent:{prompt_key}",
+                ):
+                    parts.append(token)
+            call.text = "".join(parts).strip()
+        except TimeoutError:
+            call.status = "timeout"
+        except Exception:
+            logger.warning("Orchestration agent %s failed", agent.value, exc_info=True)
+            call.status = "error"
+        call.latency_ms = int((time.perf_counter() - t0) * 1000)
+        return call
+
+    async def stream(
+        self, call: AgentCall, prompt_key: str, user_prompt: str, draft: str
+    ) -> AsyncGenerator[str, None]:
+        """主代理流式输出：首个 token 超时或出错时改为输出草稿；中途出错则在已输出处结束"""
+        t0 = time.perf_counter()
+        parts: list[str] = []
+        tokens = self._ai.stream(
+            prompt_registry.system(f"agent:{prompt_key}"),
+            user_prompt,
+            route=f"agent:{prompt_key}",
+        )
+        try:
+            try:
+                first = await asyncio.wait_for(anext(tokens, None), self._timeout)
+            except TimeoutError:
+                first, call.status = None, "fallback:timeout"
+            except Exception:
+                logger.warning(
+                    "Orchestration agent %s failed", call.agent.value, exc_info=True
+                )
+                first, call.status = None, "fallback:error"
+            if not first:
+                if call.status == "ok":
+                    call.status = "fallback:empty"
+                parts.append(draft)
+                yield draft
+                return
+
+            parts.append(first)
+            yield first
+            try:
+                async for token in tokens:
+                    parts.append(token)
+                    yield token
+            except Exception:
+                logger.warning(
+                    "Orchestration agent %s stream interrupted",
+                    call.agent.value,
+                    exc_info=True,
+                )
+                call.status = "error"
+        finally:
+            await tokens.aclose()
+            call.text = "".join(parts)
+            call.latency_ms = int((time.perf_counter() - t0) * 1000)
+
+
+def primary_prompt(user_input: str, core_concern: str | None, draft: str) -> str:
+    return (
+        f"用户消息：{user_input}\n"
+        f"当前理解：{core_concern or '（暂无）'}\n"
+        f"回复草稿：\n{draft}"
+    )
+
+
+def summary_prompt(user_input: str, core_concern: str | None) -> str:
+    return f"此前的理解：{core_concern or '（暂无）'}\n用户最新消息：{user_input}"
+
+
+def clean_summary(text: str) -> str | None:
+    cleaned = re.sub(r"\s+", " ", text).strip().strip("\"'“”")
+    if not cleaned:
+        return None
+    return cleaned[:SUMMARY_MAX_CHARS]
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import time
+from typing import AsyncGenerator
 from uuid import UUID
 
 from app.config import get_settings
+from app.models.solve_profile import SolveProfile
 from app.models.solve_session import SolveSession, SolveStep
-from app.schemas.orchestration import AgentName, OrchestratorDecision
+from app.schemas.orchestration import (
+    AgentName,
+    AuditorOutput,
+    OrchestratorDecision,
+    ProblemProfile,
+)
 from app.services.crisis_detector import get_crisis_response
 from app.services.memory_bank_service import MemoryBankService
+from app.services.message_analysis import MessageAnalysis, analyze_message
 from app.services.orchestration_agents import (
     append_run,
     run_auditor,
@@ -15,67 +24,188 @@ from app.services.orchestration_agents import (
     run_empath,
     run_visionary,
 )
+from app.services.orchestration_llm import (
+    AgentCall,
+    LLMAgentRunner,
+    clean_summary,
+    primary_prompt,
+    summary_prompt,
+)
+from app.services.structured_stream import has_structure, structured_draft
 from app.utils.datetime_utils import utc_now
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# 由 LLM 主代理生成回复的步骤（COMMIT 为固定收尾语）
+_LLM_PRIMARY_STEPS = {
+    SolveStep.RECEIVE,
+    SolveStep.CLARIFY,
+    SolveStep.REFRAME,
+    SolveStep.OPTIONS,
+}
+
 
 class OrchestratorService:
     def __init__(self, db: AsyncSession):
         self._db = db
         self._memory = MemoryBankService(db)
         self._settings = get_settings()
+        # 最近一次处理使用的 profile 行（供调用方提交后写回会话状态缓存）
+        self.profile_entity: SolveProfile | None = None
 
     async def handle_solve_message(
         self,
         session: SolveSession,
         user_input: str,
         current_step: SolveStep,
-        sanitized_input: str | None = None,
+        analysis: MessageAnalysis | None = None,
+        profile_entity: SolveProfile | None = None,
     ) -> OrchestratorDecision:
+        """处理一条 Solve 消息
+
+        analysis 为路由层已完成的消息分析，profile_entity 为会话状态缓存中的
+        profile 行；缺省时在此计算 / 查询。
+        """
+        profile_entity, profile = await self._load_profile(session, profile_entity)
+        if analysis is None:
+            analysis = analyze_message(user_input)
+
+        audit = self._run_auditor(profile, analysis)
+        if not audit.allowed:
+            decision = self._blocked_decision(profile, audit, current_step)
+            await self._memory.save_profile(profile_entity, profile)
+            return decision
+
+        decision = self._run_step(profile, analysis, audit, current_step)
+        profile.meta.last_updated_at = utc_now()
+        await self._memory.save_profile(profile_entity, profile)
+        return decision
+
+    async def start_solve_turn(
+        self,
+        session: SolveSession,
+        user_input: str,
+        current_step: SolveStep,
+        analysis: MessageAnalysis | None = None,
+        profile_entity: SolveProfile | None = None,
+        runner: LLMAgentRunner | None = None,
+        structured: bool = False,
+    ) -> SolveTurn:
+        """LLM 代理模式：审核后立即发起次代理，并以规则代理回复作为主代理草稿
+
+        返回的 SolveTurn 由调用方先消费 tokens()，再调用 finish() 汇总并保存 profile。
+        structured 为 True 且本步骤有结构化结果时，主代理输出 JSON
+        （草稿为规则结果的 JSON），turn.structured 为 True。
+        """
+        profile_entity, profile = await self._load_profile(session, profile_entity)
+        if analysis is None:
+            analysis = analyze_message(user_input)
+
+        audit = self._run_auditor(profile, analysis)
+        if not audit.allowed:
+            decision = self._blocked_decision(profile, audit, current_step)
+            return SolveTurn(self._memory, profile_entity, decision)
+
+        runner = runner or LLMAgentRunner()
+        user_text = audit.sanitized_user_input
+        # 次代理基于本轮之前的理解，与主代理（草稿基于规则结果）同时运行
+        summary = asyncio.create_task(
+            runner.complete(
+                AgentName.EMPATH,
+                "summary",
+                summary_prompt(user_text, profile.core_concern_summary),
+            )
+        )
+        decision = self._run_step(profile, analysis, audit, current_step)
+        if current_step not in _LLM_PRIMARY_STEPS:
+            return SolveTurn(
+                self._memory, profile_entity, decision, secondary=[summary]
+            )
+
+        structured = structured and has_structure(decision)
+        prompt_key = decision.primary_agent.value
+        draft = decision.response_text
+        if structured:
+            prompt_key = f"{prompt_key}_json"
+            draft = structured_draft(decision)
+        return SolveTurn(
+            self._memory,
+            profile_entity,
+            decision,
+            runner=runner,
+            primary_call=AgentCall(decision.primary_agent),
+            primary_key=prompt_key,
+            primary_prompt=primary_prompt(
+                user_text, profile.core_concern_summary, draft
+            ),
+            draft=draft,
+            secondary=[summary],
+            structured=structured,
+        )
+
+    async def _load_profile(
+        self, session: SolveSession, profile_entity: SolveProfile | None
+    ) -> tuple[SolveProfile, ProblemProfile]:
         if session.id is None or session.user_id is None:
             raise ValueError("SESSION_ID_OR_USER_ID_MISSING")
 
-        profile_entity = await self._memory.get_or_create_profile(
-            session_id=UUID(str(session.id)),
-            user_id=UUID(str(session.user_id)),
-        )
-        profile = self._memory.load_profile(profile_entity)
+        if profile_entity is None:
+            profile_entity = await self._memory.get_or_create_profile(
+                session_id=UUID(str(session.id)),
+                user_id=UUID(str(session.user_id)),
+            )
+        self.profile_entity = profile_entity
+        return profile_entity, self._memory.load_profile(profile_entity)
 
+    def _run_auditor(
+        self, profile: ProblemProfile, analysis: MessageAnalysis
+    ) -> AuditorOutput:
         audit_started = utc_now()
         audit0 = time.perf_counter()
-        audit = run_auditor(
-            user_input, self._settings.prompt_injection_policy, sanitized_input
-        )
+        audit = run_auditor(analysis, self._settings.prompt_injection_policy)
         append_run(
             profile,
             AgentName.AUDITOR,
             audit_started,
             int((time.perf_counter() - audit0) * 1000),
         )
+        return audit
 
-        if not audit.allowed:
-            decision = OrchestratorDecision(
-                primary_agent=AgentName.AUDITOR,
-                next_step=current_step.value,
-                response_text=get_crisis_response().get("message", ""),
-                profile=profile,
-                audit=audit,
-            )
-            await self._memory.save_profile(profile_entity, profile)
-            return decision
+    @staticmethod
+    def _blocked_decision(
+        profile: ProblemProfile, audit: AuditorOutput, current_step: SolveStep
+    ) -> OrchestratorDecision:
+        return OrchestratorDecision(
+            primary_agent=AgentName.AUDITOR,
+            next_step=current_step.value,
+            response_text=get_crisis_response().get("message", ""),
+            profile=profile,
+            audit=audit,
+        )
 
+    def _run_step(
+        self,
+        profile: ProblemProfile,
+        analysis: MessageAnalysis,
+        audit: AuditorOutput,
+        current_step: SolveStep,
+    ) -> OrchestratorDecision:
+        """规则代理处理当前步骤"""
         solve_step = current_step
         now_step = current_step.value
 
-        response_text = ""
-        next_step = now_step
-        primary = AgentName.CLARIFY
+        decision = OrchestratorDecision(
+            primary_agent=AgentName.CLARIFY,
+            next_step=now_step,
+            response_text="",
+            profile=profile,
+            audit=audit,
+        )
 
         if solve_step == SolveStep.RECEIVE:
-            primary = AgentName.EMPATH
+            decision.primary_agent = AgentName.EMPATH
             started = utc_now()
             t0 = time.perf_counter()
-            empath = run_empath(audit.sanitized_user_input)
+            empath = run_empath(analysis)
             append_run(
                 profile,
                 AgentName.EMPATH,
@@ -85,11 +215,10 @@ class OrchestratorService:
 
             profile.core_concern_summary = empath.core_concern_summary
             profile.emotion = empath.emotion
-            response_text = empath.user_facing_message
-            next_step = SolveStep.CLARIFY.value
+            decision.response_text = empath.user_facing_message
+            decision.next_step = SolveStep.CLARIFY.value
 
         elif solve_step == SolveStep.CLARIFY:
-            primary = AgentName.CLARIFY
             started = utc_now()
             t0 = time.perf_counter()
             clarify = run_clarify(profile, audit.sanitized_user_input)
@@ -103,7 +232,8 @@ class OrchestratorService:
             profile.hypotheses = clarify.hypotheses
             profile.info_gaps = clarify.info_gaps
             profile.last_questions.append(clarify.next_question.prompt)
-            response_text = clarify.user_facing_message
+            decision.response_text = clarify.user_facing_message
+            decision.question = clarify.next_question
 
             done = profile.meta.clarify_state == "DONE" or (
                 bool(profile.user_goal)
@@ -111,10 +241,12 @@ class OrchestratorService:
                 and bool(profile.constraints)
                 and profile.meta.clarify_turn_index >= 2
             )
-            next_step = SolveStep.REFRAME.value if done else SolveStep.CLARIFY.value
+            decision.next_step = (
+                SolveStep.REFRAME.value if done else SolveStep.CLARIFY.value
+            )
 
         elif solve_step in {SolveStep.REFRAME, SolveStep.OPTIONS}:
-            primary = AgentName.VISIONARY
+            decision.primary_agent = AgentName.VISIONARY
             started = utc_now()
             t0 = time.perf_counter()
             visionary = run_visionary(profile, now_step)
@@ -125,25 +257,97 @@ class OrchestratorService:
                 int((time.perf_counter() - t0) * 1000),
             )
 
-            response_text = visionary.user_facing_message
-            next_step = (
+            decision.response_text = visionary.user_facing_message
+            decision.reframed_problem = visionary.reframed_problem
+            decision.options = visionary.options
+            decision.next_step = (
                 SolveStep.OPTIONS.value
                 if solve_step == SolveStep.REFRAME
                 else SolveStep.COMMIT.value
             )
 
         else:
-            primary = AgentName.CLARIFY
-            response_text = "我们收个尾：如果只能选一个‘今天 10 分钟内能做的最小动作’，你愿意先做哪个？"
-            next_step = SolveStep.COMMIT.value
+            decision.response_text = "我们收个尾：如果只能选一个‘今天 10 分钟内能做的最小动作’，你愿意先做哪个？"
+            decision.next_step = SolveStep.COMMIT.value
 
-        profile.meta.last_updated_at = utc_now()
-        await self._memory.save_profile(profile_entity, profile)
+        return decision
 
-        return OrchestratorDecision(
-            primary_agent=primary,
-            next_step=next_step,
-            response_text=response_text,
-            profile=profile,
-            audit=audit,
-        )
+
+class SolveTurn:
+    """LLM 代理模式下的一轮处理
+
+    tokens() 产出主代理输出（无主代理时为草稿 / 拦截提示；结构化模式下为 JSON 文本），
+    期间次代理继续运行；
+    finish() 在请求所在任务中等待次代理（各自带超时）、记录全部代理耗时并保存 profile。
+    客户端断开等提前结束的情况调用 cancel()，不保存本轮 profile。
+    """
+
+    def __init__(
+        self,
+        memory: MemoryBankService,
+        profile_entity: SolveProfile,
+        decision: OrchestratorDecision,
+        *,
+        runner: LLMAgentRunner | None = None,
+        primary_call: AgentCall | None = None,
+        primary_key: str = "",
+        primary_prompt: str = "",
+        draft: str | None = None,
+        secondary: list[asyncio.Task[AgentCall]] | None = None,
+        structured: bool = False,
+    ) -> None:
+        self._memory = memory
+        self._profile_entity = profile_entity
+        self._runner = runner
+        self._primary_call = primary_call
+        self._primary_key = primary_key
+        self._primary_prompt = primary_prompt
+        self._draft = draft if draft is not None else decision.response_text
+        self._secondary = secondary or []
+        self.decision = decision
+        self.structured = structured
+
+    async def tokens(self) -> AsyncGenerator[str, None]:
+        if self._runner is None or self._primary_call is None:
+            yield self._draft
+            return
+        async for token in self._runner.stream(
+            self._primary_call, self._primary_key, self._primary_prompt, self._draft
+        ):
+            yield token
+
+    async def finish(self, response_text: str | None = None) -> OrchestratorDecision:
+        """response_text 为实际发送给客户端的文本（经输出过滤），缺省使用主代理输出"""
+        decision = self.decision
+        profile = decision.profile
+        try:
+            calls = await asyncio.gather(*self._secondary)
+        finally:
+            self.cancel()
+
+        if self._primary_call is not None:
+            call = self._primary_call
+            append_run(
+                profile, call.agent, call.started_at, call.latency_ms, call.notes
+            )
+            decision.response_text = call.text
+        # 次代理目前只有 Empath 的核心困扰摘要
+        for call in calls:
+            append_run(
+                profile, call.agent, call.started_at, call.latency_ms, call.notes
+            )
+            summary = clean_summary(call.text)
+            if summary:
+                profile.core_concern_summary = summary
+
+        if response_text is not None:
+            decision.response_text = response_text
+        if decision.audit.allowed:
+            profile.meta.last_updated_at = utc_now()
+        await self._memory.save_profile(self._profile_entity, profile)
+        return decision
+
+    def cancel(self) -> None:
+        for task in self._secondary:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,136 @@
+"""输出安全过滤 - 对流式 LLM 输出逐段打码邮箱 / 电话并检测危机关键词
+
+每个 SSE 流一个 OutboundFilter。feed() 只处理「待发送尾部 + 新 token」：
+只保留末尾仍可能变成命中的部分——连续的邮箱字符、电话字符，或关键词前缀——
+跨 token 的命中（如邮箱被拆成两个 token）在下一次 feed 时整体判断；
+其余文本经打码后立即返回。保留部分最多 window 个字符，
+每个 token 的开销与窗口大小成正比，与已生成的回复长度无关。
+"""
+
+from __future__ import annotations
+
+import re
+
+from app.config import get_settings
+from app.services.content_filter import PII_RE
+from app.services.crisis_detector import CRISIS_CATEGORY, get_crisis_response
+from app.services.keyword_engine import detection_keywords
+
+REDACTION_LABELS = {"email": "[email]", "phone": "[phone]"}
+# 末尾可能继续延伸成邮箱 / 电话的连续字符（电话只能以数字、"+" 或 "(" 开头）
+_EMAIL_TAIL_RE = re.compile(r"[A-Za-z0-9._%+@-]+\Z")
+_PHONE_TAIL_RE = re.compile(r"[\d(+][\d\s().+-]*\Z")
+
+
+class OutboundFilter:
+    """流式输出过滤器（有状态，不可跨流复用）"""
+
+    def __init__(self, window: int | None = None) -> None:
+        if window is None:
+            window = get_settings().outbound_filter_window_chars
+        self._window = max(window, 0)
+        self._pending = ""
+        # 已发送原文的最后一个字符，作为关键词 \b 判断的左侧上下文
+        self._previous = ""
+        self.redactions: dict[str, int] = {}
+        self.crisis_keyword: str | None = None
+
+    @property
+    def crisis_detected(self) -> bool:
+        return self.crisis_keyword is not None
+
+    def done_fields(self) -> dict:
+        """附加到 done 事件的字段：输出中出现危机关键词时带上求助资源"""
+        if not self.crisis_detected:
+            return {}
+        return {"resources": get_crisis_response().get("resources", {})}
+
+    def feed(self, chunk: str) -> str:
+        """追加一段输出，返回可以安全发送的文本（可能为空）"""
+        if not chunk:
+            return ""
+        self._pending += chunk
+        return self._drain(self._hold_start(), final=False)
+
+    def flush(self) -> str:
+        """流结束时处理剩余的尾部"""
+        return self._drain(len(self._pending), final=True)
+
+    def _hold_start(self) -> int:
+        """仍可能变成命中的尾部起点；超出 window 的部分无论如何都放行"""
+        pending = self._pending
+        floor = max(len(pending) - self._window, 0)
+        hold = len(pending)
+        for tail_re in (_EMAIL_TAIL_RE, _PHONE_TAIL_RE):
+            match = tail_re.search(pending, floor)
+            if match is not None:
+                hold = min(hold, match.start())
+        keyword_start = detection_keywords.partial_start(
+            pending[floor:], CRISIS_CATEGORY
+        )
+        if keyword_start is not None:
+            hold = min(hold, floor + keyword_start)
+        return hold
+
+    def _drain(self, limit: int, final: bool) -> str:
+        if limit <= 0:
+            return ""
+        pending = self._pending
+        cut = limit
+
+        # 前一个已发送字符参与电话号码的前后文判断（如紧跟在小数点后的数字）
+        context = self._previous + pending
+        offset = len(self._previous)
+        spans: list[tuple[int, int, str]] = []
+        for match in PII_RE.finditer(context, offset):
+            start, end = match.start() - offset, match.end() - offset
+            if start >= cut:
+                break
+            if end > limit and not final:
+                # 命中延伸到保留部分，可能还会变长：从命中起点开始整体保留
+                cut = start
+                break
+            spans.append((start, end, match.lastgroup or "email"))
+
+        crisis_keyword = None
+        for hit in detection_keywords.scan(context, CRISIS_CATEGORY):
+            start = hit.start - offset
+            end = start + len(hit.text)
+            if start >= cut:
+                break
+            if end > limit and not final:
+                cut = start
+                break
+            if crisis_keyword is None:
+                crisis_keyword = hit.text
+
+        # 保留点不能落在打码区间内部
+        for start, end, _ in spans:
+            if start < cut < end:
+                cut = start
+        if cut <= 0:
+            return ""
+        if crisis_keyword is not None and self.crisis_keyword is None:
+            self.crisis_keyword = crisis_keyword
+
+        pieces: list[str] = []
+        last = 0
+        for start, end, kind in spans:
+            if end > cut:
+                break
+            pieces.append(pending[last:start])
+            pieces.append(REDACTION_LABELS.get(kind, ""))
+            self.redactions[kind] = self.redactions.get(kind, 0) + 1
+            last = end
+        pieces.append(pending[last:cut])
+
+        self._previous = pending[cut - 1]
+        self._pending = pending[cut:]
+        return "".join(pieces)
+
+
+def create_outbound_filter() -> OutboundFilter | None:
+    """按配置创建输出过滤器（关闭时返回 None）"""
+    if not get_settings().outbound_filter_enabled:
+        return None
+    return OutboundFilter()
@@ -0,0 +1,150 @@
+"""系统提示词前缀注册表 - 预先计算、带版本的静态提示词，便于提供商端缓存
+
+Solve 步骤提示词、Learn 步骤/工具提示词以及模板会话的 PromptTemplate.system_prompt
+在所有请求间完全相同。这里把它们注册为带内容哈希版本号的前缀段，组合成 SystemPrompt，
+AIService 据此构造请求：
+- Anthropic：system 使用 text block 列表，最后一个静态段带 cache_control；
+- OpenAI / OpenRouter：静态 system 消息始终位于最前且字节不变（自动前缀缓存），
+  动态内容只出现在之后的 user 消息中。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Mapping
+
+SEGMENT_SEPARATOR = "\n\n"
+TEMPLATE_CACHE_SIZE = 512
+TEMPLATE_CACHE_TTL_SECONDS = 600.0
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+class PromptPrefix:
+    """单个静态提示词段，version 为内容哈希（内容变化即换版本）"""
+
+    __slots__ = ("key", "text", "version")
+
+    def __init__(self, key: str, text: str) -> None:
+        self.key = key
+        self.text = text
+        self.version = f"{key}@{_digest(text)}"
+
+    def __repr__(self) -> str:
+        return f"<PromptPrefix {self.version}>"
+
+
+class SystemPrompt:
+    """由若干静态前缀段组成的系统提示词，并预先构造各提供商所需的请求片段
+
+    实例在注册表中复用，请求负载直接引用这些对象，调用方不得修改。
+    """
+
+    __slots__ = ("segments", "text", "cache_key", "anthropic_blocks")
+
+    def __init__(self, segments: tuple[PromptPrefix, ...]) -> None:
+        self.segments = segments
+        self.text = SEGMENT_SEPARATOR.join(segment.text for segment in segments)
+        versions = "+".join(segment.version for segment in segments)
+        self.cache_key = f"sp-{_digest(versions)}"
+        blocks: list[dict[str, Any]] = [
+            {"type": "text", "text": segment.text} for segment in segments
+        ]
+        if blocks:
+            # 缓存断点放在最后一个静态段：之前的全部内容作为一个缓存前缀
+            blocks[-1] = {**blocks[-1], "cache_control": _EPHEMERAL}
+        self.anthropic_blocks = blocks
+
+    @classmethod
+    def from_text(cls, text: str) -> SystemPrompt:
+        """临时提示词（未注册），仍按单段静态前缀处理"""
+        return cls((PromptPrefix("adhoc", text),))
+
+    def __repr__(self) -> str:
+        return f"<SystemPrompt {self.cache_key}>"
+
+
+def as_system_prompt(prompt: str | SystemPrompt) -> SystemPrompt:
+    return (
+        prompt if isinstance(prompt, SystemPrompt) else SystemPrompt.from_text(prompt)
+    )
+
+
+class PromptRegistry:
+    """静态前缀与组合结果的进程内注册表"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._prefixes: dict[str, PromptPrefix] = {}
+        self._composed: dict[tuple[str, ...], SystemPrompt] = {}
+        self._templates: OrderedDict[str, tuple[float, PromptPrefix]] = OrderedDict()
+
+    def register(self, key: str, text: str) -> PromptPrefix:
+        """注册（或按新内容更新）一个静态前缀"""
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is None or prefix.text != text:
+                prefix = PromptPrefix(key, text)
+                self._prefixes[key] = prefix
+            return prefix
+
+    def register_many(
+        self, namespace: str, prompts: Mapping[str, str]
+    ) -> dict[str, PromptPrefix]:
+        return {
+            name: self.register(f"{namespace}:{name}", text)
+            for name, text in prompts.items()
+        }
+
+    def get(self, key: str) -> PromptPrefix:
+        return self._prefixes[key]
+
+    def compose(self, segments: Iterable[PromptPrefix]) -> SystemPrompt:
+        """组合多个前缀段，相同版本组合复用同一个 SystemPrompt"""
+        parts = tuple(segments)
+        key = tuple(segment.version for segment in parts)
+        with self._lock:
+            prompt = self._composed.get(key)
+            if prompt is None:
+                prompt = SystemPrompt(parts)
+                self._composed[key] = prompt
+            return prompt
+
+    def system(self, *keys: str) -> SystemPrompt:
+        return self.compose(self.get(key) for key in keys)
+
+    def cached_template(self, template_id: str) -> PromptPrefix | None:
+        """返回仍在有效期内的模板前缀（模板内容来自数据库，按 TTL 刷新）"""
+        with self._lock:
+            entry = self._templates.get(template_id)
+            if entry is None:
+                return None
+            loaded_at, prefix = entry
+            if time.monotonic() - loaded_at > TEMPLATE_CACHE_TTL_SECONDS:
+                del self._templates[template_id]
+                return None
+            self._templates.move_to_end(template_id)
+            return prefix
+
+    def register_template(self, template_id: str, text: str) -> PromptPrefix:
+        prefix = PromptPrefix(f"template:{template_id}", text)
+        with self._lock:
+            self._templates[template_id] = (time.monotonic(), prefix)
+            self._templates.move_to_end(template_id)
+            while len(self._templates) > TEMPLATE_CACHE_SIZE:
+                self._templates.popitem(last=False)
+        return prefix
+
+    def clear_templates(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+
+prompt_registry = PromptRegistry()
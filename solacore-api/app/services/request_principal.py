@@ -0,0 +1,156 @@
+"""请求主体：当前用户 + 订阅 + 当前设备
+
+get_current_user 与 create_session 需要的三份数据的缓存键（user / subscription /
+按 X-Device-Fingerprint 的设备）用一次 MGET 读取；有未命中时用一条 LEFT JOIN
+查询补齐，并以一个 pipeline 回填未命中的部分。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from app.models.device import Device
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services.cache_service import CacheService
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+cache_service = CacheService()
+
+
+@dataclass(frozen=True, slots=True)
+class RequestPrincipal:
+    user: User
+    # 订阅缓存负载（见 subscription_payload）；用户没有订阅行时为 None
+    subscription: dict[str, Any] | None = None
+    device_fingerprint: str | None = None
+    # 指纹对应的本用户设备；未携带指纹或设备不存在时为 None
+    device_id: UUID | None = None
+
+    @property
+    def tier(self) -> str:
+        return str((self.subscription or {}).get("tier") or "free")
+
+    def subscription_dates(self) -> tuple[datetime | None, datetime | None] | None:
+        """(created_at, current_period_start)；缓存负载不完整时返回 None"""
+        if self.subscription is None or "created_at" not in self.subscription:
+            return None
+        return (
+            _parse_datetime(self.subscription.get("created_at")),
+            _parse_datetime(self.subscription.get("period_start")),
+        )
+
+
+def user_payload(user: User) -> dict[str, Any]:
+    return {
+        "id": str(user.id),
+        "email": user.email,
+        "auth_provider": user.auth_provider,
+        "locale": user.locale,
+        "is_active": user.is_active,
+    }
+
+
+def subscription_payload(subscription: Subscription) -> dict[str, Any]:
+    return {
+        "tier": str(subscription.tier),
+        "status": str(subscription.status),
+        "created_at": _isoformat(subscription.created_at),
+        "period_start": _isoformat(subscription.current_period_start),
+        "period_end": _isoformat(subscription.current_period_end),
+        "cancel_at_period_end": bool(subscription.cancel_at_period_end),
+        "stripe_customer_id": subscription.stripe_customer_id,
+    }
+
+
+def _user_from_payload(user_id: UUID, payload: Any) -> User | None:
+    if not isinstance(payload, dict) or not payload.get("email"):
+        return None
+    return User(
+        id=user_id,
+        email=str(payload.get("email")),
+        auth_provider=str(payload.get("auth_provider") or "email"),
+        locale=str(payload.get("locale") or "en"),
+        is_active=bool(payload.get("is_active", True)),
+    )
+
+
+def _device_id_from_payload(payload: Any) -> UUID | None:
+    if not isinstance(payload, dict):
+        return None
+    try:
+        return UUID(str(payload.get("id")))
+    except (TypeError, ValueError):
+        return None
+
+
+async def load_request_principal(
+    db: AsyncSession, user_id: UUID, device_fingerprint: str | None = None
+) -> RequestPrincipal | None:
+    """读取请求主体；用户不存在时返回 None（停用的用户照常返回，由调用方拒绝）"""
+    cached_user, cached_subscription, cached_device = await cache_service.get_principal(
+        user_id, device_fingerprint
+    )
+    user = _user_from_payload(user_id, cached_user)
+    device_id = _device_id_from_payload(cached_device)
+    if (
+        user is not None
+        and isinstance(cached_subscription, dict)
+        and (device_id is not None or not device_fingerprint)
+    ):
+        return RequestPrincipal(
+            user, cached_subscription, device_fingerprint, device_id
+        )
+
+    stmt = (
+        select(User, Subscription)
+        .outerjoin(Subscription, Subscription.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    if device_fingerprint:
+        stmt = stmt.add_columns(Device.id).outerjoin(
+            Device,
+            and_(
+                Device.user_id == User.id,
+                Device.device_fingerprint == device_fingerprint,
+            ),
+        )
+    # 设备表可能存在历史重复数据，只取第一行
+    row = (await db.execute(stmt.limit(1))).first()
+    if row is None:
+        return None
+    values: tuple[Any, ...] = tuple(row)
+    db_user: User = values[0]
+    subscription = subscription_payload(values[1]) if values[1] is not None else None
+    db_device_id: UUID | None = values[2] if len(values) > 2 else None
+
+    # 只回填本次未命中的部分；停用的用户不缓存
+    await cache_service.set_principal(
+        user_id,
+        user=user_payload(db_user) if user is None and db_user.is_active else None,
+        subscription=subscription
+        if not isinstance(cached_subscription, dict)
+        else None,
+        device_fingerprint=device_fingerprint,
+        device={"id": str(db_device_id)}
+        if device_id is None and db_device_id is not None
+        else None,
+    )
+    return RequestPrincipal(db_user, subscription, device_fingerprint, db_device_id)
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _parse_datetime(value: Any) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
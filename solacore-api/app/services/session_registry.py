@@ -0,0 +1,130 @@
+"""访问令牌会话的撤销感知缓存
+
+get_current_user 每个请求都要确认令牌 sid 对应的 ActiveSession 仍然有效，查询顺序：
+1. 进程内 TTL LRU（仅在撤销订阅已连接时使用，否则收不到其他 worker 的撤销）；
+2. Redis 键 auth:session:<sid>：值为 user_id 表示有效，"revoked" 表示已撤销；
+   有效标记的过期时间取会话与访问令牌过期时间的较早者，以 SET NX 写入，不覆盖撤销标记；
+3. 都未命中时由调用方查询 active_sessions，再调用 remember() 回填 Redis。
+
+登出、终止会话、移除设备、重置密码与删除账户在提交后调用 revoke()：写入撤销标记
+（保留 jwt_expire_minutes，覆盖仍可能在用的访问令牌）并通过 Redis pub/sub 广播，
+各 worker 的订阅任务收到后立即在本地标记为已撤销。
+绕过 revoke() 直接删除的会话行最迟在有效标记过期（访问令牌过期）时失效。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+from uuid import UUID
+
+from app.config import Settings, get_settings
+from app.utils.cache import ChannelSubscriber, RedisCache
+from app.utils.cache import cache as redis_cache
+from app.utils.datetime_utils import utc_now
+from cachetools import TTLCache  # type: ignore[import-untyped]
+
+REVOCATION_CHANNEL = "auth:session:revoked"
+_REVOKED = "revoked"
+
+
+class SessionRegistry:
+    def __init__(self, cache: RedisCache | None = None) -> None:
+        self._cache = cache or redis_cache
+        # sid -> user_id 或 _REVOKED
+        self._local: TTLCache | None = None
+        self._subscriber = ChannelSubscriber(
+            self._cache, REVOCATION_CHANNEL, self._on_revoked, self._on_reset
+        )
+
+    @staticmethod
+    def _key(session_id: UUID | str) -> str:
+        return f"auth:session:{session_id}"
+
+    async def check(self, session_id: UUID, user_id: UUID) -> bool | None:
+        """True：有效；False：已撤销；None：缓存中没有结论，需查询数据库"""
+        if not get_settings().auth_session_cache_enabled:
+            return None
+        sid = str(session_id)
+        local = self._local if self._subscriber.connected else None
+        if local is not None:
+            cached = local.get(sid)
+            if cached is not None:
+                return _verdict(cached, user_id)
+
+        cached = await self._cache.get(self._key(sid))
+        if cached is None:
+            return None
+        if local is not None:
+            local[sid] = cached
+        return _verdict(cached, user_id)
+
+    async def remember(
+        self, session_id: UUID, user_id: UUID, expires_at: datetime
+    ) -> None:
+        """数据库确认有效后回填 Redis（本地缓存只从 Redis 读取结果填充，避免覆盖并发撤销）"""
+        if not get_settings().auth_session_cache_enabled:
+            return
+        ttl = int((expires_at - utc_now()).total_seconds())
+        if ttl <= 0:
+            return
+        await self._cache.set(self._key(session_id), str(user_id), ttl=ttl, nx=True)
+
+    async def revoke(self, session_ids: Iterable[UUID | str]) -> None:
+        settings = get_settings()
+        if not settings.auth_session_cache_enabled:
+            return
+        sids = [str(session_id) for session_id in session_ids]
+        if not sids:
+            return
+        self._mark_revoked(sids)
+        ttl = settings.jwt_expire_minutes * 60
+        for sid in sids:
+            await self._cache.set(self._key(sid), _REVOKED, ttl=ttl)
+        await self._cache.publish(REVOCATION_CHANNEL, sids)
+
+    async def start(self) -> None:
+        """启动撤销订阅（应用启动时调用）"""
+        settings = get_settings()
+        if not settings.auth_session_cache_enabled:
+            return
+        self._local = _local_cache(settings)
+        self._subscriber.start()
+
+    async def close(self) -> None:
+        await self._subscriber.close()
+        self._local = None
+
+    def _mark_revoked(self, sids: Iterable[str]) -> None:
+        if self._local is None:
+            return
+        for sid in sids:
+            self._local[sid] = _REVOKED
+
+    def _on_revoked(self, payload: object) -> None:
+        if isinstance(payload, list):
+            self._mark_revoked(str(sid) for sid in payload)
+
+    def _on_reset(self) -> None:
+        # 断开期间可能错过撤销消息，丢弃本地结果
+        if self._local is not None:
+            self._local.clear()
+
+
+def _local_cache(settings: Settings) -> TTLCache | None:
+    if settings.auth_session_local_ttl_seconds <= 0:
+        return None
+    return TTLCache(
+        maxsize=max(settings.auth_session_local_max_entries, 1),
+        ttl=settings.auth_session_local_ttl_seconds,
+    )
+
+
+def _verdict(cached: object, user_id: UUID) -> bool | None:
+    if cached == _REVOKED:
+        return False
+    # sid 属于其他用户时交给数据库查询（必然失败）
+    return True if cached == str(user_id) else None
+
+
+session_registry = SessionRegistry()
@@ -0,0 +1,179 @@
+"""Solve 会话状态缓存 - 消息路径所需的行数据写穿缓存在 Redis
+
+每个会话一个键，保存会话行、当前未完成的步骤历史行以及 SolveProfile 行（列值）。
+命中时用缓存的列值构造实例并以「已持久化」状态加入数据库会话
+（make_transient_to_detached），之后的修改照常只生成 UPDATE，
+稳态下每条消息在调用 LLM 之前不发起任何读查询。
+
+写入时机：每次提交后由消息路径写回最新状态；步骤推进、会话状态变更、
+客户端断开、出错以及删除会话时删除缓存键，下次从数据库重建。
+
+每个会话另有一个代数计数：load 时读出，store 仅在代数未变时写入（并递增代数）。
+流式回复期间会话被其他请求修改（如 PATCH /sessions/{id}）时，invalidate 递增代数，
+该流结束时的 store 不会把旧状态写回缓存。
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, TypeVar
+from uuid import UUID
+
+from app.config import get_settings
+from app.models.solve_profile import SolveProfile
+from app.models.solve_session import SolveSession
+from app.models.step_history import StepHistory
+from app.utils.cache import RedisCache
+from app.utils.cache import cache as redis_cache
+from sqlalchemy import DateTime, Uuid, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+logger = logging.getLogger(__name__)
+
+_Row = TypeVar("_Row", SolveSession, StepHistory, SolveProfile)
+
+
+@dataclass(slots=True)
+class SessionState:
+    """一条消息处理所需的会话状态（均已加入当前数据库会话）"""
+
+    session: SolveSession
+    step_history: StepHistory | None
+    profile: SolveProfile | None = None
+    # 读取时的缓存代数（见 SessionStateCache.load），写回时用于判断期间是否被失效
+    generation: int | None = None
+
+
+class SessionStateCache:
+    def __init__(self, cache: RedisCache | None = None) -> None:
+        self._cache = cache or redis_cache
+
+    @staticmethod
+    def _key(session_id: UUID | str) -> str:
+        return f"solve:state:{session_id}"
+
+    @staticmethod
+    def _generation_key(session_id: UUID | str) -> str:
+        return f"solve:state:{session_id}:gen"
+
+    async def load(
+        self, db: AsyncSession, session_id: UUID, user_id: UUID
+    ) -> tuple[SessionState | None, int | None]:
+        """读取缓存并加入数据库会话，同时返回当前代数
+
+        未命中、已关闭或不属于该用户时状态为 None；代数照常返回，
+        调用方从数据库加载后用它写回。缓存关闭或 Redis 不可用时代数为 None。
+        """
+        if not get_settings().solve_state_cache_enabled:
+            return None, None
+        payload, generation = await self._cache.get_with_generation(
+            self._key(session_id), self._generation_key(session_id)
+        )
+        if not isinstance(payload, dict) or not isinstance(
+            payload.get("session"), dict
+        ):
+            return None, generation
+        try:
+            session = _decode(SolveSession, payload["session"])
+            if session.user_id != user_id:
+                return None, generation
+            step_history = (
+                _decode(StepHistory, payload["step_history"])
+                if payload.get("step_history")
+                else None
+            )
+            profile = (
+                _decode(SolveProfile, payload["profile"])
+                if payload.get("profile")
+                else None
+            )
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Invalid session state cache entry", exc_info=True)
+            await self.discard(session_id)
+            return None, generation
+
+        for row in (session, step_history, profile):
+            if row is not None:
+                make_transient_to_detached(row)
+                db.add(row)
+        return SessionState(session, step_history, profile), generation
+
+    async def store(
+        self,
+        session: SolveSession,
+        step_history: StepHistory | None,
+        profile: SolveProfile | None = None,
+        *,
+        generation: int | None,
+    ) -> None:
+        """提交后写回；代数已变（期间被 invalidate）或未知时不写，列值不完整时改为删除缓存"""
+        settings = get_settings()
+        if not settings.solve_state_cache_enabled or generation is None:
+            return
+        rows = {
+            "session": _encode(session),
+            "step_history": _encode(step_history) if step_history else None,
+            "profile": _encode(profile) if profile else None,
+        }
+        if rows["session"] is None or (step_history and rows["step_history"] is None):
+            await self.invalidate(session.id)  # type: ignore[arg-type]
+            return
+        written = await self._cache.set_if_generation(
+            self._key(session.id),  # type: ignore[arg-type]
+            rows,
+            settings.solve_state_cache_ttl_seconds,
+            generation_key=self._generation_key(session.id),  # type: ignore[arg-type]
+            expected=generation,
+        )
+        if not written:
+            logger.debug("Session state changed since load, skip cache write-back")
+
+    async def invalidate(self, session_id: UUID | str) -> None:
+        """删除缓存并递增代数，进行中的请求不会再写回旧状态"""
+        await self._cache.delete_and_bump(
+            self._key(session_id),
+            self._generation_key(session_id),
+            ttl=get_settings().solve_state_cache_ttl_seconds,
+        )
+
+    async def discard(self, session_id: UUID | str) -> None:
+        """只删除缓存、不递增代数：当前请求提交后会自行写回（如步骤推进）"""
+        await self._cache.delete(self._key(session_id))
+
+
+def _encode(row: Any) -> dict[str, Any] | None:
+    """取出全部列值；存在无法确定的列（已过期或有服务端默认值未回读）时返回 None"""
+    state = inspect(row)
+    if state.expired_attributes:
+        return None
+    values: dict[str, Any] = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in state.unloaded:
+            column = attr.columns[0]
+            # 插入时未赋值且无服务端默认值的列在数据库中就是 NULL
+            if column.primary_key or column.server_default is not None:
+                return None
+            values[attr.key] = None
+        else:
+            values[attr.key] = getattr(row, attr.key)
+    return values
+
+
+def _decode(model: type[_Row], values: dict[str, Any]) -> _Row:
+    row = model()
+    for attr in inspect(model).column_attrs:
+        value = values[attr.key]
+        column_type = attr.columns[0].type
+        if value is not None:
+            if isinstance(column_type, Uuid):
+                value = UUID(str(value))
+            elif isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+        setattr(row, attr.key, value)
+    return row
+
+
+session_state_cache = SessionStateCache()
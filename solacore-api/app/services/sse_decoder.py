@@ -0,0 +1,109 @@
+"""提供商 SSE 流解码器 - 直接在字节块上增量解析 data 帧"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+JSONLoader = Callable[[bytes], Any]
+
+# orjson.JSONDecodeError 继承自 ValueError，统一捕获 ValueError 即可
+json_loads: JSONLoader = orjson.loads if orjson is not None else json.loads
+
+DONE = b"[DONE]"
+
+_LF = b"\n"
+_CR = b"\r"
+_CRLF = b"\r\n"
+_DATA = b"data:"
+_SPACE = 0x20
+
+
+class SSEDecoder:
+    """增量 SSE 解码器
+
+    按字节块喂入数据，返回已完整结束（遇到空行）的事件 data 负载。
+    支持跨块的半行/半帧、多行 data 字段以及 CRLF/CR 换行；
+    注释行和 event/id/retry 字段会被忽略。
+    """
+
+    __slots__ = ("_buffer", "_data")
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._data: list[bytes] = []
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """喂入一个字节块，返回本次完成的事件 data 列表"""
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if _CR in buffer:
+            # 末尾的 \r 可能与下一块的 \n 组成 CRLF，先保留
+            held = b""
+            if buffer.endswith(_CR):
+                buffer, held = buffer[:-1], _CR
+            buffer = buffer.replace(_CRLF, _LF).replace(_CR, _LF)
+        else:
+            held = b""
+
+        end = buffer.rfind(_LF)
+        if end == -1:
+            self._buffer = buffer + held
+            return []
+        self._buffer = buffer[end + 1 :] + held
+
+        events: list[bytes] = []
+        data = self._data
+        for line in buffer[:end].split(_LF):
+            if not line:
+                if data:
+                    events.append(data[0] if len(data) == 1 else _LF.join(data))
+                    data.clear()
+            elif line.startswith(_DATA):
+                value = line[5:]
+                if value and value[0] == _SPACE:
+                    value = value[1:]
+                data.append(value)
+        return events
+
+    def flush(self) -> list[bytes]:
+        """流结束时调用，返回未以空行结束的最后一个事件（若有）"""
+        events = self.feed(b"\n\n") if self._buffer or self._data else []
+        self._buffer = b""
+        return events
+
+
+async def iter_sse_data(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """将字节块迭代器转换为 SSE 事件 data 负载迭代器"""
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for data in decoder.feed(chunk):
+            yield data
+    for data in decoder.flush():
+        yield data
+
+
+async def iter_sse_json(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict[str, Any]]:
+    """解析 SSE data 为 JSON 对象，遇到 [DONE] 结束，跳过无法解析的帧"""
+    async for data in iter_sse_data(chunks):
+        if data == DONE:
+            return
+        try:
+            payload = json_loads(data)
+        except ValueError:
+            continue
+        if isinstance(payload, dict):
+            yield payload
+
+
+def openai_delta(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """提取 OpenAI 兼容格式（OpenAI / OpenRouter）的首个 choice delta"""
+    choices = payload.get("choices")
+    if not choices:
+        return None
+    delta = choices[0].get("delta")
+    return delta if delta else None
@@ -0,0 +1,139 @@
+"""结构化流式输出 - 编排结果以类型化 SSE 事件逐个发送
+
+事件：
+- reframe：{"reframe": "..."}
+- option：{"index": 0, "title": ..., "description": ..., "pros": [...], "cons": [...]}
+- question：{"prompt": ..., "rationale": ..., "expected_fields": [...], "allow_unknown": true}
+
+LLM 代理按 {"reframe": ..., "options": [...], "question": {...}} 输出 JSON，
+StructuredStream 在 token 流上增量解析，每个对象一闭合就按编排 schema 校验并产出事件；
+校验失败的对象被跳过。规则代理的结果用 decision_events 直接转换为同样的事件。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from app.schemas.orchestration import OptionItem, OrchestratorDecision, QuestionPlan
+from app.services.json_stream import IncrementalJSONParser, JSONPath
+from pydantic import TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+OPTION_ADAPTER: TypeAdapter[OptionItem] = TypeAdapter(OptionItem)
+QUESTION_ADAPTER: TypeAdapter[QuestionPlan] = TypeAdapter(QuestionPlan)
+
+
+@dataclass(frozen=True, slots=True)
+class StructuredEvent:
+    name: str
+    data: dict[str, Any]
+
+    def sse(self) -> str:
+        return f"event: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+
+def has_structure(decision: OrchestratorDecision) -> bool:
+    return bool(decision.reframed_problem or decision.options or decision.question)
+
+
+def structured_draft(decision: OrchestratorDecision) -> str:
+    """规则结果的 JSON 形式（LLM 草稿；LLM 不可用时原样作为输出解析）"""
+    draft: dict[str, Any] = {}
+    if decision.reframed_problem:
+        draft["reframe"] = decision.reframed_problem
+    if decision.options:
+        draft["options"] = [
+            OPTION_ADAPTER.dump_python(item, mode="json") for item in decision.options
+        ]
+    if decision.question is not None:
+        draft["question"] = QUESTION_ADAPTER.dump_python(decision.question, mode="json")
+    return json.dumps(draft, ensure_ascii=False)
+
+
+def decision_events(decision: OrchestratorDecision) -> list[StructuredEvent]:
+    events: list[StructuredEvent] = []
+    if decision.reframed_problem:
+        events.append(
+            StructuredEvent("reframe", {"reframe": decision.reframed_problem})
+        )
+    for index, item in enumerate(decision.options):
+        events.append(_option_event(index, item))
+    if decision.question is not None:
+        events.append(_question_event(decision.question))
+    return events
+
+
+def render_text(events: list[StructuredEvent]) -> str:
+    """事件对应的纯文本（保存为 AI 消息、写入对话窗口）"""
+    lines: list[str] = []
+    for event in events:
+        if event.name == "reframe":
+            lines.append(
+                f"我试着把你的问题重新写成一个更可解的版本：{event.data['reframe']}"
+            )
+        elif event.name == "option":
+            data = event.data
+            lines.append(f"{data['index'] + 1}) {data['title']}：{data['description']}")
+        elif event.name == "question":
+            lines.append(event.data["prompt"])
+    return "\n".join(lines)
+
+
+class StructuredStream:
+    """单个流的增量解析状态；events 为已产出的全部事件"""
+
+    def __init__(self) -> None:
+        self._parser = IncrementalJSONParser()
+        self._failed = False
+        self._options = 0
+        self.events: list[StructuredEvent] = []
+
+    def feed(self, chunk: str) -> list[StructuredEvent]:
+        if self._failed:
+            return []
+        try:
+            values = self._parser.feed(chunk)
+        except ValueError:
+            # 输出不是合法 JSON：停止解析，已产出的事件保留
+            logger.warning("Structured agent output is not valid JSON", exc_info=True)
+            self._failed = True
+            return []
+        events = [
+            event
+            for event in (self._to_event(path, value) for path, value in values)
+            if event is not None
+        ]
+        self.events.extend(events)
+        return events
+
+    def _to_event(self, path: JSONPath, value: Any) -> StructuredEvent | None:
+        try:
+            if path == ("reframe",) and isinstance(value, str) and value.strip():
+                return StructuredEvent("reframe", {"reframe": value.strip()})
+            if len(path) == 2 and path[0] == "options":
+                event = _option_event(
+                    self._options, OPTION_ADAPTER.validate_python(value)
+                )
+                self._options += 1
+                return event
+            if path == ("question",):
+                return _question_event(QUESTION_ADAPTER.validate_python(value))
+        except ValidationError:
+            logger.warning("Dropping invalid structured item at %s", path)
+        return None
+
+
+def _option_event(index: int, item: OptionItem) -> StructuredEvent:
+    return StructuredEvent(
+        "option", {"index": index, **OPTION_ADAPTER.dump_python(item, mode="json")}
+    )
+
+
+def _question_event(question: QuestionPlan) -> StructuredEvent:
+    return StructuredEvent(
+        "question", QUESTION_ADAPTER.dump_python(question, mode="json")
+    )
@@ -4,7 +4,10 @@ from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
 from app.config import Settings, validate_production_config
+from app.services.llm_clients import llm_clients
+from app.services.session_registry import session_registry
 from app.tasks.scheduler import shutdown_scheduler, start_scheduler
+from app.utils.cache import tiered_cache
 from fastapi import FastAPI
 
 
@@ -21,5 +24,13 @@ async def lifespan_handler(app: FastAPI, settings: Settings) -> AsyncIterator[No
     """
     validate_production_config(settings)
     start_scheduler()
-    yield
-    shutdown_scheduler()
+    await llm_clients.start(settings)
+    await session_registry.start()
+    await tiered_cache.start()
+    try:
+        yield
+    finally:
+        await tiered_cache.close()
+        await session_registry.close()
+        await llm_clients.close()
+        shutdown_scheduler()
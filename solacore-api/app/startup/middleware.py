@@ -3,6 +3,7 @@
 import time
 
 from app.config import Settings
+from app.middleware.auth_context import AuthContextMiddleware
 from app.middleware.csrf import validate_csrf
 from app.middleware.rate_limit import limiter
 from app.utils.metrics import metrics
@@ -118,3 +119,7 @@ def setup_middlewares(app: FastAPI, settings: Settings) -> None:
 
     # 5. Sentry 错误追踪
     setup_sentry(app, settings)
+
+    # 6. 认证上下文（最后注册即最外层）：每个请求只解码校验一次访问令牌，
+    # CSRF / 限流 key / Sentry 用户标记 / get_current_user 共用
+    app.add_middleware(AuthContextMiddleware)
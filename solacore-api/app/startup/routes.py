@@ -16,6 +16,7 @@ from app.routers import (
     templates,
     webhooks,
 )
+from app.services.llm_resilience import llm_resilience
 from app.utils.docs import COMMON_ERROR_RESPONSES
 from app.utils.exceptions import AuthError
 from app.utils.health import (
@@ -260,6 +261,7 @@ def register_health_routes(app: FastAPI, settings: Settings) -> None:
             active_sessions=active_sessions,
             active_users=active_users,
             db_pool=db_pool_stats,
+            llm_providers=llm_resilience.snapshot(),
         )
         return PlainTextResponse(payload, media_type="text/plain; version=0.0.4")
 
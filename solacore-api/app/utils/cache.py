@@ -1,19 +1,73 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import json
 import logging
+import math
+import random
+import struct
 import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
 from typing import Any
+from uuid import uuid4
 
 from app.config import get_settings
 from app.utils.metrics import metrics
 from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
 from redis.asyncio.connection import ConnectionPool
 from redis.exceptions import RedisError
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 
+# TieredCache 的 L1 失效广播频道
+INVALIDATION_CHANNEL = "cache:invalidate"
+# 订阅断开后的重连间隔
+_RESUBSCRIBE_SECONDS = 5.0
+
+# 值格式版本：键前缀 / 值头部不兼容变化时递增。新版本读写新的键，
+# 滚动发布期间新旧进程互不读取对方的条目（旧条目按各自 TTL 过期）
+CACHE_FORMAT_VERSION = 1
+_KEY_PREFIX = f"v{CACHE_FORMAT_VERSION}:"
+
+# 代数未变时写入值并递增代数（见 RedisCache.set_if_generation）
+_SET_IF_GENERATION_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[3])
+if ttl > 0 then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ttl)
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+redis.call('INCR', KEYS[2])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return 1
+"""
+
+# 值头部：序列化器代码、标志位、loader 耗时（秒）、逻辑过期时间（unix 秒，0 表示不过期）
+_HEADER = struct.Struct(">BBfd")
+_FLAG_ZLIB = 0x01
+# 压缩级别 1：缓存值以速度优先
+_ZLIB_LEVEL = 1
+
 
 def _default_serializer(value: Any) -> str:
     if hasattr(value, "isoformat"):
@@ -21,7 +75,129 @@ def _default_serializer(value: Any) -> str:
     return str(value)
 
 
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                value, default=_default_serializer, option=orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError:
+            # orjson 不支持的值（如超过 64 位的整数）回退到标准库
+            pass
+    return json.dumps(value, default=_default_serializer).encode()
+
+
+_json_loads: Callable[[bytes], Any] = orjson.loads if orjson is not None else json.loads
+
+
+@dataclass(frozen=True, slots=True)
+class CacheSerializer:
+    """值序列化器；code 写入值头部，读取时按 code 选择反序列化器"""
+
+    name: str
+    code: int
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+_SERIALIZERS: dict[str, CacheSerializer] = {}
+_SERIALIZERS_BY_CODE: dict[int, CacheSerializer] = {}
+
+
+def register_serializer(serializer: CacheSerializer) -> None:
+    _SERIALIZERS[serializer.name] = serializer
+    _SERIALIZERS_BY_CODE[serializer.code] = serializer
+
+
+def get_serializer(name: str) -> CacheSerializer:
+    """按名称取序列化器；未知或依赖未安装时回退到 json"""
+    serializer = _SERIALIZERS.get(name)
+    if serializer is None:
+        logger.warning("Cache serializer %r is not available, using json", name)
+        return _SERIALIZERS["json"]
+    return serializer
+
+
+register_serializer(CacheSerializer("json", 1, _json_dumps, _json_loads))
+if msgpack is not None:
+    register_serializer(
+        CacheSerializer(
+            "msgpack",
+            2,
+            lambda value: msgpack.packb(
+                value, default=_default_serializer, use_bin_type=True
+            ),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+        )
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class CacheEntry:
+    value: Any
+    # 生成该值的 loader 耗时（秒），普通 set 写入时为 0
+    delta: float = 0.0
+    expires_at: float = 0.0
+
+    def should_refresh(self, beta: float, now: float | None = None) -> bool:
+        """XFetch：now - delta * beta * ln(rand) >= expires_at 时提前刷新
+
+        越接近过期、loader 越慢，提前刷新的概率越高；各进程独立抽样，
+        通常只有少数请求在过期前重新加载。
+        """
+        if beta <= 0 or self.delta <= 0 or self.expires_at <= 0:
+            return False
+        now = time.time() if now is None else now
+        gap = -self.delta * beta * math.log(1.0 - random.random())
+        return now + gap >= self.expires_at
+
+
+def versioned_key(key: str) -> str:
+    return _KEY_PREFIX + key
+
+
+def encode_entry(
+    value: Any,
+    serializer: CacheSerializer,
+    *,
+    compress_min_bytes: int = 0,
+    delta: float = 0.0,
+    expires_at: float = 0.0,
+) -> bytes:
+    body = serializer.dumps(value)
+    flags = 0
+    if 0 < compress_min_bytes <= len(body):
+        compressed = zlib.compress(body, _ZLIB_LEVEL)
+        if len(compressed) < len(body):
+            body, flags = compressed, flags | _FLAG_ZLIB
+    return _HEADER.pack(serializer.code, flags, delta, expires_at) + body
+
+
+def decode_entry(raw: bytes) -> CacheEntry | None:
+    """解析值；头部不完整、序列化器未知或内容损坏时返回 None（按未命中处理）"""
+    if len(raw) < _HEADER.size:
+        return None
+    code, flags, delta, expires_at = _HEADER.unpack_from(raw)
+    serializer = _SERIALIZERS_BY_CODE.get(code)
+    if serializer is None:
+        return None
+    body = raw[_HEADER.size :]
+    try:
+        if flags & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        value = serializer.loads(body)
+    except (TypeError, ValueError, zlib.error):
+        return None
+    return CacheEntry(value, delta, expires_at)
+
+
 class RedisCache:
+    """Redis 值缓存
+
+    所有键（值操作与列表操作）都带格式版本前缀（见 CACHE_FORMAT_VERSION），
+    值为「头部 + 序列化内容」（见 encode_entry）；列表与 pub/sub 消息仍为 JSON。
+    """
+
     def __init__(self) -> None:
         settings = get_settings()
         self._enabled = bool(settings.redis_url)
@@ -29,6 +205,12 @@ class RedisCache:
         self._client: Redis | None = None
         self._pool: ConnectionPool | None = None
         self._loop: asyncio.AbstractEventLoop | None = None
+        self._serializer = get_serializer(settings.cache_serializer)
+        self._compress_min_bytes = settings.cache_compress_min_bytes
+        self._early_refresh_beta = settings.cache_early_refresh_beta
+        # get_or_load 进行中的加载（按事件循环隔离）
+        self._flights: dict[str, asyncio.Future[Any]] = {}
+        self._flights_loop: asyncio.AbstractEventLoop | None = None
 
     async def _ensure_client(self) -> Redis | None:
         if not self._enabled:
@@ -45,10 +227,11 @@ class RedisCache:
             except (RedisError, RuntimeError):
                 logger.debug("Redis close failed", exc_info=True)
 
+        # 值可能是压缩后的二进制，不在连接层解码
         self._pool = ConnectionPool.from_url(
             self._redis_url,
             max_connections=20,
-            decode_responses=True,
+            decode_responses=False,
             socket_connect_timeout=2,
             socket_timeout=2,
             health_check_interval=30,
@@ -58,37 +241,57 @@ class RedisCache:
         return self._client
 
     async def get(self, key: str) -> Any | None:
+        entry = await self._get_entry(key)
+        return entry.value if entry is not None else None
+
+    async def _get_entry(self, key: str) -> CacheEntry | None:
         client = await self._ensure_client()
         if not client:
             return None
         start = time.perf_counter()
         try:
-            value = await client.get(key)
+            raw = await client.get(versioned_key(key))
         except (RedisError, RuntimeError):
             logger.debug("Redis get failed", exc_info=True)
             metrics.record_cache_miss()
             return None
         finally:
             metrics.record_redis_command(time.perf_counter() - start, command="get")
-        if value is None:
-            metrics.record_cache_miss()
-            return None
-        try:
-            payload = json.loads(value)
-        except (TypeError, ValueError):
+        entry = decode_entry(raw) if isinstance(raw, bytes) else None
+        if entry is None:
             metrics.record_cache_miss()
             return None
         metrics.record_cache_hit()
-        return payload
+        return entry
 
-    async def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+    async def set(
+        self, key: str, value: Any, ttl: int | None = None, *, nx: bool = False
+    ) -> None:
+        """写入值；nx=True 时仅在键不存在时写入"""
+        await self._store(key, value, ttl, nx=nx)
+
+    async def _store(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None,
+        *,
+        nx: bool = False,
+        delta: float = 0.0,
+    ) -> None:
         client = await self._ensure_client()
         if not client:
             return
         start = time.perf_counter()
         try:
-            payload = json.dumps(value, default=_default_serializer)
-            await client.set(key, payload, ex=ttl)
+            payload = encode_entry(
+                value,
+                self._serializer,
+                compress_min_bytes=self._compress_min_bytes,
+                delta=delta,
+                expires_at=time.time() + ttl if ttl else 0.0,
+            )
+            await client.set(versioned_key(key), payload, ex=ttl, nx=nx)
         except (RedisError, RuntimeError):
             logger.debug("Redis set failed", exc_info=True)
         finally:
@@ -100,22 +303,329 @@ class RedisCache:
             return
         start = time.perf_counter()
         try:
-            await client.delete(key)
+            await client.delete(versioned_key(key))
         except (RedisError, RuntimeError):
             logger.debug("Redis delete failed", exc_info=True)
         finally:
             metrics.record_redis_command(time.perf_counter() - start, command="delete")
 
+    async def get_many(self, keys: Sequence[str]) -> list[Any | None]:
+        """一次 MGET 读取多个键，结果与 keys 一一对应（未命中为 None）"""
+        if not keys:
+            return []
+        client = await self._ensure_client()
+        if not client:
+            return [None] * len(keys)
+        start = time.perf_counter()
+        try:
+            raws = await client.mget([versioned_key(key) for key in keys])
+        except (RedisError, RuntimeError):
+            logger.debug("Redis mget failed", exc_info=True)
+            for _ in keys:
+                metrics.record_cache_miss()
+            return [None] * len(keys)
+        finally:
+            metrics.record_redis_command(time.perf_counter() - start, command="mget")
+        values: list[Any | None] = []
+        for raw in raws:
+            entry = decode_entry(raw) if isinstance(raw, bytes) else None
+            if entry is None:
+                metrics.record_cache_miss()
+                values.append(None)
+            else:
+                metrics.record_cache_hit()
+                values.append(entry.value)
+        return values
+
+    async def set_many(self, items: Mapping[str, tuple[Any, int | None]]) -> None:
+        """以一个 pipeline 写入多个键；items 为 key -> (value, ttl)"""
+        if not items:
+            return
+        client = await self._ensure_client()
+        if not client:
+            return
+        start = time.perf_counter()
+        try:
+            now = time.time()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, (value, ttl) in items.items():
+                    payload = encode_entry(
+                        value,
+                        self._serializer,
+                        compress_min_bytes=self._compress_min_bytes,
+                        expires_at=now + ttl if ttl else 0.0,
+                    )
+                    pipe.set(versioned_key(key), payload, ex=ttl)
+                await pipe.execute()
+        except (RedisError, RuntimeError):
+            logger.debug("Redis set many failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="set_many"
+            )
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """一条 DEL 删除多个键"""
+        names = [versioned_key(key) for key in keys]
+        if not names:
+            return
+        client = await self._ensure_client()
+        if not client:
+            return
+        start = time.perf_counter()
+        try:
+            await client.delete(*names)
+        except (RedisError, RuntimeError):
+            logger.debug("Redis delete many failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(time.perf_counter() - start, command="delete")
+
+    async def get_with_generation(
+        self, key: str, generation_key: str
+    ) -> tuple[Any | None, int | None]:
+        """在一个事务内读取值与代数计数（计数不存在时为 0，Redis 不可用时为 None）
+
+        代数用于防止丢失更新：读取后若有人调用 delete_and_bump，
+        持有旧代数的 set_if_generation 不再写入。
+        """
+        client = await self._ensure_client()
+        if not client:
+            return None, None
+        start = time.perf_counter()
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.get(versioned_key(key))
+                pipe.get(versioned_key(generation_key))
+                raw, raw_generation = await pipe.execute()
+            generation = int(raw_generation or 0)
+        except (RedisError, RuntimeError, ValueError):
+            logger.debug("Redis get with generation failed", exc_info=True)
+            metrics.record_cache_miss()
+            return None, None
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="get_with_generation"
+            )
+        entry = decode_entry(raw) if isinstance(raw, bytes) else None
+        if entry is None:
+            metrics.record_cache_miss()
+            return None, generation
+        metrics.record_cache_hit()
+        return entry.value, generation
+
+    async def set_if_generation(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | None,
+        *,
+        generation_key: str,
+        expected: int,
+    ) -> bool:
+        """代数仍为 expected 时写入值并递增代数（Lua 脚本原子执行），返回是否写入"""
+        client = await self._ensure_client()
+        if not client:
+            return False
+        start = time.perf_counter()
+        try:
+            payload = encode_entry(
+                value,
+                self._serializer,
+                compress_min_bytes=self._compress_min_bytes,
+                expires_at=time.time() + ttl if ttl else 0.0,
+            )
+            script = client.register_script(_SET_IF_GENERATION_LUA)
+            written = await script(
+                keys=[versioned_key(key), versioned_key(generation_key)],
+                args=[expected, payload, ttl or 0],
+            )
+        except (RedisError, RuntimeError):
+            logger.debug("Redis set if generation failed", exc_info=True)
+            return False
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="set_if_generation"
+            )
+        return bool(written)
+
+    async def delete_and_bump(
+        self, key: str, generation_key: str, ttl: int | None = None
+    ) -> None:
+        """删除值并递增代数（单个事务），使持有旧代数的 set_if_generation 失效"""
+        client = await self._ensure_client()
+        if not client:
+            return
+        start = time.perf_counter()
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(versioned_key(key))
+                pipe.incr(versioned_key(generation_key))
+                if ttl:
+                    pipe.expire(versioned_key(generation_key), ttl)
+                await pipe.execute()
+        except (RedisError, RuntimeError):
+            logger.debug("Redis delete and bump failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="delete_and_bump"
+            )
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int | None = None,
+    ) -> Any | None:
+        """读取缓存，未命中时调用 loader 并写回（loader 返回 None 时不缓存）
+
+        - 进程内 single-flight：同一键的并发未命中只执行一次 loader，其余调用等待其结果；
+        - 跨进程概率提前刷新（CacheEntry.should_refresh）：命中的请求可能在过期前
+          重新加载，本进程已有加载进行中时其余请求继续返回旧值。
+        Redis 不可用时仍合并并发加载，只是不缓存。
+        """
+        entry = await self._get_entry(key)
+        if entry is not None:
+            if key in self._inflight() or not entry.should_refresh(
+                self._early_refresh_beta
+            ):
+                return entry.value
+        return await self._load_once(key, loader, ttl)
+
+    def _inflight(self) -> dict[str, asyncio.Future[Any]]:
+        loop = asyncio.get_running_loop()
+        if self._flights_loop is not loop:
+            self._flights, self._flights_loop = {}, loop
+        return self._flights
+
+    async def _load_once(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int | None
+    ) -> Any | None:
+        flights = self._inflight()
+        pending = flights.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # 执行加载的请求被取消（如客户端断开），由本请求自行加载
+
+        # loader 在调用方自己的协程里执行（可以安全使用调用方的数据库会话）
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        flights[key] = future
+        try:
+            started = time.perf_counter()
+            value = await loader()
+            if value is not None:
+                await self._store(key, value, ttl, delta=time.perf_counter() - started)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # 没有等待者时不报告「exception was never retrieved」
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if flights.get(key) is future:
+                del flights[key]
+
+    async def list_range(self, key: str) -> list[Any] | None:
+        """读取整个列表，键不存在或 Redis 不可用时返回 None"""
+        client = await self._ensure_client()
+        if not client:
+            return None
+        start = time.perf_counter()
+        try:
+            values = await client.lrange(versioned_key(key), 0, -1)  # type: ignore[misc]
+        except (RedisError, RuntimeError):
+            logger.debug("Redis lrange failed", exc_info=True)
+            metrics.record_cache_miss()
+            return None
+        finally:
+            metrics.record_redis_command(time.perf_counter() - start, command="lrange")
+        if not values:
+            metrics.record_cache_miss()
+            return None
+        items: list[Any] = []
+        for value in values:
+            try:
+                items.append(json.loads(value))
+            except (TypeError, ValueError):
+                continue
+        metrics.record_cache_hit()
+        return items
+
+    async def list_replace(
+        self, key: str, values: list[Any], ttl: int | None = None
+    ) -> None:
+        """整体替换列表内容（单个事务内 DEL + RPUSH + EXPIRE）"""
+        client = await self._ensure_client()
+        if not client or not values:
+            return
+        start = time.perf_counter()
+        try:
+            payloads = [json.dumps(v, default=_default_serializer) for v in values]
+            name = versioned_key(key)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(name)
+                pipe.rpush(name, *payloads)
+                if ttl:
+                    pipe.expire(name, ttl)
+                await pipe.execute()
+        except (RedisError, RuntimeError):
+            logger.debug("Redis list replace failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="list_replace"
+            )
+
+    async def list_append(
+        self,
+        key: str,
+        values: list[Any],
+        *,
+        max_length: int,
+        ttl: int | None = None,
+    ) -> None:
+        """仅在列表已存在时追加（RPUSHX），并裁剪为最后 max_length 个元素
+
+        列表不存在说明缓存未加载或已过期，下次读取时会从数据库完整重建。
+        """
+        client = await self._ensure_client()
+        if not client or not values:
+            return
+        start = time.perf_counter()
+        try:
+            payloads = [json.dumps(v, default=_default_serializer) for v in values]
+            name = versioned_key(key)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.rpushx(name, *payloads)
+                pipe.ltrim(name, -max_length, -1)
+                if ttl:
+                    pipe.expire(name, ttl)
+                await pipe.execute()
+        except (RedisError, RuntimeError):
+            logger.debug("Redis list append failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(
+                time.perf_counter() - start, command="list_append"
+            )
+
     async def invalidate(self, pattern: str) -> None:
+        """删除匹配的键（pattern 不含版本前缀，支持 *）"""
         client = await self._ensure_client()
         if not client:
             return
         start = time.perf_counter()
         try:
             if "*" not in pattern:
-                await client.delete(pattern)
+                await client.delete(versioned_key(pattern))
                 return
-            keys = [key async for key in client.scan_iter(match=pattern)]
+            keys = [key async for key in client.scan_iter(match=versioned_key(pattern))]
             if keys:
                 await client.delete(*keys)
         except (RedisError, RuntimeError):
@@ -125,6 +635,28 @@ class RedisCache:
                 time.perf_counter() - start, command="invalidate"
             )
 
+    async def publish(self, channel: str, value: Any) -> None:
+        """以 JSON 发布 pub/sub 消息（无订阅者或 Redis 不可用时丢弃）"""
+        client = await self._ensure_client()
+        if not client:
+            return
+        start = time.perf_counter()
+        try:
+            await client.publish(
+                channel, json.dumps(value, default=_default_serializer)
+            )
+        except (RedisError, RuntimeError):
+            logger.debug("Redis publish failed", exc_info=True)
+        finally:
+            metrics.record_redis_command(time.perf_counter() - start, command="publish")
+
+    async def pubsub(self) -> PubSub | None:
+        """返回新的 PubSub（独占一个连接，由调用方 aclose）；Redis 未启用时返回 None"""
+        client = await self._ensure_client()
+        if not client:
+            return None
+        return client.pubsub(ignore_subscribe_messages=True)
+
     async def close(self) -> None:
         if not self._client:
             return
@@ -135,4 +667,294 @@ class RedisCache:
             logger.debug("Redis close failed", exc_info=True)
 
 
+@dataclass(slots=True)
+class _LocalEntry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+class LocalCache:
+    """进程内 LRU：每个键独立 TTL，条目数与近似内存（JSON 长度）双上限
+
+    只在单个事件循环内使用，不加锁。返回的是共享对象，调用方不得修改。
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self._entries: OrderedDict[str, _LocalEntry] = OrderedDict()
+        self._max_entries = max(max_entries, 1)
+        self._max_bytes = max(max_bytes, 1)
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> None:
+        self.pop(key)
+        if ttl <= 0 or size > self._max_bytes:
+            return
+        self._entries[key] = _LocalEntry(value, size, time.monotonic() + ttl)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+
+class ChannelSubscriber:
+    """后台订阅一个 Redis pub/sub 频道（消息为 JSON），断开后自动重连
+
+    connected 只在订阅生效期间为 True。断开时调用 on_reset：期间可能错过消息，
+    依赖这些消息保持一致的进程内缓存应清空，并在 connected 恢复前不再使用。
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        channel: str,
+        on_message: Callable[[Any], None],
+        on_reset: Callable[[], None],
+    ) -> None:
+        self._cache = cache
+        self._channel = channel
+        self._on_message = on_message
+        self._on_reset = on_reset
+        self._task: asyncio.Task[None] | None = None
+        self._connected = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._connected = False
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = await self._cache.pubsub()
+            if pubsub is None:
+                return
+            try:
+                await pubsub.subscribe(self._channel)
+                self._connected = True
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self._on_message(payload)
+            except (RedisError, RuntimeError, OSError):
+                logger.warning(
+                    "Redis subscription %s lost", self._channel, exc_info=True
+                )
+            finally:
+                self._connected = False
+                self._on_reset()
+                with contextlib.suppress(RedisError, RuntimeError, OSError):
+                    await pubsub.aclose()
+            await asyncio.sleep(_RESUBSCRIBE_SECONDS)
+
+
+class TieredCache:
+    """L1 进程内 LocalCache + L2 RedisCache（接口与 RedisCache 的值操作相同）
+
+    读：L1 命中直接返回；未命中读 Redis 并回填 L1（TTL 不超过 cache_local_ttl_seconds）。
+    写 / 删除：写 Redis、更新本进程 L1，并在 INVALIDATION_CHANNEL 广播键名（批量操作一条消息），
+    其他 worker 收到后丢弃对应 L1 条目。L1 只在订阅生效期间使用（见 start）。
+    """
+
+    def __init__(self, l2: RedisCache) -> None:
+        self._l2 = l2
+        self._local: LocalCache | None = None
+        self._local_ttl = 0.0
+        # 区分本进程发出的失效消息
+        self._origin = uuid4().hex
+        # 每次失效递增；回填前比较，避免并发读把失效前的旧值写回 L1
+        self._generation = 0
+        self._subscriber = ChannelSubscriber(
+            l2, INVALIDATION_CHANNEL, self._on_invalidate, self._on_reset
+        )
+
+    def _active_local(self) -> LocalCache | None:
+        return self._local if self._subscriber.connected else None
+
+    async def get(self, key: str) -> Any | None:
+        local = self._active_local()
+        value = self._local_get(local, key)
+        if value is not None:
+            return value
+        generation = self._generation
+        value = await self._l2.get(key)
+        self._backfill(local, generation, key, value, self._local_ttl)
+        return value
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int | None = None,
+    ) -> Any | None:
+        """L1 未命中时经 RedisCache.get_or_load（single-flight + 提前刷新）读取并回填 L1"""
+        local = self._active_local()
+        value = self._local_get(local, key)
+        if value is not None:
+            return value
+        generation = self._generation
+        value = await self._l2.get_or_load(key, loader, ttl)
+        local_ttl = min(ttl, self._local_ttl) if ttl else self._local_ttl
+        self._backfill(local, generation, key, value, local_ttl)
+        return value
+
+    async def get_many(self, keys: Sequence[str]) -> list[Any | None]:
+        """L1 未命中的键用一次 RedisCache.get_many 读取并回填 L1"""
+        local = self._active_local()
+        values = [self._local_get(local, key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if not missing:
+            return values
+        generation = self._generation
+        loaded = await self._l2.get_many([keys[index] for index in missing])
+        for index, value in zip(missing, loaded):
+            values[index] = value
+            self._backfill(local, generation, keys[index], value, self._local_ttl)
+        return values
+
+    async def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+        await self._l2.set(key, value, ttl=ttl)
+        self._put_local(key, value, ttl)
+        await self._publish([key])
+
+    async def set_many(self, items: Mapping[str, tuple[Any, int | None]]) -> None:
+        if not items:
+            return
+        await self._l2.set_many(items)
+        for key, (value, ttl) in items.items():
+            self._put_local(key, value, ttl)
+        await self._publish(list(items))
+
+    async def delete(self, key: str) -> None:
+        await self._l2.delete(key)
+        self._evict(key)
+        await self._publish([key])
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        names = list(keys)
+        if not names:
+            return
+        await self._l2.delete_many(names)
+        for key in names:
+            self._evict(key)
+        await self._publish(names)
+
+    async def start(self) -> None:
+        """启动失效订阅（应用启动时调用）；未启用 L1 时等同于直接使用 RedisCache"""
+        settings = get_settings()
+        if not settings.cache_local_enabled or settings.cache_local_ttl_seconds <= 0:
+            return
+        self._local = LocalCache(
+            settings.cache_local_max_entries, settings.cache_local_max_bytes
+        )
+        self._local_ttl = settings.cache_local_ttl_seconds
+        self._subscriber.start()
+
+    async def close(self) -> None:
+        await self._subscriber.close()
+        self._local = None
+
+    @staticmethod
+    def _local_get(local: LocalCache | None, key: str) -> Any | None:
+        if local is None:
+            return None
+        value = local.get(key)
+        if value is not None:
+            metrics.record_cache_hit(tier="l1")
+        else:
+            metrics.record_cache_miss(tier="l1")
+        return value
+
+    def _backfill(
+        self,
+        local: LocalCache | None,
+        generation: int,
+        key: str,
+        value: Any,
+        ttl: float,
+    ) -> None:
+        if value is not None and local is not None and generation == self._generation:
+            local.set(key, value, _payload_size(value), ttl)
+
+    def _evict(self, key: str) -> None:
+        self._generation += 1
+        if self._local is not None:
+            self._local.pop(key)
+
+    def _put_local(self, key: str, value: Any, ttl: int | None) -> None:
+        self._evict(key)
+        local = self._active_local()
+        if local is not None:
+            local_ttl = min(ttl, self._local_ttl) if ttl else self._local_ttl
+            local.set(key, value, _payload_size(value), local_ttl)
+
+    async def _publish(self, keys: list[str]) -> None:
+        # 未启动 L1 的进程（脚本、定时任务）也要通知各 worker
+        if not get_settings().cache_local_enabled:
+            return
+        await self._l2.publish(
+            INVALIDATION_CHANNEL, {"origin": self._origin, "keys": keys}
+        )
+
+    def _on_invalidate(self, payload: Any) -> None:
+        if not isinstance(payload, dict) or payload.get("origin") == self._origin:
+            return
+        keys = payload.get("keys")
+        if not isinstance(keys, list):
+            return
+        for key in keys:
+            self._evict(str(key))
+
+    def _on_reset(self) -> None:
+        self._generation += 1
+        if self._local is not None:
+            self._local.clear()
+
+
+def _payload_size(value: Any) -> int:
+    return len(_json_dumps(value))
+
+
 cache = RedisCache()
+tiered_cache = TieredCache(cache)
@@ -11,6 +11,7 @@ import json
 from typing import Any, AsyncGenerator
 
 from app.logging_config import get_logger
+from app.services.llm_resilience import LLMUnavailableError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = get_logger(__name__)
@@ -36,10 +37,24 @@ async def handle_sse_error(
         1. 回滚数据库事务
         2. 记录详细错误日志（包含堆栈跟踪和上下文）
         3. 返回通用错误码给客户端（不泄露内部细节）
+        4. LLM 熔断/并发已满时返回 LLM_UNAVAILABLE，客户端可稍后重试
     """
     # 回滚事务，防止连接状态不一致
     await db.rollback()
 
+    # 熔断/限流快速失败是预期行为，不记录堆栈，返回可重试的错误码
+    if isinstance(error, LLMUnavailableError):
+        logger.warning(
+            "sse_llm_unavailable",
+            provider=error.provider,
+            model=error.model,
+            reason=error.reason,
+            **context,
+        )
+        error_payload = json.dumps({"error": "LLM_UNAVAILABLE"})
+        yield f"event: error\ndata: {error_payload}\n\n"
+        return
+
     # 记录详细错误到日志（包含堆栈跟踪），用于服务器端排查
     logger.error(
         "sse_stream_error",
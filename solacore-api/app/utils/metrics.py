@@ -13,12 +13,20 @@ class MetricsRegistry:
             float
         )
         self._request_duration_count: dict[tuple[str, str, str], int] = defaultdict(int)
+        # cache_hits / cache_misses 只统计 Redis（L2），分层结果见 _cache_lookups
         self._cache_hits = 0
         self._cache_misses = 0
+        self._cache_lookups: dict[tuple[str, str], int] = defaultdict(int)
         self._db_query_duration_sum = 0.0
         self._db_query_duration_count = 0
         self._redis_command_duration_sum: dict[str, float] = defaultdict(float)
         self._redis_command_duration_count: dict[str, int] = defaultdict(int)
+        self._llm_ttft_sum: dict[str, float] = defaultdict(float)
+        self._llm_ttft_count: dict[str, int] = defaultdict(int)
+        self._llm_routing_events: dict[tuple[str, str], int] = defaultdict(int)
+        self._llm_prompt_tokens: dict[str, int] = defaultdict(int)
+        self._llm_prompt_cache_hit_tokens: dict[str, int] = defaultdict(int)
+        self._llm_prompt_cache_write_tokens: dict[str, int] = defaultdict(int)
 
     def record_request(
         self, duration_seconds: float, *, method: str, path: str, status_code: int
@@ -29,13 +37,18 @@ class MetricsRegistry:
             self._request_duration_sum[key] += max(duration_seconds, 0.0)
             self._request_duration_count[key] += 1
 
-    def record_cache_hit(self) -> None:
+    def record_cache_hit(self, *, tier: str = "l2") -> None:
+        """tier：l1 为进程内缓存，l2 为 Redis"""
         with self._lock:
-            self._cache_hits += 1
+            if tier == "l2":
+                self._cache_hits += 1
+            self._cache_lookups[(tier, "hit")] += 1
 
-    def record_cache_miss(self) -> None:
+    def record_cache_miss(self, *, tier: str = "l2") -> None:
         with self._lock:
-            self._cache_misses += 1
+            if tier == "l2":
+                self._cache_misses += 1
+            self._cache_lookups[(tier, "miss")] += 1
 
     def record_db_query(self, duration_seconds: float) -> None:
         with self._lock:
@@ -47,6 +60,28 @@ class MetricsRegistry:
             self._redis_command_duration_sum[command] += max(duration_seconds, 0.0)
             self._redis_command_duration_count[command] += 1
 
+    def record_llm_ttft(self, duration_seconds: float, *, provider: str) -> None:
+        with self._lock:
+            self._llm_ttft_sum[provider] += max(duration_seconds, 0.0)
+            self._llm_ttft_count[provider] += 1
+
+    def record_llm_routing_event(self, *, event: str, provider: str) -> None:
+        with self._lock:
+            self._llm_routing_events[(event, provider)] += 1
+
+    def record_llm_prompt_usage(
+        self,
+        *,
+        provider: str,
+        prompt_tokens: int,
+        cached_tokens: int,
+        cache_write_tokens: int = 0,
+    ) -> None:
+        with self._lock:
+            self._llm_prompt_tokens[provider] += max(prompt_tokens, 0)
+            self._llm_prompt_cache_hit_tokens[provider] += max(cached_tokens, 0)
+            self._llm_prompt_cache_write_tokens[provider] += max(cache_write_tokens, 0)
+
     def snapshot(self) -> dict[str, Any]:
         with self._lock:
             total_cache = self._cache_hits + self._cache_misses
@@ -68,12 +103,21 @@ class MetricsRegistry:
                 "cache_hits": self._cache_hits,
                 "cache_misses": self._cache_misses,
                 "cache_hit_rate": cache_hit_rate,
+                "cache_lookups": dict(self._cache_lookups),
                 "db_query_duration_sum": self._db_query_duration_sum,
                 "db_query_duration_count": self._db_query_duration_count,
                 "redis_command_duration_sum": dict(self._redis_command_duration_sum),
                 "redis_command_duration_count": dict(
                     self._redis_command_duration_count
                 ),
+                "llm_ttft_sum": dict(self._llm_ttft_sum),
+                "llm_ttft_count": dict(self._llm_ttft_count),
+                "llm_routing_events": dict(self._llm_routing_events),
+                "llm_prompt_tokens": dict(self._llm_prompt_tokens),
+                "llm_prompt_cache_hit_tokens": dict(self._llm_prompt_cache_hit_tokens),
+                "llm_prompt_cache_write_tokens": dict(
+                    self._llm_prompt_cache_write_tokens
+                ),
             }
 
 
@@ -83,6 +127,7 @@ def format_prometheus_metrics(
     active_sessions: int,
     active_users: int,
     db_pool: dict[str, Any] | None,
+    llm_providers: dict[tuple[str, str], dict[str, Any]] | None = None,
 ) -> str:
     request_count = int(snapshot.get("request_count", 0))
     request_duration = float(snapshot.get("request_duration", 0.0))
@@ -104,6 +149,11 @@ def format_prometheus_metrics(
     redis_command_duration_count: dict[str, int] = snapshot.get(
         "redis_command_duration_count", {}
     )
+    llm_ttft_sum: dict[str, float] = snapshot.get("llm_ttft_sum", {})
+    llm_ttft_count: dict[str, int] = snapshot.get("llm_ttft_count", {})
+    llm_routing_events: dict[tuple[str, str], int] = snapshot.get(
+        "llm_routing_events", {}
+    )
 
     lines = [
         "# HELP http_requests_total Total number of HTTP requests",
@@ -148,13 +198,13 @@ def format_prometheus_metrics(
             "# HELP active_users Current active users",
             "# TYPE active_users gauge",
             f"active_users {active_users}",
-            "# HELP cache_hits_total Cache hits",
+            "# HELP cache_hits_total Redis (L2) cache hits",
             "# TYPE cache_hits_total counter",
             f"cache_hits_total {cache_hits}",
-            "# HELP cache_misses_total Cache misses",
+            "# HELP cache_misses_total Redis (L2) cache misses",
             "# TYPE cache_misses_total counter",
             f"cache_misses_total {cache_misses}",
-            "# HELP cache_hit_rate Cache hit rate (0-1)",
+            "# HELP cache_hit_rate Redis (L2) cache hit rate (0-1)",
             "# TYPE cache_hit_rate gauge",
             f"cache_hit_rate {cache_hit_rate:.6f}",
             "# HELP db_query_duration_seconds_sum Total database query duration in seconds",
@@ -163,11 +213,27 @@ def format_prometheus_metrics(
             "# HELP db_query_duration_seconds_count Total database query count",
             "# TYPE db_query_duration_seconds_count counter",
             f"db_query_duration_seconds_count {db_query_duration_count}",
+        ]
+    )
+
+    cache_lookups: dict[tuple[str, str], int] = snapshot.get("cache_lookups", {})
+    if cache_lookups:
+        lines.extend(
+            [
+                "# HELP cache_lookups_total Cache lookups by tier (l1=in-process, l2=Redis)",
+                "# TYPE cache_lookups_total counter",
+            ]
+        )
+        for (tier, result), count in sorted(cache_lookups.items()):
+            labels = _format_labels({"tier": tier, "result": result})
+            lines.append(f"cache_lookups_total{labels} {count}")
+
+    lines.extend(
+        [
             "# HELP redis_command_duration_seconds_sum Total Redis command duration",
             "# TYPE redis_command_duration_seconds_sum counter",
         ]
     )
-
     for command, duration in sorted(redis_command_duration_sum.items()):
         labels = _format_labels({"command": command})
         lines.append(f"redis_command_duration_seconds_sum{labels} {duration:.6f}")
@@ -182,6 +248,91 @@ def format_prometheus_metrics(
         labels = _format_labels({"command": command})
         lines.append(f"redis_command_duration_seconds_count{labels} {count}")
 
+    if llm_ttft_count:
+        lines.extend(
+            [
+                "# HELP llm_ttft_seconds_sum Total LLM time to first token in seconds",
+                "# TYPE llm_ttft_seconds_sum counter",
+            ]
+        )
+        for provider, duration in sorted(llm_ttft_sum.items()):
+            labels = _format_labels({"provider": provider})
+            lines.append(f"llm_ttft_seconds_sum{labels} {duration:.6f}")
+        lines.extend(
+            [
+                "# HELP llm_ttft_seconds_count Total LLM streams that produced a token",
+                "# TYPE llm_ttft_seconds_count counter",
+            ]
+        )
+        for provider, count in sorted(llm_ttft_count.items()):
+            labels = _format_labels({"provider": provider})
+            lines.append(f"llm_ttft_seconds_count{labels} {count}")
+
+    if llm_routing_events:
+        lines.extend(
+            [
+                "# HELP llm_routing_events_total LLM hedge and failover events",
+                "# TYPE llm_routing_events_total counter",
+            ]
+        )
+        for (event, provider), count in sorted(llm_routing_events.items()):
+            labels = _format_labels({"event": event, "provider": provider})
+            lines.append(f"llm_routing_events_total{labels} {count}")
+
+    prompt_counters = (
+        ("llm_prompt_tokens_total", "LLM prompt tokens reported by providers"),
+        (
+            "llm_prompt_cache_hit_tokens_total",
+            "LLM prompt tokens served from the provider prompt cache",
+        ),
+        (
+            "llm_prompt_cache_write_tokens_total",
+            "LLM prompt tokens written to the provider prompt cache",
+        ),
+    )
+    for name, help_text in prompt_counters:
+        key = name.removesuffix("_total")
+        values: dict[str, int] = snapshot.get(key, {})
+        if not values:
+            continue
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter"])
+        for provider, count in sorted(values.items()):
+            labels = _format_labels({"provider": provider})
+            lines.append(f"{name}{labels} {count}")
+
+    if llm_providers:
+        gauges = (
+            (
+                "llm_circuit_state",
+                "LLM circuit breaker state (0=closed, 1=half_open, 2=open)",
+                "gauge",
+                lambda stats: stats["state_value"],
+            ),
+            (
+                "llm_concurrency_limit",
+                "Current adaptive LLM concurrency limit",
+                "gauge",
+                lambda stats: stats["limit"],
+            ),
+            (
+                "llm_concurrency_in_flight",
+                "In-flight LLM requests",
+                "gauge",
+                lambda stats: stats["in_flight"],
+            ),
+            (
+                "llm_rejected_total",
+                "LLM requests rejected by circuit breaker or concurrency limit",
+                "counter",
+                lambda stats: stats["rejected"],
+            ),
+        )
+        for name, help_text, metric_type, value in gauges:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"])
+            for (provider, model), stats in sorted(llm_providers.items()):
+                labels = _format_labels({"provider": provider, "model": model})
+                lines.append(f"{name}{labels} {value(stats)}")
+
     if db_pool:
         pool_size = db_pool.get("size")
         checked_out = db_pool.get("checked_out")
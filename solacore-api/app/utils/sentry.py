@@ -6,7 +6,7 @@ from typing import Any, Iterable
 
 import sentry_sdk
 from app.config import Settings
-from app.utils.security import decode_token
+from app.middleware.auth_context import get_auth_context
 from fastapi import FastAPI, Request
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from sentry_sdk.integrations.fastapi import FastApiIntegration
@@ -85,26 +85,7 @@ def _before_breadcrumb(
 
 
 def _extract_user_id(request: Request) -> str | None:
-    token = request.cookies.get("access_token")
-    if not token:
-        auth_header = request.headers.get("Authorization") or request.headers.get(
-            "authorization"
-        )
-        if auth_header:
-            token = (
-                auth_header.split(" ", 1)[1]
-                if auth_header.startswith("Bearer ")
-                else auth_header
-            )
-
-    if not token:
-        return None
-
-    payload = decode_token(token)
-    if not payload or payload.get("type") != "access":
-        return None
-
-    user_id = payload.get("sub")
+    user_id = get_auth_context(request).user_id
     return str(user_id) if user_id else None
 
 
@@ -0,0 +1,205 @@
+"""SSE 输出工具 - 合并上游 token 并定时刷新，空闲时发送心跳，监听客户端断开"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncGenerator, AsyncIterable
+
+from app.config import get_settings
+from fastapi import Request
+
+# SSE 注释帧，客户端会忽略，仅用于保持连接活跃（nginx / 移动网络空闲超时）
+SSE_HEARTBEAT = ": heartbeat\n\n"
+
+_QUEUE_SIZE = 256
+
+
+class _StreamEnd:
+    __slots__ = ()
+
+
+class _StreamFailure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+_END = _StreamEnd()
+
+
+class DisconnectWatcher:
+    """后台监听 ASGI receive 通道上的 http.disconnect
+
+    每个 SSE 流启动一个监听任务；客户端断开时立即置位 event，
+    coalesce_tokens 收到后会取消上游 LLM 流（连同提供商请求）。
+    用法：async with DisconnectWatcher(request) as watcher: ...
+    """
+
+    def __init__(self, request: Request) -> None:
+        self._receive = request.receive
+        self.event = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def disconnected(self) -> bool:
+        return self.event.is_set()
+
+    async def _watch(self) -> None:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self.event.set()
+                return
+
+    async def __aenter__(self) -> DisconnectWatcher:
+        self._task = asyncio.create_task(self._watch())
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await self._task
+        self._task = None
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterable[str],
+    *,
+    flush_interval: float,
+    max_bytes: int,
+    heartbeat_interval: float = 0.0,
+    stop: asyncio.Event | None = None,
+) -> AsyncGenerator[str | None, None]:
+    """合并 token 流
+
+    - 首个 token 立即输出，保证首字延迟不变；
+    - 之后缓冲的 token 在 flush_interval 秒或累计 max_bytes 字节时输出（先到先触发）；
+    - 超过 heartbeat_interval 秒没有任何输出时产出 None，调用方应发送 SSE_HEARTBEAT；
+    - 上游异常会在输出已缓冲的内容之后原样抛出；
+    - stop 被置位（客户端断开）时立即取消上游并结束，丢弃未发送的缓冲。
+
+    flush_interval <= 0 时不做合并，逐个透传 token（仍支持心跳）。
+    """
+    queue: asyncio.Queue[str | _StreamEnd | _StreamFailure] = asyncio.Queue(
+        maxsize=_QUEUE_SIZE
+    )
+
+    async def pump() -> None:
+        iterator = aiter(tokens)
+        try:
+            async for token in iterator:
+                await queue.put(token)
+        except Exception as exc:
+            await queue.put(_StreamFailure(exc))
+            return
+        finally:
+            # 在 queue.put 处被取消时上游生成器停在 yield，立即关闭以释放提供商响应
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await queue.put(_END)
+
+    pump_task = asyncio.create_task(pump())
+    stop_task = asyncio.ensure_future(stop.wait()) if stop is not None else None
+    buffer: list[str] = []
+    buffered_bytes = 0
+    flush_at = 0.0
+    last_output = time.monotonic()
+    first_token = True
+
+    try:
+        while True:
+            now = time.monotonic()
+            if buffer:
+                timeout: float | None = max(flush_at - now, 0.0)
+            elif heartbeat_interval > 0:
+                timeout = max(last_output + heartbeat_interval - now, 0.0)
+            else:
+                timeout = None
+
+            if stop is not None and stop.is_set():
+                return
+            if not queue.empty():
+                item = queue.get_nowait()
+            else:
+                getter = asyncio.ensure_future(queue.get())
+                waiters = {getter} if stop_task is None else {getter, stop_task}
+                try:
+                    await asyncio.wait(
+                        waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                except BaseException:
+                    getter.cancel()
+                    raise
+                if getter.done():
+                    item = getter.result()
+                else:
+                    getter.cancel()
+                    item = None
+
+            if stop is not None and stop.is_set():
+                return
+            if item is None:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    buffered_bytes = 0
+                else:
+                    yield None
+                last_output = time.monotonic()
+                continue
+
+            if isinstance(item, _StreamEnd):
+                break
+            if isinstance(item, _StreamFailure):
+                if buffer:
+                    yield "".join(buffer)
+                raise item.error
+            if not item:
+                continue
+
+            if first_token or flush_interval <= 0:
+                first_token = False
+                yield item
+                last_output = time.monotonic()
+                continue
+
+            if not buffer:
+                flush_at = time.monotonic() + flush_interval
+            buffer.append(item)
+            buffered_bytes += len(item.encode("utf-8"))
+            if buffered_bytes >= max_bytes:
+                yield "".join(buffer)
+                buffer.clear()
+                buffered_bytes = 0
+                last_output = time.monotonic()
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        for task in (pump_task, stop_task):
+            if task is not None and not task.done():
+                task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await pump_task
+
+
+def coalesce_llm_stream(
+    tokens: AsyncIterable[str],
+    watcher: DisconnectWatcher | None = None,
+) -> AsyncGenerator[str | None, None]:
+    """按应用配置合并 LLM token 流（Solve / Learn SSE 共用）"""
+    settings = get_settings()
+    return coalesce_tokens(
+        tokens,
+        flush_interval=settings.sse_flush_interval_ms / 1000,
+        max_bytes=settings.sse_flush_max_bytes,
+        heartbeat_interval=settings.sse_heartbeat_seconds,
+        stop=watcher.event if watcher is not None else None,
+    )
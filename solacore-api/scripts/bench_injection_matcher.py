@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+提示注入过滤微基准
+
+对比旧实现（10 个回溯正则依次 re.sub）与新实现（规范化 + 预筛 + Pike 虚拟机）
+在正常消息与对抗输入（长串 "!"、分隔符夹杂的 leet 变体等）上的耗时，
+按输入长度翻倍打印每字符耗时：新实现应基本恒定，旧实现随长度线性增长（整体平方级）。
+
+使用方法：
+    python scripts/bench_injection_matcher.py [--max-chars 16000] [--rounds 3]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.content_filter import (  # noqa: E402
+    DANGEROUS_PATTERNS,
+    normalize_content,
+    sanitize_user_input,
+)
+
+_LEGACY = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in DANGEROUS_PATTERNS]
+
+CASES = {
+    "normal": lambda n: ("hello world 我最近很焦虑 today I feel sad. " * n)[:n],
+    "bangs": lambda n: "!" * n,
+    "now-act+bangs": lambda n: "now act " + "!" * n,
+    "disregard+seps": lambda n: ("disregard " + "@$!_ " * n)[:n],
+    "split-leet": lambda n: ("1!g!n!0!r!3! pr3v!0u$ " * n)[:n],
+}
+
+
+def legacy_sanitize(content: str) -> str:
+    sanitized = normalize_content(content)
+    for regex in _LEGACY:
+        sanitized = regex.sub("", sanitized)
+    return re.sub(r"\s+", " ", sanitized).strip()
+
+
+def best_of(func, text: str, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-chars", type=int, default=16000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--legacy-max-chars",
+        type=int,
+        default=8000,
+        help="旧实现只测到该长度（平方级耗时增长很快）",
+    )
+    args = parser.parse_args()
+
+    print(f"{'case':<16} {'chars':>6} {'legacy':>12} {'matcher':>12} {'us/char':>8}")
+    for name, build in CASES.items():
+        size = 1000
+        while size <= args.max_chars:
+            text = build(size)
+            legacy = (
+                f"{best_of(legacy_sanitize, text, args.rounds) * 1000:9.2f} ms"
+                if size <= args.legacy_max_chars
+                else f"{'-':>12}"
+            )
+            new = best_of(sanitize_user_input, text, args.rounds)
+            print(
+                f"{name:<16} {size:>6} {legacy:>12} {new * 1000:9.2f} ms "
+                f"{new * 1e6 / size:8.3f}"
+            )
+            size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+危机 / 情绪关键词检测微基准
+
+对比旧路径（每条消息对 56 个未编译模式逐个 re.findall + 逐个 search 21 个危机正则）
+与新路径（关键词引擎：前缀自动机定位候选 + 预编译模式锚定匹配）在 4000 字符输入上的耗时。
+engine 分别调用 detect_emotion / detect_crisis，combined 为一次扫描同时得到两者。
+
+使用方法：
+    python scripts/bench_keyword_engine.py [--chars 4000] [--rounds 200]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.crisis_detector import (  # noqa: E402
+    CRISIS_KEYWORDS,
+    crisis_from_hits,
+    detect_crisis,
+)
+from app.services.emotion_detector import (  # noqa: E402
+    EMOTION_KEYWORDS,
+    detect_emotion,
+    emotion_from_hits,
+)
+from app.services.keyword_engine import detection_keywords  # noqa: E402
+
+WORDS = (
+    "I have been feeling worried about work and I don't know what should I do "
+    "最近工作压力很大 我有点焦虑 也很迷茫 but sometimes I feel peaceful and happy "
+    "my friend says it is a loss and I keep crying at night 今天还是不知道怎么办"
+).split(" ")
+
+
+def build_text(chars: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:chars]
+
+
+_LEGACY_CRISIS = [
+    re.compile(rf"\b{re.escape(keyword)}\b", flags=re.IGNORECASE)
+    for keywords in CRISIS_KEYWORDS.values()
+    for keyword in keywords
+]
+
+
+def legacy_path(text: str) -> int:
+    """旧实现：逐模式 findall + 逐个危机正则 search"""
+    text_lower = text.lower()
+    hits = 0
+    for patterns in EMOTION_KEYWORDS.values():
+        for pattern, _ in patterns:
+            hits += len(re.findall(pattern, text_lower, re.IGNORECASE))
+    for crisis in _LEGACY_CRISIS:
+        if crisis.search(text_lower):
+            hits += 1
+            break
+    return hits
+
+
+def engine_path(text: str) -> int:
+    detect_emotion(text)
+    detect_crisis(text)
+    return len(detection_keywords.scan(text, "emotion"))
+
+
+def combined_path(text: str) -> int:
+    hits = detection_keywords.scan(text)
+    emotion_from_hits(hits)
+    crisis_from_hits(hits)
+    return len(hits)
+
+
+def run(name: str, func, text: str, rounds: int) -> float:
+    best = float("inf")
+    result = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<8} {best * 1000:8.3f} ms  ({result} hits)")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    text = build_text(args.chars)
+    print(f"input: {len(text)} chars, rounds={args.rounds}")
+    legacy = run("legacy", legacy_path, text, args.rounds)
+    engine = run("engine", engine_path, text, args.rounds)
+    combined = run("combined", combined_path, text, args.rounds)
+    print(f"speedup  {legacy / engine:8.2f}x (combined {legacy / combined:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
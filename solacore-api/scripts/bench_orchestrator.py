@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Solve 编排端到端微基准
+
+用内存版 MemoryBankService（读写同样经过 profile 的 JSON 校验 / 序列化，只去掉数据库往返）
+驱动 OrchestratorService.handle_solve_message，按 receive -> clarify x3 -> reframe ->
+options -> commit 跑完整会话，统计每轮平均耗时。
+
+使用方法：
+    python scripts/bench_orchestrator.py [--sessions 300] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.solve_profile import SolveProfile  # noqa: E402
+from app.models.solve_session import SolveStep  # noqa: E402
+from app.schemas.orchestration import ProblemProfile, profile_to_json  # noqa: E402
+from app.services.memory_bank_service import (  # noqa: E402
+    MemoryBankService,
+    trim_profile,
+)
+from app.services.orchestrator_service import OrchestratorService  # noqa: E402
+
+TURNS = [
+    (SolveStep.RECEIVE, "最近工作压力很大，下周就要交付一个项目，我有点焦虑"),
+    (SolveStep.CLARIFY, "希望项目按时上线。标准是周五前通过验收；bug 少于 3 个"),
+    (SolveStep.CLARIFY, "时间只剩五天，人手不够，需求还在变"),
+    (SolveStep.CLARIFY, "试过加班，也试过和产品沟通砍需求，效果一般"),
+    (SolveStep.REFRAME, "对，我觉得主要是约束太多"),
+    (SolveStep.OPTIONS, "第二个方向听起来可行"),
+    (SolveStep.COMMIT, "今天先列出可控和不可控的事情"),
+]
+
+
+class InMemoryBank(MemoryBankService):
+    """profile 存在实体的 dict 中，读写路径与数据库版一致（校验 + 序列化）"""
+
+    def __init__(self) -> None:
+        self._profiles: dict[uuid.UUID, SolveProfile] = {}
+
+    async def get_or_create_profile(self, session_id, user_id):  # type: ignore[override]
+        entity = self._profiles.get(session_id)
+        if entity is None:
+            profile = ProblemProfile(session_id=session_id, user_id=user_id)
+            entity = SolveProfile(
+                session_id=session_id,
+                schema_version="v1",
+                profile=profile_to_json(profile),
+            )
+            self._profiles[session_id] = entity
+        return entity
+
+    async def save_profile(self, entity, profile):  # type: ignore[override]
+        trim_profile(profile)
+        entity.profile = profile_to_json(profile)
+
+
+async def run_sessions(count: int) -> tuple[float, int]:
+    service = OrchestratorService.__new__(OrchestratorService)
+    OrchestratorService.__init__(service, None)  # type: ignore[arg-type]
+    service._memory = InMemoryBank()
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        session = SimpleNamespace(id=uuid.uuid4(), user_id=uuid.uuid4())
+        for step, text in TURNS:
+            await service.handle_solve_message(session, text, step)  # type: ignore[arg-type]
+            turns += 1
+    return time.perf_counter() - start, turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run_sessions(20))  # 预热（关键词引擎、正则编译等）
+    best = float("inf")
+    turns = 0
+    for _ in range(args.rounds):
+        elapsed, turns = asyncio.run(run_sessions(args.sessions))
+        best = min(best, elapsed)
+    print(
+        f"sessions={args.sessions} turns={turns} "
+        f"total={best * 1000:.1f} ms per_turn={best * 1e6 / turns:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
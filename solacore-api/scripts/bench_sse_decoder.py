@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+提供商 SSE 解析微基准
+
+对比旧路径（aiter_lines + startswith/切片 + json.loads + 嵌套 .get）
+与新路径（aiter_bytes + SSEDecoder + 快速 JSON 后端）解析同一 OpenAI 流的耗时。
+
+使用方法：
+    python scripts/bench_sse_decoder.py [--tokens 2000] [--chunk-size 512] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator
+
+import httpx
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.sse_decoder import (  # noqa: E402
+    iter_sse_json,
+    json_loads,
+    openai_delta,
+)
+
+
+def build_stream(tokens: int) -> bytes:
+    """构造一个 OpenAI chat.completions 风格的 SSE 流"""
+    frames = []
+    for i in range(tokens):
+        payload = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {"index": 0, "delta": {"content": f"词{i} "}, "finish_reason": None}
+            ],
+        }
+        frames.append(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n")
+    frames.append("data: [DONE]\n\n")
+    return "".join(frames).encode()
+
+
+def make_response(raw: bytes, chunk_size: int) -> httpx.Response:
+    async def chunks() -> AsyncIterator[bytes]:
+        for start in range(0, len(raw), chunk_size):
+            yield raw[start : start + chunk_size]
+
+    return httpx.Response(200, content=chunks())
+
+
+async def legacy_path(response: httpx.Response) -> int:
+    count = 0
+    async for line in response.aiter_lines():
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            break
+        try:
+            payload = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        delta = payload.get("choices", [{}])[0].get("delta", {})
+        if delta.get("content"):
+            count += 1
+    return count
+
+
+async def decoder_path(response: httpx.Response) -> int:
+    count = 0
+    async for event in iter_sse_json(response.aiter_bytes()):
+        delta = openai_delta(event)
+        if delta is not None and delta.get("content"):
+            count += 1
+    return count
+
+
+async def run(name: str, parser, raw: bytes, chunk_size: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        response = make_response(raw, chunk_size)
+        start = time.perf_counter()
+        count = await parser(response)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<10} {best * 1000:8.2f} ms  ({count} tokens)")
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    raw = build_stream(args.tokens)
+    backend = getattr(json_loads, "__module__", "json")
+    print(f"stream: {len(raw)} bytes, chunk={args.chunk_size}B, json backend={backend}")
+    legacy = await run("legacy", legacy_path, raw, args.chunk_size, args.rounds)
+    decoder = await run("decoder", decoder_path, raw, args.chunk_size, args.rounds)
+    print(f"speedup    {legacy / decoder:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+本地 LLM 替身服务（压测 / 确定性基准用）
+
+按真实提供商的 SSE 协议流式返回固定文本，可配置首字延迟、吐字速度、
+错误注入和卡顿注入，让 /sessions/{id}/messages 与 /learn/{id}/messages
+的压测只衡量本服务自身，而不受上游波动和费用影响。
+
+路由：
+    POST /openai/v1/chat/completions      OpenAI Chat Completions
+    POST /openrouter/v1/chat/completions  OpenRouter（含 PROCESSING 注释帧与 usage）
+    POST /anthropic/v1/messages           Anthropic Messages
+    GET/HEAD 其他路径                      200（连接预热 / 健康检查）
+
+使用方法：
+    python scripts/fake_llm_server.py --port 8765 --ttft-ms 300 --tokens-per-second 40
+
+API 侧二选一：
+    LLM_PROVIDER=fake FAKE_LLM_BASE_URL=http://127.0.0.1:8765 FAKE_LLM_FORMAT=anthropic
+    或保留真实提供商，只覆盖地址：OPENAI_BASE_URL=http://127.0.0.1:8765/openai/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+WORDS = (
+    "Let's slow down and look at this together. "
+    "What feels most important to you right now, and what would a small, "
+    "realistic next step look like?"
+).split(" ")
+
+
+@dataclass
+class FakeLLMConfig:
+    """替身服务参数（所有概率取值 0-1）"""
+
+    ttft_ms: float = 300.0  # 首个 token 之前的等待
+    tokens_per_second: float = 40.0  # 0 表示不限速
+    tokens: int = 120  # 每次回复的 token 数
+    error_rate: float = 0.0  # 直接返回 error_status 的概率
+    error_status: int = 503
+    midstream_error_rate: float = 0.0  # 输出若干 token 后断开连接的概率
+    stall_rate: float = 0.0  # 在回复中途卡住 stall_seconds 的概率
+    stall_seconds: float = 30.0
+    seed: int | None = None
+
+
+class InjectedDisconnect(Exception):
+    """模拟上游在流中途断开"""
+
+
+@dataclass
+class _Plan:
+    stall_at: int
+    fail_at: int
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _prompt_tokens(body: dict) -> int:
+    text = json.dumps(body.get("messages", []), ensure_ascii=False)
+    text += str(body.get("system", ""))
+    return max(len(text) // 4, 1)
+
+
+def create_app(config: FakeLLMConfig) -> Starlette:
+    """构建替身服务 ASGI 应用（测试中可直接配合 httpx.ASGITransport 使用）"""
+    rng = random.Random(config.seed)
+
+    def plan() -> _Plan:
+        tokens = max(config.tokens, 1)
+        stall_at = tokens // 2 if rng.random() < config.stall_rate else -1
+        fail_at = -1
+        if rng.random() < config.midstream_error_rate:
+            fail_at = rng.randrange(1, tokens) if tokens > 1 else 0
+        return _Plan(stall_at=stall_at, fail_at=fail_at)
+
+    async def tokens(request_plan: _Plan) -> AsyncIterator[str]:
+        if config.ttft_ms > 0:
+            await asyncio.sleep(config.ttft_ms / 1000)
+        interval = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+        for index in range(max(config.tokens, 1)):
+            if index == request_plan.stall_at:
+                await asyncio.sleep(config.stall_seconds)
+            if index == request_plan.fail_at:
+                raise InjectedDisconnect("injected mid-stream disconnect")
+            if index and interval:
+                await asyncio.sleep(interval)
+            word = WORDS[index % len(WORDS)]
+            yield word if index == 0 else f" {word}"
+
+    def injected_error() -> Response | None:
+        if rng.random() >= config.error_rate:
+            return None
+        return JSONResponse(
+            {"error": {"type": "server_error", "message": "injected error"}},
+            status_code=config.error_status,
+        )
+
+    async def openai_frames(
+        body: dict, request_plan: _Plan, openrouter: bool
+    ) -> AsyncIterator[str]:
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-fake-{int(time.time() * 1000)}"
+        base = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+        }
+        if openrouter:
+            yield ": OPENROUTER PROCESSING\n\n"
+        yield _sse(
+            {
+                **base,
+                "choices": [
+                    {"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}
+                ],
+            }
+        )
+        count = 0
+        async for text in tokens(request_plan):
+            count += 1
+            yield _sse(
+                {
+                    **base,
+                    "choices": [
+                        {"index": 0, "delta": {"content": text}, "finish_reason": None}
+                    ],
+                }
+            )
+        final = {
+            **base,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        if openrouter or body.get("stream_options", {}).get("include_usage"):
+            final["usage"] = _usage(_prompt_tokens(body), count)
+        yield _sse(final)
+        yield "data: [DONE]\n\n"
+
+    async def anthropic_frames(body: dict, request_plan: _Plan) -> AsyncIterator[str]:
+        model = body.get("model", "fake")
+        prompt_tokens = _prompt_tokens(body)
+        yield _sse(
+            {
+                "type": "message_start",
+                "message": {
+                    "id": f"msg_fake_{int(time.time() * 1000)}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": model,
+                    "content": [],
+                    "stop_reason": None,
+                    "usage": {"input_tokens": prompt_tokens, "output_tokens": 1},
+                },
+            },
+            event="message_start",
+        )
+        yield _sse(
+            {
+                "type": "content_block_start",
+                "index": 0,
+                "content_block": {"type": "text", "text": ""},
+            },
+            event="content_block_start",
+        )
+        yield _sse({"type": "ping"}, event="ping")
+        count = 0
+        async for text in tokens(request_plan):
+            count += 1
+            yield _sse(
+                {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": text},
+                },
+                event="content_block_delta",
+            )
+        yield _sse(
+            {"type": "content_block_stop", "index": 0}, event="content_block_stop"
+        )
+        yield _sse(
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": count},
+            },
+            event="message_delta",
+        )
+        yield _sse({"type": "message_stop"}, event="message_stop")
+
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        error = injected_error()
+        if error is not None:
+            return error
+        openrouter = request.path_params["flavor"] == "openrouter"
+        return StreamingResponse(
+            openai_frames(body, plan(), openrouter),
+            media_type="text/event-stream",
+        )
+
+    async def messages(request: Request) -> Response:
+        body = await request.json()
+        error = injected_error()
+        if error is not None:
+            return error
+        return StreamingResponse(
+            anthropic_frames(body, plan()), media_type="text/event-stream"
+        )
+
+    async def ok(request: Request) -> Response:
+        return JSONResponse({"object": "list", "data": [{"id": "fake"}]})
+
+    return Starlette(
+        routes=[
+            Route(
+                "/{flavor:str}/v1/chat/completions", chat_completions, methods=["POST"]
+            ),
+            Route("/anthropic/v1/messages", messages, methods=["POST"]),
+            Route("/{path:path}", ok, methods=["GET", "HEAD"]),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 LLM 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--midstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeLLMConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        midstream_error_rate=args.midstream_error_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,7 @@ from uuid import uuid4
 
 import pytest
 from app.models.learn_session import LearnSession
-from app.routers.learn.utils import (
-    _build_context_prompt,
-    _generate_review_schedule,
-    _validate_session,
-)
+from app.routers.learn.utils import _generate_review_schedule, _validate_session
 from fastapi import HTTPException
 
 
@@ -48,39 +44,6 @@ def test_validate_session_raises_when_inactive():
     assert excinfo.value.detail == {"error": "SESSION_NOT_ACTIVE"}
 
 
-def test_build_context_prompt_returns_current_message_without_history():
-    # Arrange
-    history = []
-    message = "current"
-
-    # Act
-    result = _build_context_prompt(history, message)
-
-    # Assert
-    assert result == "current"
-
-
-def test_build_context_prompt_includes_recent_history_only():
-    # Arrange
-    history = [
-        {"role": "user", "content": f"u-{index}"}
-        if index % 2 == 0
-        else {"role": "assistant", "content": f"a-{index}"}
-        for index in range(7)
-    ]
-    message = "current"
-
-    # Act
-    result = _build_context_prompt(history, message)
-
-    # Assert
-    assert "u-0" not in result
-    assert "a-1" in result
-    assert "Assistant: a-1" in result
-    assert "User: u-2" in result
-    assert "Current message: current" in result
-
-
 def test_generate_review_schedule_uses_expected_offsets(monkeypatch):
     # Arrange
     fixed_now = datetime(2024, 1, 1, 12, 0, 0)
@@ -42,7 +42,9 @@ async def test_send_learn_message_success(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["Hello", " ", "World"]:
                 yield token
 
@@ -118,7 +120,9 @@ async def test_send_learn_message_first_message_sets_topic(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ok"]:
                 yield token
 
@@ -153,7 +157,9 @@ async def test_send_learn_message_long_topic_truncated(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ok"]:
                 yield token
 
@@ -190,7 +196,9 @@ async def test_send_learn_message_final_step_generates_review(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["x" * 60]:
                 yield token
 
@@ -238,7 +246,9 @@ async def test_send_learn_message_content_filtering(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ok"]:
                 yield token
 
@@ -288,7 +298,9 @@ async def test_send_learn_message_ai_service_error(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             raise RuntimeError("boom")
             if False:
                 yield ""
@@ -310,3 +322,52 @@ async def test_send_learn_message_ai_service_error(
 
     assert "event: error" in body
     assert "STREAM_ERROR" in body
+
+
+@pytest.mark.asyncio
+async def test_send_learn_message_uses_session_memory(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    captured: list[tuple[str, list]] = []
+
+    class FakeAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            captured.append((user_prompt, list(history or [])))
+            yield f"reply {len(captured)}"
+
+    monkeypatch.setattr("app.routers.learn.message.AIService", FakeAIService)
+    token = await _register_user(
+        client, "learn-message-memory@example.com", "learn-device-010"
+    )
+    session_id = await _create_learn_session(client, token, "learn-device-010")
+
+    for content in ("Teach me chess", "What about openings?"):
+        async with client.stream(
+            "POST",
+            f"/learn/{session_id}/messages",
+            json={"content": content, "step": "start"},
+            headers={"Authorization": f"Bearer {token}"},
+        ) as response:
+            assert response.status_code == 200
+            await response.aread()
+
+    assert captured[0] == ("Teach me chess", [])
+    assert captured[1] == (
+        "What about openings?",
+        [
+            {"role": "user", "content": "Teach me chess"},
+            {"role": "assistant", "content": "reply 1"},
+        ],
+    )
+
+    async with TestingSessionLocal() as session:
+        learn_session = await session.get(LearnSession, UUID(session_id))
+        assert learn_session is not None
+        assert [msg["content"] for msg in learn_session.memory["recent"]] == [
+            "Teach me chess",
+            "reply 1",
+            "What about openings?",
+            "reply 2",
+        ]
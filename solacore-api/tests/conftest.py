@@ -20,6 +20,7 @@ from app.database import Base, get_db  # noqa: E402
 from app.main import app  # noqa: E402
 from app.middleware.rate_limit import limiter  # noqa: E402
 from app.services import stripe_service  # noqa: E402
+from app.services.llm_resilience import llm_resilience  # noqa: E402
 from httpx import ASGITransport, AsyncClient  # noqa: E402
 from sqlalchemy.ext.asyncio import (  # noqa: E402
     AsyncSession,
@@ -91,6 +92,14 @@ async def _truncate_tables() -> None:
             await session.commit()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def _reset_llm_resilience() -> Generator[None, None, None]:
+    """Each test starts with closed LLM circuit breakers and default limits."""
+    llm_resilience.reset()
+    yield
+    llm_resilience.reset()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def _configure_payments(request) -> Generator[None, None, None]:
     """Ensure Stripe settings and stubs for subscription tests."""
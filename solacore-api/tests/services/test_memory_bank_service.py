@@ -4,7 +4,7 @@ MemoryBankService 单元测试
 覆盖函数：
 - get_or_create_profile: 获取或创建 profile（含并发场景）
 - load_profile: 加载 profile
-- save_profile: 保存 profile
+- save_profile: 保存 profile（只写有变化的顶层字段，列表字段按上限截断）
 """
 
 import asyncio
@@ -14,9 +14,15 @@ import pytest
 from app.models.solve_profile import SolveProfile
 from app.models.solve_session import SolveSession, SolveStep
 from app.models.user import User
-from app.schemas.orchestration import ProblemProfile
+from app.schemas.orchestration import (
+    PROFILE_LIST_LIMITS,
+    AgentName,
+    AgentRun,
+    ProblemProfile,
+    profile_to_json,
+)
 from app.services.memory_bank_service import MemoryBankService
-from sqlalchemy import select
+from sqlalchemy import select, text
 from tests.conftest import TestingSessionLocal
 
 
@@ -210,3 +216,120 @@ class TestSaveProfile:
 
             assert reloaded.core_concern_summary == "测试问题"
             assert "约束1" in reloaded.constraints
+
+    async def test_save_profile_only_writes_changed_fields(self):
+        async with TestingSessionLocal() as db:
+            user = User(email=f"test-{uuid4().hex}@example.com", password_hash="hash")
+            db.add(user)
+            await db.flush()
+
+            session = SolveSession(
+                user_id=user.id,
+                current_step=SolveStep.RECEIVE.value,
+                locale="zh-CN",
+            )
+            db.add(session)
+            await db.flush()
+
+            service = MemoryBankService(db)
+            profile_entity = await service.get_or_create_profile(session.id, user.id)
+            profile = service.load_profile(profile_entity)
+
+            # 另一个请求在此期间写入了 user_goal：未改动的字段不应被覆盖
+            await db.execute(
+                text(
+                    "UPDATE solve_profiles SET profile = jsonb_set("
+                    "profile, '{user_goal}', '\"并发写入\"') WHERE id = :id"
+                ),
+                {"id": profile_entity.id},
+            )
+
+            profile.core_concern_summary = "测试问题"
+            await service.save_profile(profile_entity, profile)
+            await db.commit()
+
+            row = (
+                await db.execute(
+                    select(SolveProfile.profile).where(
+                        SolveProfile.id == profile_entity.id
+                    )
+                )
+            ).scalar_one()
+            assert row["core_concern_summary"] == "测试问题"
+            assert row["user_goal"] == "并发写入"
+            assert profile_entity.profile["core_concern_summary"] == "测试问题"
+
+    async def test_save_profile_caps_list_fields(self):
+        async with TestingSessionLocal() as db:
+            user = User(email=f"test-{uuid4().hex}@example.com", password_hash="hash")
+            db.add(user)
+            await db.flush()
+
+            session = SolveSession(
+                user_id=user.id,
+                current_step=SolveStep.RECEIVE.value,
+                locale="zh-CN",
+            )
+            db.add(session)
+            await db.flush()
+
+            service = MemoryBankService(db)
+            profile_entity = await service.get_or_create_profile(session.id, user.id)
+            profile = service.load_profile(profile_entity)
+
+            for index in range(100):
+                profile.agent_runs.append(
+                    AgentRun(agent=AgentName.CLARIFY, latency_ms=index)
+                )
+                profile.last_questions.append(f"问题{index}")
+
+            profile_id = profile_entity.id
+            await service.save_profile(profile_entity, profile)
+            await db.commit()
+            db.expire_all()
+
+            result = await db.execute(
+                select(SolveProfile).where(SolveProfile.id == profile_id)
+            )
+            reloaded = service.load_profile(result.scalar_one())
+
+            limit = PROFILE_LIST_LIMITS["agent_runs"]
+            assert len(reloaded.agent_runs) == limit
+            assert reloaded.agent_runs[-1].latency_ms == 99
+            assert reloaded.agent_runs[0].latency_ms == 100 - limit
+            assert reloaded.last_questions == [
+                f"问题{index}"
+                for index in range(100 - PROFILE_LIST_LIMITS["last_questions"], 100)
+            ]
+
+    async def test_load_profile_trims_oversized_profile(self):
+        async with TestingSessionLocal() as db:
+            user = User(email=f"test-{uuid4().hex}@example.com", password_hash="hash")
+            db.add(user)
+            await db.flush()
+
+            session = SolveSession(
+                user_id=user.id,
+                current_step=SolveStep.RECEIVE.value,
+                locale="zh-CN",
+            )
+            db.add(session)
+            await db.flush()
+
+            oversized = ProblemProfile(
+                session_id=session.id,
+                user_id=user.id,
+                constraints=[f"约束{index}" for index in range(50)],
+            )
+            entity = SolveProfile(
+                session_id=session.id,
+                schema_version="v1",
+                profile=profile_to_json(oversized),
+            )
+            db.add(entity)
+            await db.flush()
+
+            loaded = MemoryBankService(db).load_profile(entity)
+
+            assert len(loaded.constraints) == PROFILE_LIST_LIMITS["constraints"]
+            assert loaded.constraints[-1] == "约束49"
@@ -6,11 +6,15 @@ OrchestratorService 单元测试
 - 状态机转换：RECEIVE -> CLARIFY -> REFRAME/OPTIONS -> COMMIT
 """
 
+import asyncio
+import time
 from uuid import uuid4
 
 import pytest
 from app.models.solve_session import SolveSession, SolveStep
 from app.models.user import User
+from app.schemas.orchestration import AgentName
+from app.services.orchestration_llm import LLMAgentRunner
 from app.services.orchestrator_service import OrchestratorService
 from tests.conftest import TestingSessionLocal
 
@@ -143,3 +147,94 @@ class TestOrchestratorProfilePersistence:
 
             assert decision1.profile.session_id == decision2.profile.session_id
             assert len(decision2.profile.agent_runs) > len(decision1.profile.agent_runs)
+
+
+class _ScriptedAI:
+    """按系统提示词区分主代理 / 次代理的假 AIService"""
+
+    def __init__(self, primary_delay: float = 0.0, summary_delay: float = 0.0):
+        self.primary_delay = primary_delay
+        self.summary_delay = summary_delay
+        self.summary_finished = asyncio.Event()
+
+    async def stream(self, system_prompt, user_prompt, history=None, route=None):
+        if "问题画像" in system_prompt.text:
+            await asyncio.sleep(self.summary_delay)
+            self.summary_finished.set()
+            yield "项目交付期临近，人手不足"
+            return
+        await asyncio.sleep(self.primary_delay)
+        yield "我听到了，"
+        yield "这周的交付让你很紧绷。"
+
+
+async def _new_session(db, step: SolveStep) -> SolveSession:
+    user = User(email=f"test-{uuid4().hex}@example.com", password_hash="hash")
+    db.add(user)
+    await db.flush()
+    session = SolveSession(user_id=user.id, current_step=step.value, locale="zh-CN")
+    db.add(session)
+    await db.flush()
+    return session
+
+
+@pytest.mark.asyncio
+class TestOrchestratorLLMAgents:
+    async def test_primary_streams_while_secondary_runs(self):
+        ai = _ScriptedAI(summary_delay=0.05)
+        async with TestingSessionLocal() as db:
+            session = await _new_session(db, SolveStep.RECEIVE)
+            turn = await OrchestratorService(db).start_solve_turn(
+                session,
+                "下周就要交付项目，我很焦虑",
+                SolveStep.RECEIVE,
+                runner=LLMAgentRunner(ai, timeout=1.0),
+            )
+            tokens = [token async for token in turn.tokens()]
+            assert tokens == ["我听到了，", "这周的交付让你很紧绷。"]
+            # 主代理输出结束时次代理仍在运行
+            assert not ai.summary_finished.is_set()
+
+            decision = await turn.finish()
+
+        assert decision.primary_agent == AgentName.EMPATH
+        assert decision.next_step == SolveStep.CLARIFY.value
+        assert decision.response_text == "我听到了，这周的交付让你很紧绷。"
+        assert decision.profile.core_concern_summary == "项目交付期临近，人手不足"
+        llm_runs = [
+            (run.agent, run.notes)
+            for run in decision.profile.agent_runs
+            if run.notes is not None
+        ]
+        assert llm_runs == [
+            (AgentName.EMPATH, "llm:ok"),
+            (AgentName.EMPATH, "llm:ok"),
+        ]
+        assert decision.profile.agent_runs[0].agent == AgentName.AUDITOR
+
+    async def test_timeouts_fall_back_to_rule_draft(self):
+        ai = _ScriptedAI(primary_delay=1.0, summary_delay=1.0)
+        async with TestingSessionLocal() as db:
+            session = await _new_session(db, SolveStep.CLARIFY)
+            baseline = await OrchestratorService(db).handle_solve_message(
+                await _new_session(db, SolveStep.CLARIFY),
+                "我想提升效率",
+                SolveStep.CLARIFY,
+            )
+            turn = await OrchestratorService(db).start_solve_turn(
+                session,
+                "我想提升效率",
+                SolveStep.CLARIFY,
+                runner=LLMAgentRunner(ai, timeout=0.05),
+            )
+            started = time.perf_counter()
+            tokens = [token async for token in turn.tokens()]
+            decision = await turn.finish()
+            elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.5
+        assert tokens == [baseline.response_text]
+        assert decision.response_text == baseline.response_text
+        assert decision.profile.core_concern_summary == "我想提升效率"
+        notes = [run.notes for run in decision.profile.agent_runs if run.notes]
+        assert notes == ["llm:fallback:timeout", "llm:timeout"]
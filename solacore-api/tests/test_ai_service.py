@@ -7,11 +7,15 @@ import app.services.ai_service as ai_module
 import httpx
 import pytest
 from app.services.ai_service import AIService
+from app.services.generation_routes import GenerationProfile
+from app.services.llm_resilience import LLMUnavailableError, llm_resilience
+from app.services.prompt_registry import PromptRegistry
+from app.utils.metrics import MetricsRegistry
 
 
 class FakeStreamResponse:
-    def __init__(self, lines: list[str]):
-        self._lines = lines
+    def __init__(self, events: list[str]):
+        self._events = events
 
     async def __aenter__(self):
         return self
@@ -22,23 +26,31 @@ class FakeStreamResponse:
     def raise_for_status(self):
         return None
 
-    async def aiter_lines(self):
-        for line in self._lines:
-            yield line
+    async def aiter_bytes(self):
+        for event in self._events:
+            yield f"{event}\n\n".encode()
 
 
 class FakeAsyncClient:
-    def __init__(self, lines: list[str]):
-        self._lines = lines
+    def __init__(self, events: list[str]):
+        self._events = events
+        self.requests: list[tuple[str, str]] = []
+        self.payloads: list[dict] = []
 
-    async def __aenter__(self):
-        return self
+    def stream(self, method, url, headers=None, json=None, timeout=None):
+        self.requests.append((method, url))
+        self.payloads.append(json)
+        return FakeStreamResponse(self._events)
 
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
 
-    def stream(self, method, url, headers=None, json=None):
-        return FakeStreamResponse(self._lines)
+class FakeClientRegistry:
+    def __init__(self, client: FakeAsyncClient):
+        self.client = client
+        self.providers: list[str] = []
+
+    async def get(self, provider: str):
+        self.providers.append(provider)
+        return self.client
 
 
 def _make_settings(**overrides):
@@ -47,6 +59,10 @@ def _make_settings(**overrides):
         "openai_api_key": "test-openai-key",
         "anthropic_api_key": "test-anthropic-key",
         "openrouter_api_key": "test-openrouter-key",
+        "openai_base_url": "https://api.openai.com/v1",
+        "anthropic_base_url": "https://api.anthropic.com/v1",
+        "fake_llm_base_url": "http://127.0.0.1:8765",
+        "fake_llm_format": "openai",
         "openrouter_base_url": "https://openrouter.ai/api/v1",
         "openrouter_app_name": "",
         "openrouter_referer": "",
@@ -54,6 +70,19 @@ def _make_settings(**overrides):
         "llm_model": "gpt-test",
         "llm_timeout": 1,
         "llm_max_tokens": 128,
+        "llm_fallback_providers": "",
+        "llm_fallback_models": "",
+        "llm_hedge_enabled": False,
+        "llm_hedge_percentile": 0.95,
+        "llm_hedge_initial_delay_ms": 2000,
+        "llm_hedge_min_delay_ms": 0,
+        "llm_breaker_failure_threshold": 5,
+        "llm_breaker_recovery_seconds": 30.0,
+        "llm_concurrency_initial": 20,
+        "llm_concurrency_min": 2,
+        "llm_concurrency_max": 100,
+        "llm_concurrency_backoff": 0.5,
+        "llm_prompt_cache_enabled": True,
     }
     defaults.update(overrides)
     return SimpleNamespace(**defaults)
@@ -83,11 +112,22 @@ def ai_service(ai_settings):
         ("openrouter", "_stream_openrouter"),
     ],
 )
-def test_get_stream_generator_routes(ai_service, provider, method_name, monkeypatch):
-    sentinel = object()
-    monkeypatch.setattr(ai_service, method_name, lambda *args, **kwargs: sentinel)
+@pytest.mark.asyncio
+async def test_get_stream_generator_routes(
+    ai_service, provider, method_name, monkeypatch
+):
+    async def provider_stream():
+        yield provider
+
+    monkeypatch.setattr(
+        ai_service, method_name, lambda *args, **kwargs: provider_stream()
+    )
     ai_service.provider = provider
-    assert ai_service._get_stream_generator("system", "user") is sentinel
+    result = await _collect(ai_service._get_stream_generator("system", "user"))
+    assert result == [provider]
+    snapshot = llm_resilience.snapshot()[(provider, "gpt-test")]
+    assert snapshot["state"] == "closed"
+    assert snapshot["in_flight"] == 0
 
 
 def test_get_stream_generator_rejects_unknown_provider(ai_service):
@@ -120,21 +160,21 @@ async def test_stream_retries_after_timeout(ai_service, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_stream_openai_parses_content(ai_service, monkeypatch):
+async def test_stream_openai_parses_content(ai_service):
     ai_service.settings.openai_api_key = "test-openai-key"
-    lines = [
-        "event: ping",
+    events = [
+        ": ping",
         'data: {"choices":[{"delta":{"content":"Hello"}}]}',
         "data: {invalid",
         "data: [DONE]",
+        'data: {"choices":[{"delta":{"content":"ignored"}}]}',
     ]
-    monkeypatch.setattr(
-        ai_module.httpx, "AsyncClient", lambda *args, **kwargs: FakeAsyncClient(lines)
-    )
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
 
     result = await _collect(ai_service._stream_openai("system", "user"))
 
     assert result == ["Hello"]
+    assert ai_service.clients.providers == ["openai"]
 
 
 @pytest.mark.asyncio
@@ -145,36 +185,427 @@ async def test_stream_openai_requires_api_key(ai_service):
 
 
 @pytest.mark.asyncio
-async def test_stream_openrouter_reasoning_fallback(ai_service, monkeypatch):
+async def test_stream_openrouter_reasoning_fallback(ai_service):
     ai_service.settings.openrouter_api_key = "test-openrouter-key"
     ai_service.settings.openrouter_base_url = "https://openrouter.ai/api/v1/"
     ai_service.settings.openrouter_reasoning_fallback = True
     ai_service.settings.enable_reasoning_output = True  # 必须开启才能输出 reasoning
-    lines = [
+    events = [
         'data: {"choices":[{"delta":{"reasoning":"Think"}}]}',
         'data: {"choices":[{"delta":{"reasoning":"ing"}}]}',
         "data: [DONE]",
     ]
-    monkeypatch.setattr(
-        ai_module.httpx, "AsyncClient", lambda *args, **kwargs: FakeAsyncClient(lines)
-    )
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
 
     result = await _collect(ai_service._stream_openrouter("system", "user"))
 
     assert result == ["Thinking"]
+    assert ai_service.clients.client.requests == [
+        ("POST", "https://openrouter.ai/api/v1/chat/completions")
+    ]
 
 
 @pytest.mark.asyncio
-async def test_stream_anthropic_parses_content(ai_service, monkeypatch):
+async def test_stream_anthropic_parses_content(ai_service):
     ai_service.settings.anthropic_api_key = "test-anthropic-key"
-    lines = [
-        'data: {"type":"content_block_delta","delta":{"text":"Hi"}}',
-        'data: {"type":"message_stop"}',
+    events = [
+        'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"text":"Hi"}}',
+        'event: message_stop\ndata: {"type":"message_stop"}',
     ]
-    monkeypatch.setattr(
-        ai_module.httpx, "AsyncClient", lambda *args, **kwargs: FakeAsyncClient(lines)
-    )
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
 
     result = await _collect(ai_service._stream_anthropic("system", "user"))
 
     assert result == ["Hi"]
+
+
+def _cached_system_prompt():
+    registry = PromptRegistry()
+    template = registry.register_template("tpl-1", "You are a coach.")
+    step = registry.register("solve:receive", "Current step: receive.")
+    return registry.compose((template, step))
+
+
+@pytest.mark.asyncio
+async def test_stream_anthropic_sends_cache_control_and_records_usage(
+    ai_service, monkeypatch
+):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(ai_module, "metrics", registry)
+    events = [
+        'event: message_start\ndata: {"type":"message_start","message":{"usage":'
+        '{"input_tokens":12,"cache_read_input_tokens":1500,'
+        '"cache_creation_input_tokens":0}}}',
+        'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"text":"Hi"}}',
+    ]
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+
+    result = await _collect(
+        ai_service._stream_anthropic(_cached_system_prompt(), "user")
+    )
+
+    assert result == ["Hi"]
+    system = ai_service.clients.client.payloads[0]["system"]
+    assert [block["text"] for block in system] == [
+        "You are a coach.",
+        "Current step: receive.",
+    ]
+    assert "cache_control" not in system[0]
+    assert system[1]["cache_control"] == {"type": "ephemeral"}
+    snapshot = registry.snapshot()
+    assert snapshot["llm_prompt_tokens"] == {"anthropic": 1512}
+    assert snapshot["llm_prompt_cache_hit_tokens"] == {"anthropic": 1500}
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_keeps_static_prefix_and_records_cached_tokens(
+    ai_service, monkeypatch
+):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(ai_module, "metrics", registry)
+    events = [
+        'data: {"choices":[{"delta":{"content":"Hi"}}]}',
+        'data: {"choices":[],"usage":{"prompt_tokens":2000,'
+        '"prompt_tokens_details":{"cached_tokens":1920}}}',
+        "data: [DONE]",
+    ]
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+    prompt = _cached_system_prompt()
+
+    assert await _collect(ai_service._stream_openai(prompt, "user")) == ["Hi"]
+
+    payload = ai_service.clients.client.payloads[0]
+    assert payload["messages"][0] == {"role": "system", "content": prompt.text}
+    assert payload["prompt_cache_key"] == prompt.cache_key
+    assert payload["stream_options"] == {"include_usage": True}
+    assert registry.snapshot()["llm_prompt_cache_hit_tokens"] == {"openai": 1920}
+
+
+def test_openrouter_payload_uses_cache_control_for_anthropic_models(ai_service):
+    prompt = _cached_system_prompt()
+
+    anthropic_payload = ai_service._get_openrouter_payload(
+        prompt, "user", "anthropic/claude-3.5-haiku"
+    )
+    openai_payload = ai_service._get_openrouter_payload(
+        prompt, "user", "openai/gpt-4o-mini"
+    )
+
+    assert anthropic_payload["messages"][0]["content"] == prompt.anthropic_blocks
+    assert openai_payload["messages"][0]["content"] == prompt.text
+    assert openai_payload["usage"] == {"include": True}
+
+
+def test_prompt_cache_can_be_disabled(ai_service):
+    ai_service.settings.llm_prompt_cache_enabled = False
+
+    payload = ai_service._get_openrouter_payload(
+        _cached_system_prompt(), "user", "anthropic/claude-3.5-haiku"
+    )
+
+    assert isinstance(payload["messages"][0]["content"], str)
+    assert "usage" not in payload
+
+
+HISTORY = [
+    {"role": "assistant", "content": "Welcome"},
+    {"role": "user", "content": "I feel stuck"},
+    {"role": "assistant", "content": "Tell me more"},
+]
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_history_as_role_messages(ai_service):
+    events = [
+        'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"text":"Hi"}}',
+    ]
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+
+    await _collect(ai_service._stream_anthropic("sys", "now", history=HISTORY))
+
+    # 开头的 assistant 消息被丢弃，保证以 user 开头
+    assert ai_service.clients.client.payloads[0]["messages"] == [
+        {"role": "user", "content": "I feel stuck"},
+        {"role": "assistant", "content": "Tell me more"},
+        {"role": "user", "content": "now"},
+    ]
+
+    payload = ai_service._get_openrouter_payload(
+        "sys", "now", "openai/gpt-4o-mini", HISTORY
+    )
+    assert [m["role"] for m in payload["messages"]] == [
+        "system",
+        "user",
+        "assistant",
+        "user",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_merges_consecutive_user_turns(ai_service):
+    events = ['data: {"choices":[{"delta":{"content":"Hi"}}]}', "data: [DONE]"]
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+    history = [{"role": "user", "content": "unanswered"}]
+
+    await _collect(ai_service._stream_openai("sys", "again", history=history))
+
+    assert ai_service.clients.client.payloads[0]["messages"][1:] == [
+        {"role": "user", "content": "unanswered\n\nagain"},
+    ]
+
+
+def _routed_service(monkeypatch, streams, **overrides):
+    settings = _make_settings(llm_fallback_providers="anthropic", **overrides)
+    with patch("app.services.ai_service.get_settings", return_value=settings):
+        service = AIService()
+    calls: list[tuple[str, str | None]] = []
+
+    def fake_generator(
+        system_prompt,
+        user_prompt,
+        provider=None,
+        model=None,
+        history=None,
+        generation=None,
+    ):
+        calls.append((provider, model))
+        return streams[provider]()
+
+    monkeypatch.setattr(service, "_get_stream_generator", fake_generator)
+    return service, calls
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_fails_over_without_retry_sleep(monkeypatch):
+    async def broken():
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        raise httpx.HTTPStatusError(
+            "503", request=request, response=httpx.Response(503, request=request)
+        )
+        yield  # pragma: no cover
+
+    async def healthy():
+        yield "from"
+        yield " anthropic"
+
+    service, calls = _routed_service(
+        monkeypatch,
+        {"openai": broken, "anthropic": healthy},
+        llm_fallback_models="anthropic=claude-test",
+    )
+    sleep_mock = AsyncMock()
+    monkeypatch.setattr(ai_module.asyncio, "sleep", sleep_mock)
+
+    result = await _collect(service.stream("system", "user"))
+
+    assert result == ["from", " anthropic"]
+    assert calls == [("openai", "gpt-test"), ("anthropic", "claude-test")]
+    sleep_mock.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_hedges_slow_primary_and_cancels_loser(monkeypatch):
+    import asyncio
+
+    primary_cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+            yield "slow"
+        finally:
+            primary_cancelled.set()
+
+    async def fast():
+        yield "hedged"
+
+    service, calls = _routed_service(
+        monkeypatch,
+        {"openai": slow, "anthropic": fast},
+        llm_hedge_enabled=True,
+        llm_hedge_initial_delay_ms=10,
+    )
+
+    result = await asyncio.wait_for(_collect(service.stream("system", "user")), 1)
+
+    assert result == ["hedged"]
+    assert [provider for provider, _ in calls] == ["openai", "anthropic"]
+    assert primary_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_fast_primary_skips_hedge(monkeypatch):
+    async def fast():
+        yield "primary"
+
+    async def unused():
+        yield "secondary"  # pragma: no cover
+
+    service, calls = _routed_service(
+        monkeypatch,
+        {"openai": fast, "anthropic": unused},
+        llm_hedge_enabled=True,
+        llm_hedge_initial_delay_ms=1000,
+    )
+
+    result = await _collect(service.stream("system", "user"))
+
+    assert result == ["primary"]
+    assert [provider for provider, _ in calls] == ["openai"]
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_raises_when_all_providers_fail(monkeypatch):
+    async def timeout():
+        raise httpx.ReadTimeout("timeout")
+        yield  # pragma: no cover
+
+    service, _ = _routed_service(monkeypatch, {"openai": timeout, "anthropic": timeout})
+
+    with pytest.raises(httpx.ReadTimeout):
+        await _collect(service.stream("system", "user"))
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_does_not_switch_after_first_token(monkeypatch):
+    async def partial():
+        yield "partial"
+        raise httpx.ReadError("reset")
+
+    async def unused():
+        yield "secondary"  # pragma: no cover
+
+    service, calls = _routed_service(
+        monkeypatch, {"openai": partial, "anthropic": unused}
+    )
+
+    received = []
+    with pytest.raises(httpx.ReadError):
+        async for token in service.stream("system", "user"):
+            received.append(token)
+
+    assert received == ["partial"]
+    assert [provider for provider, _ in calls] == ["openai"]
+
+
+def _trip_breaker(provider, settings):
+    guard = llm_resilience.guard(provider, "gpt-test", settings)
+    for _ in range(guard.breaker.failure_threshold):
+        guard.acquire()
+        guard.release(httpx.ConnectError("refused"))
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fast_fails_without_calling_provider(ai_service):
+    _trip_breaker("openai", ai_service.settings)
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient([]))
+
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        await _collect(ai_service.stream("system", "user"))
+
+    assert exc_info.value.reason == "circuit_open"
+    assert ai_service.clients.client.requests == []
+
+
+@pytest.mark.asyncio
+async def test_provider_errors_shrink_concurrency_limit(ai_service, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        raise httpx.HTTPStatusError(
+            "503", request=request, response=httpx.Response(503, request=request)
+        )
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(ai_service, "_stream_openai", unavailable)
+    monkeypatch.setattr(ai_module.asyncio, "sleep", AsyncMock())
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _collect(ai_service.stream("system", "user"))
+
+    snapshot = llm_resilience.snapshot()[("openai", "gpt-test")]
+    assert snapshot["state"] == "closed"
+    assert snapshot["limit"] == 2
+    assert snapshot["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_falls_back_when_breaker_open(monkeypatch):
+    async def unused(*args, **kwargs):
+        yield "primary"  # pragma: no cover
+
+    async def healthy(*args, **kwargs):
+        yield "fallback"
+
+    settings = _make_settings(llm_fallback_providers="anthropic")
+    with patch("app.services.ai_service.get_settings", return_value=settings):
+        service = AIService()
+    monkeypatch.setattr(service, "_stream_openai", unused)
+    monkeypatch.setattr(service, "_stream_anthropic", healthy)
+    _trip_breaker("openai", settings)
+
+    result = await _collect(service.stream("system", "user"))
+
+    assert result == ["fallback"]
+    assert llm_resilience.snapshot()[("openai", "gpt-test")]["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_route_sets_generation_budget_in_payload(ai_service, monkeypatch):
+    monkeypatch.setattr(
+        ai_module.generation_routes,
+        "resolve",
+        lambda route: GenerationProfile(max_tokens=42, temperature=0.3, stop=("##",)),
+    )
+    events = ['data: {"choices":[{"delta":{"content":"ok"}}]}', "data: [DONE]"]
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+
+    result = await _collect(ai_service.stream("system", "user", route="solve:receive"))
+
+    assert result == ["ok"]
+    payload = ai_service.clients.client.payloads[0]
+    assert payload["model"] == "gpt-test"
+    assert payload["max_tokens"] == 42
+    assert payload["temperature"] == 0.3
+    assert payload["stop"] == ["##"]
+
+
+@pytest.mark.asyncio
+async def test_anthropic_payload_uses_stop_sequences(ai_service):
+    events = ['event: message_stop\ndata: {"type":"message_stop"}']
+    ai_service.clients = FakeClientRegistry(FakeAsyncClient(events))
+
+    await _collect(
+        ai_service._stream_anthropic(
+            "system", "user", generation=GenerationProfile(stop=("END",))
+        )
+    )
+
+    payload = ai_service.clients.client.payloads[0]
+    assert payload["stop_sequences"] == ["END"]
+    assert payload["max_tokens"] == 128
+    assert "temperature" not in payload
+
+
+@pytest.mark.asyncio
+async def test_route_model_override_keeps_global_provider_as_fallback(monkeypatch):
+    async def broken():
+        raise httpx.ConnectError("down")
+        yield  # pragma: no cover
+
+    async def healthy():
+        yield "default"
+
+    service, calls = _routed_service(
+        monkeypatch, {"anthropic": broken, "openai": healthy}
+    )
+    monkeypatch.setattr(
+        ai_module.generation_routes,
+        "resolve",
+        lambda route: GenerationProfile(provider="anthropic", model="claude-fast"),
+    )
+    monkeypatch.setattr(ai_module.asyncio, "sleep", AsyncMock())
+
+    result = await _collect(service.stream("system", "user", route="solve:clarify"))
+
+    assert result == ["default"]
+    assert calls == [("anthropic", "claude-fast"), ("openai", "gpt-test")]
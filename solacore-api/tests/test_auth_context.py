@@ -0,0 +1,140 @@
+"""请求级认证上下文测试"""
+
+from datetime import timedelta
+from unittest.mock import patch
+from uuid import uuid4
+
+import app.middleware.auth_context as auth_context_module
+import pytest
+from app.middleware.auth_context import (
+    ANONYMOUS,
+    AuthContext,
+    AuthContextMiddleware,
+    build_auth_context,
+    get_auth_context,
+)
+from app.utils.security import create_access_token, create_refresh_token
+from httpx import AsyncClient
+from starlette.requests import HTTPConnection, Request
+
+
+def _connection(
+    *, headers: dict[str, str] | None = None, cookies: dict[str, str] | None = None
+) -> HTTPConnection:
+    raw = [
+        (key.lower().encode(), value.encode()) for key, value in (headers or {}).items()
+    ]
+    if cookies:
+        cookie_value = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        raw.append((b"cookie", cookie_value.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_no_token_is_anonymous() -> None:
+    assert build_auth_context(_connection()) is ANONYMOUS
+
+
+def test_header_token_takes_priority_over_cookie() -> None:
+    user_id, session_id = uuid4(), uuid4()
+    token = create_access_token(user_id, "a@example.com", session_id)
+    context = build_auth_context(
+        _connection(
+            headers={"Authorization": f"Bearer {token}"},
+            cookies={"access_token": "stale"},
+        )
+    )
+
+    assert context.token_source == "bearer"
+    assert context.user_id == user_id
+    assert context.session_id == session_id
+    assert context.expires_at is not None
+    assert context.authenticated
+
+
+def test_cookie_and_raw_header_sources() -> None:
+    token = create_access_token(uuid4(), "a@example.com", uuid4())
+
+    assert (
+        build_auth_context(_connection(cookies={"access_token": token})).token_source
+        == "cookie"
+    )
+    assert (
+        build_auth_context(_connection(headers={"Authorization": token})).token_source
+        == "header"
+    )
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not-a-jwt",
+        create_refresh_token(uuid4()),
+        create_access_token(uuid4(), "a@example.com", uuid4(), timedelta(seconds=-1)),
+    ],
+)
+def test_invalid_token_keeps_source_without_user(token: str) -> None:
+    context = build_auth_context(
+        _connection(headers={"Authorization": f"Bearer {token}"})
+    )
+
+    assert context == AuthContext(token_source="bearer")
+    assert not context.authenticated
+
+
+def test_bad_sid_leaves_session_empty() -> None:
+    user_id = uuid4()
+    with patch.object(
+        auth_context_module,
+        "decode_token",
+        return_value={"type": "access", "sub": str(user_id), "sid": "bad"},
+    ):
+        context = build_auth_context(_connection(cookies={"access_token": "token"}))
+
+    assert context.user_id == user_id
+    assert context.session_id is None
+
+
+def test_get_auth_context_decodes_once_per_request() -> None:
+    connection = _connection(cookies={"access_token": "token"})
+    with patch.object(auth_context_module, "decode_token", return_value=None) as decode:
+        first = get_auth_context(connection)
+        second = get_auth_context(connection)
+
+    assert first is second
+    decode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_middleware_stores_context_in_scope_state() -> None:
+    seen: dict = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope["state"])
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    await AuthContextMiddleware(app)(scope, None, None)  # type: ignore[arg-type]
+
+    assert seen["auth_context"] is ANONYMOUS
+
+
+@pytest.mark.asyncio
+async def test_authenticated_request_verifies_token_once(client: AsyncClient):
+    response = await client.post(
+        "/auth/register",
+        json={
+            "email": "auth-context@example.com",
+            "password": "Password123",
+            "device_fingerprint": "auth-context-device",
+        },
+    )
+    assert response.status_code == 201
+
+    with patch.object(
+        auth_context_module,
+        "decode_token",
+        wraps=auth_context_module.decode_token,
+    ) as decode:
+        me = await client.get("/auth/me")
+
+    assert me.status_code == 200
+    decode.assert_called_once()
@@ -99,3 +99,58 @@ async def test_cache_service_device_paths() -> None:
 
     await service.invalidate_device(device_id)
     fake_cache.delete.assert_awaited_once_with(f"device:{device_id}")
+
+
+@pytest.mark.asyncio
+async def test_cache_service_loaders_use_get_or_load() -> None:
+    fake_cache = MagicMock()
+    fake_cache.get_or_load = AsyncMock(return_value={"tier": "pro"})
+    service = CacheService(fake_cache)
+
+    async def loader():
+        return None
+
+    user_id = uuid4()
+    assert await service.load_subscription(user_id, loader) == {"tier": "pro"}
+    fake_cache.get_or_load.assert_awaited_with(
+        f"subscription:{user_id}", loader, ttl=SUBSCRIPTION_TTL_SECONDS
+    )
+
+    await service.load_sessions(user_id, loader)
+    fake_cache.get_or_load.assert_awaited_with(
+        f"sessions:{user_id}", loader, ttl=SESSIONS_TTL_SECONDS
+    )
+
+
+@pytest.mark.asyncio
+async def test_cache_service_batches_principal_and_account_keys() -> None:
+    fake_cache = MagicMock()
+    fake_cache.get_many = AsyncMock(return_value=[{"email": "a"}, None, None])
+    fake_cache.set_many = AsyncMock()
+    fake_cache.delete_many = AsyncMock()
+    service = CacheService(fake_cache)
+    user_id = uuid4()
+
+    user, subscription, device = await service.get_principal(user_id, "phone")
+    assert (user, subscription, device) == ({"email": "a"}, None, None)
+    fake_cache.get_many.assert_awaited_once_with(
+        [f"user:{user_id}", f"subscription:{user_id}", f"device:fp:{user_id}:phone"]
+    )
+
+    await service.set_principal(
+        user_id,
+        subscription={"tier": "free"},
+        device_fingerprint="phone",
+        device={"id": "d"},
+    )
+    fake_cache.set_many.assert_awaited_once_with(
+        {
+            f"subscription:{user_id}": ({"tier": "free"}, SUBSCRIPTION_TTL_SECONDS),
+            f"device:fp:{user_id}:phone": ({"id": "d"}, DEVICE_TTL_SECONDS),
+        }
+    )
+
+    await service.invalidate_account(user_id)
+    fake_cache.delete_many.assert_awaited_once_with(
+        [f"user:{user_id}", f"subscription:{user_id}", f"sessions:{user_id}"]
+    )
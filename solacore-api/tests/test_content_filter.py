@@ -1,6 +1,7 @@
 """Content filter tests for prompt injection attempts."""
 
-from app.services.content_filter import sanitize_user_input
+import pytest
+from app.services.content_filter import PII_RE, sanitize_user_input
 
 
 def test_ignore_previous_instructions():
@@ -52,3 +53,26 @@ def test_case_insensitive_bypass():
     lowered = sanitized.lower()
     assert "ignore previous instructions" not in lowered
     assert "reveal secrets" in lowered
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "The value of pi is 3.14159265358979 and years 1990-2000 2010.",
+        "2023-2024 学年",
+        "on 2024-01-15, 15.01.2024 or 12/25/2023",
+        "version 10.2.3.4567",
+    ],
+)
+def test_pii_regex_ignores_decimals_dates_and_year_ranges(text):
+    assert PII_RE.search(text) is None
+
+
+@pytest.mark.parametrize(
+    "phone",
+    ["+1 (555) 123-4567", "555-123-4567", "(555) 123-4567", "138 1234 5678"],
+)
+def test_pii_regex_matches_grouped_phone_numbers(phone):
+    match = PII_RE.search(f"call {phone} today")
+    assert match is not None
+    assert (match.lastgroup, match.group()) == ("phone", phone)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from app.config import get_settings
+from app.services.conversation_window import ConversationWindow
+
+
+class _FakeListCache:
+    """内存版 Redis 列表，语义与 RedisCache.list_* 一致"""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[Any]] = {}
+        self.deleted: list[str] = []
+
+    async def list_range(self, key: str) -> list[Any] | None:
+        return list(self.lists[key]) if self.lists.get(key) else None
+
+    async def list_replace(self, key: str, values: list[Any], ttl=None) -> None:
+        self.lists[key] = list(values)
+
+    async def list_append(self, key: str, values: list[Any], *, max_length, ttl=None):
+        if key in self.lists:
+            self.lists[key] = (self.lists[key] + list(values))[-max_length:]
+
+    async def delete(self, key: str) -> None:
+        self.deleted.append(key)
+        self.lists.pop(key, None)
+
+
+def _db_with_rows(rows: list[tuple[str, str]]) -> MagicMock:
+    result = MagicMock()
+    result.all.return_value = rows
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+@pytest.fixture
+def window_settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "solve_context_turns", 2)
+    monkeypatch.setattr(settings, "solve_context_message_chars", 20)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_load_miss_queries_once_and_populates_cache(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    session_id = uuid4()
+    # 查询按 created_at 倒序返回
+    db = _db_with_rows([("assistant", "a2"), ("user", "u2"), ("assistant", "a1")])
+
+    turns = await window.load(db, session_id)
+
+    assert turns == [
+        {"role": "assistant", "content": "a1"},
+        {"role": "user", "content": "u2"},
+        {"role": "assistant", "content": "a2"},
+    ]
+    db.execute.assert_awaited_once()
+    assert await window.load(db, session_id) == turns
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_empty_session_is_cached(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    session_id = uuid4()
+    db = _db_with_rows([])
+
+    assert await window.load(db, session_id) == []
+    assert await window.load(db, session_id) == []
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_append_trims_to_window_and_truncates(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    session_id = uuid4()
+    db = _db_with_rows([])
+    await window.load(db, session_id)
+
+    for index in range(3):
+        await window.append(session_id, "user", f"question {index}")
+        await window.append(session_id, "assistant", f"answer {index} " + "x" * 40)
+
+    turns = await window.load(db, session_id)
+    assert [turn["content"][:10] for turn in turns] == [
+        "question 1",
+        "answer 1 x",
+        "question 2",
+        "answer 2 x",
+    ]
+    assert all(len(turn["content"]) <= 20 for turn in turns)
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_append_without_loaded_window_is_skipped(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    session_id = uuid4()
+
+    await window.append(session_id, "user", "hello")
+
+    assert cache.lists == {}
+
+
+@pytest.mark.asyncio
+async def test_user_content_is_sanitized(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    db = _db_with_rows([("user", "mail a@b.com")])
+
+    turns = await window.load(db, uuid4())
+
+    assert "a@b.com" not in turns[0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_window_skips_cache_and_db(monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "solve_context_turns", 0)
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    db = _db_with_rows([("user", "hi")])
+
+    assert await window.load(db, uuid4()) == []
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_clear_deletes_key(window_settings) -> None:
+    cache = _FakeListCache()
+    window = ConversationWindow(cache)  # type: ignore[arg-type]
+    session_id = uuid4()
+
+    await window.clear(session_id)
+
+    assert cache.deleted == [f"solve:window:{session_id}"]
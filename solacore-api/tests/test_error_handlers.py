@@ -6,6 +6,7 @@ import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from app.services.llm_resilience import LLMUnavailableError
 from app.utils.error_handlers import handle_sse_error, log_and_sanitize_error
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -44,6 +45,26 @@ async def test_handle_sse_error_rollback_transaction():
     assert "Test database error" not in events[0]
 
 
+@pytest.mark.asyncio
+async def test_handle_sse_error_llm_unavailable():
+    """测试 LLM 熔断快速失败返回可重试错误码且不记录堆栈"""
+    db_mock = AsyncMock(spec=AsyncSession)
+    error = LLMUnavailableError("openai", "gpt-4o-mini", "circuit_open")
+
+    with patch("app.utils.error_handlers.logger") as logger_mock:
+        events = [
+            event
+            async for event in handle_sse_error(db_mock, error, {"session_id": "s"})
+        ]
+
+    db_mock.rollback.assert_awaited_once()
+    assert len(events) == 1
+    payload = json.loads(events[0].split("data: ", 1)[1])
+    assert payload == {"error": "LLM_UNAVAILABLE"}
+    logger_mock.error.assert_not_called()
+    logger_mock.warning.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_handle_sse_error_logs_context():
     """测试 SSE 错误处理时记录详细上下文"""
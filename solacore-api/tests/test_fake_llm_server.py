@@ -0,0 +1,131 @@
+"""Tests for the local fake LLM provider used in load tests."""
+
+import importlib.util
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import app.services.ai_service as ai_module
+import httpx
+import pytest
+from app.services.ai_service import AIService
+from app.services.llm_clients import provider_base_url
+
+_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "fake_llm_server.py"
+_spec = importlib.util.spec_from_file_location("fake_llm_server", _SCRIPT)
+assert _spec and _spec.loader
+fake_llm_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fake_llm_server)
+
+EXPECTED_TEXT = " ".join(fake_llm_server.WORDS[:5])
+
+
+class ASGIClientRegistry:
+    """把 AIService 的提供商客户端指向进程内的替身服务"""
+
+    def __init__(self, config) -> None:
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake_llm_server.create_app(config))
+        )
+
+    async def get(self, provider: str) -> httpx.AsyncClient:
+        return self.client
+
+
+def _make_settings(**overrides):
+    defaults = {
+        "llm_provider": "fake",
+        "openai_api_key": "",
+        "anthropic_api_key": "",
+        "openrouter_api_key": "",
+        "openai_base_url": "https://api.openai.com/v1",
+        "anthropic_base_url": "https://api.anthropic.com/v1",
+        "openrouter_base_url": "https://openrouter.ai/api/v1",
+        "openrouter_app_name": "",
+        "openrouter_referer": "",
+        "openrouter_reasoning_fallback": False,
+        "enable_reasoning_output": False,
+        "fake_llm_base_url": "http://fake-llm",
+        "fake_llm_format": "openai",
+        "llm_model": "fake-model",
+        "llm_timeout": 5,
+        "llm_max_tokens": 64,
+        "llm_fallback_providers": "",
+        "llm_fallback_models": "",
+        "llm_hedge_enabled": False,
+        "llm_breaker_failure_threshold": 5,
+        "llm_breaker_recovery_seconds": 30.0,
+        "llm_concurrency_initial": 20,
+        "llm_concurrency_min": 2,
+        "llm_concurrency_max": 100,
+        "llm_concurrency_backoff": 0.5,
+        "llm_prompt_cache_enabled": True,
+    }
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def _service(settings, **config) -> AIService:
+    defaults = {"ttft_ms": 0, "tokens_per_second": 0, "tokens": 5, "seed": 1}
+    defaults.update(config)
+    with patch("app.services.ai_service.get_settings", return_value=settings):
+        return AIService(
+            clients=ASGIClientRegistry(fake_llm_server.FakeLLMConfig(**defaults))
+        )
+
+
+async def _collect(service: AIService) -> str:
+    return "".join([token async for token in service.stream("system", "user")])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("wire_format", ["openai", "anthropic", "openrouter"])
+async def test_fake_provider_streams_each_wire_format(wire_format):
+    service = _service(_make_settings(fake_llm_format=wire_format))
+    assert await _collect(service) == EXPECTED_TEXT
+
+
+@pytest.mark.asyncio
+async def test_real_provider_can_target_fake_server_via_base_url():
+    settings = _make_settings(
+        llm_provider="anthropic",
+        anthropic_api_key="test-key",
+        anthropic_base_url="http://fake-llm/anthropic/v1/",
+    )
+    assert await _collect(_service(settings)) == EXPECTED_TEXT
+
+
+@pytest.mark.asyncio
+async def test_fake_server_injects_http_errors(monkeypatch):
+    monkeypatch.setattr(ai_module.asyncio, "sleep", AsyncMock())
+    service = _service(_make_settings(), error_rate=1.0, error_status=429)
+
+    with pytest.raises(httpx.HTTPStatusError) as exc_info:
+        await _collect(service)
+
+    assert exc_info.value.response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_fake_server_injects_midstream_disconnect():
+    service = _service(_make_settings(), midstream_error_rate=1.0)
+
+    with pytest.raises(fake_llm_server.InjectedDisconnect):
+        await _collect(service)
+
+
+@pytest.mark.asyncio
+async def test_fake_server_applies_ttft_and_stall():
+    service = _service(_make_settings(), ttft_ms=20, stall_rate=1.0, stall_seconds=0.03)
+
+    started = time.monotonic()
+    assert await _collect(service) == EXPECTED_TEXT
+    assert time.monotonic() - started >= 0.05
+
+
+def test_fake_provider_base_url_uses_wire_format():
+    settings = _make_settings(
+        fake_llm_base_url="http://127.0.0.1:8765/", fake_llm_format="anthropic"
+    )
+    assert provider_base_url("fake", settings) == "http://127.0.0.1:8765/anthropic/v1"
@@ -0,0 +1,111 @@
+"""按步骤的模型路由与生成预算"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import app.services.generation_routes as routes_module
+import pytest
+from app.services.generation_routes import (
+    DEFAULT_PROFILE,
+    GenerationProfile,
+    GenerationRoutes,
+    builtin_routes,
+)
+
+
+def _settings(**overrides):
+    defaults = {
+        "llm_max_tokens": 1000,
+        "llm_fast_model": "",
+        "llm_routing_table_path": "",
+        "llm_routing_reload_seconds": 0.0,
+    }
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    settings = _settings()
+    monkeypatch.setattr(routes_module, "get_settings", lambda: settings)
+    return GenerationRoutes(), settings
+
+
+def test_builtin_budgets_are_capped_by_global_max_tokens():
+    table = builtin_routes(_settings(llm_max_tokens=500))
+
+    assert table["solve:receive"].max_tokens == 300
+    assert table["solve:options"].max_tokens == 500
+    assert table["agent:summary"].temperature == 0.2
+    assert not table["solve:options"].overrides_model
+
+
+def test_fast_model_applies_to_short_steps_only():
+    table = builtin_routes(_settings(llm_fast_model="gpt-mini"))
+
+    assert table["solve:clarify"].model == "gpt-mini"
+    assert table["agent:summary"].model == "gpt-mini"
+    assert table["solve:options"].model is None
+
+
+def test_unknown_or_missing_route_uses_default(routes):
+    table, _ = routes
+
+    assert table.resolve(None) is DEFAULT_PROFILE
+    assert table.resolve("solve:unknown") is DEFAULT_PROFILE
+
+
+def test_file_overrides_merge_and_hot_reload(routes, tmp_path):
+    table, settings = routes
+    path = tmp_path / "routes.json"
+    path.write_text(
+        json.dumps(
+            {
+                "solve:options": {"model": "gpt-big", "temperature": 0.7},
+                "learn_tool:custom": {"provider": "anthropic", "stop": ["###"]},
+            }
+        )
+    )
+    settings.llm_routing_table_path = str(path)
+
+    options = table.resolve("solve:options")
+    assert options == GenerationProfile(
+        model="gpt-big", max_tokens=800, temperature=0.7
+    )
+    assert table.resolve("learn_tool:custom").stop == ("###",)
+
+    path.write_text(json.dumps({"solve:options": {"max_tokens": 64}}))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert table.resolve("solve:options") == GenerationProfile(max_tokens=64)
+    assert table.resolve("learn_tool:custom") is DEFAULT_PROFILE
+
+
+def test_invalid_file_keeps_previous_table(routes, tmp_path):
+    table, settings = routes
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"solve:commit": {"model": "gpt-a"}}))
+    settings.llm_routing_table_path = str(path)
+    assert table.resolve("solve:commit").model == "gpt-a"
+
+    path.write_text(json.dumps({"solve:commit": {"max_tokens": 0, "bogus": 1}}))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert table.resolve("solve:commit").model == "gpt-a"
+
+
+def test_reload_interval_skips_file_checks(routes, tmp_path):
+    table, settings = routes
+    settings.llm_routing_reload_seconds = 3600.0
+    assert table.resolve("solve:commit").model is None
+
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"solve:commit": {"model": "gpt-a"}}))
+    settings.llm_routing_table_path = str(path)
+    assert table.resolve("solve:commit").model is None
+
+    table.reset()
+    assert table.resolve("solve:commit").model == "gpt-a"
@@ -0,0 +1,73 @@
+"""增量 JSON 解析测试 - 分块方式不影响结果，对象一闭合就产出"""
+
+import json
+import random
+
+import pytest
+from app.services.json_stream import IncrementalJSONParser
+
+DOCUMENT = {
+    "reframe": '如何在"人手不足"的前提下\\按时交付？',
+    "options": [
+        {"title": "切分", "pros": ["快"], "cons": [], "weight": 0.5},
+        {"title": "实验", "nested": {"deep": [1, {"x": None}]}, "ok": True},
+    ],
+    "question": {"prompt": "你更倾向哪个？", "allow_unknown": False},
+    "empty": [],
+}
+TEXT = (
+    "好的，以下是结果：\n```json\n"
+    + json.dumps(DOCUMENT, ensure_ascii=False, indent=2)
+    + "\n```\n希望有帮助"
+)
+
+
+def _feed_randomly(text: str, rng: random.Random):
+    parser = IncrementalJSONParser()
+    values = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 9)
+        values.extend(parser.feed(text[position : position + size]))
+        position += size
+    return parser, values
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunking_does_not_change_values(seed):
+    parser, values = _feed_randomly(TEXT, random.Random(seed))
+
+    assert parser.done
+    assert values == [
+        (("reframe",), DOCUMENT["reframe"]),
+        (("options", 0), DOCUMENT["options"][0]),
+        (("options", 1), DOCUMENT["options"][1]),
+        (("question",), DOCUMENT["question"]),
+    ]
+
+
+def test_object_is_emitted_as_soon_as_it_closes():
+    parser = IncrementalJSONParser()
+    head = '{"options": [{"title": "A"}'
+
+    assert parser.feed(head[:-1]) == []
+    assert parser.feed(head[-1]) == [(("options", 0), {"title": "A"})]
+    assert parser.feed(', {"title": "B"') == []
+    assert parser.feed("}]}") == [(("options", 1), {"title": "B"})]
+    assert parser.done
+
+
+def test_scanned_prefix_is_discarded():
+    parser = IncrementalJSONParser()
+    parser.feed('{"options": [')
+    for index in range(200):
+        parser.feed(json.dumps({"title": f"option {index}" * 5}) + ",")
+
+    # 已产出的元素不再保留原文
+    assert len(parser._text) < 100
+
+
+def test_mismatched_brackets_raise():
+    parser = IncrementalJSONParser()
+    with pytest.raises(ValueError):
+        parser.feed('{"options": [1}')
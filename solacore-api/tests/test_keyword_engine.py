@@ -0,0 +1,206 @@
+"""关键词引擎测试 - 与逐模式匹配的旧实现逐条对比"""
+
+import random
+import re
+from collections import Counter
+
+from app.services.crisis_detector import (
+    CRISIS_CATEGORY,
+    CRISIS_KEYWORDS,
+    CRISIS_RESOURCES,
+    CrisisCheckResult,
+    crisis_from_hits,
+    detect_crisis,
+)
+from app.services.emotion_detector import (
+    EMOTION_CATEGORY,
+    EMOTION_KEYWORDS,
+    MIN_CONFIDENCE_THRESHOLD,
+    EmotionResult,
+    EmotionType,
+    detect_emotion,
+    emotion_from_hits,
+)
+from app.services.keyword_engine import KeywordEngine, detection_keywords
+
+PHRASES = [
+    "worried",
+    "worry",
+    "scared",
+    "panicking",
+    "stressful",
+    "anxiety",
+    "freaking out",
+    "can't breathe",
+    "cant calm down",
+    "preocupada",
+    "ansiedad",
+    "焦虑",
+    "担心",
+    "紧张",
+    "sad",
+    "depression",
+    "hopeless",
+    "crying",
+    "lonely",
+    "loss",
+    "hurting",
+    "heartbroken",
+    "triste",
+    "难过",
+    "沮丧",
+    "peaceful",
+    "relaxing",
+    "contented",
+    "happy",
+    "tranquila",
+    "平静",
+    "快乐",
+    "confusing",
+    "lost",
+    "don't understand",
+    "what should i do",
+    "i don't know",
+    "no entiendo",
+    "困惑",
+    "不知道",
+    "迷茫",
+    "suicide",
+    "kill myself",
+    "end my life",
+    "want to die",
+    "self-harm",
+    "hurt myself",
+    "cutting myself",
+    "better off dead",
+    "can't go on",
+    "quiero morir",
+    "autolesión",
+    "no puedo seguir",
+]
+FILLER = ["I", "feel", "today", "work", "我", "今天", "really", "so", "and", "x"]
+SEPARATORS = [" ", ", ", ". ", "! ", "", "\n", "-"]
+
+
+def _legacy_emotion(text: str) -> EmotionResult:
+    if not text or not text.strip():
+        return EmotionResult(emotion=EmotionType.NEUTRAL, confidence=0.5)
+    text_lower = text.lower()
+    scores = {}
+    for emotion, patterns in EMOTION_KEYWORDS.items():
+        total_weight = 0.0
+        match_count = 0
+        for pattern, weight in patterns:
+            matches = re.findall(pattern, text_lower, re.IGNORECASE)
+            if matches:
+                match_count += len(matches)
+                total_weight += weight * len(matches)
+        if match_count > 0:
+            avg_weight = total_weight / match_count
+            scores[emotion] = min(avg_weight * (1 + 0.1 * (match_count - 1)), 1.0)
+    if not scores:
+        return EmotionResult(emotion=EmotionType.NEUTRAL, confidence=0.5)
+    best = max(scores, key=lambda e: scores[e])
+    if scores[best] < MIN_CONFIDENCE_THRESHOLD:
+        return EmotionResult(emotion=EmotionType.NEUTRAL, confidence=0.5)
+    return EmotionResult(emotion=best, confidence=round(scores[best], 2))
+
+
+def _legacy_crisis(content: str) -> CrisisCheckResult:
+    content_lower = content.lower()
+    for keywords in CRISIS_KEYWORDS.values():
+        for keyword in keywords:
+            match = re.search(rf"\b{re.escape(keyword)}\b", content_lower, re.I)
+            if match:
+                return CrisisCheckResult(
+                    blocked=True,
+                    reason="CRISIS",
+                    resources=CRISIS_RESOURCES,
+                    matched_keyword=match.group(0),
+                )
+    return CrisisCheckResult(blocked=False)
+
+
+def _random_text(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        pool = PHRASES if rng.random() < 0.4 else FILLER
+        word = rng.choice(pool)
+        if rng.random() < 0.2:
+            word = word.upper()
+        parts.append(word + rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def test_detectors_match_legacy_on_random_corpus():
+    rng = random.Random(20261018)
+    for _ in range(2000):
+        text = _random_text(rng, rng.randint(0, 40))
+        assert detect_emotion(text) == _legacy_emotion(text), text
+        assert detect_crisis(text) == _legacy_crisis(text), text
+
+
+def test_detectors_match_legacy_on_long_input():
+    rng = random.Random(7)
+    text = _random_text(rng, 800)[:4000]
+    assert detect_emotion(text) == _legacy_emotion(text)
+    assert detect_crisis(text) == _legacy_crisis(text)
+
+
+def test_case_folded_variants_match_legacy():
+    # re.IGNORECASE 下 "ſ"（长 s）与 "K"（开尔文符号）可匹配 s / k
+    for text in ("ſtreſſed and ſad", "I will \u212aill myself", "ſuicide"):
+        assert detect_emotion(text) == _legacy_emotion(text), text
+        assert detect_crisis(text) == _legacy_crisis(text), text
+
+
+def test_combined_scan_returns_every_category_hit():
+    rng = random.Random(11)
+    for _ in range(500):
+        text = _random_text(rng, rng.randint(1, 30))
+        combined = detection_keywords.scan(text)
+        separate = detection_keywords.scan(
+            text, EMOTION_CATEGORY
+        ) + detection_keywords.scan(text, CRISIS_CATEGORY)
+        assert Counter(combined) == Counter(separate), text
+        assert emotion_from_hits(combined) == detect_emotion(text)
+        assert crisis_from_hits(combined) == detect_crisis(text)
+
+
+def test_combined_scan_recovers_overlapping_emotion_hit():
+    hits = detection_keywords.scan("I want to hurt myself")
+
+    assert {(hit.category, hit.text) for hit in hits} == {
+        (CRISIS_CATEGORY, "hurt myself"),
+        (EMOTION_CATEGORY, "hurt"),
+    }
+
+
+def test_crisis_priority_follows_registration_order():
+    # "suicide" 注册在 "kill myself" 之前，即使出现在后面也优先返回
+    result = detect_crisis("I will kill myself, suicide")
+    assert result.matched_keyword == "suicide"
+
+
+def test_engine_register_replaces_category():
+    engine = KeywordEngine()
+    engine.register("a", [("x", r"\bfoo\b", 1.0)])
+    engine.register("a", [("y", r"\bbar\b", 0.5)])
+
+    hits = engine.scan("foo BAR")
+
+    assert [(hit.label, hit.text, hit.weight) for hit in hits] == [("y", "bar", 0.5)]
+    assert engine.categories == ("a",)
+    assert engine.scan("bar", "missing") == []
+    assert KeywordEngine().scan("anything") == []
+
+
+def test_partial_start_reports_keyword_prefix_at_tail():
+    engine = KeywordEngine()
+    engine.register("a", [("k", r"\bkill myself\b", 1.0)])
+
+    assert engine.partial_start("I will KILL my", "a") == 7
+    assert engine.partial_start("I will kill myself", "a") == 7
+    assert engine.partial_start("I will kill myself.", "a") is None
+    assert engine.partial_start("nothing here", "a") is None
+    assert engine.partial_start("kill", "missing") is None
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from app.learn.memory import (
+    MAX_RECENT_MESSAGES,
+    build_context,
+    empty_memory,
+    estimate_tokens,
+    load_memory,
+    token_budget,
+    update_memory,
+)
+
+
+def test_estimate_tokens_counts_cjk_per_character() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("学习方法") == 4
+
+
+def test_update_memory_keeps_recent_window_in_order() -> None:
+    memory = update_memory(None, "hi", "hello", "start")
+    memory = update_memory(memory, "again", "sure", "start")
+
+    assert memory["recent"] == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "again"},
+        {"role": "assistant", "content": "sure"},
+    ]
+    assert memory["summary"] == []
+
+
+def test_update_memory_folds_old_turns_into_summary() -> None:
+    memory = empty_memory()
+    for index in range(10):
+        memory = update_memory(
+            memory, f"问题{index}。补充说明", f"回答{index}。更多细节", "feynman"
+        )
+
+    assert len(memory["recent"]) <= MAX_RECENT_MESSAGES
+    assert memory["recent"][0]["role"] == "user"
+    assert memory["recent"][-1]["content"] == "回答9。更多细节"
+    # 摘要只保留首句要点
+    assert memory["summary"][0] == "用户：问题0。；助手：回答0。"
+
+
+def test_memory_respects_token_budget() -> None:
+    long_reply = "很长的解释" * 200
+    memory = empty_memory()
+    for _ in range(5):
+        memory = update_memory(memory, "继续讲解这个概念", long_reply, "spaced")
+
+    history, _ = build_context(memory, "下一步？", "spaced")
+    summary_and_recent = sum(estimate_tokens(m["content"]) for m in history)
+    assert summary_and_recent <= token_budget("spaced")
+
+
+def test_build_context_prefixes_summary() -> None:
+    memory = {
+        "v": 1,
+        "summary": ["用户：学国际象棋；助手：先学走法"],
+        "recent": [{"role": "user", "content": "开局呢"}],
+    }
+
+    history, prompt = build_context(memory, "中局呢", "explore")
+
+    assert history == [{"role": "user", "content": "开局呢"}]
+    assert prompt.startswith("Conversation summary:\n- 用户：学国际象棋")
+    assert prompt.endswith("Current message: 中局呢")
+
+
+def test_build_context_does_not_mutate_memory() -> None:
+    memory = update_memory(None, "a" * 4000, "b" * 4000, "pareto")
+    snapshot = {key: list(value) for key, value in memory.items() if key != "v"}
+
+    build_context(memory, "next", "spaced")
+
+    assert memory["recent"] == snapshot["recent"]
+    assert memory["summary"] == snapshot["summary"]
+
+
+@pytest.mark.asyncio
+async def test_load_memory_returns_existing_without_query() -> None:
+    db = MagicMock()
+    db.execute = AsyncMock()
+    memory = update_memory(None, "hi", "hello", None)
+
+    assert await load_memory(db, uuid4(), memory) is memory
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_load_memory_seeds_legacy_session_from_recent_messages() -> None:
+    result = MagicMock()
+    result.all.return_value = [("assistant", "a1"), ("user", "u1")]
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    memory = await load_memory(db, uuid4(), None)
+
+    assert memory["recent"] == [
+        {"role": "user", "content": "u1"},
+        {"role": "assistant", "content": "a1"},
+    ]
+    db.execute.assert_awaited_once()
@@ -309,7 +309,9 @@ async def test_send_learn_message_with_tool_parameter(
     monkeypatch: pytest.MonkeyPatch,
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ok"]:
                 yield token
 
@@ -350,7 +352,9 @@ async def test_send_learn_message_with_step_parameter(
     monkeypatch: pytest.MonkeyPatch,
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ok"]:
                 yield token
 
@@ -0,0 +1,92 @@
+"""Tests for the shared LLM HTTP client registry."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from app.services.llm_clients import LLMClientRegistry, provider_base_url
+
+
+def _make_settings(**overrides):
+    defaults = {
+        "openai_api_key": "test-openai-key",
+        "anthropic_api_key": "",
+        "openrouter_api_key": "",
+        "llm_provider": "openai",
+        "openai_base_url": "https://api.openai.com/v1",
+        "anthropic_base_url": "https://api.anthropic.com/v1",
+        "fake_llm_base_url": "http://127.0.0.1:8765/",
+        "fake_llm_format": "anthropic",
+        "openrouter_base_url": "https://openrouter.ai/api/v1/",
+        "llm_timeout": 5,
+        "llm_http2": False,
+        "llm_max_connections": 10,
+        "llm_max_keepalive_connections": 5,
+        "llm_keepalive_expiry": 15.0,
+        "llm_warmup_on_startup": False,
+    }
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_per_provider():
+    registry = LLMClientRegistry()
+    with patch("app.services.llm_clients.get_settings", return_value=_make_settings()):
+        first = await registry.get("openai")
+        second = await registry.get("openai")
+        other = await registry.get("anthropic")
+
+    assert first is second
+    assert first is not other
+    await registry.close()
+    assert first.is_closed
+    assert other.is_closed
+
+
+@pytest.mark.asyncio
+async def test_registry_start_creates_configured_providers_only():
+    registry = LLMClientRegistry()
+    settings = _make_settings()
+    with patch("app.services.llm_clients.get_settings", return_value=settings):
+        await registry.start(settings)
+
+    assert set(registry._clients) == {"openai"}
+    await registry.close()
+    assert registry._clients == {}
+
+
+@pytest.mark.asyncio
+async def test_registry_warmup_ignores_connection_errors():
+    registry = LLMClientRegistry()
+    settings = _make_settings(llm_warmup_on_startup=True)
+    calls: list[str] = []
+
+    async def failing_head(self, url, **kwargs):
+        calls.append(url)
+        raise httpx.ConnectError("unreachable")
+
+    with (
+        patch("app.services.llm_clients.get_settings", return_value=settings),
+        patch.object(httpx.AsyncClient, "head", failing_head),
+    ):
+        await registry.start(settings)
+
+    assert calls == ["https://api.openai.com/v1"]
+    await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_registry_http2_falls_back_without_h2():
+    registry = LLMClientRegistry()
+    settings = _make_settings(llm_http2=True)
+    with patch("app.services.llm_clients.importlib.util.find_spec", return_value=None):
+        assert registry._http2_enabled(settings) is False
+
+
+def test_provider_base_url_strips_openrouter_slash():
+    settings = _make_settings()
+    assert provider_base_url("openrouter", settings) == "https://openrouter.ai/api/v1"
+    with pytest.raises(ValueError, match="Unsupported LLM provider"):
+        provider_base_url("unknown", settings)
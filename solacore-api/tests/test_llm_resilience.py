@@ -0,0 +1,163 @@
+"""Tests for the LLM circuit breaker and AIMD concurrency limiter."""
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from app.services.llm_resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    AIMDLimiter,
+    CircuitBreaker,
+    LLMResilienceRegistry,
+    LLMUnavailableError,
+    is_provider_failure,
+)
+from app.utils.metrics import format_prometheus_metrics
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return httpx.HTTPStatusError(
+        str(status), request=request, response=httpx.Response(status, request=request)
+    )
+
+
+def _settings(**overrides):
+    defaults = {
+        "llm_breaker_failure_threshold": 2,
+        "llm_breaker_recovery_seconds": 10.0,
+        "llm_concurrency_initial": 2,
+        "llm_concurrency_min": 1,
+        "llm_concurrency_max": 4,
+        "llm_concurrency_backoff": 0.5,
+    }
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert breaker.allow() is False
+
+    clock.now = 10.0
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow() is True
+    # 半开状态只放行一个探测请求
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow() is True
+
+
+def test_breaker_half_open_failure_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5.0
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    clock.now = 9.0
+    assert breaker.allow() is False
+
+
+def test_breaker_cancelled_probe_returns_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_ignored()
+    assert breaker.allow() is True
+
+
+def test_aimd_limiter_additive_increase_multiplicative_decrease():
+    limiter = AIMDLimiter(initial=4, min_limit=1, max_limit=8, backoff=0.5)
+    assert [limiter.try_acquire() for _ in range(5)] == [True] * 4 + [False]
+
+    limiter.release("failure")
+    assert limiter.limit == 2
+    assert limiter.in_flight == 3
+    assert limiter.try_acquire() is False
+
+    for _ in range(3):
+        limiter.release(None)
+    for _ in range(2):
+        assert limiter.try_acquire() is True
+        limiter.release("success")
+    assert limiter.limit == 2
+    assert limiter.try_acquire() is True
+    limiter.release("success")
+    assert limiter.limit == 3
+
+
+def test_is_provider_failure_classification():
+    assert is_provider_failure(httpx.ReadTimeout("timeout"))
+    assert is_provider_failure(httpx.ConnectError("refused"))
+    assert is_provider_failure(_status_error(503))
+    assert is_provider_failure(_status_error(429))
+    assert not is_provider_failure(_status_error(400))
+    assert not is_provider_failure(ValueError("missing key"))
+
+
+def test_guard_rejects_when_saturated_or_open():
+    registry = LLMResilienceRegistry()
+    guard = registry.guard("openai", "gpt-test", _settings())
+    assert registry.guard("openai", "gpt-test", _settings()) is guard
+
+    guard.acquire()
+    guard.acquire()
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        guard.acquire()
+    assert exc_info.value.reason == "overloaded"
+
+    guard.release(_status_error(502))
+    guard.release(httpx.ReadTimeout("timeout"))
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        guard.acquire()
+    assert exc_info.value.reason == "circuit_open"
+
+    snapshot = registry.snapshot()[("openai", "gpt-test")]
+    assert snapshot == {
+        "state": STATE_OPEN,
+        "state_value": 2,
+        "limit": 1,
+        "in_flight": 0,
+        "rejected": 2,
+    }
+
+
+def test_prometheus_metrics_include_llm_guards():
+    registry = LLMResilienceRegistry()
+    registry.guard("anthropic", "claude-test", _settings())
+
+    output = format_prometheus_metrics(
+        {},
+        active_sessions=0,
+        active_users=0,
+        db_pool=None,
+        llm_providers=registry.snapshot(),
+    )
+
+    labels = '{model="claude-test",provider="anthropic"}'
+    assert f"llm_circuit_state{labels} 0" in output
+    assert f"llm_concurrency_limit{labels} 2" in output
+    assert f"llm_concurrency_in_flight{labels} 0" in output
+    assert f"llm_rejected_total{labels} 0" in output
@@ -0,0 +1,60 @@
+"""Tests for LLM provider chain parsing and TTFT tracking."""
+
+from types import SimpleNamespace
+
+from app.services.llm_routing import TTFT_MIN_SAMPLES, TTFTTracker, provider_chain
+
+
+def _make_settings(**overrides):
+    defaults = {
+        "llm_provider": "openai",
+        "llm_model": "gpt-test",
+        "openai_api_key": "sk-openai",
+        "anthropic_api_key": "sk-anthropic",
+        "openrouter_api_key": "",
+        "llm_fallback_providers": "",
+        "llm_fallback_models": "",
+        "llm_hedge_percentile": 0.95,
+        "llm_hedge_initial_delay_ms": 2000,
+        "llm_hedge_min_delay_ms": 500,
+    }
+    defaults.update(overrides)
+    return SimpleNamespace(**defaults)
+
+
+def test_provider_chain_defaults_to_primary_only():
+    assert provider_chain(_make_settings()) == [("openai", "gpt-test")]
+
+
+def test_provider_chain_skips_unconfigured_and_duplicates():
+    settings = _make_settings(
+        llm_fallback_providers=" Anthropic, openrouter, openai ,anthropic",
+        llm_fallback_models="anthropic=claude-test, openrouter=openai/gpt-4o-mini",
+    )
+    assert provider_chain(settings) == [
+        ("openai", "gpt-test"),
+        ("anthropic", "claude-test"),
+    ]
+
+
+def test_ttft_tracker_uses_initial_delay_until_enough_samples():
+    tracker = TTFTTracker()
+    settings = _make_settings()
+    tracker.record("openai", 0.1)
+    assert tracker.percentile("openai", 0.95) is None
+    assert tracker.hedge_delay("openai", settings) == 2.0
+
+
+def test_ttft_tracker_percentile_with_floor():
+    tracker = TTFTTracker()
+    for i in range(TTFT_MIN_SAMPLES * 5):
+        tracker.record("openai", (i + 1) / 100)
+    assert tracker.percentile("openai", 0.95) == 0.96
+    assert tracker.hedge_delay("openai", _make_settings()) == 0.96
+    assert (
+        tracker.hedge_delay("openai", _make_settings(llm_hedge_min_delay_ms=1500))
+        == 1.5
+    )
+
+    tracker.reset()
+    assert tracker.percentile("openai", 0.5) is None
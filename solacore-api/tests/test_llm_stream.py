@@ -24,7 +24,9 @@ async def test_llm_stream_emits_tokens_and_done(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["foo", "bar"]:
                 yield token
 
@@ -125,3 +127,388 @@ async def test_llm_stream_multi_agent_orchestration_path(
     assert done_payload is not None
     assert done_payload["next_step"] == "clarify"
     assert done_payload["primary_agent"] == "empath"
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_orchestration_llm_agents_path(
+    client: AsyncClient, monkeypatch
+):
+    from app.config import Settings
+
+    enabled = Settings()
+    enabled.enable_multi_agent_orchestration = True
+    enabled.orchestration_llm_agents = True
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: enabled)
+
+    class FakeAIService:
+        async def stream(self, system_prompt, user_prompt, history=None, route=None):
+            if "问题画像" in system_prompt.text:
+                yield "用户在打招呼"
+                return
+            yield "你好，"
+            yield "愿意说说发生了什么吗？"
+
+    monkeypatch.setattr("app.services.orchestration_llm.AIService", FakeAIService)
+
+    token = await _register_user(
+        client, "llm-orch-agents@example.com", "llm-orch-agents-001"
+    )
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "X-Device-Fingerprint": "llm-orch-agents-001",
+    }
+    create_resp = await client.post("/sessions", json={}, headers=headers)
+    assert create_resp.status_code == 201
+    session_id = create_resp.json()["session_id"]
+
+    async with client.stream(
+        "POST",
+        f"/sessions/{session_id}/messages",
+        json={"content": "hello", "step": "receive"},
+        headers=headers,
+    ) as response:
+        assert response.status_code == 200
+        body = (await response.aread()).decode()
+
+    events = [
+        (lines[0].removeprefix("event: "), json.loads(lines[1][len("data: ") :]))
+        for lines in (block.splitlines() for block in body.split("\n\n"))
+        if len(lines) == 2 and lines[0].startswith("event: ")
+    ]
+    content = "".join(data["content"] for name, data in events if name == "token")
+    assert content == "你好，愿意说说发生了什么吗？"
+    assert events[-1][0] == "done"
+    assert events[-1][1]["next_step"] == "clarify"
+    assert events[-1][1]["primary_agent"] == "empath"
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_structured_question_event(client: AsyncClient, monkeypatch):
+    from app.config import Settings
+
+    enabled = Settings()
+    enabled.enable_multi_agent_orchestration = True
+    enabled.orchestration_llm_agents = True
+    enabled.orchestration_structured_stream = True
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: enabled)
+
+    question = {"prompt": "这件事做成什么样，你会觉得解决了？", "rationale": "对齐目标"}
+
+    class FakeAIService:
+        async def stream(self, system_prompt, user_prompt, history=None, route=None):
+            if "问题画像" in system_prompt.text:
+                yield "项目交付压力"
+                return
+            if "JSON" not in system_prompt.text:
+                yield "听起来压力不小。"
+                return
+            text = json.dumps({"question": question}, ensure_ascii=False)
+            for index in range(0, len(text), 5):
+                yield text[index : index + 5]
+
+    monkeypatch.setattr("app.services.orchestration_llm.AIService", FakeAIService)
+
+    token = await _register_user(
+        client, "llm-structured@example.com", "llm-structured-001"
+    )
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "X-Device-Fingerprint": "llm-structured-001",
+    }
+    create_resp = await client.post("/sessions", json={}, headers=headers)
+    session_id = create_resp.json()["session_id"]
+
+    bodies = []
+    for step in ("receive", "clarify"):
+        async with client.stream(
+            "POST",
+            f"/sessions/{session_id}/messages",
+            json={"content": "下周要交付项目，我很焦虑", "step": step},
+            headers=headers,
+        ) as response:
+            assert response.status_code == 200
+            bodies.append((await response.aread()).decode())
+
+    def events(body):
+        return [
+            (lines[0].removeprefix("event: "), json.loads(lines[1][len("data: ") :]))
+            for lines in (block.splitlines() for block in body.split("\n\n"))
+            if len(lines) == 2 and lines[0].startswith("event: ")
+        ]
+
+    # 共情步骤没有结构化结果，仍按 token 发送
+    assert [name for name, _ in events(bodies[0])] == ["token", "done"]
+    clarify_events = events(bodies[1])
+    assert [name for name, _ in clarify_events] == ["question", "done"]
+    assert clarify_events[0][1]["prompt"] == question["prompt"]
+    assert clarify_events[0][1]["allow_unknown"] is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+async def test_llm_stream_disconnect_cancels_upstream_and_closes_step(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch, spec_version: str
+):
+    import asyncio
+    from uuid import UUID
+
+    from app.config import Settings
+    from app.main import app
+    from app.models.step_history import StepHistory
+    from sqlalchemy import select
+    from tests.conftest import TestingSessionLocal
+
+    upstream_started = asyncio.Event()
+    upstream_cancelled = asyncio.Event()
+
+    class StalledAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            upstream_started.set()
+            try:
+                await asyncio.sleep(30)
+                yield "never"
+            finally:
+                upstream_cancelled.set()
+
+    disabled = Settings()
+    disabled.enable_multi_agent_orchestration = False
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: disabled)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", StalledAIService)
+
+    token = await _register_user(
+        client, f"llm-disconnect-{spec_version}@example.com", "llm-disc-device"
+    )
+    create_resp = await client.post(
+        "/sessions/",
+        json={},
+        headers={
+            "Authorization": f"Bearer {token}",
+            "X-Device-Fingerprint": "llm-disc-device",
+        },
+    )
+    session_id = create_resp.json()["session_id"]
+
+    body = json.dumps({"content": "hello", "step": "receive"}).encode()
+    disconnect = asyncio.Event()
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        return None
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": spec_version},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": f"/sessions/{session_id}/messages",
+        "raw_path": f"/sessions/{session_id}/messages".encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("test", 80),
+    }
+
+    call = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(upstream_started.wait(), timeout=5)
+    disconnect.set()
+    await asyncio.wait_for(upstream_cancelled.wait(), timeout=5)
+    await asyncio.wait_for(call, timeout=5)
+
+    async with TestingSessionLocal() as db:
+        result = await db.execute(
+            select(StepHistory).where(StepHistory.session_id == UUID(session_id))
+        )
+        histories = result.scalars().all()
+
+    assert histories
+    assert all(history.completed_at is not None for history in histories)
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_prefixes_template_system_prompt(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    from uuid import uuid4
+
+    from app.config import Settings
+    from app.models.prompt_template import PromptTemplate
+    from app.routers.sessions.utils import STEP_SYSTEM_PROMPTS
+    from app.services.prompt_registry import prompt_registry
+    from tests.conftest import TestingSessionLocal
+
+    captured = []
+
+    class FakeAIService:
+        async def stream(
+            self, system_prompt, user_prompt: str, history=None, route=None
+        ):
+            captured.append(system_prompt)
+            yield "ok"
+
+    disabled = Settings()
+    disabled.enable_multi_agent_orchestration = False
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: disabled)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+    prompt_registry.clear_templates()
+
+    template = PromptTemplate(
+        id=uuid4(),
+        role_name="Stream Coach",
+        category="life",
+        system_prompt="You are a calm coach.",
+    )
+    async with TestingSessionLocal() as session:
+        session.add(template)
+        await session.commit()
+
+    token = await _register_user(client, "llm-template@example.com", "llm-device-009")
+    create_resp = await client.post(
+        "/sessions/",
+        json={"template_id": str(template.id)},
+        headers={
+            "Authorization": f"Bearer {token}",
+            "X-Device-Fingerprint": "llm-device-009",
+        },
+    )
+    session_id = create_resp.json()["session_id"]
+
+    for _ in range(2):
+        async with client.stream(
+            "POST",
+            f"/sessions/{session_id}/messages",
+            json={"content": "hello", "step": "receive"},
+            headers={"Authorization": f"Bearer {token}"},
+        ) as response:
+            assert response.status_code == 200
+            await response.aread()
+
+    first, second = captured
+    assert [segment.text for segment in first.segments] == [
+        "You are a calm coach.",
+        STEP_SYSTEM_PROMPTS["receive"],
+    ]
+    assert first.segments[0].key == f"template:{template.id}"
+    # 第二轮复用进程内缓存的模板前缀
+    assert second.segments[0] is first.segments[0]
+    assert second.segments[1].text == STEP_SYSTEM_PROMPTS["clarify"]
+    prompt_registry.clear_templates()
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_sends_recent_turns_as_history(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    from app.config import Settings
+
+    captured: list[list[dict]] = []
+
+    class FakeAIService:
+        async def stream(
+            self, system_prompt, user_prompt: str, history=None, route=None
+        ):
+            captured.append(list(history or []))
+            yield f"reply {len(captured)}"
+
+    disabled = Settings()
+    disabled.enable_multi_agent_orchestration = False
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: disabled)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+
+    token = await _register_user(client, "llm-history@example.com", "llm-device-010")
+    create_resp = await client.post(
+        "/sessions/",
+        json={},
+        headers={
+            "Authorization": f"Bearer {token}",
+            "X-Device-Fingerprint": "llm-device-010",
+        },
+    )
+    session_id = create_resp.json()["session_id"]
+
+    for content in ("first question", "second question", "third question"):
+        async with client.stream(
+            "POST",
+            f"/sessions/{session_id}/messages",
+            json={"content": content, "step": "receive"},
+            headers={"Authorization": f"Bearer {token}"},
+        ) as response:
+            assert response.status_code == 200
+            await response.aread()
+
+    assert all(turn["content"] != "first question" for turn in captured[0])
+    assert captured[1][-2:] == [
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "reply 1"},
+    ]
+    assert captured[2][-4:] == [
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "reply 1"},
+        {"role": "user", "content": "second question"},
+        {"role": "assistant", "content": "reply 2"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_redacts_pii_split_across_tokens(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    class FakeAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            for token in ["contact me at jo", "hn@example.com now"]:
+                yield token
+
+    from app.config import Settings
+
+    disabled = Settings()
+    disabled.enable_multi_agent_orchestration = False
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: disabled)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+
+    token = await _register_user(client, "llm-redact@example.com", "llm-device-redact")
+    create_resp = await client.post(
+        "/sessions/",
+        json={},
+        headers={
+            "Authorization": f"Bearer {token}",
+            "X-Device-Fingerprint": "llm-device-redact",
+        },
+    )
+    assert create_resp.status_code == 201
+    session_id = create_resp.json()["session_id"]
+
+    async with client.stream(
+        "POST",
+        f"/sessions/{session_id}/messages",
+        json={"content": "hello", "step": "receive"},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as response:
+        assert response.status_code == 200
+        body = (await response.aread()).decode()
+
+    tokens = [
+        json.loads(line[len("data: ") :])["content"]
+        for line in body.splitlines()
+        if line.startswith("data: ") and '"content"' in line
+    ]
+    assert "".join(tokens) == "contact me at [email] now"
+    assert "example.com" not in body
+    assert "event: done" in body
@@ -63,3 +63,58 @@ def test_format_prometheus_metrics_without_pool() -> None:
         snapshot, active_sessions=0, active_users=0, db_pool=None
     )
     assert "db_pool_size" not in output
+
+
+def test_format_prometheus_metrics_includes_llm_routing() -> None:
+    registry = MetricsRegistry()
+    registry.record_llm_ttft(0.4, provider="openai")
+    registry.record_llm_routing_event(event="failover", provider="anthropic")
+
+    output = format_prometheus_metrics(
+        registry.snapshot(), active_sessions=0, active_users=0, db_pool=None
+    )
+
+    assert 'llm_ttft_seconds_sum{provider="openai"} 0.4' in output
+    assert 'llm_ttft_seconds_count{provider="openai"} 1' in output
+    assert 'llm_routing_events_total{event="failover",provider="anthropic"} 1' in output
+
+
+def test_format_prometheus_metrics_includes_prompt_cache_tokens() -> None:
+    registry = MetricsRegistry()
+    registry.record_llm_prompt_usage(
+        provider="anthropic",
+        prompt_tokens=2000,
+        cached_tokens=1800,
+        cache_write_tokens=0,
+    )
+    registry.record_llm_prompt_usage(
+        provider="openai", prompt_tokens=1200, cached_tokens=0, cache_write_tokens=0
+    )
+
+    output = format_prometheus_metrics(
+        registry.snapshot(), active_sessions=0, active_users=0, db_pool=None
+    )
+
+    assert 'llm_prompt_tokens_total{provider="anthropic"} 2000' in output
+    assert 'llm_prompt_cache_hit_tokens_total{provider="anthropic"} 1800' in output
+    assert 'llm_prompt_cache_hit_tokens_total{provider="openai"} 0' in output
+    assert 'llm_prompt_cache_write_tokens_total{provider="openai"} 0' in output
+
+
+def test_cache_lookups_are_reported_per_tier() -> None:
+    registry = MetricsRegistry()
+    registry.record_cache_hit(tier="l1")
+    registry.record_cache_miss(tier="l1")
+    registry.record_cache_hit()
+
+    snapshot = registry.snapshot()
+    output = format_prometheus_metrics(
+        snapshot, active_sessions=0, active_users=0, db_pool=None
+    )
+
+    # cache_hits / cache_misses 仍只统计 Redis
+    assert snapshot["cache_hits"] == 1
+    assert snapshot["cache_misses"] == 0
+    assert 'cache_lookups_total{result="hit",tier="l1"} 1' in output
+    assert 'cache_lookups_total{result="miss",tier="l1"} 1' in output
+    assert 'cache_lookups_total{result="hit",tier="l2"} 1' in output
@@ -0,0 +1,101 @@
+"""输出安全过滤测试 - 分块方式不影响结果，只保留仍可能变成命中的尾部"""
+
+import random
+
+import pytest
+from app.services.content_filter import PII_RE
+from app.services.outbound_filter import OutboundFilter
+
+SAMPLE = (
+    "你可以先联系老师 teacher.wang@example.edu.cn 说明情况，"
+    "或者拨打 +1 (555) 123-4567 预约咨询。2023-2024 学年的安排不受影响。"
+    "如果你有 suicide 的念头，请立即寻求帮助。"
+)
+
+
+def _run(chunks, window=64):
+    outbound = OutboundFilter(window=window)
+    emitted = [outbound.feed(chunk) for chunk in chunks]
+    emitted.append(outbound.flush())
+    return outbound, "".join(emitted)
+
+
+def _split_randomly(text: str, rng: random.Random) -> list[str]:
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 12)
+        chunks.append(text[position : position + size])
+        position += size
+    return chunks
+
+
+def test_redacts_pii_and_keeps_other_text():
+    outbound, output = _run([SAMPLE])
+
+    assert output == PII_RE.sub(
+        lambda m: "[email]" if m.lastgroup == "email" else "[phone]", SAMPLE
+    )
+    assert "teacher.wang" not in output
+    assert "555" not in output
+    assert "2023-2024" in output
+    assert outbound.redactions == {"email": 1, "phone": 1}
+    assert outbound.crisis_keyword == "suicide"
+    assert "resources" in outbound.done_fields()
+
+
+def test_output_is_independent_of_token_boundaries():
+    _, expected = _run([SAMPLE])
+    rng = random.Random(14)
+    for _ in range(200):
+        chunks = _split_randomly(SAMPLE * 3, rng)
+        outbound, output = _run(chunks)
+        assert output == expected * 3
+        assert outbound.redactions == {"email": 3, "phone": 3}
+
+
+@pytest.mark.parametrize("window", [16, 32, 64])
+def test_pending_tail_is_bounded_by_window(window):
+    outbound = OutboundFilter(window=window)
+    rng = random.Random(window)
+    longest = 0
+    for chunk in _split_randomly("普通的回复内容，没有敏感信息。" * 200, rng):
+        outbound.feed(chunk)
+        longest = max(longest, len(outbound._pending))
+    assert longest <= window + 12
+
+
+def test_short_plain_reply_is_emitted_before_flush():
+    outbound = OutboundFilter()
+
+    assert outbound.feed("Sure, happy to help!") == "Sure, happy to help!"
+    assert outbound.feed("好的，我们一起梳理一下。") == "好的，我们一起梳理一下。"
+    assert outbound.flush() == ""
+
+
+def test_holds_back_only_text_that_may_still_match():
+    outbound = OutboundFilter()
+
+    assert outbound.feed("mail me at a") == "mail me at "
+    # 邮箱拼完后立即打码发送，只保留末尾仍可能延伸的单词
+    assert outbound.feed("@b.co now") == "[email] "
+    assert outbound.feed(", or call 555-12") == "now, or call "
+    assert outbound.feed("3-4567 today.") == "[phone] "
+    assert outbound.flush() == "today."
+    assert outbound.done_fields() == {}
+
+
+def test_holds_back_crisis_keyword_prefix():
+    outbound = OutboundFilter()
+
+    assert outbound.feed("I feel like I want to kill my") == "I feel like I want to "
+    assert outbound.feed("self. ") == "kill myself. "
+    assert outbound.crisis_keyword == "kill myself"
+
+
+def test_crisis_keyword_needs_word_boundary_across_chunks():
+    outbound, _ = _run(["I want to go my", "self-harm"], window=4)
+    assert outbound.crisis_keyword is None
+
+    outbound, _ = _run(["it is not self", "-harm, but"], window=4)
+    assert outbound.crisis_keyword == "self-harm"
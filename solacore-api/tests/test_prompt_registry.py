@@ -0,0 +1,73 @@
+"""Tests for the versioned system-prompt prefix registry."""
+
+from app.learn.prompts import LEARN_STEP_PREFIXES, LEARN_STEP_PROMPTS
+from app.routers.learn.message import TOOL_PROMPT_PREFIXES, TOOL_PROMPTS
+from app.routers.sessions.utils import STEP_PROMPT_PREFIXES, STEP_SYSTEM_PROMPTS
+from app.services import prompt_registry as registry_module
+from app.services.prompt_registry import (
+    PromptRegistry,
+    SystemPrompt,
+    as_system_prompt,
+    prompt_registry,
+)
+
+
+def test_register_versions_by_content():
+    registry = PromptRegistry()
+    first = registry.register("solve:receive", "v1 text")
+    same = registry.register("solve:receive", "v1 text")
+    changed = registry.register("solve:receive", "v2 text")
+
+    assert first is same
+    assert changed is not first
+    assert changed.version != first.version
+    assert changed.version.startswith("solve:receive@")
+    assert registry.get("solve:receive") is changed
+
+
+def test_compose_reuses_precomputed_prompt():
+    registry = PromptRegistry()
+    registry.register("a", "alpha")
+    registry.register("b", "beta")
+
+    prompt = registry.system("a", "b")
+
+    assert registry.system("a", "b") is prompt
+    assert prompt.text == "alpha\n\nbeta"
+    assert prompt.anthropic_blocks == [
+        {"type": "text", "text": "alpha"},
+        {"type": "text", "text": "beta", "cache_control": {"type": "ephemeral"}},
+    ]
+    assert prompt.cache_key != registry.system("b", "a").cache_key
+
+
+def test_as_system_prompt_wraps_plain_text():
+    prompt = as_system_prompt("plain")
+    assert isinstance(prompt, SystemPrompt)
+    assert prompt.text == "plain"
+    assert as_system_prompt(prompt) is prompt
+
+
+def test_template_cache_expires_and_is_bounded(monkeypatch):
+    registry = PromptRegistry()
+    now = [100.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(registry_module, "TEMPLATE_CACHE_SIZE", 2)
+
+    prefix = registry.register_template("t1", "template one")
+    assert registry.cached_template("t1") is prefix
+
+    registry.register_template("t2", "template two")
+    registry.register_template("t3", "template three")
+    assert registry.cached_template("t1") is None
+
+    now[0] += registry_module.TEMPLATE_CACHE_TTL_SECONDS + 1
+    assert registry.cached_template("t3") is None
+
+
+def test_static_prompts_are_preregistered():
+    assert set(STEP_PROMPT_PREFIXES) == set(STEP_SYSTEM_PROMPTS)
+    assert set(LEARN_STEP_PREFIXES) == set(LEARN_STEP_PROMPTS)
+    assert set(TOOL_PROMPT_PREFIXES) == set(TOOL_PROMPTS)
+    for step, text in STEP_SYSTEM_PROMPTS.items():
+        assert prompt_registry.get(f"solve:{step}").text == text
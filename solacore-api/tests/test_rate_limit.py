@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from types import SimpleNamespace
 from unittest.mock import patch
+from uuid import UUID
 
 import pytest
 from app.middleware import rate_limit as rate_limit_module
+from app.middleware.auth_context import AuthContext
 from starlette.requests import Request
 
+USER_1 = UUID("00000000-0000-0000-0000-000000000001")
+USER_2 = UUID("00000000-0000-0000-0000-000000000002")
+USER_3 = UUID("00000000-0000-0000-0000-000000000003")
+
 
 async def _receive() -> dict:
     return {"type": "http.request", "body": b"", "more_body": False}
@@ -107,35 +112,35 @@ async def test_rate_limit_context_middleware_skips_non_http() -> None:
     assert called["value"] is True
 
 
-def test_extract_user_id_prefers_request_state() -> None:
-    request = _make_request()
-    request.state.current_user = SimpleNamespace(id="user-1")
-    with patch("app.middleware.rate_limit.decode_token") as decode_mock:
-        assert rate_limit_module._extract_user_id(request) == "user-1"
+def test_extract_user_id_prefers_request_auth_context() -> None:
+    request = _make_request(headers={"Authorization": "Bearer token"})
+    request.state.auth_context = AuthContext("bearer", USER_1)
+    with patch("app.middleware.auth_context.decode_token") as decode_mock:
+        assert rate_limit_module._extract_user_id(request) == str(USER_1)
     decode_mock.assert_not_called()
 
 
 def test_extract_user_id_from_cookie_and_header() -> None:
     request = _make_request(cookies={"access_token": "token"})
     with patch(
-        "app.middleware.rate_limit.decode_token",
-        return_value={"type": "access", "sub": "user-2"},
+        "app.middleware.auth_context.decode_token",
+        return_value={"type": "access", "sub": str(USER_2)},
     ):
-        assert rate_limit_module._extract_user_id(request) == "user-2"
+        assert rate_limit_module._extract_user_id(request) == str(USER_2)
 
     request = _make_request(headers={"Authorization": "Bearer token"})
     with patch(
-        "app.middleware.rate_limit.decode_token",
-        return_value={"type": "access", "sub": "user-3"},
+        "app.middleware.auth_context.decode_token",
+        return_value={"type": "access", "sub": str(USER_3)},
     ):
-        assert rate_limit_module._extract_user_id(request) == "user-3"
+        assert rate_limit_module._extract_user_id(request) == str(USER_3)
 
 
 def test_extract_user_id_invalid_token() -> None:
     request = _make_request(headers={"Authorization": "token"})
     with patch(
-        "app.middleware.rate_limit.decode_token",
-        return_value={"type": "refresh", "sub": "user"},
+        "app.middleware.auth_context.decode_token",
+        return_value={"type": "refresh", "sub": str(USER_1)},
     ):
         assert rate_limit_module._extract_user_id(request) is None
 
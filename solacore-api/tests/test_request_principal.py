@@ -0,0 +1,127 @@
+"""请求主体测试 - 用户 / 订阅 / 设备一次 MGET 读取，未命中时一条查询补齐"""
+
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app.models.user import User
+from app.services import request_principal as principal_module
+from tests.conftest import engine_test
+
+
+class _BatchCache:
+    def __init__(self) -> None:
+        self.values: dict[str, object] = {}
+        self.get_many_calls = 0
+        self.set_many_calls: list[dict[str, tuple[object, int | None]]] = []
+
+    async def get_many(self, keys):
+        self.get_many_calls += 1
+        return [self.values.get(key) for key in keys]
+
+    async def set_many(self, items):
+        self.set_many_calls.append(dict(items))
+        for key, (value, _ttl) in items.items():
+            self.values[key] = value
+
+
+class _NoQueryDB:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("principal should be served from cache")
+
+
+@pytest.fixture
+def principal_reads():
+    reads: list[str] = []
+
+    def log(conn, cursor, statement, parameters, context, executemany):
+        text = statement.lstrip().upper()
+        if text.startswith("SELECT") and any(
+            table in statement for table in ("users", "subscriptions", "devices")
+        ):
+            reads.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", log)
+    yield reads
+    event.remove(engine_test.sync_engine, "before_cursor_execute", log)
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_uses_one_batch_read(monkeypatch) -> None:
+    cache = _BatchCache()
+    monkeypatch.setattr(
+        principal_module, "cache_service", principal_module.CacheService(cache)
+    )
+    user_id, device_id = uuid4(), uuid4()
+    cache.values = {
+        f"user:{user_id}": {"email": "a@example.com", "is_active": True},
+        f"subscription:{user_id}": {
+            "tier": "pro",
+            "created_at": "2024-01-01T08:30:00",
+            "period_start": "2024-02-01T00:00:00",
+        },
+        f"device:fp:{user_id}:phone": {"id": str(device_id)},
+    }
+
+    principal = await principal_module.load_request_principal(
+        _NoQueryDB(),  # type: ignore[arg-type]
+        user_id,
+        "phone",
+    )
+
+    assert principal is not None
+    assert isinstance(principal.user, User)
+    assert principal.user.email == "a@example.com"
+    assert principal.tier == "pro"
+    assert principal.device_id == device_id
+    assert principal.subscription_dates() is not None
+    assert cache.get_many_calls == 1
+    assert cache.set_many_calls == []
+
+
+@pytest.mark.asyncio
+async def test_principal_misses_load_with_one_query_and_backfill(
+    client: AsyncClient, principal_reads: list[str]
+):
+    register = await client.post(
+        "/auth/register",
+        json={
+            "email": "request-principal@example.com",
+            "password": "Password123",
+            "device_fingerprint": "request-principal-device",
+        },
+    )
+    assert register.status_code == 201
+    token = register.cookies["access_token"]
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "X-Device-Fingerprint": "request-principal-device",
+    }
+
+    before = len(principal_reads)
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+    assert len(principal_reads) - before == 1
+
+    before = len(principal_reads)
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+    assert len(principal_reads) == before
+
+    # create_session 直接使用请求主体中的设备与订阅
+    before = len(principal_reads)
+    created = await client.post("/sessions", json={}, headers=headers)
+    assert created.status_code == 201
+    assert not [
+        statement
+        for statement in principal_reads[before:]
+        if "devices" in statement or "FROM subscriptions" in statement
+    ]
+
+    unknown = await client.post(
+        "/sessions",
+        json={},
+        headers={**headers, "X-Device-Fingerprint": "unknown-device"},
+    )
+    assert unknown.status_code == 403
+    assert unknown.json()["detail"]["error"] == "DEVICE_NOT_FOUND"
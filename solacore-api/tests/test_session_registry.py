@@ -0,0 +1,138 @@
+"""访问令牌会话缓存测试 - 稳态鉴权不查询 active_sessions，撤销经 pub/sub 广播"""
+
+import asyncio
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app.services.session_registry import SessionRegistry
+from app.utils.datetime_utils import utc_now
+from tests.conftest import engine_test
+
+
+class _MemoryCache:
+    def __init__(self) -> None:
+        self.values: dict[str, object] = {}
+        self.ttls: dict[str, int | None] = {}
+        self.published: list[tuple[str, object]] = []
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ttl=None, *, nx=False):
+        if nx and key in self.values:
+            return
+        self.values[key] = value
+        self.ttls[key] = ttl
+
+    async def publish(self, channel, value):
+        self.published.append((channel, value))
+
+
+@pytest.fixture
+def active_session_reads():
+    reads: list[str] = []
+
+    def log(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and (
+            "active_sessions" in statement
+        ):
+            reads.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", log)
+    yield reads
+    event.remove(engine_test.sync_engine, "before_cursor_execute", log)
+
+
+@pytest.mark.asyncio
+async def test_remember_then_check_and_revoke() -> None:
+    cache = _MemoryCache()
+    registry = SessionRegistry(cache)  # type: ignore[arg-type]
+    session_id, user_id = uuid4(), uuid4()
+
+    assert await registry.check(session_id, user_id) is None
+    await registry.remember(session_id, user_id, utc_now() + timedelta(minutes=5))
+    assert await registry.check(session_id, user_id) is True
+    assert 0 < cache.ttls[f"auth:session:{session_id}"] <= 300
+    # sid 不属于该用户时没有结论
+    assert await registry.check(session_id, uuid4()) is None
+
+    await registry.revoke([session_id])
+    assert await registry.check(session_id, user_id) is False
+    assert cache.published == [("auth:session:revoked", [str(session_id)])]
+
+    # 撤销标记不会被并发请求的回填覆盖
+    await registry.remember(session_id, user_id, utc_now() + timedelta(minutes=5))
+    assert await registry.check(session_id, user_id) is False
+
+
+@pytest.mark.asyncio
+async def test_remember_skips_expired_sessions() -> None:
+    cache = _MemoryCache()
+    registry = SessionRegistry(cache)  # type: ignore[arg-type]
+
+    await registry.remember(uuid4(), uuid4(), utc_now() - timedelta(seconds=1))
+
+    assert cache.values == {}
+
+
+@pytest.mark.asyncio
+async def test_revocation_is_broadcast_to_other_workers() -> None:
+    worker, other = SessionRegistry(), SessionRegistry()
+    session_id, user_id = uuid4(), uuid4()
+    await worker.start()
+    try:
+        for _ in range(100):
+            if worker._subscriber.connected:
+                break
+            await asyncio.sleep(0.01)
+        assert worker._subscriber.connected
+
+        await other.remember(session_id, user_id, utc_now() + timedelta(minutes=1))
+        assert await worker.check(session_id, user_id) is True
+
+        await other.revoke([session_id])
+        for _ in range(100):
+            if worker._local.get(str(session_id)) == "revoked":
+                break
+            await asyncio.sleep(0.01)
+        assert await worker.check(session_id, user_id) is False
+    finally:
+        await worker.close()
+
+
+@pytest.mark.asyncio
+async def test_steady_state_auth_skips_session_query(
+    client: AsyncClient, active_session_reads: list[str]
+):
+    register = await client.post(
+        "/auth/register",
+        json={
+            "email": "session-registry@example.com",
+            "password": "Password123",
+            "device_fingerprint": "session-registry-device",
+        },
+    )
+    assert register.status_code == 201
+    token = register.cookies["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+    first_reads = len(active_session_reads)
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+    assert len(active_session_reads) == first_reads
+
+    sessions = await client.get("/auth/sessions", headers=headers)
+    session_id = sessions.json()[0]["id"]
+    assert (
+        await client.delete(f"/auth/sessions/{session_id}", headers=headers)
+    ).status_code == 204
+
+    revoked_reads = len(active_session_reads)
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"]["error"] == "SESSION_REVOKED"
+    assert len(active_session_reads) == revoked_reads
@@ -0,0 +1,206 @@
+"""Solve 会话状态缓存测试 - 稳态消息路径在调用 LLM 前不读数据库"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, select
+
+from app.config import Settings
+from app.models.step_history import StepHistory
+from app.services.session_state_cache import session_state_cache
+from tests.conftest import TestingSessionLocal, engine_test
+
+
+class _StatementLog:
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reads(self, start: int = 0) -> list[str]:
+        return [
+            s
+            for s in self.statements[start:]
+            if s.lstrip().upper().startswith("SELECT")
+        ]
+
+
+@pytest.fixture
+def statement_log():
+    log = _StatementLog()
+    event.listen(engine_test.sync_engine, "before_cursor_execute", log)
+    yield log
+    event.remove(engine_test.sync_engine, "before_cursor_execute", log)
+
+
+async def _create_session(client: AsyncClient, email: str, fingerprint: str):
+    register = await client.post(
+        "/auth/register",
+        json={
+            "email": email,
+            "password": "Password123",
+            "device_fingerprint": fingerprint,
+        },
+    )
+    assert register.status_code == 201
+    token = register.cookies["access_token"]
+    headers = {"Authorization": f"Bearer {token}", "X-Device-Fingerprint": fingerprint}
+    create_resp = await client.post("/sessions/", json={}, headers=headers)
+    assert create_resp.status_code == 201
+    return create_resp.json()["session_id"], headers
+
+
+async def _send(client: AsyncClient, session_id: str, headers: dict, step: str) -> str:
+    async with client.stream(
+        "POST",
+        f"/sessions/{session_id}/messages",
+        json={"content": "我最近工作压力很大", "step": step},
+        headers=headers,
+    ) as response:
+        assert response.status_code == 200
+        return (await response.aread()).decode()
+
+
+def _use_settings(monkeypatch, orchestration: bool) -> None:
+    settings = Settings()
+    settings.enable_multi_agent_orchestration = orchestration
+    monkeypatch.setattr("app.routers.sessions.stream.get_settings", lambda: settings)
+
+
+@pytest.mark.asyncio
+async def test_cached_message_path_has_no_reads_before_llm(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch, statement_log
+):
+    reads_before_llm: list[list[str]] = []
+
+    class FakeAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            reads_before_llm.append(statement_log.reads(start))
+            yield "好的"
+
+    _use_settings(monkeypatch, orchestration=False)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+    session_id, headers = await _create_session(
+        client, "state-cache@example.com", "state-cache-001"
+    )
+
+    # 鉴权本身的查询不在本缓存范围内：只统计会话状态相关的表
+    for step in ("receive", "clarify", "reframe"):
+        start = len(statement_log.statements)
+        body = await _send(client, session_id, headers, step)
+        assert "event: done" in body
+
+    state_reads = [
+        [s for s in reads if "solve_sessions" in s or "step_history" in s]
+        for reads in reads_before_llm
+    ]
+    assert state_reads[0], "首条消息应从数据库加载会话"
+    assert state_reads[1] == []
+    assert state_reads[2] == []
+
+    async with TestingSessionLocal() as db:
+        histories = (
+            (
+                await db.execute(
+                    select(StepHistory)
+                    .where(StepHistory.session_id == session_id)
+                    .order_by(StepHistory.started_at)
+                )
+            )
+            .scalars()
+            .all()
+        )
+    # 每条消息推进一步：已完成的三步各一条消息，当前步骤历史未完成
+    assert [h.step for h in histories] == ["receive", "clarify", "reframe", "options"]
+    assert [h.message_count for h in histories] == [1, 1, 1, 0]
+    assert [h.completed_at is None for h in histories] == [False, False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_orchestration_reuses_cached_profile(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch, statement_log
+):
+    _use_settings(monkeypatch, orchestration=True)
+    session_id, headers = await _create_session(
+        client, "state-cache-orch@example.com", "state-cache-002"
+    )
+
+    await _send(client, session_id, headers, "receive")
+    start = len(statement_log.statements)
+    body = await _send(client, session_id, headers, "clarify")
+
+    assert "event: done" in body
+    profile_reads = [s for s in statement_log.reads(start) if "solve_profiles" in s]
+    assert profile_reads == []
+
+
+@pytest.mark.asyncio
+async def test_update_invalidates_state(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    class FakeAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            yield "好的"
+
+    _use_settings(monkeypatch, orchestration=False)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+    session_id, headers = await _create_session(
+        client, "state-cache-update@example.com", "state-cache-003"
+    )
+    await _send(client, session_id, headers, "receive")
+    key = session_state_cache._key(session_id)
+    assert await session_state_cache._cache.get(key) is not None
+
+    patch_resp = await client.patch(
+        f"/sessions/{session_id}", json={"status": "completed"}, headers=headers
+    )
+    assert patch_resp.status_code == 200
+    assert await session_state_cache._cache.get(key) is None
+
+    async with client.stream(
+        "POST",
+        f"/sessions/{session_id}/messages",
+        json={"content": "还在吗", "step": "clarify"},
+        headers=headers,
+    ) as response:
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_stream_blocks_stale_write_back(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    session_id, headers = await _create_session(
+        client, "state-cache-race@example.com", "state-cache-004"
+    )
+
+    class FakeAIService:
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
+            # 流式回复进行中会话被另一个请求关闭：该流结束时不能把旧状态写回缓存
+            patch_resp = await client.patch(
+                f"/sessions/{session_id}", json={"status": "completed"}, headers=headers
+            )
+            assert patch_resp.status_code == 200
+            yield "好的"
+
+    _use_settings(monkeypatch, orchestration=False)
+    monkeypatch.setattr("app.routers.sessions.stream.AIService", FakeAIService)
+
+    body = await _send(client, session_id, headers, "receive")
+    assert "event: done" in body
+    key = session_state_cache._key(session_id)
+    assert await session_state_cache._cache.get(key) is None
+
+    async with client.stream(
+        "POST",
+        f"/sessions/{session_id}/messages",
+        json={"content": "还在吗", "step": "clarify"},
+        headers=headers,
+    ) as response:
+        assert response.status_code == 400
@@ -378,7 +378,9 @@ async def test_sse_endpoint_returns_event_stream(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["hello", "world"]:
                 yield token
 
@@ -430,7 +432,9 @@ async def test_sse_updates_step_history_message_count(
     client: AsyncClient, monkeypatch: pytest.MonkeyPatch
 ):
     class FakeAIService:
-        async def stream(self, system_prompt: str, user_prompt: str):
+        async def stream(
+            self, system_prompt: str, user_prompt: str, history=None, route=None
+        ):
             for token in ["ping"]:
                 yield token
 
@@ -0,0 +1,65 @@
+"""Tests for the incremental provider SSE decoder."""
+
+import pytest
+from app.services.sse_decoder import (
+    SSEDecoder,
+    iter_sse_data,
+    iter_sse_json,
+    openai_delta,
+)
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def test_decoder_handles_frames_split_across_chunks():
+    decoder = SSEDecoder()
+    assert decoder.feed(b'data: {"a"') == []
+    assert decoder.feed(b":1}\n") == []
+    assert decoder.feed(b"\ndata: x\n\n") == [b'{"a":1}', b"x"]
+
+
+def test_decoder_joins_multiline_data_and_ignores_other_fields():
+    decoder = SSEDecoder()
+    events = decoder.feed(
+        b": comment\nevent: message\nid: 7\ndata: first\ndata:second\n\n"
+    )
+    assert events == [b"first\nsecond"]
+
+
+def test_decoder_handles_crlf_split_between_chunks():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: one\r") == []
+    assert decoder.feed(b"\n\r") == []
+    assert decoder.feed(b"\ndata: two\r\n\r\n") == [b"one", b"two"]
+
+
+def test_decoder_flush_emits_unterminated_event():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: tail") == []
+    assert decoder.flush() == [b"tail"]
+    assert decoder.flush() == []
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_data_byte_by_byte():
+    raw = b"data: hello\n\ndata: world\n\n"
+    parts = [raw[i : i + 1] for i in range(len(raw))]
+    result = [data async for data in iter_sse_data(_chunks(*parts))]
+    assert result == [b"hello", b"world"]
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_json_stops_at_done_and_skips_invalid():
+    raw = b'data: {"n": 1}\n\ndata: {bad\n\ndata: [1]\n\ndata: [DONE]\n\ndata: {"n": 2}\n\n'
+    result = [event async for event in iter_sse_json(_chunks(raw))]
+    assert result == [{"n": 1}]
+
+
+def test_openai_delta_handles_missing_fields():
+    assert openai_delta({}) is None
+    assert openai_delta({"choices": []}) is None
+    assert openai_delta({"choices": [{"delta": {}}]}) is None
+    assert openai_delta({"choices": [{"delta": {"content": "x"}}]}) == {"content": "x"}
@@ -0,0 +1,77 @@
+"""结构化流式输出测试 - 按 schema 校验、逐个产出类型化事件"""
+
+import json
+from uuid import uuid4
+
+from app.schemas.orchestration import (
+    AgentName,
+    AuditorOutput,
+    OrchestratorDecision,
+    ProblemProfile,
+)
+from app.services.orchestration_agents import run_visionary
+from app.services.structured_stream import (
+    StructuredStream,
+    decision_events,
+    render_text,
+    structured_draft,
+)
+
+
+def _visionary_decision() -> OrchestratorDecision:
+    profile = ProblemProfile(session_id=uuid4(), user_goal="按时交付")
+    visionary = run_visionary(profile, "reframe")
+    return OrchestratorDecision(
+        primary_agent=AgentName.VISIONARY,
+        next_step="options",
+        response_text=visionary.user_facing_message,
+        profile=profile,
+        audit=AuditorOutput(allowed=True, sanitized_user_input=""),
+        reframed_problem=visionary.reframed_problem,
+        options=visionary.options,
+    )
+
+
+def test_invalid_items_are_dropped_and_indexes_stay_contiguous():
+    output = json.dumps(
+        {
+            "reframe": "如何在五天内交付核心功能？",
+            "options": [
+                {"title": "砍范围", "description": "只保留核心路径", "pros": ["快"]},
+                {"title": "缺少描述"},
+                {"title": "找支援", "description": "向其他组借人"},
+            ],
+        },
+        ensure_ascii=False,
+    )
+    stream = StructuredStream()
+    events = [event for char in output for event in stream.feed(char)]
+
+    assert [event.name for event in events] == ["reframe", "option", "option"]
+    assert [event.data.get("index") for event in events[1:]] == [0, 1]
+    assert events[2].data["title"] == "找支援"
+    assert events[1].data["cons"] == []
+    assert stream.events == events
+    assert render_text(events).splitlines()[1:] == [
+        "1) 砍范围：只保留核心路径",
+        "2) 找支援：向其他组借人",
+    ]
+
+
+def test_non_json_output_produces_no_events():
+    stream = StructuredStream()
+
+    assert stream.feed("抱歉，我只能用文字回答。") == []
+    assert stream.feed('{"options": [1}') == []
+    assert stream.feed('{"reframe": "x"}') == []
+    assert stream.events == []
+
+
+def test_rule_draft_parses_to_the_same_events():
+    decision = _visionary_decision()
+    stream = StructuredStream()
+    parsed = stream.feed(structured_draft(decision))
+
+    assert parsed == decision_events(decision)
+    assert [event.name for event in parsed] == ["reframe", "option", "option", "option"]
+    assert parsed[0].sse().startswith("event: reframe\ndata: ")
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from datetime import datetime
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
 
 import pytest
+from app.services.conversation_window import ConversationWindow
 from app.utils import cache as cache_module
+from app.utils.metrics import MetricsRegistry
 from redis.exceptions import RedisError
 
 
@@ -17,6 +22,11 @@ def _make_cache(client: AsyncMock | None) -> cache_module.RedisCache:
     instance._enabled = client is not None
     instance._redis_url = "redis://localhost:6379"
     instance._loop = None
+    instance._serializer = cache_module.get_serializer("json")
+    instance._compress_min_bytes = 0
+    instance._early_refresh_beta = 1.0
+    instance._flights = {}
+    instance._flights_loop = None
 
     # Mock _ensure_client() 方法让它直接返回预设的 client
     async def mock_ensure_client():
@@ -28,6 +38,12 @@ def _make_cache(client: AsyncMock | None) -> cache_module.RedisCache:
     return instance
 
 
+def _encoded(value, **kwargs) -> bytes:
+    return cache_module.encode_entry(
+        value, cache_module.get_serializer("json"), **kwargs
+    )
+
+
 def test_default_serializer_uses_isoformat() -> None:
     value = datetime(2024, 1, 1)
     assert cache_module._default_serializer(value) == value.isoformat()
@@ -56,7 +72,7 @@ async def test_no_client_noops() -> None:
 @pytest.mark.asyncio
 async def test_get_cache_hit_records_metrics(monkeypatch) -> None:
     client = AsyncMock()
-    client.get = AsyncMock(return_value='{"ok": true}')
+    client.get = AsyncMock(return_value=_encoded({"ok": True}))
     cache = _make_cache(client)
 
     record_hit = MagicMock()
@@ -69,7 +85,7 @@ async def test_get_cache_hit_records_metrics(monkeypatch) -> None:
     result = await cache.get("key")
 
     assert result == {"ok": True}
-    client.get.assert_awaited_once_with("key")
+    client.get.assert_awaited_once_with("v1:key")
     record_hit.assert_called_once()
     record_miss.assert_not_called()
     assert record_cmd.call_args.kwargs["command"] == "get"
@@ -94,7 +110,7 @@ async def test_get_cache_miss_on_none(monkeypatch) -> None:
 @pytest.mark.asyncio
 async def test_get_cache_miss_on_bad_json(monkeypatch) -> None:
     client = AsyncMock()
-    client.get = AsyncMock(return_value="not-json")
+    client.get = AsyncMock(return_value=b"not-json")
     cache = _make_cache(client)
 
     record_miss = MagicMock()
@@ -134,6 +150,10 @@ async def test_set_serializes_and_records(monkeypatch) -> None:
 
     await cache.set("key", {"value": 1}, ttl=30)
     client.set.assert_awaited_once()
+    key, payload = client.set.await_args.args
+    assert key == "v1:key"
+    assert cache_module.decode_entry(payload).value == {"value": 1}
+    assert client.set.await_args.kwargs == {"ex": 30, "nx": False}
     assert record_cmd.call_args.kwargs["command"] == "set"
 
 
@@ -160,7 +180,7 @@ async def test_delete_records_command(monkeypatch) -> None:
     monkeypatch.setattr(cache_module.metrics, "record_redis_command", record_cmd)
 
     await cache.delete("key")
-    client.delete.assert_awaited_once_with("key")
+    client.delete.assert_awaited_once_with("v1:key")
     assert record_cmd.call_args.kwargs["command"] == "delete"
 
 
@@ -175,7 +195,7 @@ async def test_invalidate_single_key(monkeypatch) -> None:
     monkeypatch.setattr(cache_module.metrics, "record_redis_command", record_cmd)
 
     await cache.invalidate("one")
-    client.delete.assert_awaited_once_with("one")
+    client.delete.assert_awaited_once_with("v1:one")
     client.scan_iter.assert_not_called()
     assert record_cmd.call_args.kwargs["command"] == "invalidate"
 
@@ -186,6 +206,7 @@ async def test_invalidate_pattern_deletes_keys(monkeypatch) -> None:
     client.delete = AsyncMock()
 
     async def fake_scan_iter(match: str | None = None):
+        assert match == "v1:prefix*"
         for item in ["a", "b"]:
             yield item
 
@@ -230,3 +251,578 @@ async def test_close_handles_errors() -> None:
 
     await cache.close()
     client.close.assert_awaited_once()
+
+
+def _pipeline_client() -> tuple[AsyncMock, MagicMock]:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=None)
+    client = AsyncMock()
+    client.pipeline = MagicMock(return_value=pipe)
+    return client, pipe
+
+
+@pytest.mark.asyncio
+async def test_list_range_decodes_items() -> None:
+    client = AsyncMock()
+    client.lrange = AsyncMock(return_value=['"marker"', '{"role": "user"}', "bad{"])
+    cache = _make_cache(client)
+
+    assert await cache.list_range("key") == ["marker", {"role": "user"}]
+    client.lrange.assert_awaited_once_with(cache_module.versioned_key("key"), 0, -1)
+
+
+@pytest.mark.asyncio
+async def test_list_range_missing_key_returns_none() -> None:
+    client = AsyncMock()
+    client.lrange = AsyncMock(return_value=[])
+    cache = _make_cache(client)
+
+    assert await cache.list_range("key") is None
+
+
+@pytest.mark.asyncio
+async def test_list_replace_and_append_use_pipeline() -> None:
+    client, pipe = _pipeline_client()
+    cache = _make_cache(client)
+
+    name = cache_module.versioned_key("key")
+    await cache.list_replace("key", ["a", {"b": 1}], ttl=60)
+    pipe.delete.assert_called_once_with(name)
+    pipe.rpush.assert_called_once_with(name, '"a"', '{"b": 1}')
+    pipe.expire.assert_called_once_with(name, 60)
+
+    await cache.list_append("key", ["c"], max_length=4, ttl=60)
+    pipe.rpushx.assert_called_once_with(name, '"c"')
+    pipe.ltrim.assert_called_once_with(name, -4, -1)
+
+
+class _KeyedListPipeline:
+    def __init__(self, client: _KeyedListClient) -> None:
+        self._client = client
+        self._ops: list[tuple[str, tuple]] = []
+
+    async def __aenter__(self) -> _KeyedListPipeline:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    def __getattr__(self, command: str):
+        return lambda *args: self._ops.append((command, args))
+
+    async def execute(self) -> list:
+        for command, args in self._ops:
+            await getattr(self._client, command)(*args)
+        return []
+
+
+class _KeyedListClient:
+    """按真实键名保存列表的最小 Redis 客户端，用于校验 RedisCache 的键处理"""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[bytes]] = {}
+
+    def pipeline(self, transaction: bool = True) -> _KeyedListPipeline:
+        return _KeyedListPipeline(self)
+
+    async def rpush(self, name: str, *values: str) -> None:
+        self.lists.setdefault(name, []).extend(v.encode() for v in values)
+
+    async def expire(self, name: str, ttl: int) -> None:
+        return None
+
+    async def lrange(self, name: str, start: int, end: int) -> list[bytes]:
+        return list(self.lists.get(name, []))
+
+    async def delete(self, *names: str) -> None:
+        for name in names:
+            self.lists.pop(name, None)
+
+
+@pytest.mark.asyncio
+async def test_conversation_window_clear_deletes_list_written_by_cache() -> None:
+    client = _KeyedListClient()
+    cache = _make_cache(client)  # type: ignore[arg-type]
+    window = ConversationWindow(cache)
+    session_id = uuid4()
+    key = window._key(session_id)
+
+    await cache.list_replace(key, ["__window__", {"role": "user"}], ttl=60)
+    assert await cache.list_range(key) == ["__window__", {"role": "user"}]
+
+    await window.clear(session_id)
+
+    assert await cache.list_range(key) is None
+    assert client.lists == {}
+
+
+@pytest.mark.asyncio
+async def test_list_append_swallows_redis_errors() -> None:
+    client, pipe = _pipeline_client()
+    pipe.execute = AsyncMock(side_effect=RedisError("boom"))
+    cache = _make_cache(client)
+
+    await cache.list_append("key", ["c"], max_length=4)
+
+
+def test_local_cache_expires_and_evicts_lru(monkeypatch) -> None:
+    now = {"value": 100.0}
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now["value"])
+    local = cache_module.LocalCache(max_entries=2, max_bytes=1000)
+
+    local.set("a", {"v": 1}, 10, ttl=5)
+    local.set("b", {"v": 2}, 10, ttl=60)
+    assert local.get("a") == {"v": 1}
+    local.set("c", {"v": 3}, 10, ttl=60)
+
+    # b 最久未使用，被淘汰
+    assert local.get("b") is None
+    assert len(local) == 2
+
+    now["value"] += 10
+    assert local.get("a") is None
+    assert local.get("c") == {"v": 3}
+    assert local.size_bytes == 10
+
+
+def test_local_cache_respects_memory_cap() -> None:
+    local = cache_module.LocalCache(max_entries=100, max_bytes=25)
+
+    local.set("a", "x", 10, ttl=60)
+    local.set("b", "y", 10, ttl=60)
+    local.set("c", "z", 10, ttl=60)
+    local.set("huge", "w", 26, ttl=60)
+
+    assert local.get("a") is None
+    assert local.get("b") == "y"
+    assert local.get("huge") is None
+    assert local.size_bytes == 20
+
+
+class _FakeL2:
+    def __init__(self) -> None:
+        self.values: dict[str, object] = {}
+        self.gets = 0
+        self.published: list[object] = []
+
+    async def get(self, key):
+        self.gets += 1
+        return self.values.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.values[key] = value
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def publish(self, channel, value):
+        self.published.append(value)
+
+
+def _tiered(l2: _FakeL2) -> cache_module.TieredCache:
+    tiered = cache_module.TieredCache(l2)  # type: ignore[arg-type]
+    tiered._local = cache_module.LocalCache(100, 10_000)
+    tiered._local_ttl = 30.0
+    tiered._subscriber._connected = True
+    return tiered
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_serves_repeat_reads_from_l1(monkeypatch) -> None:
+    l2 = _FakeL2()
+    l2.values["user:1"] = {"email": "a@example.com"}
+    tiered = _tiered(l2)
+    registry = MetricsRegistry()
+    monkeypatch.setattr(cache_module, "metrics", registry)
+
+    assert await tiered.get("user:1") == {"email": "a@example.com"}
+    assert await tiered.get("user:1") == {"email": "a@example.com"}
+
+    assert l2.gets == 1
+    lookups = registry.snapshot()["cache_lookups"]
+    assert lookups == {("l1", "miss"): 1, ("l1", "hit"): 1}
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_writes_update_l1_and_broadcast() -> None:
+    l2 = _FakeL2()
+    tiered = _tiered(l2)
+
+    await tiered.set("user:1", {"v": 1}, ttl=600)
+    assert await tiered.get("user:1") == {"v": 1}
+    assert l2.gets == 0
+
+    await tiered.delete("user:1")
+    assert await tiered.get("user:1") is None
+    assert [message["keys"] for message in l2.published] == [["user:1"], ["user:1"]]
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_applies_remote_invalidation() -> None:
+    l2 = _FakeL2()
+    l2.values["user:1"] = {"v": 1}
+    tiered = _tiered(l2)
+    await tiered.get("user:1")
+
+    # 本进程发出的消息被忽略
+    tiered._on_invalidate({"origin": tiered._origin, "keys": ["user:1"]})
+    await tiered.get("user:1")
+    assert l2.gets == 1
+
+    l2.values["user:1"] = {"v": 2}
+    tiered._on_invalidate({"origin": "other-worker", "keys": ["user:1"]})
+    assert await tiered.get("user:1") == {"v": 2}
+    assert l2.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_does_not_backfill_after_concurrent_invalidation() -> None:
+    l2 = _FakeL2()
+    l2.values["user:1"] = {"v": "stale"}
+    tiered = _tiered(l2)
+    original_get = l2.get
+
+    async def racing_get(key):
+        value = await original_get(key)
+        tiered._on_invalidate({"origin": "other-worker", "keys": [key]})
+        return value
+
+    l2.get = racing_get  # type: ignore[method-assign]
+    await tiered.get("user:1")
+
+    assert tiered._local is not None
+    assert tiered._local.get("user:1") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_bypasses_l1_while_unsubscribed() -> None:
+    l2 = _FakeL2()
+    l2.values["user:1"] = {"v": 1}
+    tiered = _tiered(l2)
+    tiered._subscriber._connected = False
+
+    await tiered.get("user:1")
+    await tiered.get("user:1")
+
+    assert l2.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_invalidates_other_workers_over_pubsub() -> None:
+    worker, other = (
+        cache_module.TieredCache(cache_module.cache),
+        cache_module.TieredCache(cache_module.cache),
+    )
+    key = f"test:tiered:{uuid4()}"
+    await worker.start()
+    try:
+        for _ in range(100):
+            if worker._subscriber.connected:
+                break
+            await asyncio.sleep(0.01)
+        assert worker._subscriber.connected
+
+        await other.set(key, {"v": 1}, ttl=60)
+        assert await worker.get(key) == {"v": 1}
+
+        await other.set(key, {"v": 2}, ttl=60)
+        for _ in range(100):
+            if worker._local is not None and worker._local.get(key) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert await worker.get(key) == {"v": 2}
+    finally:
+        await worker.close()
+        await cache_module.cache.delete(key)
+
+
+def test_entry_roundtrip_compresses_large_values() -> None:
+    serializer = cache_module.get_serializer("json")
+    value = {"text": "x" * 4000, "when": datetime(2024, 1, 1)}
+
+    small = cache_module.encode_entry({"v": 1}, serializer, compress_min_bytes=1024)
+    large = cache_module.encode_entry(
+        value, serializer, compress_min_bytes=1024, delta=0.5, expires_at=123.0
+    )
+
+    assert cache_module.decode_entry(small).value == {"v": 1}
+    assert len(large) < 1000
+    entry = cache_module.decode_entry(large)
+    assert entry.value == {"text": "x" * 4000, "when": "2024-01-01T00:00:00"}
+    assert (entry.delta, entry.expires_at) == (0.5, 123.0)
+
+
+def test_decode_entry_rejects_unknown_format() -> None:
+    # 旧格式的纯 JSON、未知序列化器代码与损坏的压缩内容都按未命中处理
+    assert cache_module.decode_entry(b'{"v": 1}') is None
+    unknown = bytearray(_encoded({"v": 1}))
+    unknown[0] = 250
+    assert cache_module.decode_entry(bytes(unknown)) is None
+    corrupt = bytearray(_encoded({"v": 1}))
+    corrupt[1] = 0x01
+    assert cache_module.decode_entry(bytes(corrupt)) is None
+
+
+def test_unavailable_serializer_falls_back_to_json() -> None:
+    assert cache_module.get_serializer("no-such-format").name == "json"
+
+
+def test_should_refresh_only_near_expiry(monkeypatch) -> None:
+    # -ln(1 - 0.5) ≈ 0.69：提前量约为 delta * beta * 0.69
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.5)
+    entry = cache_module.CacheEntry({"v": 1}, delta=2.0, expires_at=100.0)
+
+    assert not entry.should_refresh(1.0, now=90.0)
+    assert entry.should_refresh(1.0, now=99.0)
+    assert not entry.should_refresh(0.0, now=99.0)
+    assert not cache_module.CacheEntry({"v": 1}, expires_at=100.0).should_refresh(
+        1.0, now=99.9
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_coalesces_concurrent_misses() -> None:
+    cache = _make_cache(None)
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"v": calls}
+
+    tasks = [
+        asyncio.create_task(cache.get_or_load("hot", loader, ttl=60)) for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [{"v": 1}] * 5
+    assert calls == 1
+    assert cache._flights == {}
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_shares_loader_errors_and_recovers() -> None:
+    cache = _make_cache(None)
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("db down")
+
+    tasks = [asyncio.create_task(cache.get_or_load("hot", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def loader():
+        return "ok"
+
+    assert await cache.get_or_load("hot", loader) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_follower_loads_when_leader_is_cancelled() -> None:
+    cache = _make_cache(None)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "fresh"
+
+    leader = asyncio.create_task(cache.get_or_load("hot", slow))
+    await started.wait()
+    follower = asyncio.create_task(cache.get_or_load("hot", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_refreshes_early_and_caches_loader_time(
+    monkeypatch,
+) -> None:
+    client = AsyncMock()
+    client.get = AsyncMock(
+        return_value=_encoded({"v": "old"}, delta=5.0, expires_at=time.time() + 1)
+    )
+    client.set = AsyncMock()
+    cache = _make_cache(client)
+
+    async def loader():
+        return {"v": "new"}
+
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.999)
+    assert await cache.get_or_load("hot", loader, ttl=60) == {"v": "new"}
+    key, payload = client.set.await_args.args
+    assert key == "v1:hot"
+    entry = cache_module.decode_entry(payload)
+    assert entry.value == {"v": "new"}
+    assert entry.delta > 0
+    assert entry.expires_at > time.time() + 50
+
+    # 远离过期时直接返回缓存值
+    client.set.reset_mock()
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.0)
+    assert await cache.get_or_load("hot", loader, ttl=60) == {"v": "old"}
+    client.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_does_not_cache_none() -> None:
+    client = AsyncMock()
+    client.get = AsyncMock(return_value=None)
+    client.set = AsyncMock()
+    cache = _make_cache(client)
+
+    async def loader():
+        return None
+
+    assert await cache.get_or_load("missing", loader, ttl=60) is None
+    client.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_against_redis_uses_versioned_keys() -> None:
+    cache = cache_module.cache
+    key = f"test:load:{uuid4()}"
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return {"blob": "y" * 5000}
+
+    try:
+        assert await cache.get_or_load(key, loader, ttl=60) == {"blob": "y" * 5000}
+        assert await cache.get_or_load(key, loader, ttl=60) == {"blob": "y" * 5000}
+        assert calls == 1
+
+        client = await cache._ensure_client()
+        assert client is not None
+        assert await client.exists(key) == 0
+        raw = await client.get(f"v1:{key}")
+        assert raw[1] & 0x01  # 超过阈值的值已压缩
+    finally:
+        await cache.delete(key)
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_get_or_load_backfills_l1() -> None:
+    l2 = _FakeL2()
+    tiered = _tiered(l2)
+    loads = 0
+
+    async def l2_get_or_load(key, loader, ttl=None):
+        nonlocal loads
+        loads += 1
+        return await loader()
+
+    l2.get_or_load = l2_get_or_load  # type: ignore[attr-defined]
+
+    async def loader():
+        return {"v": 1}
+
+    assert await tiered.get_or_load("user:1", loader, ttl=60) == {"v": 1}
+    assert await tiered.get_or_load("user:1", loader, ttl=60) == {"v": 1}
+    assert loads == 1
+
+
+@pytest.mark.asyncio
+async def test_get_many_uses_single_mget(monkeypatch) -> None:
+    client = AsyncMock()
+    client.mget = AsyncMock(return_value=[_encoded({"v": 1}), None, b"bad"])
+    cache = _make_cache(client)
+    registry = MetricsRegistry()
+    monkeypatch.setattr(cache_module, "metrics", registry)
+
+    assert await cache.get_many(["a", "b", "c"]) == [{"v": 1}, None, None]
+    client.mget.assert_awaited_once_with(["v1:a", "v1:b", "v1:c"])
+    snapshot = registry.snapshot()
+    assert (snapshot["cache_hits"], snapshot["cache_misses"]) == (1, 2)
+    assert await cache.get_many([]) == []
+
+
+@pytest.mark.asyncio
+async def test_set_many_and_delete_many_batch_commands() -> None:
+    client, pipe = _pipeline_client()
+    client.delete = AsyncMock()
+    cache = _make_cache(client)
+
+    await cache.set_many({"a": ({"v": 1}, 60), "b": ("x", None)})
+    client.pipeline.assert_called_once_with(transaction=False)
+    assert [call.args[0] for call in pipe.set.call_args_list] == ["v1:a", "v1:b"]
+    assert [call.kwargs["ex"] for call in pipe.set.call_args_list] == [60, None]
+    assert cache_module.decode_entry(pipe.set.call_args_list[0].args[1]).value == {
+        "v": 1
+    }
+    pipe.execute.assert_awaited_once()
+
+    await cache.delete_many(["a", "b"])
+    client.delete.assert_awaited_once_with("v1:a", "v1:b")
+
+
+@pytest.mark.asyncio
+async def test_batch_operations_against_redis() -> None:
+    cache = cache_module.cache
+    prefix = f"test:batch:{uuid4()}"
+    keys = [f"{prefix}:a", f"{prefix}:b"]
+    try:
+        await cache.set_many({keys[0]: ({"v": 1}, 60), keys[1]: ([1, 2], 60)})
+        assert await cache.get_many([*keys, f"{prefix}:missing"]) == [
+            {"v": 1},
+            [1, 2],
+            None,
+        ]
+        await cache.delete_many(keys)
+        assert await cache.get_many(keys) == [None, None]
+    finally:
+        await cache.delete_many(keys)
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_get_many_reads_only_l1_misses() -> None:
+    l2 = _FakeL2()
+    l2.values.update({"a": 1, "b": 2})
+    requested: list[list[str]] = []
+
+    async def get_many(keys):
+        requested.append(list(keys))
+        return [l2.values.get(key) for key in keys]
+
+    async def set_many(items):
+        for key, (value, _ttl) in items.items():
+            l2.values[key] = value
+
+    async def delete_many(keys):
+        for key in keys:
+            l2.values.pop(key, None)
+
+    l2.get_many = get_many  # type: ignore[attr-defined]
+    l2.set_many = set_many  # type: ignore[attr-defined]
+    l2.delete_many = delete_many  # type: ignore[attr-defined]
+    tiered = _tiered(l2)
+
+    await tiered.set("a", 1, ttl=60)
+    assert await tiered.get_many(["a", "b", "c"]) == [1, 2, None]
+    assert requested == [["b", "c"]]
+
+    await tiered.set_many({"c": (3, 60), "d": (4, 60)})
+    assert await tiered.get_many(["b", "c", "d"]) == [2, 3, 4]
+    assert requested == [["b", "c"]]
+
+    await tiered.delete_many(["a", "c"])
+    assert await tiered.get_many(["a", "c"]) == [None, None]
+    assert [message["keys"] for message in l2.published][-2:] == [
+        ["c", "d"],
+        ["a", "c"],
+    ]
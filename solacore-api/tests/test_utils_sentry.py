@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from unittest.mock import patch
+from uuid import UUID
 
 from app.config import Settings
 from app.utils import sentry as sentry_utils
 from fastapi import FastAPI
 from starlette.requests import Request
 
+USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+
 
 async def _receive() -> dict:
     return {"type": "http.request", "body": b"", "more_body": False}
@@ -85,17 +88,17 @@ def test_before_send_scrubs_event() -> None:
 def test_extract_user_id_from_cookie() -> None:
     request = _make_request(cookies={"access_token": "token"})
     with patch(
-        "app.utils.sentry.decode_token",
-        return_value={"type": "access", "sub": "user-1"},
+        "app.middleware.auth_context.decode_token",
+        return_value={"type": "access", "sub": str(USER_ID)},
     ):
-        assert sentry_utils._extract_user_id(request) == "user-1"
+        assert sentry_utils._extract_user_id(request) == str(USER_ID)
 
 
 def test_extract_user_id_from_header_and_invalid_payload() -> None:
     request = _make_request(headers={"Authorization": "Bearer token"})
     with patch(
-        "app.utils.sentry.decode_token",
-        return_value={"type": "refresh", "sub": "user-1"},
+        "app.middleware.auth_context.decode_token",
+        return_value={"type": "refresh", "sub": str(USER_ID)},
     ):
         assert sentry_utils._extract_user_id(request) is None
 
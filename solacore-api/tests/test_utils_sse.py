@@ -0,0 +1,174 @@
+"""Tests for SSE token coalescing."""
+
+import asyncio
+
+import pytest
+from app.utils.sse import DisconnectWatcher, coalesce_tokens
+
+
+async def _tokens(items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(generator):
+    return [item async for item in generator]
+
+
+@pytest.mark.asyncio
+async def test_first_token_is_sent_immediately_and_rest_coalesced():
+    chunks = await _collect(
+        coalesce_tokens(
+            _tokens(["a", "b", "c", "d"]), flush_interval=10.0, max_bytes=1024
+        )
+    )
+    assert chunks == ["a", "bcd"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_max_bytes_reached():
+    chunks = await _collect(
+        coalesce_tokens(
+            _tokens(["x", "ab", "cd", "ef", "g"]), flush_interval=10.0, max_bytes=4
+        )
+    )
+    assert chunks == ["x", "abcd", "efg"]
+    assert "".join(chunks) == "xabcdefg"
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval_while_upstream_is_slow():
+    async def slow():
+        yield "a"
+        yield "b"
+        await asyncio.sleep(0.1)
+        yield "c"
+
+    chunks = await _collect(
+        coalesce_tokens(slow(), flush_interval=0.02, max_bytes=1024)
+    )
+    assert chunks == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_zero_interval_passes_tokens_through():
+    chunks = await _collect(
+        coalesce_tokens(_tokens(["a", "", "b"]), flush_interval=0, max_bytes=1024)
+    )
+    assert chunks == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_emitted_while_waiting_for_first_token():
+    async def thinking():
+        await asyncio.sleep(0.08)
+        yield "hi"
+
+    chunks = await _collect(
+        coalesce_tokens(
+            thinking(), flush_interval=0.01, max_bytes=1024, heartbeat_interval=0.03
+        )
+    )
+    assert chunks[-1] == "hi"
+    assert chunks.count(None) >= 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_raised_after_buffered_text():
+    async def failing():
+        yield "a"
+        yield "b"
+        raise RuntimeError("boom")
+
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        async for chunk in coalesce_tokens(
+            failing(), flush_interval=10.0, max_bytes=1024
+        ):
+            received.append(chunk)
+    assert received == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_closing_consumer_cancels_upstream():
+    cancelled = asyncio.Event()
+
+    async def endless():
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            cancelled.set()
+
+    generator = coalesce_tokens(endless(), flush_interval=0.01, max_bytes=1024)
+    assert await generator.__anext__() == "a"
+    await generator.aclose()
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_closing_consumer_closes_upstream_blocked_on_full_queue():
+    closed = asyncio.Event()
+
+    async def flood():
+        try:
+            while True:
+                yield "x"
+        finally:
+            closed.set()
+
+    generator = coalesce_tokens(flood(), flush_interval=10.0, max_bytes=1 << 20)
+    assert await generator.__anext__() == "x"
+    # 让上游填满队列并阻塞在 queue.put
+    for _ in range(5):
+        await asyncio.sleep(0)
+    await generator.aclose()
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_stop_event_cancels_stalled_upstream():
+    cancelled = asyncio.Event()
+    stop = asyncio.Event()
+
+    async def stalled():
+        try:
+            await asyncio.sleep(10)
+            yield "never"
+        finally:
+            cancelled.set()
+
+    async def trigger():
+        await asyncio.sleep(0.02)
+        stop.set()
+
+    trigger_task = asyncio.create_task(trigger())
+    chunks = await asyncio.wait_for(
+        _collect(
+            coalesce_tokens(stalled(), flush_interval=0.01, max_bytes=1024, stop=stop)
+        ),
+        timeout=1,
+    )
+    await trigger_task
+    assert chunks == []
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_watcher_sets_event_on_http_disconnect():
+    messages = asyncio.Queue()
+
+    class FakeRequest:
+        async def receive(self):
+            return await messages.get()
+
+    async with DisconnectWatcher(FakeRequest()) as watcher:
+        await messages.put({"type": "http.request", "body": b"", "more_body": False})
+        await asyncio.sleep(0)
+        assert not watcher.disconnected
+        await messages.put({"type": "http.disconnect"})
+        await asyncio.wait_for(watcher.event.wait(), timeout=1)
+    assert watcher.disconnected